@@ -1,8 +1,10 @@
 # analyzer.py
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from statistics import mean
 from collections import defaultdict, Counter
 
+from match_features import MatchFeatures, build_match_features, current_season, detect_role
+
 # --- Helper functions --------------------------------------------------------
 
 
@@ -93,41 +95,24 @@ def _role_cs_threshold(role: str) -> float:
     return ROLE_CS_LOW_THRESH.get(role, ROLE_CS_LOW_THRESH["DEFAULT"])
 
 
-def _detect_role(self_participant: Dict[str, Any]) -> str:
-    """
-    Detect role using strictly Riot API's teamPosition.
-    Falls back to individualPosition if teamPosition is missing/invalid.
-    """
-    # 1. Riot API Team Position
-    pos = self_participant.get("teamPosition")
-    if pos and pos != "Invalid":
-        return pos
-
-    # 2. Fallback
-    return self_participant.get("individualPosition") or "MIDDLE"
+_detect_role = detect_role  # Moved to match_features; kept for existing imports
 
 
 # --- OP.GG Style Analytics ---------------------------------------------------
 
-def analyze_teammates(matches: List[Dict[str, Any]], self_puuid: str, season_prefix: str = None) -> List[Dict[str, Any]]:
+def analyze_teammates(features: List[MatchFeatures], self_puuid: str, season_prefix: str = None) -> List[Dict[str, Any]]:
     """Identify frequent teammates (duos) and their performance, optionally filtered by season."""
     teammate_stats = defaultdict(lambda: {"games": 0, "wins": 0, "name": "", "tag": ""})
     
-    for match in matches:
-        info = match["info"]
-        
+    for f in features:
         # Season Filter
-        if season_prefix:
-            game_version = info.get("gameVersion", "")
-            if not game_version.startswith(season_prefix):
-                continue
-
-        self_p = extract_self_participant(match, self_puuid)
-        my_team = self_p["teamId"]
-        win = self_p["win"]
+        if season_prefix and f.season != season_prefix:
+            continue
+
+        win = f.win
         
-        for p in info["participants"]:
-            if p["teamId"] == my_team and p["puuid"] != self_puuid:
+        for p in f.team_participants:
+            if p["puuid"] != self_puuid:
                 # Key by PUUID for uniqueness
                 ts = teammate_stats[p["puuid"]]
                 ts["games"] += 1
@@ -155,22 +140,20 @@ def analyze_teammates(matches: List[Dict[str, Any]], self_puuid: str, season_pre
 
 
 
-def analyze_recent_performance(matches: List[Dict[str, Any]], self_puuid: str, days: int = 7) -> List[Dict[str, Any]]:
+def analyze_recent_performance(features: List[MatchFeatures], days: int = 7) -> List[Dict[str, Any]]:
     """Calculate winrate per champion over the last N days."""
     import time
     cutoff_ms = (time.time() - (days * 24 * 3600)) * 1000
     
     recent_stats = defaultdict(lambda: {"wins": 0, "losses": 0, "games": 0})
     
-    for match in matches:
-        info = match["info"]
-        end_time = info.get("gameEndTimestamp")
+    for f in features:
+        end_time = f.game_end_ts
         if not end_time or end_time < cutoff_ms:
             continue
             
-        self_p = extract_self_participant(match, self_puuid)
-        champ = self_p["championName"]
-        win = self_p["win"]
+        champ = f.champion
+        win = f.win
         
         recent_stats[champ]["games"] += 1
         if win:
@@ -198,10 +181,14 @@ def analyze_recent_performance(matches: List[Dict[str, Any]], self_puuid: str, d
 def analyze_matches(
     matches: List[Dict[str, Any]],
     puuid: str,
+    features: Optional[List[MatchFeatures]] = None,
 ) -> Dict[str, Any]:
     """
     Main entrypoint: analyze a set of matches for a given player.
 
+    Pass `features` (from match_features.build_match_features) to share the
+    single per-match pre-pass with the enricher; it is computed here otherwise.
+
     Returns a dictionary with:
       - summary: overall stats
       - per_champion: list of per-champion stats (for champs with 3+ games)
@@ -211,22 +198,16 @@ def analyze_matches(
       - per_game_loss_details: per-loss tags and diagnostics
       - primary_role: most common role across analyzed games (e.g. 'MIDDLE', 'JUNGLE')
     """
-    # --- Helper to extract season (major version) ----------------------------
-    def _get_season_from_version(game_version: str) -> str:
-        if not game_version:
-            return "0"
-        return game_version.split(".")[0]
-
     # --- Core analysis -----------------------------------------------------------
 
-    match_count = len(matches)
+    if features is None:
+        features = build_match_features(matches, puuid)
+
+    match_count = len(features)
     use_weighted = match_count > 50
-    current_season_prefix = "16" # Default to Season 16
     
-    # Detect most recent season from the latest game
-    if matches:
-        latest_ver = matches[0]["info"].get("gameVersion", "16.1")
-        current_season_prefix = _get_season_from_version(latest_ver)
+    # Detect most recent season from the latest game (defaults to Season 16)
+    current_season_prefix = current_season(features)
 
     kdas_weighted = []
     dmg_shares_weighted = []
@@ -268,11 +249,10 @@ def analyze_matches(
     role_counter = Counter()
     patch_counter = Counter()
 
-    for match in matches:
-        info = match["info"]
-        game_version = info.get("gameVersion", "")
-        patch = ".".join(game_version.split(".")[:2]) if game_version else "unknown"
-        season = _get_season_from_version(game_version)
+    for f in features:
+        info = f.info
+        patch = f.patch
+        season = f.season
         
         # Weighting Logic
         # If use_weighted is True (batch > 50), current season games get weight 2.0, others 1.0
@@ -290,19 +270,18 @@ def analyze_matches(
                 weight = 1.0
         
         patch_counter[patch] += 1
-        duration = info.get("gameDuration", 0)  # seconds
-        duration_minutes = max(duration / 60, 1)
+        duration = f.duration  # seconds
+        duration_minutes = f.duration_minutes
 
-        self_p = extract_self_participant(match, puuid)
+        self_p = f.self_p
         
         # ... (rest of extraction logic remains similar, but we apply weights to lists)
         
-        team_id = self_p.get("teamId")
-        game_role = _detect_role(self_p)
+        team_id = f.team_id
+        game_role = f.role
         role_counter[game_role] += 1
 
-        team_participants = [p for p in info["participants"] if p["teamId"] == team_id]
-        enemy_participants = [p for p in info["participants"] if p["teamId"] != team_id]
+        team_participants = f.team_participants
 
         # Basic stats
         kills = self_p.get("kills", 0)
@@ -311,13 +290,12 @@ def analyze_matches(
         cs = self_p.get("totalMinionsKilled", 0) + self_p.get("neutralMinionsKilled", 0)
         damage = self_p.get("totalDamageDealtToChampions", 0)
         gold = self_p.get("goldEarned", 0)
-        champ_name = self_p.get("championName", "Unknown")
+        champ_name = f.champion
 
-        # Team aggregates
-        team_kills = sum(p.get("kills", 0) for p in team_participants)
-        enemy_kills = sum(p.get("kills", 0) for p in enemy_participants)
-        team_damage = sum(p.get("totalDamageDealtToChampions", 0) for p in team_participants)
-        team_gold = sum(p.get("goldEarned", 0) for p in team_participants)
+        # Team aggregates (precomputed once per match)
+        team_kills = f.team_kills
+        team_damage = f.team_damage
+        team_gold = f.team_gold
 
         team_cs_per_min = []
         for p in team_participants:
@@ -332,7 +310,7 @@ def analyze_matches(
         kp = (kills + assists) / team_kills if team_kills > 0 else 0.0
 
         # Win/Loss
-        win = bool(self_p.get("win", False))
+        win = f.win
         if win:
             wins += 1
         else:
@@ -453,7 +431,7 @@ def analyze_matches(
                 loss_reason_counter[r] += 1
             
             per_game_loss_details.append({
-                "match_id": match["metadata"]["matchId"],
+                "match_id": f.match_id,
                 "champion": champ_name,
                 "game_length_min": round(duration_minutes, 1),
                 "reasons": reasons,
@@ -461,9 +439,10 @@ def analyze_matches(
             })
 
         # Append to detailed_matches
-        # Append to detailed_matches
+        # Scoreboard rows are built once by the enricher (build_detailed_match_info),
+        # so no per-participant copies are made here.
         detailed_matches.append({
-            "match_id": match["metadata"]["matchId"],
+            "match_id": f.match_id,
             "champion": champ_name,
             "role": game_role,
             "kda": round(kda, 2),
@@ -472,11 +451,7 @@ def analyze_matches(
             "game_duration": duration, # snake_case for frontend
             "queue_id": info.get("queueId", 0),
             "game_mode": info.get("gameMode", "CLASSIC"),
-            "participants": [
-                {**p, "is_self": (p.get("puuid") == puuid)} 
-                for p in info.get("participants", [])
-            ],
-            "tags": match.get("tags", []), # Tags might be added by ai later, or empty
+            "tags": f.match.get("tags", []), # Tags might be added by ai later, or empty
         })
 
     # --- End Loop ---
@@ -494,10 +469,10 @@ def analyze_matches(
         avg_kda = avg_dmg_share = avg_gold_share = avg_cs_per_min = avg_kp = avg_vis_score = avg_dpm = 0.0
 
     summary = {
-        "games": len(matches),
+        "games": match_count,
         "wins": wins,
         "losses": losses,
-        "winrate": round(wins / len(matches), 2) if matches else 0.0,
+        "winrate": round(wins / match_count, 2) if match_count else 0.0,
         "avg_kda": round(avg_kda, 2),
         "avg_damage_share": round(avg_dmg_share, 3),
         "avg_gold_share": round(avg_gold_share, 3),
@@ -643,8 +618,8 @@ def analyze_matches(
         "per_game_loss_details": per_game_loss_details,
         "detailed_matches": detailed_matches,
         "primary_role": primary_role,
-        "teammates": analyze_teammates(matches, puuid, season_prefix=current_season_prefix),
-        "recent_performance": analyze_recent_performance(matches, puuid),
+        "teammates": analyze_teammates(features, puuid, season_prefix=current_season_prefix),
+        "recent_performance": analyze_recent_performance(features),
     }
 
 
@@ -668,19 +643,12 @@ def calculate_season_stats_from_db(puuid: str) -> Dict[str, Any]:
     champ_stats = defaultdict(lambda: {"games": 0, "wins": 0, "kills": 0, "deaths": 0, "assists": 0, "cs": 0, "duration": 0})
     duo_tracker = defaultdict(lambda: {"games": 0, "wins": 0})
     
-    for m in matches:
-        info = m.get("info", {})
-        
+    for f in build_match_features(matches, puuid):
         # Strict Season Filter (Season 16)
-        game_version = info.get("gameVersion", "")
-        if not game_version.startswith("16."):
+        if f.season != "16":
             continue
             
-        parts = info.get("participants", [])
-        
-        # Find self
-        me = next((p for p in parts if p["puuid"] == puuid), None)
-        if not me: continue
+        me = f.self_p
         
         # Validate Queue Type (Optional: Filter only Ranked Solo/Flex?)
         # For now, aggregate all fetched games as they are likely ranked from our fetch logic.
@@ -698,30 +666,28 @@ def calculate_season_stats_from_db(puuid: str) -> Dict[str, Any]:
         s["deaths"] += me["deaths"]
         s["assists"] += me["assists"]
         s["cs"] += (me["totalMinionsKilled"] + me.get("neutralMinionsKilled", 0))
-        s["duration"] += info["gameDuration"]
+        s["duration"] += f.duration
         
         # Duo Analysis (Same Team)
-        my_team = me["teamId"]
-        for p in parts:
+        for p in f.team_participants:
             if p["puuid"] == puuid: continue
-            if p["teamId"] == my_team:
-                # Identification: name#tag or just name
-                # Riot API v5 has riotIdGameName / riotIdTagLine
-                name = p.get("riotIdGameName", p.get("summonerName", "Unknown"))
-                tag = p.get("riotIdTagLine", "")
-                full_name = f"{name}#{tag}" if tag else name
-                if not full_name or full_name == "Unknown": continue
-                
-                duo_tracker[full_name]["games"] += 1
-                if win: duo_tracker[full_name]["wins"] += 1
-                if "puuid" not in duo_tracker[full_name]:
-                    duo_tracker[full_name]["puuid"] = p.get("puuid")
-                
-                # Store display data (first encounter wins)
-                if "tag" not in duo_tracker[full_name]:
-                    duo_tracker[full_name]["tag"] = tag
-                    duo_tracker[full_name]["short_name"] = name
-                    duo_tracker[full_name]["icon"] = p.get("profileIcon", 29)
+            # Identification: name#tag or just name
+            # Riot API v5 has riotIdGameName / riotIdTagLine
+            name = p.get("riotIdGameName", p.get("summonerName", "Unknown"))
+            tag = p.get("riotIdTagLine", "")
+            full_name = f"{name}#{tag}" if tag else name
+            if not full_name or full_name == "Unknown": continue
+            
+            duo_tracker[full_name]["games"] += 1
+            if win: duo_tracker[full_name]["wins"] += 1
+            if "puuid" not in duo_tracker[full_name]:
+                duo_tracker[full_name]["puuid"] = p.get("puuid")
+            
+            # Store display data (first encounter wins)
+            if "tag" not in duo_tracker[full_name]:
+                duo_tracker[full_name]["tag"] = tag
+                duo_tracker[full_name]["short_name"] = name
+                duo_tracker[full_name]["icon"] = p.get("profileIcon", 29)
 
     # Format Champion Stats
     final_champs = []
@@ -0,0 +1,60 @@
+"""Benchmarks for the per-player analysis stage (analyzer, coach_data_enricher, league_crew)."""
+
+from __future__ import annotations
+
+import pytest
+
+
+def test_analyze_matches(benchmark, dataset):
+    from analyzer import analyze_matches
+
+    result = benchmark(analyze_matches, dataset.matches, dataset.puuid)
+    assert result["summary"]
+
+
+def test_analyze_matches_shared_features(benchmark, dataset):
+    from analyzer import analyze_matches
+
+    features = dataset.features
+    result = benchmark(analyze_matches, dataset.matches, dataset.puuid, features=features)
+    assert result["summary"]
+
+
+def test_calculate_season_stats_from_db(benchmark, dataset, monkeypatch):
+    from analyzer import calculate_season_stats_from_db
+    from database import Database, compress_blob, decompress_blob
+
+    # Matches come back from stored blobs, the same way a cursor over `matches` returns them
+    blobs = [compress_blob(m) for m in dataset.matches]
+    monkeypatch.setattr(
+        Database, "get_matches_by_puuid",
+        lambda self, puuid, limit=1000: [decompress_blob(b) for b in blobs[:limit]],
+    )
+
+    result = benchmark(calculate_season_stats_from_db, dataset.puuid)
+    assert result
+
+
+def test_enrich_coaching_data(benchmark, dataset):
+    from coach_data_enricher import enrich_coaching_data
+
+    analysis = dataset.analysis
+    diagnostics = dataset.loss_diagnostics
+    movement = dataset.movement_summaries
+    features = dataset.features
+
+    result = benchmark(
+        enrich_coaching_data,
+        dataset.matches, dataset.match_ids, dataset.puuid, analysis,
+        diagnostics, movement, features=features,
+    )
+    assert len(result["detailed_matches"]) == dataset.games
+
+
+def test_classify_matches_and_identify_candidates(benchmark, dataset):
+    pytest.importorskip("openai")
+    from league_crew import classify_matches_and_identify_candidates
+
+    enriched = dataset.enriched
+    candidates, match_tags = benchmark(classify_matches_and_identify_candidates, enriched)
+    assert len(match_tags) == dataset.games
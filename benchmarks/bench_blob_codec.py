@@ -0,0 +1,40 @@
+"""Benchmarks for blob_codec: zlib vs zstd vs zstd with a trained dictionary, on match and timeline JSON."""
+
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("zstandard")
+
+import blob_codec  # noqa: E402
+import fast_json  # noqa: E402
+
+CODECS = ("zlib", "zstd", "zstd-dict")
+
+
+def _tag(codec: str, kind: str, docs) -> str:
+    if codec != "zstd-dict":
+        return codec
+    # Trained on the benchmark set itself; fine for relative speed, flatters the ratio
+    dict_id = blob_codec.register_dictionary(f"bench-{kind}", blob_codec.train_dictionary(docs), active=False)
+    return f"zstd:{dict_id}"
+
+
+@pytest.mark.parametrize("codec", CODECS)
+@pytest.mark.parametrize("kind", ("matches", "timelines"))
+def test_compress(benchmark, dataset, kind, codec):
+    docs = getattr(dataset, kind)
+    tag = _tag(codec, kind, docs)
+    raw = [fast_json.dumps(d) for d in docs]
+    blobs = benchmark(lambda: [blob_codec.compress(r, tag) for r in raw])
+    benchmark.extra_info["ratio"] = round(sum(map(len, blobs)) / sum(map(len, raw)), 4)
+
+
+@pytest.mark.parametrize("codec", CODECS)
+@pytest.mark.parametrize("kind", ("matches", "timelines"))
+def test_decode(benchmark, dataset, kind, codec):
+    docs = getattr(dataset, kind)
+    tag = _tag(codec, kind, docs)
+    blobs = [blob_codec.compress(fast_json.dumps(d), tag) for d in docs]
+    out = benchmark(lambda: [blob_codec.decode(b, tag) for b in blobs])
+    assert out[0] == docs[0]
@@ -0,0 +1,85 @@
+"""Benchmarks for Database: blob compress/decompress, _sanitize_document and local-store bulk reads/writes."""
+
+from __future__ import annotations
+
+from database import Database, compress_blob, decompress_blob
+
+
+def test_compress_matches(benchmark, dataset):
+    blobs = benchmark(lambda: [compress_blob(m) for m in dataset.matches])
+    assert len(blobs) == dataset.games
+
+
+def test_decompress_matches(benchmark, dataset):
+    blobs = [compress_blob(m) for m in dataset.matches]
+    docs = benchmark(lambda: [decompress_blob(b) for b in blobs])
+    assert docs[0] == dataset.matches[0]
+
+
+def test_compress_timelines(benchmark, dataset):
+    blobs = benchmark(lambda: [compress_blob(t) for t in dataset.timelines])
+    assert len(blobs) == dataset.games
+
+
+def test_decompress_timelines(benchmark, dataset):
+    blobs = [compress_blob(t) for t in dataset.timelines]
+    docs = benchmark(lambda: [decompress_blob(b) for b in blobs])
+    assert docs[0] == dataset.timelines[0]
+
+
+def _bare_db() -> Database:
+    # _sanitize_document is pure; skip the singleton's connection setup
+    return object.__new__(Database)
+
+
+def test_sanitize_analysis(benchmark, dataset):
+    db = _bare_db()
+    enriched = dataset.enriched
+    doc = benchmark(db._sanitize_document, {"riot_id": "Bench#0000", "analysis": enriched})
+    assert doc["analysis"]
+
+
+def test_sanitize_timeline_analysis(benchmark, dataset):
+    db = _bare_db()
+    movement = dataset.movement_summaries
+    docs = benchmark(lambda: [db._sanitize_document(m) for m in movement])
+    assert len(docs) == dataset.games
+
+
+def _local_db(tmp_path, monkeypatch, name: str = "bench") -> Database:
+    from local_store import LocalStore
+
+    db = _bare_db()
+    store = LocalStore(str(tmp_path / f"{name}.sqlite3"))
+    monkeypatch.setattr(db, "_client", store, raising=False)
+    monkeypatch.setattr(db, "_db", store, raising=False)
+    db._ensure_indexes()
+    return db
+
+
+def test_local_store_matches_bulk(benchmark, dataset, tmp_path, monkeypatch):
+    db = _local_db(tmp_path, monkeypatch)
+    store = db._client
+    for m in dataset.matches:
+        db.save_match(m)
+    db.flush_writes()
+    found = benchmark(db.get_matches_bulk, dataset.match_ids)
+    assert len(found) == dataset.games
+    store.close()
+
+
+def test_local_store_ingest(benchmark, dataset, tmp_path, monkeypatch):
+    """save_match + save_timeline for every game through the write-behind buffer, until flushed."""
+    rounds = iter(range(1000))
+
+    def ingest():
+        db = _local_db(tmp_path, monkeypatch, f"ingest{next(rounds)}")
+        for m, t in zip(dataset.matches, dataset.timelines):
+            db.save_match(m)
+            db.save_timeline(m["metadata"]["matchId"], t)
+        db._ingest.close()  # flush, then stop this round's writer thread
+        return db
+
+    db = benchmark(ingest)
+    assert db.get_cached_match_ids(dataset.match_ids) == set(dataset.match_ids)
+    db._client.close()
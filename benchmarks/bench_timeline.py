@@ -0,0 +1,30 @@
+"""Benchmarks for the per-match timeline stage (timeline_analyzer)."""
+
+from __future__ import annotations
+
+
+def _run_all(fn, dataset, **kwargs):
+    return [fn(m, tl, dataset.puuid, **kwargs) for m, tl in zip(dataset.matches, dataset.timelines)]
+
+
+def test_classify_loss_reason(benchmark, dataset):
+    from timeline_analyzer import classify_loss_reason
+
+    results = benchmark(_run_all, classify_loss_reason, dataset)
+    assert any(results)
+
+
+def test_analyze_timeline_movement_pipeline(benchmark, dataset):
+    """The subset the pipeline computes for every match."""
+    from timeline_analyzer import PIPELINE_FEATURES, analyze_timeline_movement
+
+    results = benchmark(_run_all, analyze_timeline_movement, dataset, features=PIPELINE_FEATURES)
+    assert len(results) == dataset.games
+
+
+def test_analyze_timeline_movement_full(benchmark, dataset):
+    """Every output, including the replay series."""
+    from timeline_analyzer import analyze_timeline_movement
+
+    results = benchmark(_run_all, analyze_timeline_movement, dataset)
+    assert all("all_positions" in r for r in results)
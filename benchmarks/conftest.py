@@ -0,0 +1,116 @@
+"""
+Shared fixtures for the benchmark suite.
+
+Every dataset comes from synthetic_matches with a fixed seed and tracked puuid, so
+each run measures the same inputs. Sizes come from BENCH_GAMES (default "20,100").
+Use e.g. BENCH_GAMES=20,100,1000 for the larger runs; every benchmark taking
+`dataset` runs once per size.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+# Benchmarks never open a real store (Mongo or the local SQLite file); tests that need one build their own
+os.environ.setdefault("DB_BACKEND", "none")
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from synthetic_matches import SyntheticConfig, generate_dataset  # noqa: E402
+
+BENCH_PUUID = "bench" + "0" * 73
+BENCH_SEED = 20260101
+
+
+def bench_sizes() -> List[int]:
+    raw = os.getenv("BENCH_GAMES", "20,100")
+    return [int(s) for s in raw.split(",") if s.strip()]
+
+
+class BenchDataset:
+    """One fixed dataset plus the pipeline intermediates later stages need."""
+
+    def __init__(self, games: int):
+        self.games = games
+        self.puuid = BENCH_PUUID
+        pairs = list(generate_dataset(SyntheticConfig(games=games, seed=BENCH_SEED, puuid=BENCH_PUUID)))
+        self.matches: List[Dict[str, Any]] = [m for m, _ in pairs]
+        self.timelines: List[Dict[str, Any]] = [t for _, t in pairs]
+        self.match_ids: List[str] = [m["metadata"]["matchId"] for m in self.matches]
+        self._cache: Dict[str, Any] = {}
+
+    def _memo(self, key: str, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def features(self):
+        from match_features import build_match_features
+        return self._memo("features", lambda: build_match_features(self.matches, self.puuid))
+
+    @property
+    def analysis(self) -> Dict[str, Any]:
+        from analyzer import analyze_matches
+        return self._memo("analysis", lambda: analyze_matches(self.matches, self.puuid, features=self.features))
+
+    @property
+    def loss_diagnostics(self) -> List[Dict[str, Any]]:
+        from timeline_analyzer import classify_loss_reason
+
+        def build():
+            out = []
+            for mid, m, tl in zip(self.match_ids, self.matches, self.timelines):
+                diag = classify_loss_reason(m, tl, self.puuid)
+                if diag:
+                    out.append({"match_id": mid, **diag})
+            return out
+        return self._memo("loss_diagnostics", build)
+
+    @property
+    def movement_summaries(self) -> List[Dict[str, Any]]:
+        from timeline_analyzer import PIPELINE_FEATURES, analyze_timeline_movement
+        return self._memo("movement_summaries", lambda: [
+            {"match_id": mid, **analyze_timeline_movement(m, tl, self.puuid, features=PIPELINE_FEATURES)}
+            for mid, m, tl in zip(self.match_ids, self.matches, self.timelines)
+        ])
+
+    @property
+    def enriched(self) -> Dict[str, Any]:
+        from coach_data_enricher import enrich_coaching_data
+        return self._memo("enriched", lambda: enrich_coaching_data(
+            self.matches, self.match_ids, self.puuid, self.analysis,
+            self.loss_diagnostics, self.movement_summaries, features=self.features,
+        ))
+
+
+_DATASETS: Dict[int, BenchDataset] = {}
+
+
+def pytest_generate_tests(metafunc):
+    if "dataset" in metafunc.fixturenames:
+        metafunc.parametrize("dataset", bench_sizes(), ids=lambda n: f"{n}g", indirect=True, scope="session")
+
+
+@pytest.fixture(scope="session")
+def dataset(request) -> BenchDataset:
+    games = request.param
+    if games not in _DATASETS:
+        _DATASETS[games] = BenchDataset(games)
+    return _DATASETS[games]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _isolated_cwd(tmp_path_factory):
+    # Pipeline code appends to ./backend_debug.txt; keep that out of the working tree
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("bench_cwd"))
+    yield
+    os.chdir(previous)
@@ -0,0 +1,59 @@
+"""
+run.py
+
+Runs the benchmark suite against a stored baseline.
+
+    python benchmarks/run.py --save        # record a new baseline
+    python benchmarks/run.py               # compare against the latest baseline
+    python benchmarks/run.py -k timeline   # extra args go to pytest
+
+Baselines are pytest-benchmark JSON files under benchmarks/baselines/<machine>/
+(BENCH_BASELINE_DIR to override). A compare run fails if any benchmark's
+median is more than BENCH_REGRESSION_PCT percent slower than the baseline
+(default 15). Only compare baselines recorded on the same machine and with the
+same BENCH_GAMES sizes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINE_DIR = Path(os.getenv("BENCH_BASELINE_DIR", str(BENCH_DIR / "baselines")))
+REGRESSION_PCT = float(os.getenv("BENCH_REGRESSION_PCT", "15"))
+
+
+def _has_baseline() -> bool:
+    return BASELINE_DIR.exists() and any(BASELINE_DIR.rglob("*.json"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark suite runner")
+    parser.add_argument("--save", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--name", default="baseline", help="name suffix for a saved run")
+    args, pytest_args = parser.parse_known_args()
+
+    argv = [
+        str(BENCH_DIR),
+        "-c", str(BENCH_DIR / "pytest.ini"),
+        f"--benchmark-storage=file://{BASELINE_DIR}",
+        "--benchmark-columns=min,median,mean,stddev,rounds",
+        "--benchmark-sort=fullname",
+    ]
+    if args.save:
+        argv.append(f"--benchmark-save={args.name}")
+    elif _has_baseline():
+        argv += ["--benchmark-compare", f"--benchmark-compare-fail=median:{REGRESSION_PCT:g}%"]
+    else:
+        print(f"[Bench] No baseline under {BASELINE_DIR}; run with --save first. Running without comparison.")
+
+    return int(pytest.main(argv + pytest_args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
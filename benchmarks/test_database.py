@@ -0,0 +1,64 @@
+"""Database round trips against a local store (listing rows, timeline cache probes)."""
+
+from __future__ import annotations
+
+import pytest
+
+from database import Database
+from local_store import LocalStore
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    db = object.__new__(Database)
+    store = LocalStore(str(tmp_path / "db.sqlite3"))
+    monkeypatch.setattr(db, "_client", store, raising=False)
+    monkeypatch.setattr(db, "_db", store, raising=False)
+    monkeypatch.setattr(db, "backend", "local", raising=False)
+    db._ensure_indexes()
+    yield db
+    store.close()
+
+
+def test_listing_reports_the_analyzed_role(db):
+    db.save_analysis({
+        "riot_id": "Top#NA1",
+        "match_count_requested": 20,
+        "analysis": {"primary_role": "TOP", "summary": {"games": 20}},
+        "meta": {"intended_role_focus": "FLEX"},
+    })
+    rows = db.list_analyses()
+    assert [(r["riot_id"], r["primary_role"], r["match_count"]) for r in rows] == [("Top#NA1", "TOP", 20)]
+
+
+def test_timeline_lookup_counts_each_id_once(db):
+    from pipeline_trace import Tracer
+
+    db.save_timeline("NA1_1", {"metadata": {"matchId": "NA1_1"}, "info": {"frames": []}})
+    db.flush_writes()
+    tracer = Tracer()
+    with tracer.activate(), tracer.span("run"):
+        assert db.get_cached_timeline_ids(["NA1_1", "NA1_2"]) == {"NA1_1"}
+        assert db.get_timeline("NA1_1", record_lookup=False)["metadata"]["matchId"] == "NA1_1"
+    totals = tracer.totals()
+    assert (totals.get("timeline_cache_hit"), totals.get("timeline_cache_miss")) == (1, 1)
+
+
+def test_fold_claims_are_leases_until_confirmed(db):
+    assert db.claim_folds("heatmaps", "p1", ["NA1_1", "NA1_2"], "run-a") == ["NA1_1", "NA1_2"]
+    # Held by a live lease: nobody else gets them
+    assert db.claim_folds("heatmaps", "p1", ["NA1_1", "NA1_2", "NA1_3"], "run-b") == ["NA1_3"]
+    db.confirm_folds("heatmaps", "p1", ["NA1_1"], "run-a")
+    # run-x dies before writing NA1_4: once its lease expires the match can be folded again
+    assert db.claim_folds("heatmaps", "p1", ["NA1_4"], "run-x", lease_s=0.0) == ["NA1_4"]
+    assert db.claim_folds("heatmaps", "p1", ["NA1_1", "NA1_4"], "run-c") == ["NA1_4"]
+    # Releasing only drops the caller's own claims
+    db.release_folds("heatmaps", "p1", ["NA1_2", "NA1_4"], "run-c")
+    assert db.claim_folds("heatmaps", "p1", ["NA1_2", "NA1_4"], "run-d") == ["NA1_4"]
+
+
+def test_bulk_enqueue_counts_only_new_tasks(db):
+    assert db.enqueue_backfill("match", "NA1_1", "NA")
+    assert db.enqueue_backfill_many("match", ["NA1_1", "NA1_2", "NA1_3", "NA1_2"], "NA") == 2
+    assert db.enqueue_backfill_many("match", ["NA1_3"], "NA") == 0
+    assert db.backfill_queue_depth() == 3
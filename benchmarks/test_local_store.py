@@ -0,0 +1,146 @@
+"""Query and write semantics of local_store that Database relies on (Mongo parity)."""
+
+from __future__ import annotations
+
+import pytest
+
+from local_store import BulkWriteError, DuplicateKeyError, LocalStore, ReplaceOne, UpdateOne
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = LocalStore(str(tmp_path / "store.sqlite3"))
+    yield s
+    s.close()
+
+
+def test_ne_matches_missing_field(store):
+    col = store["docs"]
+    col.insert_many([{"k": 1, "tag": "a"}, {"k": 2, "tag": "b"}, {"k": 3}])
+    assert sorted(d["k"] for d in col.find({"tag": {"$ne": "a"}})) == [2, 3]
+    col.create_index("tag")
+    assert sorted(d["k"] for d in col.find({"tag": {"$ne": "a"}})) == [2, 3]
+
+
+def test_none_matches_absent_field(store):
+    col = store["docs"]
+    col.insert_many([{"k": 1, "version": 4}, {"k": 2, "version": None}, {"k": 3}])
+    assert sorted(d["k"] for d in col.find({"version": None})) == [2, 3]
+    col.create_index("version")
+    assert sorted(d["k"] for d in col.find({"version": None})) == [2, 3]
+
+
+def test_unique_index_rejects_duplicates(store):
+    col = store["docs"]
+    col.create_index([("key", 1)], unique=True)
+    col.insert_one({"key": "a"})
+    with pytest.raises(DuplicateKeyError, match="E11000"):
+        col.insert_one({"key": "a"})
+    with pytest.raises(DuplicateKeyError):
+        col.update_one({"key": "b"}, {"$set": {"key": "a"}}, upsert=True)
+    assert col.count_documents({}) == 1
+
+
+def test_unique_index_build_fails_on_existing_duplicates(store):
+    col = store["docs"]
+    col.insert_many([{"key": "a"}, {"key": "a"}])
+    with pytest.raises(DuplicateKeyError):
+        col.create_index("key", unique=True)
+    assert "key" not in col.indexes
+
+
+def test_bulk_write_rolls_back_only_the_failed_op(store):
+    col = store["docs"]
+    col.create_index("key", unique=True)
+    col.insert_one({"key": "taken", "n": 0})
+    ops = [
+        ReplaceOne({"n": 1}, {"key": "x", "n": 1}, upsert=True),
+        ReplaceOne({"n": 2}, {"key": "taken", "n": 2}, upsert=True),
+        ReplaceOne({"n": 3}, {"key": "y", "n": 3}, upsert=True),
+    ]
+    with pytest.raises(BulkWriteError) as ordered:
+        col.bulk_write(ops, ordered=True)
+    assert [e["index"] for e in ordered.value.details["writeErrors"]] == [1]
+    assert sorted(d["n"] for d in col.find({})) == [0, 1]
+
+    col.delete_many({"n": {"$gt": 0}})
+    with pytest.raises(BulkWriteError) as unordered:
+        col.bulk_write(ops, ordered=False)
+    assert unordered.value.details["writeErrors"][0]["code"] == 11000
+    assert sorted(d["n"] for d in col.find({})) == [0, 1, 3]
+
+
+def test_prefix_regex_is_a_range_scan(store):
+    col = store["docs"]
+    col.create_index("name")
+    col.insert_many([{"name": n} for n in ("faker", "fakerr", "fak", "Faker", "zeus", "fal")])
+    query = {"name": {"$regex": "^fake"}}
+    assert sorted(d["name"] for d in col.find(query)) == ["faker", "fakerr"]
+    plan = col.find(query).explain()
+    assert "IXSCAN" in str(plan) and "COLLSCAN" not in str(plan)
+    # Case-insensitive or non-literal patterns still match, just not as a range
+    assert sorted(d["name"] for d in col.find({"name": {"$regex": "^fake", "$options": "i"}})) == ["Faker", "faker", "fakerr"]
+    assert sorted(d["name"] for d in col.find({"name": {"$regex": "^fa.e"}})) == ["faker", "fakerr"]
+
+
+def test_index_created_by_another_process_is_maintained(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    worker_a, worker_b = LocalStore(path), LocalStore(path)
+    try:
+        col_a = worker_a["docs"]  # opened before the index exists
+        col_b = worker_b["docs"]
+        col_b.create_index("key", unique=True)
+        col_a.insert_one({"key": "a"})
+        assert col_b.find_one({"key": "a"}) is not None
+        with pytest.raises(DuplicateKeyError):
+            col_a.insert_one({"key": "a"})
+        # Repeating create_index elsewhere doesn't duplicate the side-table rows
+        col_a.create_index("key", unique=True)
+        assert col_b.count_documents({"key": "a"}) == 1
+    finally:
+        worker_a.close()
+        worker_b.close()
+
+
+def test_id_paging(store):
+    col = store["docs"]
+    ids = col.insert_many([{"n": i} for i in range(5)]).inserted_ids
+    page = list(col.find({"_id": {"$gt": ids[1]}}).sort("_id", 1).limit(2))
+    assert [d["n"] for d in page] == [2, 3]
+    assert [d["n"] for d in col.find({"_id": {"$gt": ids[1]}}).sort("_id", -1)] == [4, 3, 2]
+    # Combined with a condition evaluated in Python
+    assert [d["n"] for d in col.find({"_id": {"$gte": ids[3]}, "n": {"$ne": 4}})] == [3]
+
+
+def test_compound_cursor_or_is_planned(store):
+    col = store["docs"]
+    col.create_index([("created", -1), ("_id", -1)])
+    ids = col.insert_many([{"created": c} for c in (1.0, 2.0, 2.0, 2.0, 3.0)]).inserted_ids
+    query = {"$or": [{"created": {"$lt": 2.0}}, {"created": 2.0, "_id": {"$lt": ids[2]}}]}
+    page = list(col.find(query).sort([("created", -1), ("_id", -1)]))
+    assert [d["_id"] for d in page] == [ids[1], ids[0]]
+    assert "COLLSCAN" not in str(col.find(query).explain())
+
+
+def test_insert_many_reports_duplicates_by_index(store):
+    col = store["docs"]
+    col.create_index("key", unique=True)
+    col.insert_one({"key": "b"})
+    with pytest.raises(BulkWriteError) as unordered:
+        col.insert_many([{"key": "a"}, {"key": "b"}, {"key": "c"}], ordered=False)
+    assert [(e["index"], e["code"]) for e in unordered.value.details["writeErrors"]] == [(1, 11000)]
+    assert sorted(d["key"] for d in col.find({})) == ["a", "b", "c"]
+
+    with pytest.raises(BulkWriteError) as ordered:
+        col.insert_many([{"key": "d"}, {"key": "a"}, {"key": "e"}])
+    assert ordered.value.details["nInserted"] == 1
+    assert sorted(d["key"] for d in col.find({})) == ["a", "b", "c", "d"]
+
+
+def test_bulk_write_update_one_upserts(store):
+    col = store["docs"]
+    col.insert_one({"key": "a", "n": 1})
+    ops = [UpdateOne({"key": k}, {"$setOnInsert": {"n": 0}}, upsert=True) for k in ("a", "b")]
+    result = col.bulk_write(ops, ordered=False)
+    assert (result.matched_count, result.upserted_count) == (1, 1)
+    assert sorted((d["key"], d["n"]) for d in col.find({})) == [("a", 1), ("b", 0)]
@@ -0,0 +1,192 @@
+"""
+blob_codec.py
+
+Compression codecs for the `compressed_data` blobs in matches, timelines and analyses.
+
+    blob, tag = blob_codec.encode(match, kind="match")   # tag e.g. "zstd:1234567"
+    match = blob_codec.decode(blob, tag)
+
+Codecs:
+    zlib            the original format. Every document written before codec
+                    tags existed is zlib, and stays readable.
+    zstd            Zstandard at BLOB_ZSTD_LEVEL (default 6).
+    zstd:<dict_id>  Zstandard with a dictionary trained on our own corpus.
+
+Match-v5 and timeline JSON repeat the same key names, perk trees and event
+shapes in every game. A dictionary trained on a sample of stored documents
+(recompress_blobs.py train) primes the compressor with them. That shrinks
+each blob well beyond what per-document zlib can reach, and decompression is
+faster too. The dictionary id is written into every zstd frame, so a blob can
+always find its dictionary, including after a newer one is trained.
+
+BLOB_CODEC picks the codec for new writes: "zstd" (default when the
+zstandard package is installed) or "zlib". Database stores the returned tag
+next to each blob ("codec" field). Decoding trusts the tag and sniffs the
+zstd frame magic when the tag is missing. recompress_blobs.py rewrites
+documents whose tag differs from the current one.
+
+Dictionaries live in the DB (compression_dicts collection). Database
+registers them at startup, and installs a loader for ids this process
+hasn't seen yet.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import fast_json
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+ZSTD_LEVEL = int(os.getenv("BLOB_ZSTD_LEVEL", "6"))
+DEFAULT_CODEC = os.getenv("BLOB_CODEC", "zstd" if zstandard is not None else "zlib")
+DICT_SIZE = int(os.getenv("BLOB_ZSTD_DICT_KB", "112")) * 1024
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# dict_id -> zstandard.ZstdCompressionDict, and the dictionary new writes use per kind
+_dicts: Dict[int, Any] = {}
+_active: Dict[str, int] = {}
+_lock = threading.Lock()
+_dict_loader: Optional[Callable[[int], Optional[bytes]]] = None
+
+# Compressor/decompressor objects aren't safe to share between threads
+_local = threading.local()
+
+
+class CodecError(ValueError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Dictionaries
+# ---------------------------------------------------------------------------
+
+
+def register_dictionary(kind: str, data: bytes, active: bool = True) -> int:
+    """Make a trained dictionary available for decoding (and for encoding `kind` if active). Returns its id."""
+    if zstandard is None:
+        raise CodecError("zstandard is not installed")
+    d = zstandard.ZstdCompressionDict(bytes(data))
+    dict_id = d.dict_id()
+    with _lock:
+        _dicts[dict_id] = d
+        if active:
+            _active[kind] = dict_id
+    return dict_id
+
+
+def set_dictionary_loader(loader: Optional[Callable[[int], Optional[bytes]]]) -> None:
+    """loader(dict_id) -> dictionary bytes, used when a blob references an unregistered dictionary."""
+    global _dict_loader
+    _dict_loader = loader
+
+
+def active_dictionary(kind: str) -> Optional[int]:
+    return _active.get(kind)
+
+
+def train_dictionary(samples: Iterable[Any], size: int = DICT_SIZE) -> bytes:
+    """Train a zstd dictionary on sample documents (a few hundred is plenty)."""
+    if zstandard is None:
+        raise CodecError("zstandard is not installed")
+    raw = [fast_json.dumps(s) for s in samples]
+    if len(raw) < 8:
+        raise CodecError(f"need at least 8 samples to train a dictionary, got {len(raw)}")
+    return zstandard.train_dictionary(size, raw, level=ZSTD_LEVEL).as_bytes()
+
+
+def _dictionary(dict_id: int) -> Any:
+    d = _dicts.get(dict_id)
+    if d is None and _dict_loader is not None:
+        data = _dict_loader(dict_id)
+        if data:
+            with _lock:
+                d = _dicts[dict_id] = zstandard.ZstdCompressionDict(bytes(data))
+    if d is None:
+        raise CodecError(f"zstd dictionary {dict_id} is not registered")
+    return d
+
+
+# ---------------------------------------------------------------------------
+# Codecs
+# ---------------------------------------------------------------------------
+
+
+def _compressor(dict_id: int) -> Any:
+    cache = getattr(_local, "compressors", None)
+    if cache is None:
+        cache = _local.compressors = {}
+    c = cache.get(dict_id)
+    if c is None:
+        d = _dictionary(dict_id) if dict_id else None
+        c = cache[dict_id] = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=d, write_content_size=True)
+    return c
+
+
+def _decompressor(dict_id: int) -> Any:
+    cache = getattr(_local, "decompressors", None)
+    if cache is None:
+        cache = _local.decompressors = {}
+    c = cache.get(dict_id)
+    if c is None:
+        d = _dictionary(dict_id) if dict_id else None
+        c = cache[dict_id] = zstandard.ZstdDecompressor(dict_data=d)
+    return c
+
+
+def current_tag(kind: str = "generic", codec: str = DEFAULT_CODEC) -> str:
+    """The tag encode() would produce for `kind` right now."""
+    if codec == "zstd" and zstandard is not None:
+        dict_id = _active.get(kind)
+        return f"zstd:{dict_id}" if dict_id else "zstd"
+    return "zlib"
+
+
+def compress(raw: bytes, tag: str) -> bytes:
+    if tag == "zlib":
+        return zlib.compress(raw)
+    if not tag.startswith("zstd"):
+        raise CodecError(f"unknown codec '{tag}'")
+    if zstandard is None:
+        raise CodecError("zstandard is not installed")
+    dict_id = int(tag.split(":", 1)[1]) if ":" in tag else 0
+    return _compressor(dict_id).compress(raw)
+
+
+def sniff(blob: bytes) -> str:
+    """Codec tag recovered from the blob itself (zstd frames carry their dictionary id)."""
+    if bytes(blob[:4]) != ZSTD_MAGIC:
+        return "zlib"
+    if zstandard is None:
+        return "zstd"
+    dict_id = zstandard.get_frame_parameters(blob).dict_id
+    return f"zstd:{dict_id}" if dict_id else "zstd"
+
+
+def decompress(blob: bytes, tag: Optional[str] = None) -> bytes:
+    tag = tag or sniff(blob)
+    if tag == "zlib":
+        return zlib.decompress(blob)
+    if not tag.startswith("zstd"):
+        raise CodecError(f"unknown codec '{tag}'")
+    if zstandard is None:
+        raise CodecError("blob is zstd-compressed but zstandard is not installed")
+    dict_id = int(tag.split(":", 1)[1]) if ":" in tag else 0
+    return _decompressor(dict_id).decompress(blob)
+
+
+def encode(obj: Any, kind: str = "generic") -> Tuple[bytes, str]:
+    """Serialize and compress with the current codec for `kind`. Returns (blob, codec tag)."""
+    tag = current_tag(kind)
+    return compress(fast_json.dumps(obj), tag), tag
+
+
+def decode(blob: bytes, tag: Optional[str] = None) -> Any:
+    return fast_json.loads(decompress(blob, tag))
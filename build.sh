@@ -4,6 +4,12 @@ set -o errexit
 
 pip install -r requirements.txt
 
+# Precompute the enriched item asset so WhiteNoise indexes it at boot
+python enriched_items.py || echo "Item asset precompute failed; it will be built on first request"
+
+# Create any missing registered DB index once per deploy (see db_indexes.py)
+python db_indexes.py apply || echo "Index registry apply failed; Database() init retries the failed indexes every ${INDEX_RETRY_S:-600}s"
+
 cd web_dashboard/backend
 python manage.py collectstatic --no-input
 python manage.py migrate
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-import json
 from pathlib import Path
 from typing import Any, Dict, Set
 
+import fast_json
+
 
 def load_champion_profiles(path: str | Path | None = None) -> Dict[str, Any]:
     """Load champion_profiles.json from disk.
@@ -17,8 +18,7 @@ def load_champion_profiles(path: str | Path | None = None) -> Dict[str, Any]:
         path = Path(path)
 
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return fast_json.read_file(path)
     except FileNotFoundError:
         return {}
     except Exception:
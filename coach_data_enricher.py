@@ -18,88 +18,18 @@ from __future__ import annotations
 from collections import Counter
 from typing import Any, Dict, List, Optional
 
-import requests
+import static_data
+from compact_participants import ParticipantRow
+from match_features import MatchFeatures, build_match_features, current_season
 
 
-
-import os
-import time
-import json
-from pathlib import Path
-
-# ... imports ...
-
-MERAKI_ITEMS_URL = "https://cdn.merakianalytics.com/riot/lol/resources/latest/en-US/items.json"
-CACHE_DIR = Path(__file__).parent / "saves" / "cache"
-
-def _get_cached_meraki_items() -> Dict[str, Any]:
-    """Fetch Meraki items with local file caching (24h validity)."""
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    cache_path = CACHE_DIR / "meraki_items.json"
-    
-    # Check cache validity
-    if cache_path.exists():
-        mtime = cache_path.stat().st_mtime
-        if time.time() - mtime < 86400: # 24 hours
-            try:
-                with open(cache_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                pass # Corrupt cache, refetch
-    
-    # Try Data Dragon first (More reliable)
-    try:
-        version = _safe_get_latest_dd_version() or "16.1.1"
-        dd_url = f"https://ddragon.leagueoflegends.com/cdn/{version}/data/en_US/item.json"
-        
-        with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] Fetching items from DataDragon ({version})...\n")
-        resp = requests.get(dd_url, timeout=3)
-        resp.raise_for_status()
-        full_data = resp.json()
-        data = full_data.get("data", {}) # DDragon structure is {"data": {id: ...}}
-        
-        with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] DDragon fetch successful. Items: {len(data)}\n")
-        
-        # Save to cache
-        try:
-            with open(cache_path, "w", encoding="utf-8") as f:
-                json.dump(data, f)
-        except Exception:
-            pass
-            
-        return data
-    except Exception as e:
-        with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] DDragon fetch failed: {e}\n")
-        return {} # Fallback to empty if both fail
-
 def _safe_get_latest_dd_version() -> Optional[str]:
-    """Best-effort: fetch latest Data Dragon version string.
-    
-    Useful for fallback image construction if Meraki fails or for other DDragon assets.
-    """
-    try:
-        resp = requests.get("https://ddragon.leagueoflegends.com/api/versions.json", timeout=5)
-        resp.raise_for_status()
-        versions = resp.json()
-        if not isinstance(versions, list) or not versions:
-            return None
-        return versions[0]
-    except Exception:
-        return "16.1.1" # Fallback
+    """Best-effort: latest Data Dragon version string (memoized by the static-data service)."""
+    return static_data.get_latest_version()
 
 def _safe_get_item_names(version: Optional[str] = None) -> Dict[int, str]:
-    """Best-effort: fetch item ID -> item name mapping from Meraki Analytics (Cached)."""
-    data = _get_cached_meraki_items()
-    
-    mapping: Dict[int, str] = {}
-    for item_id_str, info in data.items():
-        try:
-            item_id = int(item_id_str)
-        except ValueError:
-            continue
-        name = info.get("name") or item_id_str
-        mapping[item_id] = name
-    return mapping
+    """Best-effort: item ID -> item name mapping (parsed once per patch, shared in memory)."""
+    return static_data.get_item_names()
 
 
 def _extract_self_participant(match: Dict[str, Any], puuid: str) -> Dict[str, Any]:
@@ -183,120 +113,41 @@ def build_macro_profile(
 
 
 def build_detailed_match_info(
-    matches: List[Dict[str, Any]],
-    match_ids: List[str],
+    features: List[MatchFeatures],
     puuid: str,
 ) -> List[Dict[str, Any]]:
     """Build a detailed per-game summary for the dashboard.
     
     Includes full stats for all 10 players to support OP.GG-style scoreboards.
+    Participants are ParticipantRow objects (dict-style access, see compact_participants).
     """
     detailed_matches = []
 
-    for match, mid in zip(matches, match_ids):
-        info = match.get("info", {})
-        participants = info.get("participants", [])
+    for f in features:
+        info = f.info
+        participants = f.participants
         if not participants:
             continue
 
-        game_creation = info.get("gameCreation", 0)
-        game_duration = info.get("gameDuration", 0)
+        game_creation = f.game_creation
+        game_duration = f.duration
         game_mode = info.get("gameMode", "UNKNOWN")
         queue_id = info.get("queueId", 0) # Added queueId
         
-        # Process all participants
-        processed_participants = []
-        for p in participants:
-            # Basic Identity
-            p_puuid = p.get("puuid", "")
-            riot_id_name = p.get("riotIdGameName", "")
-            riot_id_tag = p.get("riotIdTagline", "")
-            riot_id = f"{riot_id_name}#{riot_id_tag}" if riot_id_name else p.get("summonerName", "Unknown")
-            
-            # Stats
-            kills = p.get("kills", 0)
-            deaths = p.get("deaths", 0)
-            assists = p.get("assists", 0)
-            kda = (kills + assists) / max(1, deaths)
-            
-            cs = p.get("totalMinionsKilled", 0) + p.get("neutralMinionsKilled", 0)
-            cs_per_min = cs / (game_duration / 60) if game_duration > 0 else 0
-            
-            # Runes (Perks)
-            perks = p.get("perks", {})
-            styles = perks.get("styles", [])
-            primary_style = styles[0].get("style") if len(styles) > 0 else None
-            sub_style = styles[1].get("style") if len(styles) > 1 else None
-            # Extract keystone (first selection of first style)
-            keystone = None
-            if len(styles) > 0 and styles[0].get("selections"):
-                keystone = styles[0]["selections"][0].get("perk")
-
-            processed_p = {
-                "puuid": p_puuid,
-                "riot_id": riot_id,
-                "champion_name": p.get("championName", "Unknown"),
-                "champion_id": p.get("championId", 0),
-                "participant_id": p.get("participantId", 0),
-                "team_id": p.get("teamId", 100),
-                "position": p.get("teamPosition") or p.get("individualPosition") or "UNKNOWN",
-                "win": p.get("win", False),
-                "champ_level": p.get("champLevel", 1),
-                
-                # KDA & Combat
-                "kills": kills,
-                "deaths": deaths,
-                "assists": assists,
-                "kda": round(kda, 2),
-                "total_damage_dealt_to_champions": p.get("totalDamageDealtToChampions", 0),
-                "total_damage_taken": p.get("totalDamageTaken", 0),
-                
-                # Farming & Economy
-                "total_minions_killed": p.get("totalMinionsKilled", 0),
-                "neutral_minions_killed": p.get("neutralMinionsKilled", 0),
-                "cs": cs,
-                "cs_per_min": round(cs_per_min, 1),
-                "gold_earned": p.get("goldEarned", 0),
-                
-                # Vision
-                "vision_score": p.get("visionScore", 0),
-                "wards_placed": p.get("wardsPlaced", 0),
-                "wards_killed": p.get("wardsKilled", 0),
-                "detector_wards_placed": p.get("detectorWardsPlaced", 0),
-                
-                # Loadout
-                "item0": p.get("item0", 0),
-                "item1": p.get("item1", 0),
-                "item2": p.get("item2", 0),
-                "item3": p.get("item3", 0),
-                "item4": p.get("item4", 0),
-                "item5": p.get("item5", 0),
-                "item6": p.get("item6", 0),
-                "item7": p.get("item7", 0), # Season 16 "Boots Slot" (Potential)
-                "summoner1Id": p.get("summoner1Id", 0),
-                "summoner2Id": p.get("summoner2Id", 0),
-                "perks": {
-                    "primary_style": primary_style,
-                    "sub_style": sub_style,
-                    "keystone": keystone,
-                    "primary_style": primary_style,
-                    "sub_style": sub_style,
-                    "keystone": keystone,
-                    "styles": styles, # Keep full styles for detailed view
-                    "statPerks": perks.get("statPerks", {})
-                },
-                
-                # Flags
-                "is_self": (p_puuid == puuid)
-            }
-            processed_participants.append(processed_p)
+        # Compact rows (__slots__); packed into columns when the analysis is saved
+        processed_participants = [
+            ParticipantRow.from_riot(p, puuid, game_duration) for p in participants
+        ]
 
         detailed_matches.append({
-            "match_id": mid,
+            "match_id": f.match_id,
+            "role": f.role,
             "game_creation": game_creation,
             "game_duration": game_duration,
             "game_mode": game_mode,
             "queue_id": queue_id, # Added field
+            # Index into participants of the enemy in the player's lane (MatchFeatures.lane_opponent)
+            "lane_opponent_index": participants.index(f.lane_opponent) if f.lane_opponent is not None else None,
             "participants": processed_participants
         })
 
@@ -304,9 +155,7 @@ def build_detailed_match_info(
 
 
 def build_per_game_comp(
-    matches: List[Dict[str, Any]],
-    match_ids: List[str],
-    puuid: str,
+    features: List[MatchFeatures],
 ) -> List[Dict[str, Any]]:
     """Build a simple per-game composition summary.
     
@@ -314,44 +163,20 @@ def build_per_game_comp(
     """
     per_game_comp: List[Dict[str, Any]] = []
 
-    for match, mid in zip(matches, match_ids):
-        info = match.get("info", {})
-        participants = info.get("participants", [])
-        if not participants:
-            continue
-
-        # Find which team is "you"
-        self_participant = None
-        for p in participants:
-            if p.get("puuid") == puuid:
-                self_participant = p
-                break
-        if self_participant is None:
-            continue
-
-        my_team_id = self_participant.get("teamId")
-        my_champ = self_participant.get("championName")
+    for f in features:
         my_role = (
-            self_participant.get("teamPosition")
-            or self_participant.get("individualPosition")
+            f.self_p.get("teamPosition")
+            or f.self_p.get("individualPosition")
             or "UNKNOWN"
         )
 
-        ally_champs = []
-        enemy_champs = []
-        for p in participants:
-            champ_name = p.get("championName")
-            if not champ_name:
-                continue
-            if p.get("teamId") == my_team_id:
-                ally_champs.append(champ_name)
-            else:
-                enemy_champs.append(champ_name)
+        ally_champs = [p["championName"] for p in f.team_participants if p.get("championName")]
+        enemy_champs = [p["championName"] for p in f.enemy_participants if p.get("championName")]
 
         per_game_comp.append(
             {
-                "match_id": mid,
-                "your_champion": my_champ,
+                "match_id": f.match_id,
+                "your_champion": f.self_p.get("championName"),
                 "your_role": my_role,
                 "ally_champions": ally_champs,
                 "enemy_champions": enemy_champs,
@@ -361,15 +186,8 @@ def build_per_game_comp(
     return per_game_comp
 
 
-def _get_season_from_version(game_version: str) -> str:
-    if not game_version:
-        return "0"
-    return game_version.split(".")[0]
-
 def build_per_game_items(
-    matches: List[Dict[str, Any]],
-    match_ids: List[str],
-    puuid: str,
+    features: List[MatchFeatures],
 ) -> Dict[str, Any]:
     """Build per-game final item sets and a lightweight itemization profile.
 
@@ -396,25 +214,16 @@ def build_per_game_items(
 
     # Optimization: If very large batch (>50), strictly filter item build analysis
     # to the CURRENT season matches only. This prevents AI from analyzing ancient builds.
-    current_season_prefix = "16" # Default
-    if matches:
-        latest_ver = matches[0].get("info", {}).get("gameVersion", "16.1")
-        current_season_prefix = _get_season_from_version(latest_ver)
+    current_season_prefix = current_season(features)
+    should_filter_season = len(features) > 50
 
-    should_filter_season = len(matches) > 50
-
-    for match, mid in zip(matches, match_ids):
+    for f in features:
         # Check season filter
-        if should_filter_season:
-            gv = match.get("info", {}).get("gameVersion", "")
-            if _get_season_from_version(gv) != current_season_prefix:
-                continue
-
-        try:
-            p = _extract_self_participant(match, puuid)
-        except Exception:
+        if should_filter_season and f.season != current_season_prefix:
             continue
 
+        p = f.self_p
+
         champ = p.get("championName")
         items = [
             p.get("item0", 0),
@@ -437,7 +246,7 @@ def build_per_game_items(
 
         per_game_items.append(
             {
-                "match_id": mid,
+                "match_id": f.match_id,
                 "champion": champ,
                 "item_ids": item_ids,
                 "item_names": item_names,
@@ -469,32 +278,46 @@ def enrich_coaching_data(
     timeline_loss_diagnostics: List[Dict[str, Any]],
     movement_summaries: List[Dict[str, Any]],  
     db_client=None, # Optional DB connection for lazy loading (Low RAM mode)
+    features: Optional[List[MatchFeatures]] = None,
 ) -> Dict[str, Any]:
-    """Enrich the core analysis dict with extra coaching-friendly structures."""
+    """Enrich the core analysis dict with extra coaching-friendly structures.
+
+    `features` is the shared per-match pre-pass (match_features.build_match_features);
+    it is computed from `matches` if not supplied. Match IDs come from each payload,
+    so `match_ids` is only kept for call compatibility.
+    """
     with open("backend_debug.txt", "a") as f: f.write("[DEBUG] Starting enrich_coaching_data...\n")
     new_analysis = dict(analysis)
 
+    if features is None:
+        features = build_match_features(matches, puuid)
+
     macro_profile = build_macro_profile(analysis, timeline_loss_diagnostics)
-    per_game_comp = build_per_game_comp(matches, match_ids, puuid)
+    per_game_comp = build_per_game_comp(features)
     with open("backend_debug.txt", "a") as f: f.write("[DEBUG] Building per_game_items...\n")
-    items_data = build_per_game_items(matches, match_ids, puuid)
+    items_data = build_per_game_items(features)
     with open("backend_debug.txt", "a") as f: f.write("[DEBUG] Building detailed_matches...\n")
-    detailed_matches = build_detailed_match_info(matches, match_ids, puuid)
+    detailed_matches = build_detailed_match_info(features, puuid)
 
     # Merge timeline data into detailed_matches
     # movement_summaries contains the output of analyze_timeline_movement
     # If using Low RAM mode, movement_summaries might be empty, so we fetch from DB on demand.
-    timeline_map = {m["match_id"]: m for m in movement_summaries}
+    # A memory_budget.SpillList is looked up per match, so spilled summaries load one at a time.
+    if hasattr(movement_summaries, "get"):
+        lookup_movement = movement_summaries.get
+    else:
+        lookup_movement = {m["match_id"]: m for m in movement_summaries}.get
     
     for dm in detailed_matches:
         mid = dm["match_id"]
-        t_data = timeline_map.get(mid)
+        t_data = lookup_movement(mid)
         
         # LAZY LOAD from DB if missing (Low RAM Optimization)
+        # Movement summaries are per player: only take a cached one recorded for this puuid
         if not t_data and db_client:
             try:
                 cached = db_client.get_timeline_analysis(mid)
-                if cached:
+                if cached and cached.get("puuid") == puuid:
                     t_data = cached.get("movement")
             except Exception:
                 pass
@@ -508,22 +331,20 @@ def enrich_coaching_data(
             
             for p in dm["participants"]:
                 pid = p.get("participant_id")
-                if pid and pid in all_builds:
-                    p["item_build"] = all_builds[pid]
-                else:
-                    p["item_build"] = []
+                # Stored copies (DB / spill) come back with string keys
+                build = (all_builds.get(pid) or all_builds.get(str(pid))) if pid else None
+                p["item_build"] = build or []
 
             dm["kill_events"] = t_data.get("kill_events", [])
             dm["ward_events"] = t_data.get("ward_events", [])
             dm["building_events"] = t_data.get("building_events", [])
             dm["position_samples"] = t_data.get("position_samples", [])
-            dm["all_positions"] = t_data.get("all_positions", {}) # NEW
             dm["roams"] = t_data.get("roams", {})
             dm["jungle_pathing"] = t_data.get("jungle_pathing", {})
             dm["fight_presence"] = t_data.get("fight_presence", {})
             dm["gold_xp_series"] = t_data.get("gold_xp_series", [])
             dm["team_gold_diff"] = t_data.get("team_gold_diff", [])
-            dm["all_gold_xp_series"] = t_data.get("all_gold_xp_series", {})
+            # all_positions / all_gold_xp_series are served on demand by /api/matches/<id>/replay/
 
     new_analysis["macro_profile"] = macro_profile
     new_analysis["per_game_comp"] = per_game_comp
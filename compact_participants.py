@@ -0,0 +1,368 @@
+"""
+compact_participants.py
+
+Compact representation of the processed scoreboard rows in
+analysis["detailed_matches"][*]["participants"].
+
+In the pipeline:
+    ParticipantRow is a __slots__ object holding one player's stats. Items are a
+    tuple and runes a single canonical "rune page" tuple. kda, cs, cs_per_min,
+    item0..item7 and perks are derived on access. It still answers .get() /
+    ["key"] like the old dicts, so enrich / crew code keeps working unchanged.
+
+On disk / over the wire:
+    pack_analysis() turns every match's participant list into columns and pulls
+    riot ids, puuids, champions, items and rune pages into lookup tables shared
+    by the whole analysis (analysis["participant_tables"]). Derived values and
+    the is_self flag (self_index) are not stored.
+
+    unpack_analysis() restores the legacy list-of-dicts shape. The dashboard
+    does the same in utils/participants.js, so the detail endpoint can ship
+    the packed form.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+PACKED_VERSION = 1
+ITEM_SLOTS = 8  # item0..item6 + Season 16 "Boots Slot" (item7)
+
+# Plain per-row columns, stored as-is
+STAT_FIELDS = (
+    "participant_id", "team_id", "position", "win", "champ_level",
+    "kills", "deaths", "assists",
+    "total_damage_dealt_to_champions", "total_damage_taken",
+    "total_minions_killed", "neutral_minions_killed", "gold_earned",
+    "vision_score", "wards_placed", "wards_killed", "detector_wards_placed",
+    "summoner1Id", "summoner2Id",
+)
+
+# Columns stored as indexes into analysis["participant_tables"]
+IDENTITY_FIELDS = ("puuid", "riot_id", "champion_name", "champion_id")
+
+_EMPTY_RUNE_PAGE: Tuple = (None, (), None, (), (None, None, None))
+
+
+def rune_page_from_perks(perks: Dict[str, Any]) -> Tuple:
+    """Riot perks block -> (primary_style, primary_perks, sub_style, sub_perks, (offense, flex, defense))."""
+    if not perks:
+        return _EMPTY_RUNE_PAGE
+    styles = perks.get("styles") or []
+    primary = styles[0] if len(styles) > 0 else {}
+    sub = styles[1] if len(styles) > 1 else {}
+    stat = perks.get("statPerks") or {}
+    return (
+        primary.get("style", perks.get("primary_style")),
+        tuple(s.get("perk") for s in primary.get("selections", [])),
+        sub.get("style", perks.get("sub_style")),
+        tuple(s.get("perk") for s in sub.get("selections", [])),
+        (stat.get("offense"), stat.get("flex"), stat.get("defense")),
+    )
+
+
+def perks_from_rune_page(page: Tuple) -> Dict[str, Any]:
+    """Rebuild the perks dict the dashboard reads (keystone, styles[].selections[].perk, statPerks)."""
+    primary_style, primary_perks, sub_style, sub_perks, (offense, flex, defense) = page
+    styles = []
+    if primary_style is not None or primary_perks:
+        styles.append({
+            "description": "primaryStyle",
+            "style": primary_style,
+            "selections": [{"perk": p} for p in primary_perks],
+        })
+    if sub_style is not None or sub_perks:
+        styles.append({
+            "description": "subStyle",
+            "style": sub_style,
+            "selections": [{"perk": p} for p in sub_perks],
+        })
+    return {
+        "primary_style": primary_style,
+        "sub_style": sub_style,
+        "keystone": primary_perks[0] if primary_perks else None,
+        "styles": styles,
+        "statPerks": {"offense": offense, "flex": flex, "defense": defense},
+    }
+
+
+class ParticipantRow:
+    """One processed participant. Dict-like for reads/writes, __slots__ for memory."""
+
+    __slots__ = IDENTITY_FIELDS + STAT_FIELDS + ("items", "rune_page", "is_self", "game_duration", "extra")
+
+    def __init__(self, **fields: Any) -> None:
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+        if self.items is None:
+            self.items = (0,) * ITEM_SLOTS
+        if self.rune_page is None:
+            self.rune_page = _EMPTY_RUNE_PAGE
+
+    # --- Construction ---
+
+    @classmethod
+    def from_riot(cls, p: Dict[str, Any], self_puuid: str, game_duration: int) -> "ParticipantRow":
+        """Build from a match-v5 participant."""
+        riot_id_name = p.get("riotIdGameName", "")
+        riot_id_tag = p.get("riotIdTagline", "")
+        p_puuid = p.get("puuid", "")
+        return cls(
+            puuid=p_puuid,
+            riot_id=f"{riot_id_name}#{riot_id_tag}" if riot_id_name else p.get("summonerName", "Unknown"),
+            champion_name=p.get("championName", "Unknown"),
+            champion_id=p.get("championId", 0),
+            participant_id=p.get("participantId", 0),
+            team_id=p.get("teamId", 100),
+            position=p.get("teamPosition") or p.get("individualPosition") or "UNKNOWN",
+            win=p.get("win", False),
+            champ_level=p.get("champLevel", 1),
+            kills=p.get("kills", 0),
+            deaths=p.get("deaths", 0),
+            assists=p.get("assists", 0),
+            total_damage_dealt_to_champions=p.get("totalDamageDealtToChampions", 0),
+            total_damage_taken=p.get("totalDamageTaken", 0),
+            total_minions_killed=p.get("totalMinionsKilled", 0),
+            neutral_minions_killed=p.get("neutralMinionsKilled", 0),
+            gold_earned=p.get("goldEarned", 0),
+            vision_score=p.get("visionScore", 0),
+            wards_placed=p.get("wardsPlaced", 0),
+            wards_killed=p.get("wardsKilled", 0),
+            detector_wards_placed=p.get("detectorWardsPlaced", 0),
+            summoner1Id=p.get("summoner1Id", 0),
+            summoner2Id=p.get("summoner2Id", 0),
+            items=tuple(p.get(f"item{i}", 0) for i in range(ITEM_SLOTS)),
+            rune_page=rune_page_from_perks(p.get("perks", {})),
+            is_self=(p_puuid == self_puuid),
+            game_duration=game_duration,
+        )
+
+    @classmethod
+    def from_processed(cls, d: Dict[str, Any], game_duration: int) -> "ParticipantRow":
+        """Build from a legacy processed dict (as stored before packing)."""
+        fields = {k: d.get(k) for k in IDENTITY_FIELDS + STAT_FIELDS}
+        fields["items"] = tuple(d.get(f"item{i}", 0) or 0 for i in range(ITEM_SLOTS))
+        fields["rune_page"] = rune_page_from_perks(d.get("perks", {}))
+        fields["is_self"] = bool(d.get("is_self"))
+        fields["game_duration"] = game_duration
+        known = set(cls.__slots__) | set(_DERIVED)
+        extra = {k: v for k, v in d.items() if k not in known}
+        fields["extra"] = extra or None
+        return cls(**fields)
+
+    # --- Mapping-style access ---
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _DERIVED:
+            return _DERIVED[key](self)
+        if key in _STORED:
+            value = getattr(self, key)
+            return default if value is None else value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self:
+            return self.get(key)
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _STORED:
+            setattr(self, key, value)
+        elif key.startswith("item") and key[4:].isdigit():
+            items = list(self.items)
+            items[int(key[4:])] = value
+            self.items = tuple(items)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in _DERIVED or key in _STORED or bool(self.extra and key in self.extra)
+
+    def keys(self) -> Iterator[str]:
+        yield from _PUBLIC_KEYS
+        if self.extra:
+            yield from self.extra
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Legacy dict shape (what the dashboard and older saves expect)."""
+        return {k: self.get(k) for k in self.keys()}
+
+    def __repr__(self) -> str:
+        return f"ParticipantRow({self.riot_id!r}, {self.champion_name!r})"
+
+
+def _kda(r: ParticipantRow) -> float:
+    return round(((r.kills or 0) + (r.assists or 0)) / max(1, r.deaths or 0), 2)
+
+
+def _cs(r: ParticipantRow) -> int:
+    return (r.total_minions_killed or 0) + (r.neutral_minions_killed or 0)
+
+
+def _cs_per_min(r: ParticipantRow) -> float:
+    duration = r.game_duration or 0
+    return round(_cs(r) / (duration / 60), 1) if duration > 0 else 0
+
+
+_DERIVED = {
+    "kda": _kda,
+    "cs": _cs,
+    "cs_per_min": _cs_per_min,
+    "perks": lambda r: perks_from_rune_page(r.rune_page),
+    "is_self": lambda r: bool(r.is_self),
+}
+for _slot in range(ITEM_SLOTS):
+    _DERIVED[f"item{_slot}"] = (lambda i: lambda r: r.items[i])(_slot)
+
+_STORED = frozenset(IDENTITY_FIELDS + STAT_FIELDS)
+_PUBLIC_KEYS = IDENTITY_FIELDS + STAT_FIELDS + tuple(_DERIVED)
+
+
+# ---------------------------------------------------------------------------
+# Column-oriented serializer
+# ---------------------------------------------------------------------------
+
+
+class _Interner:
+    """Value -> stable index, with the values list as the lookup table."""
+
+    def __init__(self, values: Optional[List[Any]] = None):
+        self.values: List[Any] = []
+        self._index: Dict[Any, int] = {}
+        for v in values or []:
+            self.add(v)
+
+    def add(self, value: Any) -> int:
+        key = _freeze(value)
+        idx = self._index.get(key)
+        if idx is None:
+            idx = len(self.values)
+            self._index[key] = idx
+            self.values.append(value)
+        return idx
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _as_row(p: Any, game_duration: int) -> ParticipantRow:
+    if isinstance(p, ParticipantRow):
+        return p
+    return ParticipantRow.from_processed(p, game_duration)
+
+
+def is_packed(participants: Any) -> bool:
+    return isinstance(participants, dict) and "cols" in participants
+
+
+def pack_participants(rows: List[ParticipantRow], tables: Dict[str, _Interner]) -> Dict[str, Any]:
+    """Column-oriented form of one match's participants."""
+    cols: Dict[str, List[Any]] = {name: [] for name in STAT_FIELDS}
+    cols.update({"riot_id": [], "puuid": [], "champion": [], "items": [], "rune_page": []})
+    extra_cols: Dict[str, List[Any]] = {}
+    self_index = None
+
+    for i, r in enumerate(rows):
+        for name in STAT_FIELDS:
+            cols[name].append(getattr(r, name))
+        cols["riot_id"].append(tables["riot_ids"].add(r.riot_id))
+        cols["puuid"].append(tables["puuids"].add(r.puuid))
+        cols["champion"].append(tables["champions"].add([r.champion_name, r.champion_id]))
+        cols["items"].append([tables["items"].add(item) for item in r.items])
+        cols["rune_page"].append(tables["rune_pages"].add(_rune_page_to_json(r.rune_page)))
+        if r.is_self:
+            self_index = i
+        for key, value in (r.extra or {}).items():
+            extra_cols.setdefault(key, [None] * len(rows))[i] = value
+
+    packed = {"n": len(rows), "self_index": self_index, "cols": cols}
+    if extra_cols:
+        packed["extra"] = extra_cols
+    return packed
+
+
+def unpack_participants(packed: Dict[str, Any], tables: Dict[str, List[Any]], game_duration: int) -> List[ParticipantRow]:
+    cols = packed["cols"]
+    extra = packed.get("extra", {})
+    rows = []
+    for i in range(packed.get("n", 0)):
+        champion_name, champion_id = tables["champions"][cols["champion"][i]]
+        fields = {name: cols[name][i] for name in STAT_FIELDS if name in cols}
+        fields.update(
+            riot_id=tables["riot_ids"][cols["riot_id"][i]],
+            puuid=tables["puuids"][cols["puuid"][i]],
+            champion_name=champion_name,
+            champion_id=champion_id,
+            items=tuple(tables["items"][idx] for idx in cols["items"][i]),
+            rune_page=_rune_page_from_json(tables["rune_pages"][cols["rune_page"][i]]),
+            is_self=(i == packed.get("self_index")),
+            game_duration=game_duration,
+        )
+        row_extra = {k: v[i] for k, v in extra.items() if v[i] is not None}
+        fields["extra"] = row_extra or None
+        rows.append(ParticipantRow(**fields))
+    return rows
+
+
+def _rune_page_to_json(page: Tuple) -> List[Any]:
+    primary_style, primary_perks, sub_style, sub_perks, shards = page
+    return [primary_style, list(primary_perks), sub_style, list(sub_perks), list(shards)]
+
+
+def _rune_page_from_json(page: List[Any]) -> Tuple:
+    primary_style, primary_perks, sub_style, sub_perks, shards = page
+    return (primary_style, tuple(primary_perks), sub_style, tuple(sub_perks), tuple(shards))
+
+
+def pack_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return a copy of an analysis dict with every match's participants packed.
+
+    The input is not modified (the pipeline keeps using it after Stage 1 save).
+    Already-packed matches are re-interned into the new tables.
+    """
+    detailed = analysis.get("detailed_matches")
+    if not detailed:
+        return analysis
+
+    old_tables = analysis.get("participant_tables") or {}
+    tables = {name: _Interner() for name in ("riot_ids", "puuids", "champions", "items", "rune_pages")}
+
+    packed_matches = []
+    for dm in detailed:
+        participants = dm.get("participants")
+        if not participants:
+            packed_matches.append(dm)
+            continue
+        duration = dm.get("game_duration", 0)
+        if is_packed(participants):
+            rows = unpack_participants(participants, old_tables, duration)
+        else:
+            rows = [_as_row(p, duration) for p in participants]
+        packed_matches.append({**dm, "participants": pack_participants(rows, tables)})
+
+    out = dict(analysis)
+    out["detailed_matches"] = packed_matches
+    out["participant_tables"] = {"version": PACKED_VERSION, **{k: t.values for k, t in tables.items()}}
+    return out
+
+
+def unpack_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Restore list-of-dict participants in place (no-op for legacy/unpacked docs)."""
+    tables = analysis.pop("participant_tables", None)
+    if not tables:
+        return analysis
+    for dm in analysis.get("detailed_matches", []):
+        participants = dm.get("participants")
+        if is_packed(participants):
+            rows = unpack_participants(participants, tables, dm.get("game_duration", 0))
+            dm["participants"] = [r.to_dict() for r in rows]
+    return analysis
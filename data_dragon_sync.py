@@ -15,13 +15,15 @@ You can optionally set PATCH manually (e.g. "16.1.1") inside this file if you
 want to lock to a specific patch instead of "latest".
 """
 
-import json
 import sys
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
 import requests
 
+import fast_json
+import static_data
+
 
 # ----------------------
 # Configuration
@@ -43,18 +45,18 @@ CHAMPION_PROFILES_PATH = Path(__file__).parent / "champion_profiles.json"
 # ----------------------
 
 def get_latest_patch() -> str:
-    """Fetch the latest version string from Data Dragon."""
-    url = "https://ddragon.leagueoflegends.com/api/versions.json"
-    resp = requests.get(url, timeout=10)
-    resp.raise_for_status()
-    versions: List[str] = resp.json()
-    if not versions:
-        raise RuntimeError("No versions returned from Data Dragon.")
-    return versions[0]
+    """Latest version string from Data Dragon (via the shared static-data cache)."""
+    return static_data.get_latest_version()
 
 
 def get_champion_data(patch: str, lang: str = LANG) -> Dict[str, Any]:
-    """Download champion.json for the given patch and language."""
+    """champion.json "data" block for the given patch and language."""
+    if patch == static_data.get_latest_version() and lang == static_data.DEFAULT_LANG:
+        data = static_data.get_ddragon_champions()
+        if data:
+            return data
+
+    # Pinned patch / other language: one-off download, not worth caching
     url = f"https://ddragon.leagueoflegends.com/cdn/{patch}/data/{lang}/champion.json"
     resp = requests.get(url, timeout=10)
     resp.raise_for_status()
@@ -83,14 +85,12 @@ def load_profiles(path: Path) -> Dict[str, Any]:
             }
         }
 
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    return fast_json.read_file(path)
 
 
 def save_profiles(path: Path, data: Dict[str, Any]) -> None:
     """Write champion_profiles.json nicely formatted."""
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    fast_json.write_file(path, data, indent=True)
     print(f"[OK] Wrote updated champion profiles to {path}")
 
 
@@ -1,15 +1,99 @@
 import os
-import pymongo
-from pymongo import MongoClient
-from pymongo.collection import Collection
-from pymongo.database import Database as MongoDatabase
+from pathlib import Path
 from typing import Dict, Any, List, Optional
+import re
+import threading
 import time
+import unicodedata
 
+try:
+    import pymongo
+    from pymongo import MongoClient
+    from pymongo.collection import Collection
+    from pymongo.database import Database as MongoDatabase
+except ImportError:
+    # Local (SQLite) backend only
+    pymongo = None
+    MongoClient = Collection = MongoDatabase = Any
+
+import blob_codec
+from compact_participants import pack_analysis, unpack_analysis
+from pipeline_trace import count
+from metrics import cache_result, timed_db_methods
+
+# "mongo" (MONGO_URI), "local" (SQLite file at LOCAL_DB_PATH) or "none". Default: mongo if MONGO_URI is set, else local.
+DB_BACKEND = os.getenv("DB_BACKEND", "").lower()
+LOCAL_DB_PATH = os.getenv("LOCAL_DB_PATH", str(Path(__file__).resolve().parent / "saves" / "league_analyzer.sqlite3"))
+# How long a claimed aggregate fold may stay unconfirmed before another run can take it over (claim_folds)
+FOLD_LEASE_S = float(os.getenv("AGGREGATE_FOLD_LEASE_S", "300"))
+
+
+def _binary(data: bytes) -> Any:
+    """bson.Binary for Mongo; plain bytes when pymongo isn't installed (the local store takes either)."""
+    if pymongo is None:
+        return bytes(data)
+    from bson import Binary
+    return Binary(data)
+
+
+def compress_blob(data: Any, kind: str = "generic") -> bytes:
+    """Serialize a payload for a `compressed_data` field (JSON, current codec for `kind`, see blob_codec)."""
+    return blob_codec.encode(data, kind)[0]
+
+
+def decompress_blob(blob: bytes, codec: Optional[str] = None) -> Any:
+    """Inverse of compress_blob. codec is the document's tag; untagged blobs are sniffed (zstd) or zlib."""
+    count("bytes_read", len(blob))
+    return blob_codec.decode(blob, codec)
+
+
+_SEARCH_SPACE = re.compile(r"[\s_]+")
+_SEARCH_HASH = re.compile(r"\s*#\s*")
+
+
+def normalize_search_text(text: str) -> str:
+    """Search-key form of user input: NFKC, casefolded, runs of whitespace/underscores -> one space."""
+    text = _SEARCH_SPACE.sub(" ", unicodedata.normalize("NFKC", text).casefold())
+    return _SEARCH_HASH.sub("#", text).strip()
+
+
+def search_fields(riot_id: str) -> Dict[str, str]:
+    """Indexed lookup keys stored with each analysis: search_key "name#tag" and search_name "name"."""
+    name, _, tag = normalize_search_text(riot_id).rpartition("#")
+    return {"search_key": f"{name}#{tag}", "search_name": name}
+
+
+def search_key_for(core_name: str) -> Optional[str]:
+    """search_key for a lookup string ("Name#Tag", "Name_Tag", "name tag"), or None without a tag."""
+    text = normalize_search_text(core_name)
+    if "#" not in text:
+        if " " not in text:
+            return None
+        text = "#".join(text.rsplit(" ", 1))
+    return search_fields(text)["search_key"]
+
+
+def _is_duplicate_key(e: Exception) -> bool:
+    """pymongo's and local_store's DuplicateKeyError (both carry the server's E11000 message)."""
+    return "E11000" in str(e) or "DuplicateKey" in type(e).__name__
+
+
+# list_analyses only reads these (plus the legacy fallbacks for documents saved before "listing")
+LISTING_PROJECTION = {
+    "riot_id": 1, "region": 1, "created": 1, "listing": 1,
+    "meta.intended_role_focus": 1, "match_count_requested": 1, "_id": 0,
+}
+
+
+@timed_db_methods
 class Database:
     _instance = None
     _client: MongoClient = None
     _db: MongoDatabase = None
+    _ingest = None
+    _ingest_lock = threading.Lock()
+    backend = "none"
+    auto_indexes = True  # db_indexes' CLI turns this off to run apply/check itself
 
     def __new__(cls):
         if cls._instance is None:
@@ -25,12 +109,20 @@ class Database:
         except ImportError:
             pass
 
-        # Default to local if no URI provided (dev mode safe fallback)
         uri = os.environ.get("MONGO_URI")
-        if not uri:
-            print("WARNING: MONGO_URI not found in env. Database features will be disabled.")
+        self.backend = DB_BACKEND or ("mongo" if uri else "local")
+        if self.backend == "none":
+            print("WARNING: DB_BACKEND=none. Database features will be disabled.")
             self._client = None
             return
+        if self.backend == "local":
+            self._connect_local()
+            return
+        if not uri or pymongo is None:
+            reason = "MONGO_URI not found in env" if not uri else "pymongo is not installed"
+            print(f"WARNING: {reason}. Falling back to the local store.")
+            self._connect_local()
+            return
 
         try:
             self._client = MongoClient(uri, serverSelectionTimeoutMS=5000)
@@ -38,10 +130,26 @@ class Database:
             self._db = self._client.get_database("league_analyzer")
             print("Connected to MongoDB.")
             self._ensure_indexes()
+            self._load_compression_dicts()
         except Exception as e:
             print(f"Failed to connect to MongoDB: {e}")
             self._client = None
 
+    def _connect_local(self):
+        """Embedded SQLite store (local_store.py) with the same collections, for single-node setups and CI."""
+        try:
+            from local_store import LocalStore
+            Path(LOCAL_DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+            self._client = LocalStore(LOCAL_DB_PATH)
+            self._db = self._client
+            self.backend = "local"
+            print(f"Using local store at {LOCAL_DB_PATH}.")
+            self._ensure_indexes()
+            self._load_compression_dicts()
+        except Exception as e:
+            print(f"Failed to open local store {LOCAL_DB_PATH}: {e}")
+            self._client = None
+
     @property
     def is_connected(self) -> bool:
         return self._client is not None
@@ -52,36 +160,30 @@ class Database:
         return self._db[name]
 
     def _ensure_indexes(self):
-        """Idempotently ensure critical indexes exist for performance."""
-        try:
-            col = self._get_collection("analyses")
-            if col is not None:
-                # 1. Access Query Indexes (Most Critical)
-                col.create_index([("filename_id", pymongo.ASCENDING)], background=True)
-                col.create_index([("filename_id_lower", pymongo.ASCENDING)], background=True)
-                
-                # 2. Uniqueness & Sorting
-                # Use background=True to avoid locking DB on startup
-                col.create_index([("riot_id", pymongo.ASCENDING)], unique=True, background=True)
-                col.create_index([("created", pymongo.DESCENDING)], background=True)
-                # print("[DB] Verified critical indexes.")
-        except Exception as e:
-            print(f"[DB-WARN] Auto-index creation failed: {e}")
+        """Apply the db_indexes registry if this store hasn't seen the current version (one marker read otherwise)."""
+        if not self.auto_indexes:
+            return
+        import db_indexes
+        db_indexes.ensure_applied(self)
 
     # --- Match Caching ---
 
     def get_match(self, match_id: str) -> Optional[Dict[str, Any]]:
         col = self._get_collection("matches")
         if col is None: return None
+        pending = self._pending_write("matches", match_id)
+        if pending is not None:
+            count("match_cache_hit")
+            cache_result("match", True)
+            return pending
         doc = col.find_one({"metadata.matchId": match_id}, {"_id": 0})
+        count("match_cache_hit" if doc else "match_cache_miss")
+        cache_result("match", bool(doc))
         
         if doc:
             if "compressed_data" in doc:
                 try:
-                    import zlib
-                    import json
-                    decompressed = zlib.decompress(doc["compressed_data"])
-                    return json.loads(decompressed)
+                    return decompress_blob(doc["compressed_data"], doc.get("codec"))
                 except Exception as e:
                     print(f"Error decompressing match {match_id}: {e}")
                     return None
@@ -93,12 +195,13 @@ class Database:
         col = self._get_collection("matches")
         if col is None or not match_ids: return {}
         
+        # Saved but not yet flushed: serve from the ingest buffer, query only the rest
+        results = {mid: self._sanitize_document(m)
+                   for mid, m in (self._ingest.pending_ids("matches", match_ids) if self._ingest else {}).items()}
+        stored_ids = [mid for mid in match_ids if mid not in results] if results else match_ids
+
         # Use $in query for bulk retrieval
-        cursor = col.find({"metadata.matchId": {"$in": match_ids}})
-        
-        results = {}
-        import zlib
-        import json
+        cursor = col.find({"metadata.matchId": {"$in": stored_ids}}) if stored_ids else []
         
         for doc in cursor:
             mid = doc.get("metadata", {}).get("matchId")
@@ -107,8 +210,7 @@ class Database:
             final_doc = None
             if "compressed_data" in doc:
                 try:
-                    decompressed = zlib.decompress(doc["compressed_data"])
-                    final_doc = json.loads(decompressed)
+                    final_doc = decompress_blob(doc["compressed_data"], doc.get("codec"))
                 except Exception as e:
                     print(f"Error decompressing match {mid}: {e}")
             else:
@@ -117,13 +219,30 @@ class Database:
             if final_doc:
                 results[mid] = self._sanitize_document(final_doc)
         
+        count("match_cache_hit", len(results))
+        count("match_cache_miss", len(match_ids) - len(results))
+        cache_result("match", True, len(results))
+        cache_result("match", False, len(match_ids) - len(results))
         return results
 
+    def get_cached_match_ids(self, match_ids: List[str]) -> set:
+        """Return the subset of match_ids already stored (IDs only, no blob decompression)."""
+        col = self._get_collection("matches")
+        if col is None or not match_ids: return set()
+
+        pending = set(self._ingest.pending_ids("matches", match_ids)) if self._ingest else set()
+        cursor = col.find(
+            {"metadata.matchId": {"$in": [mid for mid in match_ids if mid not in pending]}},
+            {"metadata.matchId": 1, "_id": 0}
+        )
+        return pending | {doc.get("metadata", {}).get("matchId") for doc in cursor}
+
     def get_matches_by_puuid(self, puuid: str, limit: int = 1000) -> List[Dict[str, Any]]:
         """Retrieve all cached matches where the user is a participant."""
         col = self._get_collection("matches")
         if col is None: return []
-        
+        self.flush_writes()
+
         # Query for PUUID in participants list (using metadata for speed)
         # Sort by gameCreation descending (newest first)
         cursor = col.find({"metadata.participants": puuid})\
@@ -131,14 +250,11 @@ class Database:
                     .limit(limit)
         
         results = []
-        import zlib
-        import json
         
         for doc in cursor:
             if "compressed_data" in doc:
                 try:
-                    decompressed = zlib.decompress(doc["compressed_data"])
-                    results.append(json.loads(decompressed))
+                    results.append(decompress_blob(doc["compressed_data"], doc.get("codec")))
                 except Exception as e:
                     print(f"Error decompressing match {doc.get('metadata', {}).get('matchId')}: {e}")
             else:
@@ -147,48 +263,20 @@ class Database:
         return results
 
     def save_match(self, match_data: Dict[str, Any]):
+        """Queue a match for the write-behind ingest buffer (written synchronously if it's off)."""
         col = self._get_collection("matches")
         if col is None or not match_data: return
         match_id = match_data.get("metadata", {}).get("matchId")
         if match_id:
-            try:
-                import zlib
-                import json
-                from bson import Binary
-                
-                # Extract Critical Metadata for Querying/Cleanup
-                meta = match_data.get("metadata", {})
-                info = match_data.get("info", {})
-                
-                # 1. Game Creation Timestamp
-                if "gameCreation" in info:
-                    meta["gameCreation"] = info["gameCreation"]
-                
-                # 2. Participants (PUUIDs)
-                if "participants" in info:
-                    meta["participants"] = [p.get("puuid") for p in info["participants"]]
-
-                json_str = json.dumps(match_data)
-                compressed = zlib.compress(json_str.encode('utf-8'))
-                
-                doc = {
-                    "metadata": meta,
-                    "compressed_data": Binary(compressed)
-                }
-                col.replace_one({"metadata.matchId": match_id}, doc, upsert=True)
-            except Exception as e:
-                print(f"Error compressing match {match_id}: {e}")
-                import traceback
-                traceback.print_exc()
-                # Fallback: Sanitize allows int keys to be stringified
-                sanitized = self._sanitize_document(match_data)
-                col.replace_one({"metadata.matchId": match_id}, sanitized, upsert=True)
+            self._ingest_put("matches", match_id, match_data)
 
     def cleanup_old_matches(self, puuid: str, limit: int = 1000):
         """Delete matches exceeding the limit for a specific player."""
         col = self._get_collection("matches")
         tl_col = self._get_collection("timelines")
         if col is None: return
+        # Queued matches must be stored before ranking, or they'd survive (or resurrect) the cleanup
+        self.flush_writes()
 
         try:
             # Find all matches for this player, sorted NEWEST first
@@ -216,59 +304,134 @@ class Database:
         except Exception as e:
             print(f"   [DB] Cleanup execution failed: {e}")
 
-    def get_timeline(self, match_id: str) -> Optional[Dict[str, Any]]:
+    def get_timeline(self, match_id: str, record_lookup: bool = True) -> Optional[Dict[str, Any]]:
+        """record_lookup=False leaves the cache hit/miss counters alone, for reads of a timeline the
+        caller already looked up (get_cached_timeline_ids) or just fetched."""
         col = self._get_collection("timelines")
         if col is None: return None
+        pending = self._pending_write("timelines", match_id)
+        if pending is not None:
+            if record_lookup:
+                count("timeline_cache_hit")
+                cache_result("timeline", True)
+            return pending
         doc = col.find_one({"metadata.matchId": match_id}, {"_id": 0})
+        if record_lookup:
+            count("timeline_cache_hit" if doc else "timeline_cache_miss")
+            cache_result("timeline", bool(doc))
         
         if doc:
             # Check for compression
             if "compressed_data" in doc:
                 try:
-                    import zlib
-                    import json
-                    decompressed = zlib.decompress(doc["compressed_data"])
-                    return json.loads(decompressed)
+                    return decompress_blob(doc["compressed_data"], doc.get("codec"))
                 except Exception as e:
                     print(f"Error decompressing timeline {match_id}: {e}")
                     return None
             return doc # Legacy uncompressed
         return None
 
+    def get_cached_timeline_ids(self, match_ids: List[str]) -> set:
+        """The subset of match_ids with a stored timeline (one $in query on IDs, no blob decompression).
+        Counts as the timeline cache lookup for each ID."""
+        col = self._get_collection("timelines")
+        if col is None or not match_ids: return set()
+
+        pending = set(self._ingest.pending_ids("timelines", match_ids)) if self._ingest else set()
+        rest = [mid for mid in match_ids if mid not in pending]
+        cursor = col.find({"metadata.matchId": {"$in": rest}}, {"metadata.matchId": 1, "_id": 0}) if rest else []
+        found = pending | {doc.get("metadata", {}).get("matchId") for doc in cursor}
+        hits = sum(1 for mid in match_ids if mid in found)
+        count("timeline_cache_hit", hits)
+        count("timeline_cache_miss", len(match_ids) - hits)
+        cache_result("timeline", True, hits)
+        cache_result("timeline", False, len(match_ids) - hits)
+        return found
+
     def save_timeline(self, match_id: str, timeline_data: Dict[str, Any]):
+        """Queue a timeline for the write-behind ingest buffer (written synchronously if it's off)."""
         col = self._get_collection("timelines")
         if col is None or not timeline_data: return
-        
-        # Ensure ID is searchable
-        # Compress the data to save massive DB space (80% reduction)
+        self._ingest_put("timelines", match_id, timeline_data)
+
+    # --- Match / timeline ingestion (see ingest_buffer.py) ---
+
+    def _ingest_buffer(self):
+        if self._ingest is None and self.is_connected:
+            from ingest_buffer import WRITE_BEHIND, IngestBuffer
+            if not WRITE_BEHIND:
+                return None
+            with Database._ingest_lock:
+                if self._ingest is None:
+                    self._ingest = IngestBuffer(self)
+        return self._ingest
+
+    def _ingest_put(self, collection: str, match_id: str, data: Dict[str, Any]):
+        buffer = self._ingest_buffer()
+        if buffer is not None:
+            buffer.put(collection, match_id, data)
+        else:
+            self.write_blob_docs(collection, [(match_id, self._blob_doc(collection, match_id, data))])
+
+    def _pending_write(self, collection: str, match_id: str) -> Optional[Dict[str, Any]]:
+        """A document saved but not yet flushed (read-your-writes), else None."""
+        return self._ingest.get(collection, match_id) if self._ingest is not None else None
+
+    def flush_writes(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued match/timeline is stored."""
+        return self._ingest.flush(timeout) if self._ingest is not None else True
+
+    def _blob_doc(self, collection: str, match_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Storage document: queryable metadata outside, the payload as a codec blob (see blob_codec)."""
+        # Copied: the payload may still be in use by the pipeline while the ingest thread builds this
+        meta = dict(data.get("metadata", {}))
+        meta["matchId"] = match_id
+        if collection == "matches":
+            # Extract Critical Metadata for Querying/Cleanup
+            info = data.get("info", {})
+            if "gameCreation" in info:
+                meta["gameCreation"] = info["gameCreation"]
+            if "participants" in info:
+                meta["participants"] = [p.get("puuid") for p in info["participants"]]
+        kind = "match" if collection == "matches" else "timeline"
         try:
-            import zlib
-            import json
-            from bson import Binary
-            
-            # We preserve metadata outside compression for querying
-            meta = timeline_data.get("metadata", {})
-            meta["matchId"] = match_id
-            
-            json_str = json.dumps(timeline_data)
-            compressed = zlib.compress(json_str.encode('utf-8'))
-            
-            doc = {
-                "metadata": meta,
-                "compressed_data": Binary(compressed)
-            }
-            
-            col.replace_one({"metadata.matchId": match_id}, doc, upsert=True)
+            compressed, codec = blob_codec.encode(data, kind)
+            return {"metadata": meta, "compressed_data": _binary(compressed), "codec": codec}
         except Exception as e:
-            print(f"Error compressing timeline {match_id}, saving raw: {e}")
+            print(f"Error compressing {kind} {match_id}, saving raw: {e}")
             import traceback
             traceback.print_exc()
-            # Fallback
-            # Sanitize fallback too!
-            sanitized = self._sanitize_document(timeline_data)
-            sanitized["metadata"] = sanitized.get("metadata", {})
-            sanitized["metadata"]["matchId"] = match_id
-            col.replace_one({"metadata.matchId": match_id}, sanitized, upsert=True)
+            # Fallback: Sanitize allows int keys to be stringified
+            sanitized = self._sanitize_document(data)
+            sanitized["metadata"] = meta
+            return sanitized
+
+    def write_blob_docs(self, collection: str, items: List[tuple]) -> int:
+        """Upsert (match_id, document) pairs with one unordered bulk_write. Returns how many were stored."""
+        col = self._get_collection(collection)
+        if col is None or not items: return 0
+        if self.backend == "mongo":
+            from pymongo import ReplaceOne
+        else:
+            from local_store import ReplaceOne
+        ops = [ReplaceOne({"metadata.matchId": mid}, doc, upsert=True) for mid, doc in items]
+        try:
+            col.bulk_write(ops, ordered=False)
+            return len(ops)
+        except Exception as e:
+            # Unordered: everything but the reported writeErrors went through
+            details = getattr(e, "details", None) or {}
+            failed = sorted({err["index"] for err in details.get("writeErrors", [])}) or list(range(len(ops)))
+            print(f"[DB-WARN] Bulk write to {collection}: {len(failed)}/{len(ops)} failed ({e}); retrying one by one")
+        stored = len(ops) - len(failed)
+        for i in failed:
+            mid, doc = items[i]
+            try:
+                col.replace_one({"metadata.matchId": mid}, doc, upsert=True)
+                stored += 1
+            except Exception as e:
+                print(f"[DB-ERROR] Failed to save {collection} {mid}: {e}")
+        return stored
 
     def get_timeline_analysis(self, match_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve cached analysis results (loss/movement) to skip redundant processing."""
@@ -287,6 +450,275 @@ class Database:
         doc = {"match_id": match_id, **analysis_data}
         col.replace_one({"match_id": match_id}, doc, upsert=True)
 
+    # --- Memory-budget spills (see memory_budget.SpillStore) ---
+
+    def save_spill(self, job: str, key: str, puuid: str, item: Dict[str, Any]):
+        """Park one per-player item of a running job; only that job reads it back."""
+        col = self._get_collection("spills")
+        if col is None: return
+        compressed, codec = blob_codec.encode(item, "movement")
+        col.replace_one({"job": job, "key": key}, {
+            "job": job,
+            "key": key,
+            "puuid": puuid,
+            "compressed_data": _binary(compressed),
+            "codec": codec,
+            "created": time.time(),
+        }, upsert=True)
+
+    def get_spill(self, job: str, key: str) -> Optional[Dict[str, Any]]:
+        col = self._get_collection("spills")
+        if col is None: return None
+        doc = col.find_one({"job": job, "key": key}, {"compressed_data": 1, "codec": 1})
+        return decompress_blob(doc["compressed_data"], doc.get("codec")) if doc else None
+
+    def delete_spills(self, job: str) -> int:
+        col = self._get_collection("spills")
+        if col is None: return 0
+        return col.delete_many({"job": job}).deleted_count
+
+    # --- Backfill queue (see fetch_scheduler) ---
+
+    @staticmethod
+    def _backfill_task(kind: str, key: str, region: str, count: int) -> Dict[str, Any]:
+        return {
+            "task": f"{kind}:{key}",
+            "kind": kind,
+            "key": key,
+            "region": region,
+            "count": count,
+            "rank": 0 if kind == "player" else 1,  # players first: they expand into match tasks
+            "created": time.time(),
+            "lease_until": 0.0,
+        }
+
+    def enqueue_backfill(self, kind: str, key: str, region: str, count: int = 0) -> bool:
+        """Add a "player" (puuid) or "match" (match ID) task unless it's already queued. True if it was new."""
+        col = self._get_collection("backfill_queue")
+        if col is None: return False
+        task = self._backfill_task(kind, key, region, count)
+        try:
+            result = col.update_one({"task": task["task"]}, {"$setOnInsert": task}, upsert=True)
+        except Exception as e:
+            # Concurrent upsert of the same task lost the race on the unique index
+            if _is_duplicate_key(e):
+                return False
+            raise
+        return result.upserted_id is not None
+
+    def enqueue_backfill_many(self, kind: str, keys: List[str], region: str, count: int = 0) -> int:
+        """enqueue_backfill for many keys in one unordered bulk upsert. Returns how many were new."""
+        col = self._get_collection("backfill_queue")
+        if col is None or not keys: return 0
+        if self.backend == "mongo":
+            from pymongo import UpdateOne
+        else:
+            from local_store import UpdateOne
+        tasks = [self._backfill_task(kind, key, region, count) for key in dict.fromkeys(keys)]
+        try:
+            return col.bulk_write([UpdateOne({"task": t["task"]}, {"$setOnInsert": t}, upsert=True) for t in tasks],
+                                  ordered=False).upserted_count
+        except Exception as e:
+            # Unordered: only the reported writeErrors failed; duplicates lost a race with a concurrent upsert
+            details = getattr(e, "details", None) or {}
+            errors = details.get("writeErrors")
+            if not errors or any(err.get("code") != 11000 for err in errors):
+                raise
+            return details.get("nUpserted", 0)
+
+    def claim_backfill(self, owner: str, lease_s: float) -> Optional[Dict[str, Any]]:
+        """Lease the next unclaimed (or expired) task to `owner`. None when nothing is claimable."""
+        col = self._get_collection("backfill_queue")
+        if col is None: return None
+        now = time.time()
+        candidates = col.find({"lease_until": {"$lt": now}}).sort([("rank", 1), ("created", 1)]).limit(8)
+        for doc in list(candidates):
+            # Conditional on the lease we read: another worker claiming it first makes this a no-op
+            result = col.update_one(
+                {"_id": doc["_id"], "lease_until": doc["lease_until"]},
+                {"$set": {"lease_until": now + lease_s, "owner": owner}},
+            )
+            if result.modified_count == 1:
+                return doc
+        return None
+
+    def complete_backfill(self, kind: str, key: str):
+        col = self._get_collection("backfill_queue")
+        if col is None: return
+        col.delete_one({"task": f"{kind}:{key}"})
+
+    def backfill_queue_depth(self) -> int:
+        col = self._get_collection("backfill_queue")
+        if col is None: return 0
+        return col.estimated_document_count()
+
+    # --- Compression dictionaries (see blob_codec) ---
+
+    def _load_compression_dicts(self):
+        """Register every stored zstd dictionary; the newest per kind becomes the active one."""
+        col = self._get_collection("compression_dicts")
+        if col is None or blob_codec.zstandard is None: return
+        try:
+            for doc in col.find({}, {"_id": 0}).sort("created", 1):
+                blob_codec.register_dictionary(doc["kind"], doc["data"])
+            blob_codec.set_dictionary_loader(self.get_compression_dict)
+        except Exception as e:
+            print(f"[DB-WARN] Failed to load compression dictionaries: {e}")
+
+    def get_compression_dict(self, dict_id: int) -> Optional[bytes]:
+        col = self._get_collection("compression_dicts")
+        if col is None: return None
+        doc = col.find_one({"dict_id": dict_id}, {"data": 1})
+        return bytes(doc["data"]) if doc else None
+
+    def save_compression_dict(self, kind: str, data: bytes, samples: int = 0) -> Optional[int]:
+        """Store a trained dictionary and make it the active one for `kind` in this process."""
+        col = self._get_collection("compression_dicts")
+        if col is None: return None
+        dict_id = blob_codec.register_dictionary(kind, data)
+        col.replace_one({"dict_id": dict_id}, {
+            "dict_id": dict_id,
+            "kind": kind,
+            "data": _binary(data),
+            "samples": samples,
+            "created": time.time(),
+        }, upsert=True)
+        return dict_id
+
+    def sample_blob_documents(self, collection: str, n: int) -> List[Dict[str, Any]]:
+        """n random decompressed documents from a blob collection (dictionary training input)."""
+        col = self._get_collection(collection)
+        if col is None: return []
+        out = []
+        for doc in col.aggregate([
+            {"$match": {"compressed_data": {"$exists": True}}},
+            {"$sample": {"size": n}},
+            {"$project": {"compressed_data": 1, "codec": 1}},
+        ]):
+            try:
+                out.append(decompress_blob(doc["compressed_data"], doc.get("codec")))
+            except Exception as e:
+                print(f"[DB-WARN] Skipping undecodable sample {doc.get('_id')}: {e}")
+        return out
+
+    def find_stale_blobs(self, collection: str, codec: str, limit: int = 100, after: Any = None) -> List[Dict[str, Any]]:
+        """Documents whose blob isn't encoded with `codec` (untagged legacy zlib included), in _id order.
+        Pass the last _id of the previous page as `after` to continue past documents that couldn't be rewritten."""
+        col = self._get_collection(collection)
+        if col is None: return []
+        query: Dict[str, Any] = {"compressed_data": {"$exists": True}, "codec": {"$ne": codec}}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        cursor = col.find(query, {"compressed_data": 1, "codec": 1}).sort("_id", 1).limit(limit)
+        return list(cursor)
+
+    def replace_blob(self, collection: str, doc_id: Any, old_codec: Optional[str], blob: bytes, codec: str) -> bool:
+        """Swap one document's blob, unless it was rewritten (codec changed) since it was read."""
+        col = self._get_collection(collection)
+        if col is None: return False
+        result = col.update_one(
+            {"_id": doc_id, "codec": old_codec},
+            {"$set": {"compressed_data": _binary(blob), "codec": codec}},
+        )
+        return result.modified_count == 1
+
+    # --- Heatmaps ---
+
+    def get_heatmaps(self, puuid: str) -> Optional[Dict[str, Any]]:
+        """Per-player density grids (see heatmaps.py); grids are raw uint16 bytes."""
+        col = self._get_collection("heatmaps")
+        if col is None: return None
+        return col.find_one({"puuid": puuid}, {"_id": 0})
+
+    def replace_heatmaps(self, puuid: str, doc: Dict[str, Any], version: Optional[int]) -> bool:
+        """Write a new version of the grids unless another writer got there first (compare-and-swap on
+        "version"; None = no document yet, or one from before versioning). Returns False on conflict."""
+        col = self._get_collection("heatmaps")
+        if col is None: return False
+        doc = {**doc, "puuid": puuid, "version": (version or 0) + 1}
+        try:
+            result = col.replace_one({"puuid": puuid, "version": version}, doc, upsert=True)
+        except Exception as e:
+            # The upsert raced another first write (unique puuid)
+            if _is_duplicate_key(e):
+                return False
+            raise
+        return result.matched_count == 1 or result.upserted_id is not None
+
+    # --- Ward Coverage ---
+
+    def get_ward_coverage(self, puuid: str) -> Optional[Dict[str, Any]]:
+        """Per-player hotspot vision totals (see ward_coverage.py)."""
+        col = self._get_collection("ward_coverage")
+        if col is None: return None
+        return col.find_one({"puuid": puuid}, {"_id": 0})
+
+    def inc_ward_coverage(self, puuid: str, inc: Dict[str, int]):
+        """Add to the totals in place ($inc on dotted paths), so concurrent runs don't overwrite each other."""
+        col = self._get_collection("ward_coverage")
+        if col is None: return
+        # $unset: documents from before the fold markers listed their match IDs inline
+        update: Dict[str, Any] = {"$set": {"updated_at": time.time()}, "$unset": {"match_ids": ""}}
+        if inc:
+            update["$inc"] = inc
+        for attempt in range(2):
+            try:
+                col.update_one({"puuid": puuid}, update, upsert=True)
+                return
+            except Exception as e:
+                # The upsert raced another first write (unique puuid); the retry updates that document
+                if not _is_duplicate_key(e) or attempt:
+                    raise
+
+    # --- Per-match fold markers (heatmaps / ward coverage dedupe) ---
+
+    def claim_folds(self, aggregate: str, puuid: str, match_ids: List[str], owner: Optional[str] = None,
+                    lease_s: float = FOLD_LEASE_S) -> List[str]:
+        """Claim matches for folding into a player's aggregate. Returns the ones nobody else holds.
+
+        With an owner the claims are leases: confirm_folds once the aggregate is written, release_folds if
+        it wasn't. A lease that's neither (the process died in between) can be taken over after lease_s.
+        Without an owner the matches are recorded as folded straight away (e.g. legacy inline lists)."""
+        col = self._get_collection("aggregate_folds")
+        if col is None or not match_ids: return []
+        now = time.time()
+        keys = {f"{aggregate}:{puuid}:{mid}": mid for mid in match_ids}
+        docs = [{"fold": key, "created": now} for key in keys]
+        if owner is not None:
+            for doc in docs:
+                doc.update(owner=owner, lease_until=now + lease_s)
+        held = set()
+        try:
+            col.insert_many(docs, ordered=False)
+        except Exception as e:
+            # Unordered: everything but the reported writeErrors went in; duplicates are someone else's claims
+            errors = (getattr(e, "details", None) or {}).get("writeErrors")
+            if not errors or any(err.get("code") != 11000 for err in errors):
+                raise
+            held = {docs[err["index"]]["fold"] for err in errors}
+        if held and owner is not None:
+            # Take over expired leases; confirmed markers have no lease_until and never match
+            col.update_many({"fold": {"$in": sorted(held)}, "lease_until": {"$lt": now}},
+                            {"$set": {"owner": owner, "lease_until": now + lease_s}})
+            held -= {d["fold"] for d in col.find({"fold": {"$in": sorted(held)}, "owner": owner}, {"fold": 1})}
+        return [mid for key, mid in keys.items() if key not in held]
+
+    def confirm_folds(self, aggregate: str, puuid: str, match_ids: List[str], owner: str):
+        """Make `owner`'s leased claims permanent once their contribution is in the aggregate."""
+        col = self._get_collection("aggregate_folds")
+        if col is None or not match_ids: return
+        col.update_many({"fold": {"$in": [f"{aggregate}:{puuid}:{mid}" for mid in match_ids]}, "owner": owner},
+                        {"$unset": {"lease_until": "", "owner": ""}})
+
+    def release_folds(self, aggregate: str, puuid: str, match_ids: List[str], owner: Optional[str] = None):
+        """Undo claim_folds for matches whose contribution didn't get written (only `owner`'s, if given)."""
+        col = self._get_collection("aggregate_folds")
+        if col is None or not match_ids: return
+        query: Dict[str, Any] = {"fold": {"$in": [f"{aggregate}:{puuid}:{mid}" for mid in match_ids]}}
+        if owner is not None:
+            query["owner"] = owner
+        col.delete_many(query)
+
     # --- Analysis Storage ---
 
     def _sanitize_document(self, doc: Any) -> Any:
@@ -306,12 +738,24 @@ class Database:
         col = self._get_collection("analyses")
         if col is None or not analysis_data: return
         
+        # Pack scoreboard rows into shared-lookup columns (returns copies, caller's payload untouched)
+        if isinstance(analysis_data.get("analysis"), dict):
+            analysis_data = dict(analysis_data)
+            analysis_data["analysis"] = pack_analysis(analysis_data["analysis"])
+
         # Sanitize data to remove dots from keys (e.g. "15.8" -> "15_8")
         analysis_data = self._sanitize_document(analysis_data)
         
         if "created" not in analysis_data:
             import time
             analysis_data["created"] = time.time()
+
+        # Small summary for list_analyses, so the listing never has to touch the analysis body
+        analysis_data["listing"] = {
+            "primary_role": ((analysis_data.get("analysis") or {}).get("primary_role")
+                             or (analysis_data.get("meta") or {}).get("intended_role_focus", "Unknown")),
+            "match_count": analysis_data.get("match_count_requested", 0),
+        }
             
         # Optimization: Store the "virtual filename" ID for O(1) lookups
         if "riot_id" in analysis_data:
@@ -326,22 +770,21 @@ class Database:
             analysis_data["filename_id"] = riot_id.replace("#", "_")
             # Store lowercase ID for case-insensitive O(1) lookup
             analysis_data["filename_id_lower"] = analysis_data["filename_id"].lower()
+            # Normalized keys for fuzzy lookups and autocomplete (search_analyses)
+            analysis_data.update(search_fields(riot_id))
 
         if "analysis" in analysis_data:
             an = analysis_data["analysis"]
             if "movement_summaries" in an and isinstance(an["movement_summaries"], list):
                 if len(an["movement_summaries"]) > 0:
                     try:
-                        import zlib
-                        import json
-                        from bson import Binary
                         # Compress
-                        raw_json = json.dumps(an["movement_summaries"]).encode('utf-8')
-                        compressed = zlib.compress(raw_json)
-                        an["movement_summaries_compressed"] = Binary(compressed)
+                        compressed, codec = blob_codec.encode(an["movement_summaries"], "movement")
+                        an["movement_summaries_compressed"] = _binary(compressed)
+                        an["movement_summaries_codec"] = codec
                         del an["movement_summaries"]
                         analysis_data["analysis"] = an
-                        print(f"[DB-DEBUG] Compressed movement_summaries: {len(raw_json)} -> {len(compressed)} bytes")
+                        print(f"[DB-DEBUG] Compressed movement_summaries: {len(compressed)} bytes")
                     except Exception as e:
                         print(f"[DB-WARN] Failed to compress movement_summaries: {e}")
 
@@ -399,17 +842,19 @@ class Database:
             except:
                 pass
 
-    def _decompress_analysis(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+    def _decompress_analysis(self, doc: Dict[str, Any], expand: bool = True) -> Dict[str, Any]:
+        """Inflate stored blobs. expand=False leaves participants in packed column form (dashboard decodes)."""
         if not doc: return doc
         
         an = doc.get("analysis", {})
+        if expand and "participant_tables" in an:
+            try:
+                unpack_analysis(an)
+            except Exception as e:
+                print(f"[DB-ERROR] Failed to unpack participants: {e}")
         if "movement_summaries_compressed" in an:
             try:
-                import zlib
-                import json
-                compressed = an["movement_summaries_compressed"]
-                decompressed = zlib.decompress(compressed)
-                an["movement_summaries"] = json.loads(decompressed)
+                an["movement_summaries"] = decompress_blob(an["movement_summaries_compressed"], an.get("movement_summaries_codec"))
                 # del an["movement_summaries_compressed"] # Keep raw? No, cleaner to swap.
                 # Actually, clients expect 'movement_summaries'.
                 # We should probably modify a copy if we want to be safe, but modifying in place is faster.
@@ -420,99 +865,141 @@ class Database:
                 
         return doc
 
-    def get_analysis(self, riot_id: str) -> Optional[Dict[str, Any]]:
+    def get_analysis(self, riot_id: str, expand: bool = True) -> Optional[Dict[str, Any]]:
         col = self._get_collection("analyses")
         if col is None: return None
         doc = col.find_one({"riot_id": riot_id}, {"_id": 0})
-        return self._decompress_analysis(doc)
+        return self._decompress_analysis(doc, expand=expand)
 
-    def list_analyses(self) -> List[Dict[str, Any]]:
+    def list_analyses(self, limit: int = 0, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Listing rows, newest first ((created, _id) index). Each row carries an opaque "cursor";
+        pass the last row's to get the next page. Raises ValueError for a malformed cursor."""
         col = self._get_collection("analyses")
         if col is None: return []
-        
-        cursor = col.find({}, {
-            "riot_id": 1, 
-            "region": 1, 
-            "summary": 1, 
-            "match_count_requested": 1,
-            "meta": 1,
-            "created": 1, 
-            "_id": 0
-        })
-        
-        results = []
-        for doc in cursor:
-            # Reconstruct the metadata shape used by views.py
-            results.append({
-                "riot_id": doc.get("riot_id"),
-                "filename": f"league_analysis_{doc.get('riot_id').replace('#','_')}.json", # Virtual filename for frontend compat
-                "created": doc.get("created", time.time()), # Timestamp from DB
-                "primary_role": doc.get("summary", {}).get("primary_role", "Unknown"),
-                "match_count": doc.get("match_count_requested", 0)
-            })
-        return results
 
-    def find_analysis_by_fuzzy_filename(self, core_name: str) -> Optional[Dict[str, Any]]:
+        query: Dict[str, Any] = {}
+        if cursor:
+            created, doc_id = self._parse_listing_cursor(cursor)
+            # _id breaks ties on created, so rows saved in the same instant aren't skipped at a page boundary
+            query = {"$or": [{"created": {"$lt": created}}, {"created": created, "_id": {"$lt": doc_id}}]}
+        found = col.find(query, {**LISTING_PROJECTION, "_id": 1}).sort([("created", -1), ("_id", -1)])
+        if limit:
+            found = found.limit(limit)
+
+        rows = []
+        for doc in found:
+            row = self._listing_row(doc)
+            row["cursor"] = f"{row['created']!r}:{doc['_id']}"
+            rows.append(row)
+        return rows
+
+    def _parse_listing_cursor(self, cursor: str) -> tuple:
+        try:
+            created, doc_id = cursor.rsplit(":", 1)
+            if self.backend == "local":
+                return float(created), int(doc_id)
+            from bson import ObjectId
+            return float(created), ObjectId(doc_id)
+        except Exception as e:
+            raise ValueError(f"Invalid listing cursor {cursor!r}") from e
+
+    def _listing_row(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        riot_id = doc.get("riot_id") or "Unknown"
+        # Older documents predate "listing"; fall back to the fields it was built from
+        listing = doc.get("listing") or {
+            "primary_role": (doc.get("meta") or {}).get("intended_role_focus", "Unknown"),
+            "match_count": doc.get("match_count_requested", 0),
+        }
+        # Reconstruct the metadata shape used by views.py
+        return {
+            "riot_id": riot_id,
+            "filename": f"league_analysis_{riot_id.replace('#','_')}.json", # Virtual filename for frontend compat
+            "created": doc.get("created", 0), # Timestamp from DB
+            "region": doc.get("region"),
+            "primary_role": listing.get("primary_role", "Unknown"),
+            "match_count": listing.get("match_count", 0),
+        }
+
+    def search_analyses(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Autocomplete: listing rows whose normalized Riot ID starts with query (prefix scan on an index)."""
+        col = self._get_collection("analyses")
+        text = normalize_search_text(query)
+        if col is None or not text: return []
+
+        # "name#ta" completes tags of that exact name; anything else completes game names
+        field = "search_key" if "#" in text else "search_name"
+        # Anchored, case-sensitive and literal, so the server turns it into index bounds
+        cursor = col.find({field: {"$regex": "^" + re.escape(text)}}, LISTING_PROJECTION).sort(field, 1).limit(limit)
+        return [self._listing_row(doc) for doc in cursor]
+
+    def backfill_analysis_fields(self) -> int:
+        """Add the fields the analyses indexes key on to documents saved before them: search_key/search_name,
+        and created=0 so undated analyses still have a place in the list cursor. Returns how many were updated."""
+        col = self._get_collection("analyses")
+        if col is None: return 0
+        updated = 0
+        for doc in list(col.find({"search_key": {"$exists": False}}, {"riot_id": 1})):
+            if doc.get("riot_id"):
+                col.update_one({"_id": doc["_id"]}, {"$set": search_fields(doc["riot_id"])})
+                updated += 1
+        updated += col.update_many({"created": None}, {"$set": {"created": 0}}).modified_count
+        return updated
+
+    def count_analyses(self) -> int:
+        """Stored analyses, from collection metadata (no scan)."""
+        col = self._get_collection("analyses")
+        if col is None: return 0
+        return col.estimated_document_count()
+
+    def find_analysis_by_fuzzy_filename(self, core_name: str, expand: bool = True,
+                                        projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Resolve a virtual filename / typed Riot ID. Every step is an indexed lookup (see db_indexes)."""
         import time
         t_start = time.time()
         col = self._get_collection("analyses")
+        if col is None: return None
+        projection = projection or {"_id": 0}
         
         # 0. Super-Optimistic: Exact filename_id match (Fastest, O(1))
-        doc = col.find_one({"filename_id": core_name}, {"_id": 0})
+        doc = col.find_one({"filename_id": core_name}, projection)
         if doc:
             # print(f"[DB-PERF] Direct Filename Match '{core_name}' found in {time.time() - t_start:.4f}s")
-            return self._decompress_analysis(doc)
+            return self._decompress_analysis(doc, expand=expand)
 
         # 1. Case-Insensitive O(1) Match (Fast, requires 'filename_id_lower' index)
         core_lower = core_name.lower()
-        doc = col.find_one({"filename_id_lower": core_lower}, {"_id": 0})
+        doc = col.find_one({"filename_id_lower": core_lower}, projection)
         if doc:
             print(f"[DB-PERF] Case-Insensitive Match '{core_lower}' found in {time.time() - t_start:.4f}s")
-            return self._decompress_analysis(doc)
+            return self._decompress_analysis(doc, expand=expand)
 
         # 2. Optimistic: Try recreating the Riot ID if it follows standard Name_Tag pattern
         parts = core_name.rsplit('_', 1)
         if len(parts) == 2:
             potential_id = f"{parts[0]}#{parts[1]}" # e.g. "Doublelift#NA1"
-            doc = col.find_one({"riot_id": potential_id}, {"_id": 0})
+            doc = col.find_one({"riot_id": potential_id}, projection)
             if doc: 
-                return self._decompress_analysis(doc)
+                return self._decompress_analysis(doc, expand=expand)
             
             # Try Case Insensitive Riot ID (if we indexed 'riot_id_lower'?)
             # Or assume most users type correct casing or rely on filename_id_lower above.
 
-        # 2b. Prefix Match (Optimistic GameName lookup)
-        # If user provides "Bingbong" (no tag), find any "Bingbong#..." in DB.
-        # This fixes "Season Duos" clicks where only GameName is known.
-        if '#' not in core_name and '_' not in core_name:
-            import re
-            escaped_prefix = re.escape(core_name)
-            # Look for "GameName#" prefix, case-insensitive
-            prefix_pattern = f"^{escaped_prefix}#" 
-            # Sort by created desc to get the LATEST one if multiple tags exist
-            cursor = col.find({"riot_id": {"$regex": prefix_pattern, "$options": "i"}}).sort("created", -1).limit(1)
-            try:
-                doc = next(cursor, None)
-                if doc:
-                    print(f"[DB-PERF] Prefix Match '{core_name}' found '{doc.get('riot_id')}'")
-                    return self._decompress_analysis(doc)
-            except Exception:
-                pass
+        # 3. Normalized Riot ID: any casing, spaces/underscores/# as separators (search_key index)
+        key = search_key_for(core_name)
+        if key:
+            doc = col.find_one({"search_key": key}, projection)
+            if doc:
+                print(f"[DB-PERF] Search-Key Match '{key}' found in {time.time() - t_start:.4f}s")
+                return self._decompress_analysis(doc, expand=expand)
 
-        # 3. Fallback: Search using Regex (Slowest, Last Resort)
-        print(f"[DB-WARN] Falling back to REGEX search for {core_name} (This is slow on remote DB)")
-        import re
-        escaped = re.escape(core_name)
-        escaped = escaped.replace(r'\_', '_')
-        pattern_str = escaped.replace('_', '[# _]')
-        pattern_str = f"^{pattern_str}$"
-        
-        t_regex = time.time()
-        try:
-
-            doc = col.find_one({"riot_id": {"$regex": pattern_str, "$options": "i"}}, {"_id": 0})
-            print(f"[DB-PERF] Regex Search for '{core_name}' took {time.time() - t_regex:.4f}s (Result: {bool(doc)})")
-            return self._decompress_analysis(doc)
-        except Exception as e:
-            print(f"[DB-ERROR] Fuzzy search failed: {e}")
-            return None
+        # 4. GameName only (no tag): newest analysis with that name, any tag.
+        # This fixes "Season Duos" clicks where only GameName is known.
+        if '#' not in core_name:
+            name = normalize_search_text(core_name)
+            doc = next(iter(col.find({"search_name": name}, projection).sort("created", -1).limit(1)), None)
+            if doc:
+                print(f"[DB-PERF] Game-Name Match '{core_name}' found '{doc.get('riot_id')}'")
+                return self._decompress_analysis(doc, expand=expand)
+
+        print(f"[DB-PERF] No analysis for '{core_name}' ({time.time() - t_start:.4f}s)")
+        return None
@@ -0,0 +1,286 @@
+"""
+db_indexes.py
+
+The index registry for every collection, plus a query-plan check.
+
+    python db_indexes.py apply      # create any missing registered index
+    python db_indexes.py check      # explain() each hot query; exit 1 on a COLLSCAN
+    python db_indexes.py status     # registered vs. existing indexes per collection
+
+INDEXES lists every index the Database methods rely on. HOT_QUERIES lists
+the lookups that must never scan a whole collection, one per Database
+method, with placeholder values. explain() only needs the query shape.
+
+Applying happens once per deploy (build.sh runs `apply`), not on every
+Database() init. Database._ensure_indexes only reads a marker document from
+schema_meta and applies the registry when the marker's hash differs from
+REGISTRY_HASH. That happens when the registry changes, or on a fresh store
+(e.g. a new local SQLite file). Indexes that failed to build are kept in the
+marker and retried by the next init once INDEX_RETRY_S has passed. Indexes
+that exist but aren't registered are left alone, and `status` lists them.
+
+Index names are the server defaults (field_direction), so entries match
+indexes created earlier by hand. A registered index that conflicts with an
+existing one (same keys, different options) is reported and skipped. Drop
+the old index, then apply again.
+
+Works against either backend. The local store answers explain() from its
+own planner: an indexed condition is an IXSCAN, anything else a COLLSCAN.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import fast_json
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+
+    @property
+    def name(self) -> str:
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+
+class HotQuery(NamedTuple):
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[Tuple[Tuple[str, int], ...]] = None
+    projection: Optional[Dict[str, Any]] = None
+
+
+INDEXES: Tuple[IndexSpec, ...] = (
+    # analyses: exact, case-insensitive and Riot-ID lookups; list ordering + cursor paging (list_analyses)
+    IndexSpec("analyses", (("riot_id", 1),), unique=True),
+    IndexSpec("analyses", (("filename_id", 1),)),
+    IndexSpec("analyses", (("filename_id_lower", 1),)),
+    IndexSpec("analyses", (("created", -1), ("_id", -1))),
+    # analyses: normalized Riot ID (find_analysis fallbacks, search_analyses prefix scans)
+    IndexSpec("analyses", (("search_key", 1),)),
+    IndexSpec("analyses", (("search_name", 1), ("created", -1))),
+    # matches: by ID (single + bulk $in), by player newest-first (get_matches_by_puuid, cleanup_old_matches)
+    IndexSpec("matches", (("metadata.matchId", 1),), unique=True),
+    IndexSpec("matches", (("metadata.participants", 1), ("metadata.gameCreation", -1))),
+    IndexSpec("timelines", (("metadata.matchId", 1),), unique=True),
+    IndexSpec("timeline_analysis", (("match_id", 1),), unique=True),
+    IndexSpec("heatmaps", (("puuid", 1),), unique=True),
+    IndexSpec("ward_coverage", (("puuid", 1),), unique=True),
+    IndexSpec("compression_dicts", (("dict_id", 1),), unique=True),
+    # aggregate_folds: one marker per (aggregate, player, match) folded into heatmaps / ward_coverage
+    IndexSpec("aggregate_folds", (("fold", 1),), unique=True),
+    # backfill_queue: dedupe on enqueue, claimable tasks by lease (fetch_scheduler)
+    IndexSpec("backfill_queue", (("task", 1),), unique=True),
+    IndexSpec("backfill_queue", (("lease_until", 1),)),
+    # spills: one job's parked items (memory_budget.SpillStore)
+    IndexSpec("spills", (("job", 1), ("key", 1))),
+)
+
+_MATCH_ID = "NA1_0000000000"
+_PUUID = "x" * 78
+
+HOT_QUERIES: Tuple[HotQuery, ...] = (
+    HotQuery("get_match", "matches", {"metadata.matchId": _MATCH_ID}),
+    HotQuery("get_matches_bulk", "matches", {"metadata.matchId": {"$in": [_MATCH_ID, "NA1_0000000001"]}}),
+    HotQuery("get_cached_match_ids", "matches", {"metadata.matchId": {"$in": [_MATCH_ID]}},
+             projection={"metadata.matchId": 1, "_id": 0}),
+    HotQuery("get_matches_by_puuid", "matches", {"metadata.participants": _PUUID},
+             sort=(("metadata.gameCreation", -1),)),
+    HotQuery("cleanup_old_matches", "matches", {"metadata.participants": _PUUID},
+             sort=(("metadata.gameCreation", -1),), projection={"metadata.matchId": 1}),
+    HotQuery("get_timeline", "timelines", {"metadata.matchId": _MATCH_ID}),
+    HotQuery("get_cached_timeline_ids", "timelines", {"metadata.matchId": {"$in": [_MATCH_ID]}},
+             projection={"metadata.matchId": 1, "_id": 0}),
+    HotQuery("get_timeline_analysis", "timeline_analysis", {"match_id": _MATCH_ID}),
+    HotQuery("get_analysis", "analyses", {"riot_id": "Name#TAG"}),
+    HotQuery("find_analysis.filename_id", "analyses", {"filename_id": "Name_TAG"}),
+    HotQuery("find_analysis.filename_id_lower", "analyses", {"filename_id_lower": "name_tag"}),
+    HotQuery("find_analysis.search_key", "analyses", {"search_key": "name#tag"}),
+    HotQuery("find_analysis.search_name", "analyses", {"search_name": "name"}, sort=(("created", -1),)),
+    HotQuery("search_analyses.name", "analyses", {"search_name": {"$regex": "^nam"}}, sort=(("search_name", 1),)),
+    HotQuery("search_analyses.key", "analyses", {"search_key": {"$regex": "^name\\#ta"}}, sort=(("search_key", 1),)),
+    HotQuery("list_analyses.page", "analyses",
+             {"$or": [{"created": {"$lt": 1.0e9}}, {"created": 1.0e9, "_id": {"$lt": 1}}]},
+             sort=(("created", -1), ("_id", -1)), projection={"riot_id": 1, "created": 1, "listing": 1}),
+    HotQuery("get_heatmaps", "heatmaps", {"puuid": _PUUID}),
+    HotQuery("get_ward_coverage", "ward_coverage", {"puuid": _PUUID}),
+    HotQuery("claim_backfill", "backfill_queue", {"lease_until": {"$lt": 1.0e10}},
+             sort=(("rank", 1), ("created", 1))),
+    HotQuery("complete_backfill", "backfill_queue", {"task": "match:" + _MATCH_ID}),
+    HotQuery("get_spill", "spills", {"job": "0" * 16, "key": _MATCH_ID}),
+    HotQuery("release_folds", "aggregate_folds", {"fold": {"$in": ["heatmaps:" + _PUUID + ":" + _MATCH_ID]}}),
+    HotQuery("claim_folds_takeover", "aggregate_folds",
+             {"fold": {"$in": ["heatmaps:" + _PUUID + ":" + _MATCH_ID]}, "lease_until": {"$lt": 0.0}}),
+    HotQuery("confirm_folds", "aggregate_folds",
+             {"fold": {"$in": ["heatmaps:" + _PUUID + ":" + _MATCH_ID]}, "owner": "0" * 32}),
+    HotQuery("get_compression_dict", "compression_dicts", {"dict_id": 1}),
+)
+
+REGISTRY_HASH = hashlib.sha1(
+    fast_json.dumps([[s.collection, [list(k) for k in s.keys], s.unique] for s in INDEXES])
+).hexdigest()[:12]
+
+META_COLLECTION = "schema_meta"
+
+
+# ---------------------------------------------------------------------------
+# Apply
+# ---------------------------------------------------------------------------
+
+
+# Seconds before a Database() init retries indexes that failed to build
+INDEX_RETRY_S = float(os.getenv("INDEX_RETRY_S", "600"))
+
+
+def apply(db, only: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """Create the registered indexes (idempotent), or just the `only` labels. Returns {"created"/"failed": [names]}."""
+    result: Dict[str, List[str]] = {"created": [], "failed": []}
+    for spec in INDEXES:
+        label = f"{spec.collection}.{spec.name}"
+        if only is not None and label not in only:
+            continue
+        col = db._get_collection(spec.collection)
+        if col is None:
+            continue
+        try:
+            col.create_index(list(spec.keys), unique=spec.unique, background=True)
+            result["created"].append(label)
+        except Exception as e:
+            print(f"[Indexes] {label}: {e}")
+            result["failed"].append(label)
+    # Derived fields the new indexes key on, for documents saved before them
+    if hasattr(db, "backfill_analysis_fields"):
+        filled = db.backfill_analysis_fields()
+        if filled:
+            print(f"[Indexes] Backfilled search keys / created on {filled} analyses.")
+    # Failed labels stay in the marker so ensure_applied retries just those, at most every INDEX_RETRY_S
+    meta = db._get_collection(META_COLLECTION)
+    if meta is not None:
+        now = time.time()
+        meta.replace_one({"name": "indexes"}, {
+            "name": "indexes", "hash": REGISTRY_HASH, "applied_at": now, "failed": result["failed"],
+            "retry_at": now + INDEX_RETRY_S if result["failed"] else None,
+        }, upsert=True)
+    return result
+
+
+def ensure_applied(db) -> bool:
+    """Apply the registry unless this store already has the current version. Returns True if it applied."""
+    meta = db._get_collection(META_COLLECTION)
+    if meta is None:
+        return False
+    try:
+        marker = meta.find_one({"name": "indexes"}, {"_id": 0})
+        only = None
+        if marker and marker.get("hash") == REGISTRY_HASH:
+            only = marker.get("failed") or []
+            if not only or time.time() < (marker.get("retry_at") or 0):
+                return False
+            print(f"[Indexes] Retrying {len(only)} indexes that failed to build: {', '.join(only)}")
+        else:
+            print(f"[Indexes] Registry {REGISTRY_HASH} not applied yet, creating indexes...")
+        result = apply(db, only)
+        print(f"[Indexes] {len(result['created'])} ensured, {len(result['failed'])} failed.")
+        return True
+    except Exception as e:
+        print(f"[DB-WARN] Index registry check failed: {e}")
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Check
+# ---------------------------------------------------------------------------
+
+
+def _stages(plan: Any) -> Iterator[Dict[str, Any]]:
+    """Every stage dict in an explain() plan tree (classic and SBE layouts)."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan
+        for v in plan.values():
+            yield from _stages(v)
+    elif isinstance(plan, list):
+        for v in plan:
+            yield from _stages(v)
+
+
+def explain(db, query: HotQuery) -> Dict[str, Any]:
+    col = db._get_collection(query.collection)
+    cursor = col.find(query.filter, query.projection)
+    if query.sort:
+        cursor = cursor.sort(list(query.sort))
+    plan = cursor.explain()
+    winning = (plan.get("queryPlanner") or {}).get("winningPlan") or plan
+    stages = [s["stage"] for s in _stages(winning)]
+    indexes = sorted({s["indexName"] for s in _stages(winning) if s.get("indexName")})
+    return {"query": query.name, "stages": stages, "indexes": indexes,
+            "collscan": "COLLSCAN" in stages, "in_memory_sort": "SORT" in stages}
+
+
+def check(db) -> List[Dict[str, Any]]:
+    """explain() every hot query; print one line each and return the reports."""
+    reports = []
+    for query in HOT_QUERIES:
+        if db._get_collection(query.collection) is None:
+            continue
+        try:
+            report = explain(db, query)
+        except Exception as e:
+            report = {"query": query.name, "stages": [], "indexes": [], "collscan": True, "error": str(e)}
+        reports.append(report)
+        status = "COLLSCAN" if report["collscan"] else "ok"
+        note = " (in-memory sort)" if report.get("in_memory_sort") else ""
+        detail = report.get("error") or " > ".join(report["stages"])
+        print(f"[Indexes] {status:8} {query.name}: {detail} {report['indexes']}{note}")
+    return reports
+
+
+def status(db) -> None:
+    registered: Dict[str, List[IndexSpec]] = {}
+    for spec in INDEXES:
+        registered.setdefault(spec.collection, []).append(spec)
+    for collection, specs in registered.items():
+        col = db._get_collection(collection)
+        if col is None:
+            continue
+        existing = {ix.get("name") for ix in col.list_indexes()}
+        for spec in specs:
+            print(f"[Indexes] {collection}.{spec.name}: {'present' if spec.name in existing else 'MISSING'}"
+                  f"{' (unique)' if spec.unique else ''}")
+        for name in sorted(existing - {s.name for s in specs} - {"_id_"}):
+            print(f"[Indexes] {collection}.{name}: not in registry")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply and verify the database index registry.")
+    parser.add_argument("command", choices=("apply", "check", "status"))
+    args = parser.parse_args()
+
+    from database import Database
+    # Run the command alone, not after the implicit ensure_applied of Database() init
+    Database.auto_indexes = False
+    db = Database()
+    if not db.is_connected:
+        raise SystemExit("[Indexes] Database not connected.")
+
+    if args.command == "apply":
+        result = apply(db)
+        print(f"[Indexes] Registry {REGISTRY_HASH}: {len(result['created'])} ensured, {len(result['failed'])} failed.")
+        sys.exit(1 if result["failed"] else 0)
+    elif args.command == "check":
+        reports = check(db)
+        bad = [r["query"] for r in reports if r["collscan"]]
+        if bad:
+            print(f"[Indexes] {len(bad)} hot queries scan a whole collection: {', '.join(bad)}")
+            sys.exit(1)
+        print(f"[Indexes] All {len(reports)} hot queries use an index.")
+    else:
+        status(db)
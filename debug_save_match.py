@@ -18,6 +18,7 @@ def try_save():
     print("Attempting to save to DB...")
     try:
         db.save_match(match_data)
+        db.flush_writes()
         print("Save SUCCESSFUL!")
     except Exception as e:
         print(f"Save FAILED: {e}")
@@ -0,0 +1,160 @@
+"""
+enriched_items.py
+
+Builds the dashboard's item payload (Meraki items merged with Data Dragon
+names, descriptions, gold, build paths and tags) once per patch, then
+publishes it as a static, content-hashed asset:
+
+    saves/public/static-data/items.<sha12>.json      (plain)
+    saves/public/static-data/items.<sha12>.json.gz   (pre-compressed)
+    saves/public/static-data/items.latest.json       (pointer: patch, hash, url)
+
+WhiteNoise serves saves/public (WHITENOISE_ROOT) with immutable cache headers.
+/api/meraki/items/ only reads the pointer and redirects to the hashed URL.
+
+Run directly to precompute at build time:
+
+    python enriched_items.py
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import fast_json
+import static_data
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PUBLIC_ROOT = SCRIPT_DIR / "saves" / "public"
+ASSET_PREFIX = "static-data"
+ASSET_DIR = PUBLIC_ROOT / ASSET_PREFIX
+POINTER_PATH = ASSET_DIR / "items.latest.json"
+
+# How often the background thread re-checks the patch (the check itself is
+# served from memory by static_data until its own TTL expires).
+REFRESH_INTERVAL = int(os.getenv("ENRICHED_ITEMS_REFRESH_INTERVAL", "900"))
+
+_refresh_lock = threading.Lock()
+_refresh_thread: Optional[threading.Thread] = None
+
+
+def build_enriched_items() -> Dict[str, Any]:
+    """Merge DDragon text/gold/build paths into Meraki items (DDragon alone as fallback)."""
+    meraki = static_data.get_meraki_items()
+    dd_items = static_data.get_ddragon_items()
+
+    if not meraki:
+        return dict(dd_items)
+
+    data: Dict[str, Any] = {}
+    for item_id, item_info in meraki.items():
+        # Copy so the shared parsed asset isn't mutated
+        item_info = dict(item_info)
+        dd_item = dd_items.get(item_id)
+        if dd_item:
+            # Meraki often only has simpleDescription (no scaling numbers)
+            if dd_item.get("description"):
+                item_info["description"] = dd_item["description"]
+            if dd_item.get("name"):
+                item_info["name"] = dd_item["name"]
+            if not item_info.get("gold") and dd_item.get("gold"):
+                item_info["gold"] = dd_item["gold"]
+            if not item_info.get("from") and dd_item.get("from"):
+                item_info["from"] = dd_item["from"]
+            if not item_info.get("tags") and dd_item.get("tags"):
+                item_info["tags"] = dd_item["tags"]
+        data[item_id] = item_info
+    return data
+
+
+def read_pointer() -> Optional[Dict[str, Any]]:
+    """The currently published asset ({"patch", "hash", "file", "url"}) or None."""
+    try:
+        if POINTER_PATH.exists():
+            pointer = fast_json.read_file(POINTER_PATH)
+            if (ASSET_DIR / pointer["file"]).exists():
+                return pointer
+    except Exception as e:
+        print(f"[Items] Pointer unreadable: {e}")
+    return None
+
+
+def publish(force: bool = False) -> Optional[Dict[str, Any]]:
+    """Rebuild and publish the asset if the patch changed (or force). Returns the pointer."""
+    with _refresh_lock:
+        patch = static_data.get_latest_version()
+        pointer = read_pointer()
+        if pointer and pointer.get("patch") == patch and not force:
+            return pointer
+
+        data = build_enriched_items()
+        if not data:
+            print("[Items] No item data available, keeping previous asset.")
+            return pointer
+
+        body = fast_json.dumps(data, sort_keys=True)
+        content_hash = hashlib.sha256(body).hexdigest()[:12]
+        filename = f"items.{content_hash}.json"
+
+        ASSET_DIR.mkdir(parents=True, exist_ok=True)
+        target = ASSET_DIR / filename
+        if not target.exists():
+            fast_json.replace_file(target, body)
+            fast_json.replace_file(ASSET_DIR / f"{filename}.gz", gzip.compress(body, compresslevel=9, mtime=0))
+
+        new_pointer = {
+            "patch": patch,
+            "hash": content_hash,
+            "file": filename,
+            "url": f"/{ASSET_PREFIX}/{filename}",
+            "built_at": int(time.time()),
+        }
+        fast_json.replace_file(POINTER_PATH, fast_json.dumps(new_pointer))
+        _prune(keep=filename, previous=pointer.get("file") if pointer else None)
+        print(f"[Items] Published {filename} for patch {patch} ({len(body) // 1024} KB).")
+        return new_pointer
+
+
+def start_background_refresh() -> None:
+    """Start (once per process) a daemon that republishes when the patch changes."""
+    global _refresh_thread
+    if _refresh_thread is not None and _refresh_thread.is_alive():
+        return
+
+    def _loop():
+        while True:
+            try:
+                publish()
+            except Exception as e:
+                print(f"[Items] Background refresh failed: {e}")
+            time.sleep(REFRESH_INTERVAL)
+
+    _refresh_thread = threading.Thread(target=_loop, name="enriched-items-refresh", daemon=True)
+    _refresh_thread.start()
+
+
+def _prune(keep: str, previous: Optional[str]) -> None:
+    """Drop old hashed files, keeping the previous one for clients mid-redirect."""
+    for old in ASSET_DIR.glob("items.*.json*"):
+        # .tmp: another process's write in flight (fast_json.replace_file)
+        if old.name == POINTER_PATH.name or old.name.endswith(".tmp"):
+            continue
+        base = old.name[:-3] if old.name.endswith(".gz") else old.name
+        if base in (keep, previous):
+            continue
+        try:
+            old.unlink()
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    result = publish(force=True)
+    raise SystemExit(0 if result else 1)
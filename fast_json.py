@@ -0,0 +1,117 @@
+"""
+fast_json.py
+
+One JSON codec for storage blobs, cache files, HTTP bodies and prompts.
+
+    fast_json.dumps(obj)                 -> bytes (compact UTF-8)
+    fast_json.dumps(obj, indent=True)    -> bytes, 2-space indent
+    fast_json.loads(b_or_str)            -> object
+    fast_json.dumps_str(obj)             -> str (prompt text, f-strings)
+    fast_json.read_file(path) / write_file(path, obj, indent=False)
+    fast_json.replace_file(path, body)   -> atomic write of already-encoded bytes
+
+Uses orjson when installed. It works bytes-in/bytes-out with no intermediate
+str or .encode() copy, and non-str dict keys (the int participant/frame keys in
+timeline results) are serialized natively. Without orjson it falls back to the
+stdlib json module with the same call surface and output rules: compact
+separators, UTF-8 rather than \\u escapes, and int keys written as strings.
+
+Differences from the old stdlib calls: non-ASCII text is written as UTF-8
+instead of \\uXXXX escapes, and NaN/Infinity become null under orjson. Both
+decode the same way, but content hashes over the bytes change once.
+
+loads(..., strict=False) accepts raw control characters inside strings, as
+LLM output often contains them. It tries the fast path first and retries with
+the lenient stdlib parser. Decode errors are json.JSONDecodeError
+(orjson.JSONDecodeError subclasses it), so existing except clauses still match.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+    BACKEND = "orjson"
+except ImportError:
+    orjson = None
+    BACKEND = "json"
+
+
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    _OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(obj: Any, *, indent: bool = False, sort_keys: bool = False,
+          default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serialize to UTF-8 JSON bytes (compact unless indent=True)."""
+    if orjson is not None:
+        opts = _OPTS
+        if indent:
+            opts |= orjson.OPT_INDENT_2
+        if sort_keys:
+            opts |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=opts)
+    return json.dumps(
+        obj, ensure_ascii=False, sort_keys=sort_keys, default=default,
+        indent=2 if indent else None, separators=(",", ": ") if indent else (",", ":"),
+    ).encode("utf-8")
+
+
+def dumps_str(obj: Any, *, indent: bool = False, sort_keys: bool = False,
+              default: Optional[Callable[[Any], Any]] = None) -> str:
+    """dumps() as text, for prompts and other str contexts."""
+    return dumps(obj, indent=indent, sort_keys=sort_keys, default=default).decode("utf-8")
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str], *, strict: bool = True) -> Any:
+    """Parse JSON from bytes or str. strict=False tolerates control characters in strings."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            if strict:
+                raise
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode("utf-8")
+    return json.loads(data, strict=strict)
+
+
+def read_file(path: Union[str, Path]) -> Any:
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def write_file(path: Union[str, Path], obj: Any, *, indent: bool = False, atomic: bool = False,
+               default: Optional[Callable[[Any], Any]] = None) -> None:
+    """Write obj as JSON. atomic=True writes a temp file and renames it into place."""
+    body = dumps(obj, indent=indent, default=default)
+    if not atomic:
+        with open(path, "wb") as f:
+            f.write(body)
+        return
+    replace_file(path, body)
+
+
+def replace_file(path: Union[str, Path], body: bytes) -> None:
+    """Write bytes to a temp file of this writer's own in the same directory, then rename it into place.
+    Readers see the old or the new file, never a partial one, and concurrent writers don't share a temp file."""
+    path = Path(path)
+    # Unique per writer (pid + random), created with the usual umask permissions unlike mkstemp's 0600
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(tmp_path, "xb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,347 @@
+"""
+fetch_scheduler.py
+
+Central quota scheduler for Riot API traffic.
+
+Every RiotClient request asks the scheduler for a permit before it hits the
+network. Permits are handed out per routing region (Riot rate limits are
+enforced per region) in priority order:
+
+    PRIORITY_INTERACTIVE  – a player is waiting on /api/analyze/
+    PRIORITY_BACKFILL     – season history top-up, runs in the background
+
+Background work is only allowed to use a fraction of each rate-limit window
+(BACKFILL_HEADROOM), so a long backfill for one player never eats the quota
+another player's foreground analysis needs.
+
+The limits come from Riot's X-App-Rate-Limit response header (or a fixed
+RIOT_RATE_LIMITS). Until the first response arrives, a process paces at
+development-key limits.
+
+Quota is accounted per process. With several web workers sharing one API
+key, RIOT_QUOTA_SHARES (gunicorn.conf.py sets it to the worker count) splits
+every window between them. Each worker then stays inside its own slice, so
+one worker's backfill can't slow another worker's foreground run either.
+
+The backfill queue lives in the database (backfill_queue collection), so
+every worker sees the same queue and it survives restarts. Players and match
+IDs are deduplicated on enqueue. A worker claims a task with a lease
+(BACKFILL_LEASE_S) before running it, and deletes it when it's done. A task
+whose worker died becomes claimable again once its lease runs out. Web
+server processes pick up tasks left from before a restart at startup
+(resume_backfill); other processes only start a worker when they enqueue.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import socket
+import threading
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import fast_json
+from metrics import set_queue_depth
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKFILL = 1
+
+# Same format as Riot's X-App-Rate-Limit header: "count:seconds,count:seconds".
+# Set: fixed limits for the key. Unset: start at development-key limits (20 per second, 100 per
+# 2 minutes) and switch to the key's real limits from the first X-App-Rate-Limit header (learn_limits).
+RATE_LIMITS_OVERRIDE = os.getenv("RIOT_RATE_LIMITS")
+DEFAULT_RATE_LIMITS = RATE_LIMITS_OVERRIDE or "20:1,100:120"
+
+# Share of every window that PRIORITY_BACKFILL requests may consume.
+BACKFILL_HEADROOM = float(os.getenv("RIOT_BACKFILL_HEADROOM", "0.5"))
+
+# Processes sharing the key; each one gets 1/N of every window.
+QUOTA_SHARES = max(1, int(os.getenv("RIOT_QUOTA_SHARES", "1")))
+
+# How long a claimed backfill task stays reserved for the worker running it.
+BACKFILL_LEASE_S = float(os.getenv("RIOT_BACKFILL_LEASE_S", "300"))
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+# Pre-database queue file; imported into the backfill_queue collection once
+LEGACY_QUEUE_FILE = SCRIPT_DIR / "saves" / "backfill_queue.json"
+
+
+def parse_rate_limits(spec: str) -> List[Tuple[int, float]]:
+    """Parse "20:1,100:120" into [(20, 1.0), (100, 120.0)]."""
+    limits: List[Tuple[int, float]] = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            count, window = part.split(":", 1)
+            limits.append((int(count), float(window)))
+        except ValueError:
+            print(f"[Scheduler] Ignoring malformed rate limit '{part}'")
+    return limits or [(20, 1.0), (100, 120.0)]
+
+
+def process_limits(limits: List[Tuple[int, float]], shares: int = QUOTA_SHARES) -> List[Tuple[int, float]]:
+    """This process's slice of each window when `shares` processes use the same key."""
+    return [(max(1, count // shares), window) for count, window in limits]
+
+
+# ---------------------------------------------------------------------------
+# Quota accounting
+# ---------------------------------------------------------------------------
+
+
+class _RegionQuota:
+    """Sliding-window call history + waiting line for one routing region."""
+
+    def __init__(self, limits: List[Tuple[int, float]]):
+        self.limits = limits
+        self.history: List[float] = []  # monotonic timestamps of granted calls
+        self.blocked_until = 0.0        # set by 429 Retry-After
+        self.waiters: List[Tuple[int, int]] = []  # heap of (priority, seq)
+
+    def _prune(self, now: float) -> None:
+        horizon = now - max(w for _, w in self.limits)
+        cut = bisect_right(self.history, horizon)
+        if cut:
+            del self.history[:cut]
+
+    def wait_time(self, now: float, priority: int) -> float:
+        """Seconds until a call at this priority fits inside every window."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        self._prune(now)
+        wait = 0.0
+        for count, window in self.limits:
+            cap = count
+            if priority >= PRIORITY_BACKFILL:
+                cap = max(1, int(count * BACKFILL_HEADROOM))
+            in_window = len(self.history) - bisect_right(self.history, now - window)
+            if in_window >= cap:
+                # The call that has to age out before we fit again
+                oldest_needed = self.history[len(self.history) - cap]
+                wait = max(wait, oldest_needed + window - now)
+        return wait
+
+
+class FetchScheduler:
+    """Process-wide singleton that hands out this process's Riot quota by priority."""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(FetchScheduler, cls).__new__(cls)
+                cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        self._limits_spec = DEFAULT_RATE_LIMITS
+        self._limits = process_limits(parse_rate_limits(DEFAULT_RATE_LIMITS))
+        if RATE_LIMITS_OVERRIDE is None:
+            print(f"[Scheduler] WARNING: RIOT_RATE_LIMITS is not set; pacing at development-key limits "
+                  f"({DEFAULT_RATE_LIMITS}, 1/{QUOTA_SHARES} per process) until Riot reports this key's limits.")
+        self._cond = threading.Condition()
+        self._quotas: Dict[str, _RegionQuota] = {}
+        self._seq = itertools.count()
+
+        # Backfill worker handle (guarded by _worker_lock); the queue itself is in the DB
+        self._worker_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    # -------------------------------
+    # Quota
+    # -------------------------------
+
+    def _quota(self, region: str) -> _RegionQuota:
+        quota = self._quotas.get(region)
+        if quota is None:
+            quota = _RegionQuota(self._limits)
+            self._quotas[region] = quota
+        return quota
+
+    def acquire(self, region: str, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Block until a request may be sent. Returns seconds spent waiting."""
+        t_start = time.monotonic()
+        with self._cond:
+            quota = self._quota(region)
+            ticket = (priority, next(self._seq))
+            heapq.heappush(quota.waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if quota.waiters[0] == ticket:
+                        wait = quota.wait_time(now, priority)
+                        if wait <= 0:
+                            heapq.heappop(quota.waiters)
+                            quota.history.append(now)
+                            self._cond.notify_all()
+                            return now - t_start
+                    else:
+                        # Someone more important (or earlier) goes first
+                        wait = 0.5
+                    self._cond.wait(timeout=min(wait, 5.0))
+            except BaseException:
+                if ticket in quota.waiters:
+                    quota.waiters.remove(ticket)
+                    heapq.heapify(quota.waiters)
+                    self._cond.notify_all()
+                raise
+
+    def learn_limits(self, spec: str) -> None:
+        """Adopt the key's limits from an X-App-Rate-Limit header, unless RIOT_RATE_LIMITS fixes them."""
+        if RATE_LIMITS_OVERRIDE is not None or not spec or spec == self._limits_spec:
+            return
+        with self._cond:
+            if spec == self._limits_spec:
+                return
+            self._limits_spec = spec
+            self._limits = process_limits(parse_rate_limits(spec))
+            for quota in self._quotas.values():
+                quota.limits = self._limits
+            self._cond.notify_all()
+        print(f"[Scheduler] Rate limits from X-App-Rate-Limit: {spec} "
+              f"(this process: {','.join(f'{c}:{w:g}' for c, w in self._limits)})")
+
+    def penalize(self, region: str, retry_after: float) -> None:
+        """Pause all traffic for a region after a 429 (honours Retry-After)."""
+        with self._cond:
+            quota = self._quota(region)
+            quota.blocked_until = max(quota.blocked_until, time.monotonic() + retry_after)
+            self._cond.notify_all()
+
+    # -------------------------------
+    # Backfill queue
+    # -------------------------------
+
+    @staticmethod
+    def _db():
+        from database import Database
+        db = Database()
+        return db if db.is_connected else None
+
+    def schedule_backfill(self, puuid: str, region_key: str = "NA", count: int = 1000) -> None:
+        """Queue a season-history top-up for a player (deduplicated by PUUID)."""
+        db = self._db()
+        if not puuid or db is None:
+            return
+        if db.enqueue_backfill("player", puuid, region_key, count=count):
+            set_queue_depth(db.backfill_queue_depth())
+        self._ensure_worker()
+
+    def enqueue_matches(self, match_ids: List[str], region_key: str = "NA") -> int:
+        """Queue individual match IDs for background fetch. Returns how many were new."""
+        db = self._db()
+        if db is None:
+            return 0
+        added = db.enqueue_backfill_many("match", match_ids, region_key)
+        if added:
+            set_queue_depth(db.backfill_queue_depth())
+            self._ensure_worker()
+        return added
+
+    def queue_depth(self) -> int:
+        db = self._db()
+        return db.backfill_queue_depth() if db is not None else 0
+
+    def resume_backfill(self) -> None:
+        """Server startup hook: import a legacy queue file, then restart the worker if tasks are queued.
+        Called by gunicorn's post_fork and the runserver process (api.apps), not by RiotClient."""
+        db = self._db()
+        if db is None:
+            return
+        self._import_legacy_queue(db)
+        depth = db.backfill_queue_depth()
+        set_queue_depth(depth)
+        if depth:
+            print(f"[Scheduler] Resuming backfill: {depth} tasks queued.")
+            self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        with self._worker_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._backfill_loop, name="riot-backfill", daemon=True)
+            self._worker.start()
+
+    def _backfill_loop(self) -> None:
+        from riot_client import RiotClient
+
+        db = self._db()
+        if db is None:
+            return
+        clients: Dict[str, RiotClient] = {}
+
+        def client_for(region_key: str) -> RiotClient:
+            if region_key not in clients:
+                clients[region_key] = RiotClient(region_key=region_key, priority=PRIORITY_BACKFILL)
+            return clients[region_key]
+
+        while True:
+            task = db.claim_backfill(self._owner, BACKFILL_LEASE_S)
+            if task is None:
+                with self._worker_lock:
+                    # Re-check under the lock: an enqueue that saw this worker alive relies on it to pick the task up
+                    task = db.claim_backfill(self._owner, BACKFILL_LEASE_S)
+                    if task is None:
+                        self._worker = None
+                        set_queue_depth(db.backfill_queue_depth())
+                        return
+
+            kind, key, region_key = task["kind"], task["key"], task.get("region", "NA")
+            try:
+                if kind == "player":
+                    client = client_for(region_key)
+                    all_ids = client.get_recent_match_ids(key, count=task.get("count", 1000))
+                    cached = db.get_cached_match_ids(all_ids)
+                    missing = [mid for mid in all_ids if mid not in cached]
+                    if missing:
+                        print(f"[Backfill] Queued {len(missing)} missing matches for {key[:8]}...")
+                    self.enqueue_matches(missing, region_key)
+                else:
+                    # An interactive run may have fetched it since it was queued
+                    if not db.get_cached_match_ids([key]):
+                        client_for(region_key).get_match(key)
+            except Exception as e:
+                # Dropped below, so one bad ID can't wedge the queue
+                print(f"[Backfill] Error on {kind} task {key}: {e}")
+            db.complete_backfill(kind, key)
+            set_queue_depth(db.backfill_queue_depth())
+
+    # -------------------------------
+    # Persistence
+    # -------------------------------
+
+    def _import_legacy_queue(self, db) -> None:
+        """Move a queue file written before the DB-backed queue into the collection (once)."""
+        if not LEGACY_QUEUE_FILE.exists():
+            return
+        try:
+            data = fast_json.read_file(LEGACY_QUEUE_FILE)
+            for job in data.get("players", []):
+                db.enqueue_backfill("player", job["puuid"], job.get("region", "NA"), count=job.get("count", 1000))
+            by_region: Dict[str, List[str]] = {}
+            for mid, region_key in data.get("matches", []):
+                by_region.setdefault(region_key, []).append(mid)
+            for region_key, mids in by_region.items():
+                db.enqueue_backfill_many("match", mids, region_key)
+            # Another worker may have imported it first; enqueue is idempotent either way
+            os.replace(LEGACY_QUEUE_FILE, LEGACY_QUEUE_FILE.with_suffix(".json.imported"))
+            print(f"[Scheduler] Imported legacy backfill queue from {LEGACY_QUEUE_FILE.name}.")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[Scheduler] Could not import legacy backfill queue ({e}).")
+
+
+def get_scheduler() -> FetchScheduler:
+    return FetchScheduler()
@@ -0,0 +1,238 @@
+"""
+heatmaps.py
+
+Precomputed movement heatmaps per player, role and game phase.
+
+Each heatmap is a GRID_SIZE x GRID_SIZE density grid over the map
+(MAP_SIZE units per side). Cell counts are uint16 and saturate at 65535.
+Grids are updated incrementally:
+
+1. analyze_timeline_movement bins its full-resolution position series into a
+   sparse per-phase histogram ({phase: {cell: count}}), returned as
+   "position_bins".
+2. The pipeline hands those bins to the player's PlayerHeatmaps, keyed by the
+   match's role.
+3. save_player_heatmaps claims each new match in the aggregate_folds marker
+   collection. Matches folded in before (by this or any other run) are
+   skipped, so re-running an analysis doesn't double count. The claimed
+   matches are then folded into the stored grids with a versioned
+   compare-and-swap: on a conflict with a concurrent run for the same player,
+   the document is re-read and the fold retried. The claims are leases,
+   confirmed after the write and released if it fails; a run that dies in
+   between leaves leases that expire (AGGREGATE_FOLD_LEASE_S) so the matches
+   aren't lost. Dying right after the write but before the confirm can still
+   fold those matches twice once the lease expires.
+4. The grids are stored as raw little-endian uint16 bytes
+   (GRID_SIZE * GRID_SIZE * 2 = 8 KB each) and served as-is by
+   /api/heatmaps/<puuid>/.
+
+A season heatmap costs one fixed-size read, whatever the number of games:
+the document holds the grids and per-role game counts only.
+"""
+
+from __future__ import annotations
+
+import base64
+import sys
+import time
+import uuid
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+GRID_SIZE = 64
+MAP_SIZE = 14820  # Summoner's Rift, game units per side
+CELL_MAX = 65535
+SAVE_RETRIES = 5
+
+# (name, start_min, end_min)
+PHASES: Tuple[Tuple[str, float, float], ...] = (
+    ("early", 0.0, 14.0),
+    ("mid", 14.0, 25.0),
+    ("late", 25.0, float("inf")),
+)
+PHASE_NAMES = tuple(name for name, _, _ in PHASES)
+
+
+def phase_for_minute(minute: float) -> str:
+    for name, start, end in PHASES:
+        if start <= minute < end:
+            return name
+    return PHASES[-1][0]
+
+
+def cell_index(x: float, y: float) -> int:
+    """Row-major cell index; row 0 is the bottom of the map (y = 0)."""
+    scale = GRID_SIZE / MAP_SIZE
+    col = min(GRID_SIZE - 1, max(0, int(x * scale)))
+    row = min(GRID_SIZE - 1, max(0, int(y * scale)))
+    return row * GRID_SIZE + col
+
+
+def bin_positions(samples: Iterable[Tuple[int, int, int]]) -> Dict[str, Dict[int, int]]:
+    """Sparse per-phase histogram from (ts_ms, x, y) samples."""
+    bins: Dict[str, Dict[int, int]] = {}
+    for ts_ms, x, y in samples:
+        phase_bins = bins.setdefault(phase_for_minute(ts_ms / 60000.0), {})
+        idx = cell_index(x, y)
+        phase_bins[idx] = phase_bins.get(idx, 0) + 1
+    return bins
+
+
+def _empty_grid() -> array:
+    return array("H", bytes(GRID_SIZE * GRID_SIZE * 2))
+
+
+def grid_to_bytes(grid: array) -> bytes:
+    if sys.byteorder != "little":
+        grid = array("H", grid)
+        grid.byteswap()
+    return grid.tobytes()
+
+
+def grid_from_bytes(data: bytes) -> array:
+    grid = array("H")
+    grid.frombytes(bytes(data))
+    if sys.byteorder != "little":
+        grid.byteswap()
+    if len(grid) != GRID_SIZE * GRID_SIZE:
+        return _empty_grid()
+    return grid
+
+
+def merge_grids(grids: Iterable[array]) -> array:
+    """Cell-wise saturating sum."""
+    out = _empty_grid()
+    for grid in grids:
+        for i, v in enumerate(grid):
+            if v:
+                out[i] = min(CELL_MAX, out[i] + v)
+    return out
+
+
+class PlayerHeatmaps:
+    """A player's grids keyed by (role, phase), plus matches added since the load (not yet saved)."""
+
+    def __init__(self, puuid: str, doc: Optional[Dict[str, Any]] = None):
+        self.puuid = puuid
+        self.grids: Dict[Tuple[str, str], array] = {}
+        self.games: Dict[str, int] = {}
+        self.version: Optional[int] = None
+        # Pre-marker documents listed their folded match IDs inline
+        self.legacy_match_ids: List[str] = []
+        self.pending: Dict[str, Tuple[str, Dict[str, Dict[Any, int]]]] = {}
+
+        if doc:
+            self.version = doc.get("version")
+            self.legacy_match_ids = list(doc.get("match_ids") or [])
+        if doc and doc.get("grid_size") == GRID_SIZE and doc.get("map_size") == MAP_SIZE:
+            for role, phases in (doc.get("cells") or {}).items():
+                for phase, data in phases.items():
+                    self.grids[(role, phase)] = grid_from_bytes(data)
+            self.games = dict(doc.get("games") or {})
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.pending)
+
+    def add_match(self, match_id: str, role: str, position_bins: Dict[str, Dict[Any, int]]) -> bool:
+        """Queue one match's bins for the next save. Returns False if it was already added."""
+        if not match_id or match_id in self.pending:
+            return False
+        self.pending[match_id] = (role or "UNKNOWN", position_bins or {})
+        return True
+
+    def fold(self, role: str, position_bins: Dict[str, Dict[Any, int]]) -> None:
+        for phase, cells in position_bins.items():
+            grid = self.grids.get((role, phase))
+            if grid is None:
+                grid = self.grids[(role, phase)] = _empty_grid()
+            for idx, count in cells.items():
+                # Keys may have been stringified by a JSON/Mongo round trip
+                idx = int(idx)
+                grid[idx] = min(CELL_MAX, grid[idx] + int(count))
+        self.games[role] = self.games.get(role, 0) + 1
+
+    def get(self, role: Optional[str] = None, phase: Optional[str] = None) -> array:
+        """One grid, or the saturating sum across roles/phases when either is None."""
+        selected = [
+            grid for (r, p), grid in self.grids.items()
+            if (role is None or r == role) and (phase is None or p == phase)
+        ]
+        if len(selected) == 1:
+            return selected[0]
+        return merge_grids(selected)
+
+    def to_document(self) -> Dict[str, Any]:
+        cells: Dict[str, Dict[str, bytes]] = {}
+        for (role, phase), grid in self.grids.items():
+            cells.setdefault(role, {})[phase] = grid_to_bytes(grid)
+        return {
+            "puuid": self.puuid,
+            "grid_size": GRID_SIZE,
+            "map_size": MAP_SIZE,
+            "cells": cells,
+            "games": self.games,
+            "updated_at": time.time(),
+        }
+
+
+def load_player_heatmaps(puuid: str, db=None) -> PlayerHeatmaps:
+    if db is None:
+        from database import Database
+        db = Database()
+    return PlayerHeatmaps(puuid, db.get_heatmaps(puuid))
+
+
+def save_player_heatmaps(heatmaps: PlayerHeatmaps, db=None) -> None:
+    """Fold the pending matches into the stored grids (each match once, across runs and workers)."""
+    if not heatmaps.dirty:
+        return
+    if db is None:
+        from database import Database
+        db = Database()
+    puuid = heatmaps.puuid
+    stored = db.get_heatmaps(puuid)
+    legacy = set((stored or {}).get("match_ids") or [])
+    if legacy:
+        db.claim_folds("heatmaps", puuid, sorted(legacy))
+    owner = uuid.uuid4().hex
+    claimed = db.claim_folds("heatmaps", puuid, [mid for mid in heatmaps.pending if mid not in legacy], owner)
+    if not claimed and not legacy:
+        heatmaps.pending.clear()
+        return
+    try:
+        for _ in range(SAVE_RETRIES):
+            merged = PlayerHeatmaps(puuid, stored)
+            for mid in claimed:
+                merged.fold(*heatmaps.pending[mid])
+            if db.replace_heatmaps(puuid, merged.to_document(), merged.version):
+                break
+            # Another run saved this player in between; fold into its version instead
+            stored = db.get_heatmaps(puuid)
+        else:
+            raise RuntimeError(f"heatmaps for {puuid[:8]} kept changing, gave up after {SAVE_RETRIES} attempts")
+    except BaseException:
+        db.release_folds("heatmaps", puuid, claimed, owner)
+        raise
+    db.confirm_folds("heatmaps", puuid, claimed, owner)
+    heatmaps.pending.clear()
+
+
+def heatmap_payload(heatmaps: PlayerHeatmaps, role: Optional[str] = None, phase: Optional[str] = None) -> Dict[str, Any]:
+    """JSON-safe response body: the grid as base64 little-endian uint16."""
+    grid = heatmaps.get(role, phase)
+    games = heatmaps.games.get(role, 0) if role else sum(heatmaps.games.values())
+    return {
+        "puuid": heatmaps.puuid,
+        "role": role,
+        "phase": phase,
+        "games": games,
+        "grid_size": GRID_SIZE,
+        "map_size": MAP_SIZE,
+        "max": max(grid) if len(grid) else 0,
+        "dtype": "uint16",
+        "data": base64.b64encode(grid_to_bytes(grid)).decode("ascii"),
+        # (role, phase) pairs that have data, for building selectors
+        "available": [{"role": r, "phase": p} for (r, p) in sorted(heatmaps.grids)],
+    }
@@ -0,0 +1,221 @@
+"""
+http_fixtures.py
+
+Record / replay transport for outbound HTTP (Riot API, Data Dragon, Meraki,
+LeagueOfGraphs, Lolalytics), so the pipeline can be benchmarked and profiled
+reproducibly on a machine with no network access.
+
+Modes (env HTTP_FIXTURE_MODE):
+    off     (default) plain requests
+    record  real requests; every response is also saved to the fixture store
+    replay  no network; responses come from the fixture store
+
+Fixture store (env HTTP_FIXTURE_DIR, default saves/fixtures): one
+zlib-compressed JSON file per distinct request, named by a hash of
+method + URL + sorted query params. Auth headers (X-Riot-Token) are never part
+of the key and are never stored.
+
+Replay knobs (deterministic for a given HTTP_FIXTURE_SEED):
+    HTTP_FIXTURE_LATENCY_MS   "40" or "20-80" (uniform jitter), default 0
+    HTTP_FIXTURE_429_RATE     probability a call is answered 429 first, default 0
+    HTTP_FIXTURE_RETRY_AFTER  Retry-After seconds on injected 429s, default 1
+
+The injection decision depends on (seed, request key, nth call for that key).
+Re-runs therefore hit exactly the same 429s, whatever the thread scheduling.
+
+Usage:
+    session = make_session()           # instead of requests.Session()
+    resp = http_fixtures.get(url, ...) # instead of requests.get(...)
+
+The OpenAI calls made by the crew go through its own client library, not
+requests, and are not covered.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode, urlsplit, parse_qsl
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import fast_json
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+# Response headers worth keeping (rate-limit headers matter to the scheduler)
+KEPT_HEADERS = (
+    "Content-Type", "ETag", "Last-Modified", "Retry-After",
+    "X-App-Rate-Limit", "X-App-Rate-Limit-Count",
+    "X-Method-Rate-Limit", "X-Method-Rate-Limit-Count",
+)
+
+
+def fixture_mode() -> str:
+    mode = os.getenv("HTTP_FIXTURE_MODE", MODE_OFF).strip().lower()
+    return mode if mode in (MODE_RECORD, MODE_REPLAY) else MODE_OFF
+
+
+def fixture_dir() -> Path:
+    return Path(os.getenv("HTTP_FIXTURE_DIR", str(SCRIPT_DIR / "saves" / "fixtures")))
+
+
+def _parse_latency(spec: str) -> Tuple[float, float]:
+    try:
+        if "-" in spec:
+            lo, hi = spec.split("-", 1)
+            return float(lo) / 1000.0, float(hi) / 1000.0
+        value = float(spec) / 1000.0
+        return value, value
+    except ValueError:
+        return 0.0, 0.0
+
+
+def fixture_key(method: str, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Stable key: method + scheme/host/path + query params (URL and `params`), sorted."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((str(k), str(v)) for k, v in params.items() if v is not None)
+    canonical = f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}?{urlencode(sorted(query))}"
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """Compressed one-file-per-request store."""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root else fixture_dir()
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json.z"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.path_for(key)
+        if not path.exists():
+            return None
+        with open(path, "rb") as f:
+            return fast_json.loads(zlib.decompress(f.read()))
+
+    def save(self, key: str, entry: Dict[str, Any]) -> None:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + f".{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(fast_json.dumps(entry), 6))
+        os.replace(tmp_path, path)
+
+
+def _to_entry(method: str, url: str, params: Optional[Dict[str, Any]], resp: requests.Response) -> Dict[str, Any]:
+    return {
+        "method": method.upper(),
+        "url": url,
+        "params": {str(k): str(v) for k, v in (params or {}).items() if v is not None},
+        "status": resp.status_code,
+        "reason": resp.reason,
+        "headers": {h: resp.headers[h] for h in KEPT_HEADERS if h in resp.headers},
+        "body": base64.b64encode(resp.content or b"").decode("ascii"),
+        "recorded_at": time.time(),
+    }
+
+
+def _to_response(entry: Dict[str, Any], url: str) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = entry["status"]
+    resp.reason = entry.get("reason") or ""
+    resp.headers = CaseInsensitiveDict(entry.get("headers") or {})
+    resp._content = base64.b64decode(entry.get("body") or "")
+    resp.url = url
+    resp.encoding = "utf-8"
+    return resp
+
+
+def _injected_429(url: str, retry_after: int) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = 429
+    resp.reason = "Too Many Requests (injected)"
+    resp.headers = CaseInsensitiveDict({"Retry-After": str(retry_after), "Content-Type": "application/json"})
+    resp._content = b'{"status":{"message":"Rate limit exceeded","status_code":429}}'
+    resp.url = url
+    return resp
+
+
+class FixtureSession(requests.Session):
+    """requests.Session that records to, or replays from, a FixtureStore."""
+
+    def __init__(self, mode: str, store: Optional[FixtureStore] = None):
+        super().__init__()
+        self.mode = mode
+        self.store = store or FixtureStore()
+        self.latency = _parse_latency(os.getenv("HTTP_FIXTURE_LATENCY_MS", "0"))
+        self.rate_429 = float(os.getenv("HTTP_FIXTURE_429_RATE", "0") or 0)
+        self.retry_after = int(os.getenv("HTTP_FIXTURE_RETRY_AFTER", "1") or 1)
+        self.seed = os.getenv("HTTP_FIXTURE_SEED", "0")
+        self._calls: Dict[str, int] = {}
+        self._calls_lock = threading.Lock()
+
+    def _roll(self, key: str, n: int, salt: str) -> float:
+        """Deterministic uniform [0, 1) for the nth call of a key."""
+        digest = hashlib.sha256(f"{self.seed}:{salt}:{key}:{n}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    def request(self, method, url, params=None, **kwargs):
+        key = fixture_key(method, url, params)
+
+        if self.mode == MODE_RECORD:
+            resp = super().request(method, url, params=params, **kwargs)
+            # Injected/real 429s are transient; don't freeze them into the store
+            if resp.status_code != 429:
+                self.store.save(key, _to_entry(method, url, params, resp))
+            return resp
+
+        with self._calls_lock:
+            n = self._calls.get(key, 0)
+            self._calls[key] = n + 1
+
+        lo, hi = self.latency
+        if hi > 0:
+            time.sleep(lo + (hi - lo) * self._roll(key, n, "latency"))
+
+        if self.rate_429 > 0 and self._roll(key, n, "429") < self.rate_429:
+            return _injected_429(url, self.retry_after)
+
+        entry = self.store.load(key)
+        if entry is None:
+            raise requests.ConnectionError(f"[Fixtures] No recorded response for {method} {url} params={params}")
+        return _to_response(entry, url)
+
+
+def make_session() -> requests.Session:
+    """A Session honouring HTTP_FIXTURE_MODE (a plain Session when off)."""
+    mode = fixture_mode()
+    if mode == MODE_OFF:
+        return requests.Session()
+    return FixtureSession(mode)
+
+
+_shared_session: Optional[requests.Session] = None
+_shared_lock = threading.Lock()
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """Drop-in for requests.get() that goes through the fixture transport when enabled."""
+    global _shared_session
+    if fixture_mode() == MODE_OFF:
+        return requests.get(url, **kwargs)
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = make_session()
+    return _shared_session.get(url, **kwargs)
@@ -0,0 +1,172 @@
+"""
+ingest_buffer.py
+
+Write-behind buffer for match and timeline documents.
+
+    buffer = IngestBuffer(db)
+    buffer.put("matches", match_id, match)      # returns immediately
+    buffer.get("matches", match_id)             # read-your-writes until it's flushed
+    buffer.flush()                              # block until everything queued is stored
+
+Database.save_match / save_timeline used to compress and replace_one each
+document on the calling thread. The fetch loops therefore waited on a DB
+round trip per match. Now they only queue the payload: one worker thread per
+process builds the storage documents (metadata + blob_codec compression) and
+writes them in unordered bulk_write batches of up to INGEST_BATCH
+(default 100). A batch goes out once it is full, or INGEST_FLUSH_MS
+(default 250) after its first item arrived.
+
+A second put() for the same (collection, match_id) before the flush replaces
+the queued payload, so a match is only ever written once per batch. While a
+document is queued or in flight, Database reads serve it from the buffer, so
+the pipeline can read back a timeline it just fetched.
+
+put() blocks once INGEST_MAX_PENDING (default 1000) documents are waiting,
+which bounds memory if the store falls behind. Pending writes are flushed at
+interpreter exit. INGEST_WRITE_BEHIND=0 turns the buffer off, and saves then
+write synchronously in one single-document batch.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pipeline_trace import count
+
+
+WRITE_BEHIND = os.getenv("INGEST_WRITE_BEHIND", "1") != "0"
+BATCH_SIZE = int(os.getenv("INGEST_BATCH", "100"))
+FLUSH_INTERVAL_S = float(os.getenv("INGEST_FLUSH_MS", "250")) / 1000.0
+MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "1000"))
+
+Key = Tuple[str, str]  # (collection, match_id)
+
+
+class IngestBuffer:
+    """Deduplicating write-behind queue in front of Database.write_blob_docs."""
+
+    def __init__(self, db: Any, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL_S,
+                 max_pending: int = MAX_PENDING):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(self.batch_size, max_pending)
+        self._pending: "OrderedDict[Key, Any]" = OrderedDict()
+        self._inflight: Dict[Key, Any] = {}
+        self._first_pending_at = 0.0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.written = 0
+        self.deduped = 0
+        self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # -- producer side -----------------------------------------------------
+
+    def put(self, collection: str, match_id: str, data: Any) -> None:
+        key = (collection, match_id)
+        with self._cond:
+            while len(self._pending) >= self.max_pending and key not in self._pending and not self._closed:
+                self._cond.wait(0.5)
+            if key in self._pending:
+                self.deduped += 1
+                count("ingest_deduped")
+            elif not self._pending:
+                self._first_pending_at = time.monotonic()
+            self._pending[key] = data
+            self._cond.notify_all()
+
+    def get(self, collection: str, match_id: str) -> Optional[Any]:
+        """A queued or in-flight payload, else None."""
+        key = (collection, match_id)
+        with self._cond:
+            data = self._pending.get(key)
+            return data if data is not None else self._inflight.get(key)
+
+    def pending_ids(self, collection: str, match_ids: List[str]) -> Dict[str, Any]:
+        with self._cond:
+            out = {}
+            for mid in match_ids:
+                key = (collection, mid)
+                data = self._pending.get(key)
+                if data is None:
+                    data = self._inflight.get(key)
+                if data is not None:
+                    out[mid] = data
+            return out
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is written. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._first_pending_at = 0.0  # due now
+            self._cond.notify_all()
+            while (self._pending or self._inflight) and self._thread.is_alive():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(0.1 if remaining is None else min(remaining, 0.1))
+        return True
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5.0)
+
+    # -- worker ------------------------------------------------------------
+
+    def _take_batch(self) -> List[Tuple[Key, Any]]:
+        """Wait until a batch is due, then move it from pending to in-flight (caller holds the lock)."""
+        while True:
+            if self._pending:
+                due = self._first_pending_at + self.flush_interval
+                now = time.monotonic()
+                if len(self._pending) >= self.batch_size or now >= due or self._closed:
+                    break
+                self._cond.wait(due - now)
+            elif self._closed:
+                return []
+            else:
+                self._cond.wait()
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            key, data = self._pending.popitem(last=False)
+            self._inflight[key] = data
+            batch.append((key, data))
+        self._first_pending_at = time.monotonic() if self._pending else 0.0
+        self._cond.notify_all()
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return
+            by_collection: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+            for (collection, match_id), data in batch:
+                try:
+                    doc = self.db._blob_doc(collection, match_id, data)
+                except Exception as e:
+                    print(f"[Ingest] Could not build {collection} document {match_id}: {e}")
+                    continue
+                by_collection.setdefault(collection, []).append((match_id, doc))
+            for collection, items in by_collection.items():
+                try:
+                    self.written += self.db.write_blob_docs(collection, items)
+                except Exception as e:
+                    print(f"[Ingest] Bulk write to {collection} failed, {len(items)} documents dropped: {e}")
+            with self._cond:
+                for key, _ in batch:
+                    self._inflight.pop(key, None)
+                self._cond.notify_all()
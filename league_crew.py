@@ -1,16 +1,18 @@
 # league_crew.py
 
 import os
-import json
 import hashlib
 from pathlib import Path
 from typing import Any, Dict, List
 
 from openai import OpenAI
-import requests
 from functools import lru_cache
 from lolalytics_client import Lolalytics
+import fast_json
+import static_data
 from dotenv import load_dotenv
+from pipeline_trace import count
+from metrics import cache_result
 
 # --- Configuration ---
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -33,18 +35,6 @@ CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 # --- Item Name Resolution Helpers ---
 
-@lru_cache(maxsize=1)
-def _get_latest_ddragon_version() -> str:
-    try:
-        resp = requests.get("https://ddragon.leagueoflegends.com/api/versions.json", timeout=5)
-        if resp.status_code == 200:
-            return resp.json()[0]
-    except Exception:
-        pass
-    return "16.1.1" # Fallback (Season 16)
-
-import time
-
 KEYSTONE_MAP = {
     8005: "Press the Attack", 8008: "Lethal Tempo", 8021: "Fleet Footwork", 8010: "Conqueror",
     8112: "Electrocute", 8124: "Predator", 8128: "Dark Harvest", 9923: "Hail of Blades",
@@ -55,54 +45,12 @@ KEYSTONE_MAP = {
 
 # ...
 
-@lru_cache(maxsize=1)
-def _get_item_map(version: str) -> Dict[str, str]:
-    """Fetch item map from Meraki Analytics (Cached)."""
-    cache_file = CACHE_DIR / "meraki_items.json"
-    
-    # Try Cache
-    if cache_file.exists():
-        if time.time() - cache_file.stat().st_mtime < 86400:
-            try:
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    return {k: v["name"] for k, v in data.items()}
-            except Exception:
-                pass
-                
-    # Fetch
-    try:
-        url = "https://cdn.merakianalytics.com/riot/lol/resources/latest/en-US/items.json"
-        
-        # Note: Meraki format is { "1001": { "name": "Boots", ... } }
-        resp = requests.get(url, timeout=10)
-        if resp.status_code == 200:
-            data = resp.json()
-            
-            # Save Cache
-            try:
-                with open(cache_file, "w", encoding="utf-8") as f:
-                    json.dump(data, f)
-            except Exception:
-                pass
-
-            return {k: v["name"] for k, v in data.items()}
-            
-    except Exception as e:
-        print(f"Warning: Failed to fetch Meraki items: {e}")
-        pass
-        
-    return {}
-
 def _get_item_name(item_id: int) -> str:
     if not item_id or item_id == 0:
         return "Empty Slot"
-    
-    # Version is ignored by Meraki fetcher but kept for signature/caching
-    version = _get_latest_ddragon_version()
-    item_map = _get_item_map(version)
-    
-    return item_map.get(str(item_id), f"Item {item_id}")
+
+    # Served from memory; the static-data service refreshes it once per patch
+    return static_data.get_item_names().get(int(item_id), f"Item {item_id}")
 
 
 
@@ -167,7 +115,7 @@ def _extract_json_from_text(text: str) -> Dict[str, Any] | None:
     
     # Try direct parse
     try:
-        return json.loads(text, strict=False)
+        return fast_json.loads(text, strict=False)
     except Exception:
         pass
 
@@ -178,7 +126,7 @@ def _extract_json_from_text(text: str) -> Dict[str, Any] | None:
         if end_idx != -1:
             try:
                 candidate = text[start_idx : end_idx + 1]
-                return json.loads(candidate, strict=False)
+                return fast_json.loads(candidate, strict=False)
             except Exception:
                 pass
 
@@ -193,7 +141,7 @@ def _extract_json_from_text(text: str) -> Dict[str, Any] | None:
                 if balance == 0:
                     try:
                         candidate = text[start_idx : i + 1]
-                        return json.loads(candidate, strict=False)
+                        return fast_json.loads(candidate, strict=False)
                     except Exception:
                         pass
     
@@ -202,7 +150,7 @@ def _extract_json_from_text(text: str) -> Dict[str, Any] | None:
     json_match = re.search(r'\{.*\}', text, re.DOTALL)
     if json_match:
         try:
-            return json.loads(json_match.group(0), strict=False)
+            return fast_json.loads(json_match.group(0), strict=False)
         except Exception:
             pass
             
@@ -398,12 +346,12 @@ def _build_crew_prompt(agent_payload: Dict[str, Any], match_id: str | None = Non
 
     # Serialize slices of the payload as compact JSON for the model to inspect.
     # This keeps the prompt deterministic and avoids giant walls of prose.
-    summary_json = json.dumps(summary, ensure_ascii=False, separators=(',', ':'))
-    per_champ_json = json.dumps(per_champion, ensure_ascii=False, separators=(',', ':'))
-    loss_patterns_json = json.dumps(loss_patterns, ensure_ascii=False, separators=(',', ':'))
-    baseline_json = json.dumps(baseline, ensure_ascii=False, separators=(',', ':'))
-    you_vs_team_json = json.dumps(you_vs_team, ensure_ascii=False, separators=(',', ':'))
-    per_game_loss_json = json.dumps(per_game_loss, ensure_ascii=False, separators=(',', ':'))
+    summary_json = fast_json.dumps_str(summary)
+    per_champ_json = fast_json.dumps_str(per_champion)
+    loss_patterns_json = fast_json.dumps_str(loss_patterns)
+    baseline_json = fast_json.dumps_str(baseline)
+    you_vs_team_json = fast_json.dumps_str(you_vs_team)
+    per_game_loss_json = fast_json.dumps_str(per_game_loss)
     # Filter movement summaries to remove heavy coordinate data not needed by LLM
     movement_for_llm = []
     for m in movement:
@@ -484,17 +432,17 @@ You vs Team:
 
 6. Macro Profile (Objectives & Throws):
 ```json
-{json.dumps(macro_profile, ensure_ascii=False)}
+{fast_json.dumps_str(macro_profile)}
 ```
 
 7. Champion Profiles:
 ```json
-{json.dumps(champion_profiles, ensure_ascii=False)}
+{fast_json.dumps_str(champion_profiles)}
 ```
 
 8. Recent Patch Context:
 ```json
-{json.dumps(patch_summary, ensure_ascii=False)}
+{fast_json.dumps_str(patch_summary)}
 ```
 
 9. Actual Item Preference (DO NOT HALLUCINATE):
@@ -554,15 +502,18 @@ def call_league_crew(agent_payload: Dict[str, Any]) -> Dict[str, str]:
 
         if cache_file.exists():
             try:
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    print(f"   [AI] Cache Hit! Loading {cache_file.name}")
-                    return json.load(f)
+                print(f"   [AI] Cache Hit! Loading {cache_file.name}")
+                count("ai_cache_hit")
+                cache_result("ai_prompt", True)
+                return fast_json.read_file(cache_file)
             except Exception:
                 print("   [AI] Cache Corrupted, re-running...")
     except Exception as e:
         print(f"   [AI] Caching Error (skipping cache): {e}")
         # Continue without caching if hashing or path fails
 
+    count("ai_cache_miss")
+    cache_result("ai_prompt", False)
     client = OpenAI(api_key=api_key)
 
     try:
@@ -603,8 +554,7 @@ def call_league_crew(agent_payload: Dict[str, Any]) -> Dict[str, str]:
         
         # Save to cache if successful
         try:
-            with open(cache_file, "w", encoding="utf-8") as f:
-                json.dump(coaching_json, f, indent=2)
+            fast_json.write_file(cache_file, coaching_json, indent=True)
         except Exception as e:
             print(f"[AI] Error saving cache: {e}")
 
@@ -619,6 +569,23 @@ def call_league_crew(agent_payload: Dict[str, Any]) -> Dict[str, str]:
     }
 
 
+def _lane_opponent(d_match: Dict[str, Any], self_p: Any) -> Any:
+    """The enemy in the player's lane. The enricher records it as lane_opponent_index
+    (MatchFeatures.lane_opponent); analyses saved before that fall back to matching teamPosition."""
+    participants = d_match.get("participants", [])
+    if "lane_opponent_index" in d_match:
+        idx = d_match["lane_opponent_index"]
+        return participants[idx] if idx is not None and idx < len(participants) else None
+    # Participant rows carry position/team_id; raw match-v5 participants teamPosition/teamId
+    position = self_p.get("position") or self_p.get("teamPosition")
+    team = self_p.get("team_id", self_p.get("teamId"))
+    if not position or position in ("UNKNOWN", "Invalid"):
+        return None
+    return next((p for p in participants
+                 if (p.get("position") or p.get("teamPosition")) == position
+                 and p.get("team_id", p.get("teamId")) != team), None)
+
+
 def classify_matches_and_identify_candidates(analysis: Dict[str, Any]) -> tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
     """
     Classify ALL matches with descriptive tags and identify high-value review candidates.
@@ -690,10 +657,8 @@ def classify_matches_and_identify_candidates(analysis: Dict[str, Any]) -> tuple[
 
         # 1. Lane Opponent Analysis
         lane_opponent = None
-        if self_p.get("teamPosition") != "UTILITY": # Skip for support for now as lane opponent is fuzzy
-            lane_opponent = next((p for p in d_match["participants"] 
-                                  if p.get("teamPosition") == self_p.get("teamPosition") 
-                                  and p.get("teamId") != self_p.get("teamId")), None)
+        if (self_p.get("position") or self_p.get("teamPosition")) != "UTILITY": # Skip for support for now as lane opponent is fuzzy
+            lane_opponent = _lane_opponent(d_match, self_p)
         
         opponent_gap = False
         if lane_opponent:
@@ -837,6 +802,7 @@ def _build_single_game_prompt(match_data: Dict[str, Any], champion_pool: List[st
     enemy_team = []
     lane_opponent_str = None
     lane_opponent_name = None
+    lane_opponent = _lane_opponent(match_data, self_p)
     
     pid_map = {} # ID -> Name (Champ)
     
@@ -871,7 +837,7 @@ def _build_single_game_prompt(match_data: Dict[str, Any], champion_pool: List[st
             your_team.append(info)
         else:
             enemy_team.append(info)
-            if p_role == role and role != "UNKNOWN":
+            if p is lane_opponent:
                 lane_opponent_str = f"{p_name} ({p_kda}) with {keystone_str}"
                 lane_opponent_name = p_name
 
@@ -1087,9 +1053,8 @@ def analyze_specific_game(match_id: str, full_match_data: Dict[str, Any], champi
 
     if cache_file.exists():
         try:
-            with open(cache_file, "r", encoding="utf-8") as f:
-                print(f"   [AI] Game Cache Hit! Loading {cache_file.name}")
-                return json.load(f)
+            print(f"   [AI] Game Cache Hit! Loading {cache_file.name}")
+            return fast_json.read_file(cache_file)
         except Exception:
             pass
 
@@ -1140,8 +1105,7 @@ def analyze_specific_game(match_id: str, full_match_data: Dict[str, Any], champi
 
         # Save to cache
         try:
-            with open(cache_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, indent=2)
+            fast_json.write_file(cache_file, result, indent=True)
         except Exception as e:
             print(f"[AI] Error saving game cache: {e}")
             
@@ -0,0 +1,993 @@
+"""
+local_store.py
+
+Embedded SQLite storage with the subset of the pymongo Collection API that Database uses.
+
+    store = LocalStore("saves/league_analyzer.sqlite3")
+    col = store["matches"]                      # like MongoClient(...)[db][name]
+    col.create_index([("metadata.matchId", 1)])
+    col.replace_one({"metadata.matchId": mid}, doc, upsert=True)
+    col.find({"metadata.participants": puuid}).sort("metadata.gameCreation", -1).limit(50)
+
+Database uses this when MONGO_URI is unset (or DB_BACKEND=local), so a
+single-box deployment or CI run keeps its match/timeline/analysis cache on
+local disk instead of refetching everything from Riot. Every cached read is
+then a local page read rather than an Atlas round trip.
+
+Layout: one table per collection, holding each document as JSON text plus a
+side BLOB. Binary values (compressed_data, heatmap grids, packed
+movement_summaries) are cut out of the JSON, concatenated into the BLOB
+column, and put back by path on read, so blobs are never base64'd.
+
+create_index(field) maintains a (field, value, id) side table. Array values
+are indexed per element, the way Mongo multikey indexes work. The rows are
+kept in sync on every write, and a unique index raises DuplicateKeyError
+("E11000 ..."). The index list lives in the _indexes table and is reloaded
+at the start of every write transaction, so a worker keeps the side tables
+in sync for indexes another process created after it opened the collection.
+
+Queries: conditions on indexed fields (equality, $in, ranges, $regex) are
+answered from the index tables in SQL; an anchored, literal, case-sensitive
+prefix regex ("^abc") is a range scan, like Mongo's index bounds. _id
+conditions use the rowid, and an $or whose branches are all covered becomes
+an SQL OR. When the whole filter is covered that
+way, sort/skip/limit and inclusion projections also run in SQL
+(json_extract), without parsing whole documents. Anything else ($ne,
+$exists, other $or, unindexed fields) is evaluated in Python on the narrowed
+candidates. Supported operators: $eq $ne $in $nin $gt $gte $lt $lte $exists
+$regex/$options $and $or. Updates: $set $unset $inc $setOnInsert.
+Aggregation: $match $project $sample $group($sum) $sort $skip $limit $count.
+
+One connection per process (WAL journal, 5s busy timeout), serialized by a
+lock, so gunicorn workers can share the file.
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+import re
+import sqlite3
+import struct
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import fast_json
+
+
+BINARY_TYPES = (bytes, bytearray, memoryview)
+SQL_CHUNK = 500
+SCAN_CHUNK = 256
+_MISSING = object()
+_SQL_RANGE = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+class DuplicateKeyError(Exception):
+    pass
+
+
+class _Result:
+    """Stand-in for pymongo's InsertOneResult / UpdateResult / DeleteResult."""
+
+    def __init__(self, matched: int = 0, modified: int = 0, deleted: int = 0, upserted_id: Optional[int] = None,
+                 inserted_id: Optional[int] = None):
+        self.matched_count = matched
+        self.modified_count = modified
+        self.deleted_count = deleted
+        self.upserted_id = upserted_id
+        self.inserted_id = inserted_id
+        self.acknowledged = True
+
+
+class ReplaceOne:
+    """Stand-in for pymongo.ReplaceOne, for LocalCollection.bulk_write."""
+
+    def __init__(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False):
+        self._filter = filter
+        self._doc = replacement
+        self._upsert = upsert
+
+
+class UpdateOne:
+    """Stand-in for pymongo.UpdateOne, for LocalCollection.bulk_write."""
+
+    def __init__(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        self._filter = filter
+        self._doc = update
+        self._upsert = upsert
+
+
+class BulkWriteError(Exception):
+    """Raised by bulk_write / insert_many; .details["writeErrors"] lists the failed operations by index (as in pymongo)."""
+
+    def __init__(self, details: Dict[str, Any]):
+        super().__init__(f"{len(details['writeErrors'])} write errors: {details['writeErrors'][0]['errmsg']}")
+        self.details = details
+
+
+# ---------------------------------------------------------------------------
+# Document helpers
+# ---------------------------------------------------------------------------
+
+
+def _get_path(doc: Any, path: str) -> Any:
+    """Value at a dotted path; _MISSING if absent. Arrays along the way fan out into a list."""
+    cur = doc
+    parts = path.split(".")
+    for i, part in enumerate(parts):
+        if isinstance(cur, dict):
+            if part not in cur:
+                return _MISSING
+            cur = cur[part]
+        elif isinstance(cur, list):
+            if part.isdigit():
+                idx = int(part)
+                if idx >= len(cur):
+                    return _MISSING
+                cur = cur[idx]
+            else:
+                rest = ".".join(parts[i:])
+                vals = [v for v in (_get_path(e, rest) for e in cur) if v is not _MISSING]
+                return vals if vals else _MISSING
+        else:
+            return _MISSING
+    return cur
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    cur = doc
+    for part in parts[:-1]:
+        nxt = cur.get(part)
+        if not isinstance(nxt, dict):
+            nxt = cur[part] = {}
+        cur = nxt
+    cur[parts[-1]] = value
+
+
+def _unset_path(doc: Dict[str, Any], path: str) -> None:
+    parts = path.split(".")
+    cur = doc
+    for part in parts[:-1]:
+        cur = cur.get(part)
+        if not isinstance(cur, dict):
+            return
+    cur.pop(parts[-1], None)
+
+
+def _index_values(doc: Dict[str, Any], field: str) -> List[Any]:
+    """Scalar values a (multikey) index on `field` holds for doc."""
+    value = _get_path(doc, field)
+    if value is _MISSING:
+        return []
+    values = value if isinstance(value, list) else [value]
+    out = []
+    for v in values:
+        if isinstance(v, list):
+            out.extend(x for x in v if isinstance(x, (str, int, float)) or x is None)
+        elif isinstance(v, (str, int, float)) or v is None:
+            out.append(v)
+    return out
+
+
+def _json_path(field: str) -> str:
+    return "$" + "".join(f'."{part}"' for part in field.split("."))
+
+
+def _split_blobs(doc: Any) -> Tuple[List[bytes], List[List[Any]]]:
+    """Binary values in doc and their key paths (the JSON encoder writes null in their place)."""
+    blobs: List[bytes] = []
+    paths: List[List[Any]] = []
+
+    def walk(obj: Any, path: List[Any]) -> None:
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                if isinstance(v, BINARY_TYPES):
+                    blobs.append(bytes(v))
+                    paths.append(path + [k])
+                elif isinstance(v, (dict, list)):
+                    walk(v, path + [k])
+        elif isinstance(obj, list):
+            for i, v in enumerate(obj):
+                if isinstance(v, BINARY_TYPES):
+                    blobs.append(bytes(v))
+                    paths.append(path + [i])
+                elif isinstance(v, (dict, list)):
+                    walk(v, path + [i])
+
+    walk(doc, [])
+    return blobs, paths
+
+
+def _pack_blobs(blobs: List[bytes]) -> bytes:
+    return struct.pack(f"<I{len(blobs)}I", len(blobs), *map(len, blobs)) + b"".join(blobs)
+
+
+def _unpack_blobs(packed: bytes) -> List[bytes]:
+    n = struct.unpack_from("<I", packed)[0]
+    lengths = struct.unpack_from(f"<{n}I", packed, 4)
+    pos = 4 + 4 * n
+    out = []
+    for length in lengths:
+        out.append(packed[pos:pos + length])
+        pos += length
+    return out
+
+
+def _restore_blobs(doc: Dict[str, Any], packed: Optional[bytes], paths_json: Optional[str],
+                   include: Optional[List[str]] = None) -> None:
+    if not packed:
+        return
+    for path, blob in zip(fast_json.loads(paths_json), _unpack_blobs(packed)):
+        if include is not None and not any(path[:len(p.split("."))] == p.split(".") for p in include):
+            continue
+        cur = doc
+        try:
+            for key in path[:-1]:
+                cur = cur[key]
+            cur[path[-1]] = blob
+        except (KeyError, IndexError, TypeError):
+            continue
+
+
+def _no_binary(obj: Any) -> Any:
+    if isinstance(obj, BINARY_TYPES):
+        return None
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+# ---------------------------------------------------------------------------
+# Query matching (Python side)
+# ---------------------------------------------------------------------------
+
+
+def _compare(a: Any, b: Any, op: str) -> bool:
+    try:
+        if op == "$gt":
+            return a > b
+        if op == "$gte":
+            return a >= b
+        if op == "$lt":
+            return a < b
+        return a <= b
+    except TypeError:
+        return False
+
+
+def _regex(cond: Dict[str, Any]) -> "re.Pattern[str]":
+    pattern = cond["$regex"]
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    for ch in cond.get("$options", ""):
+        flags |= {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}.get(ch, 0)
+    return re.compile(pattern, flags)
+
+
+def _literal_prefix(cond: Dict[str, Any]) -> Optional[str]:
+    """{"$regex": "^abc"} -> "abc" (escapes allowed, no options or metacharacters), else None."""
+    pattern = cond["$regex"]
+    if cond.get("$options") or not isinstance(pattern, str) or not pattern.startswith("^"):
+        return None
+    out = []
+    chars = iter(pattern[1:])
+    for ch in chars:
+        if ch == "\\":
+            ch = next(chars, "")
+            if not ch or ch.isalnum():
+                return None
+        elif ch in ".^$*+?{}[]|()":
+            return None
+        out.append(ch)
+    return "".join(out) or None
+
+
+def _candidates(value: Any) -> List[Any]:
+    """The value itself plus, for arrays, each element (Mongo matches either)."""
+    if value is _MISSING:
+        return []
+    if isinstance(value, list):
+        return [value] + value
+    return [value]
+
+
+def _match_cond(value: Any, cond: Any) -> bool:
+    if not (isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond)):
+        return any(v == cond for v in _candidates(value)) or (cond is None and value is _MISSING)
+    for op, arg in cond.items():
+        if op == "$options":
+            continue
+        if op == "$eq":
+            ok = _match_cond(value, arg)
+        elif op == "$ne":
+            ok = not _match_cond(value, arg)
+        elif op == "$in":
+            ok = any(_match_cond(value, a) for a in arg)
+        elif op == "$nin":
+            ok = not any(_match_cond(value, a) for a in arg)
+        elif op == "$exists":
+            ok = (value is not _MISSING) == bool(arg)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            ok = any(_compare(v, arg, op) for v in _candidates(value) if not isinstance(v, list))
+        elif op == "$regex":
+            pattern = _regex(cond)
+            ok = any(isinstance(v, str) and pattern.search(v) for v in _candidates(value))
+        else:
+            raise ValueError(f"Unsupported query operator {op}")
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif not _match_cond(_get_path(doc, key), cond):
+            return False
+    return True
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return doc
+    include = [k for k, v in projection.items() if v and k != "_id"]
+    if include:
+        out: Dict[str, Any] = {}
+        for field in include:
+            value = _get_path(doc, field)
+            if value is not _MISSING:
+                _set_path(out, field, value)
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    out = dict(doc)
+    for field, v in projection.items():
+        if not v:
+            _unset_path(out, field)
+    return out
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, str(value))
+
+
+def _sort_docs(docs: List[Dict[str, Any]], sort: List[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    for field, direction in reversed(sort):
+        docs.sort(key=lambda d: _sort_key(_get_path(d, field)), reverse=direction < 0)
+    return docs
+
+
+def _normalize_sort(key: Union[str, Sequence[Tuple[str, int]]], direction: int = 1) -> List[Tuple[str, int]]:
+    if isinstance(key, str):
+        return [(key, direction)]
+    return [(k, d) for k, d in key]
+
+
+# ---------------------------------------------------------------------------
+# Store / collection / cursor
+# ---------------------------------------------------------------------------
+
+
+class LocalStore:
+    """One SQLite file holding every collection. store[name] returns a LocalCollection."""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS _indexes (collection TEXT, field TEXT, is_unique INTEGER, "
+            "PRIMARY KEY (collection, field))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS _index_names (collection TEXT, name TEXT, is_unique INTEGER, "
+            "PRIMARY KEY (collection, name))"
+        )
+        self._collections: Dict[str, LocalCollection] = {}
+
+    def __getitem__(self, name: str) -> "LocalCollection":
+        with self.lock:
+            col = self._collections.get(name)
+            if col is None:
+                col = self._collections[name] = LocalCollection(self, name)
+            return col
+
+    get_collection = __getitem__
+
+    def list_collection_names(self) -> List[str]:
+        with self.lock:
+            rows = self.conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'c\\_%' ESCAPE '\\'").fetchall()
+        return [r[0][2:] for r in rows]
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+class LocalCollection:
+    def __init__(self, store: LocalStore, name: str):
+        if not re.fullmatch(r"[A-Za-z0-9_]+", name):
+            raise ValueError(f"Invalid collection name '{name}'")
+        self.store = store
+        self.name = name
+        self._docs = f"c_{name}"
+        self._idx = f"x_{name}"
+        with store.lock:
+            store.conn.execute(f"CREATE TABLE IF NOT EXISTS {self._docs} "
+                               "(id INTEGER PRIMARY KEY AUTOINCREMENT, doc TEXT NOT NULL, blobs BLOB, blob_paths TEXT)")
+            store.conn.execute(f"CREATE TABLE IF NOT EXISTS {self._idx} (field TEXT, value, id INTEGER)")
+            store.conn.execute(f"CREATE INDEX IF NOT EXISTS {self._idx}_fv ON {self._idx} (field, value)")
+            store.conn.execute(f"CREATE INDEX IF NOT EXISTS {self._idx}_id ON {self._idx} (id)")
+        self.indexes: Dict[str, bool] = {}
+        self._load_indexes()
+
+    # -- indexes -----------------------------------------------------------
+
+    def _load_indexes(self) -> None:
+        """Re-read this collection's indexes; another process may have added one since the last write."""
+        with self.store.lock:
+            rows = self.store.conn.execute("SELECT field, is_unique FROM _indexes WHERE collection = ?",
+                                           (self.name,)).fetchall()
+        self.indexes = {field: bool(unique) for field, unique in rows}
+
+    def create_index(self, keys: Union[str, Sequence[Tuple[str, int]]], unique: bool = False, **kwargs: Any) -> str:
+        """Index each key's field. Only single-field indexes can be unique. _id is the rowid, always indexed."""
+        fields = [k for k in ([keys] if isinstance(keys, str) else [k for k, _ in keys]) if k != "_id"]
+        unique = unique and len(fields) == 1
+        conn = self.store.conn
+        with self.store.lock:
+            for field in fields:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._load_indexes()
+                    if field in self.indexes and (self.indexes[field] or not unique):
+                        conn.execute("COMMIT")
+                        continue
+                    if field not in self.indexes:
+                        for doc_id, doc in self._scan_rows():
+                            self._write_index_values(doc_id, field, doc)
+                    if unique:
+                        dup = conn.execute(
+                            f"SELECT value FROM {self._idx} WHERE field = ? GROUP BY value HAVING COUNT(DISTINCT id) > 1 LIMIT 1",
+                            (field,),
+                        ).fetchone()
+                        if dup:
+                            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {field} dup key: {dup[0]!r}")
+                    conn.execute("INSERT OR REPLACE INTO _indexes (collection, field, is_unique) VALUES (?, ?, ?)",
+                                 (self.name, field, int(unique)))
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                self.indexes[field] = unique
+        key_list = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = "_".join(f"{k}_{d}" for k, d in key_list)
+        with self.store.lock:
+            conn.execute("INSERT OR REPLACE INTO _index_names (collection, name, is_unique) VALUES (?, ?, ?)",
+                         (self.name, name, int(unique)))
+        return name
+
+    def list_indexes(self) -> List[Dict[str, Any]]:
+        with self.store.lock:
+            rows = self.store.conn.execute("SELECT name, is_unique FROM _index_names WHERE collection = ?",
+                                           (self.name,)).fetchall()
+        return [{"name": "_id_", "key": {"_id": 1}}] + [{"name": name, "unique": bool(unique)} for name, unique in rows]
+
+    def _write_index_values(self, doc_id: int, field: str, doc: Dict[str, Any]) -> None:
+        values = _index_values(doc, field)
+        if values:
+            self.store.conn.executemany(f"INSERT INTO {self._idx} (field, value, id) VALUES (?, ?, ?)",
+                                        [(field, v, doc_id) for v in set(values)])
+
+    def _reindex(self, doc_id: int, doc: Dict[str, Any]) -> None:
+        conn = self.store.conn
+        conn.execute(f"DELETE FROM {self._idx} WHERE id = ?", (doc_id,))
+        for field, unique in self.indexes.items():
+            if unique:
+                for v in set(_index_values(doc, field)):
+                    if conn.execute(f"SELECT 1 FROM {self._idx} WHERE field = ? AND value = ? AND id != ? LIMIT 1",
+                                    (field, v, doc_id)).fetchone():
+                        raise DuplicateKeyError(
+                            f"E11000 duplicate key error collection: {self.name} index: {field} dup key: {v!r}")
+            self._write_index_values(doc_id, field, doc)
+
+    # -- row encoding ------------------------------------------------------
+
+    def _encode(self, doc: Dict[str, Any]) -> Tuple[str, Optional[bytes], Optional[str]]:
+        body = {k: v for k, v in doc.items() if k != "_id"}
+        blobs, paths = _split_blobs(body)
+        text = fast_json.dumps(body, default=_no_binary).decode("utf-8")
+        if not blobs:
+            return text, None, None
+        return text, _pack_blobs(blobs), fast_json.dumps_str(paths)
+
+    @staticmethod
+    def _decode(doc_id: int, text: str, blobs: Optional[bytes], paths: Optional[str]) -> Dict[str, Any]:
+        doc = fast_json.loads(text)
+        _restore_blobs(doc, blobs, paths)
+        doc["_id"] = doc_id
+        return doc
+
+    def _scan_rows(self, ids_sql: str = "", params: Sequence[Any] = ()) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Decoded (id, doc) pairs in id order, fetched a chunk at a time."""
+        where = f"AND {ids_sql}" if ids_sql else ""
+        last = 0
+        while True:
+            with self.store.lock:
+                rows = self.store.conn.execute(
+                    f"SELECT id, doc, blobs, blob_paths FROM {self._docs} WHERE id > ? {where} ORDER BY id LIMIT {SCAN_CHUNK}",
+                    (last, *params),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row[0], self._decode(*row)
+            last = rows[-1][0]
+
+    # -- query planning ----------------------------------------------------
+
+    def _plan(self, query: Optional[Dict[str, Any]]) -> Tuple[List[str], List[Any], bool]:
+        """SQL conditions on the docs table for the indexed parts of a query, and whether they cover all of it."""
+        clauses: List[str] = []
+        params: List[Any] = []
+        exact = True
+        for key, cond in (query or {}).items():
+            if key == "_id":
+                if isinstance(cond, dict) and set(cond) == {"$in"}:
+                    ids = [i for i in cond["$in"] if isinstance(i, int)]
+                    clauses.append(f"id IN ({','.join('?' * len(ids))})" if ids else "0")
+                    params.extend(ids)
+                elif isinstance(cond, int):
+                    clauses.append("id = ?")
+                    params.append(cond)
+                elif (isinstance(cond, dict) and cond and set(cond) <= set(_SQL_RANGE)
+                      and all(isinstance(v, int) for v in cond.values())):
+                    # _id paging ({"_id": {"$gt": last}}) is a rowid range
+                    for op, v in sorted(cond.items()):
+                        clauses.append(f"id {_SQL_RANGE[op]} ?")
+                        params.append(v)
+                else:
+                    exact = False
+                continue
+            if key == "$or" and isinstance(cond, list) and cond:
+                # Planned only when every branch is (e.g. the (created, _id) page cursor of list_analyses)
+                branches = [self._plan(q) for q in cond]
+                if all(b_exact for _, _, b_exact in branches):
+                    clauses.append("(" + " OR ".join(f"({' AND '.join(c) or '1'})" for c, _, _ in branches) + ")")
+                    for _, p, _ in branches:
+                        params.extend(p)
+                else:
+                    exact = False
+                continue
+            if key.startswith("$") or key not in self.indexes:
+                exact = False
+                continue
+            sql = self._index_clause(key, cond, params)
+            if sql is None:
+                exact = False
+            else:
+                clauses.append(sql)
+        return clauses, params, exact
+
+    def _index_clause(self, field: str, cond: Any, params: List[Any]) -> Optional[str]:
+        scalar = (str, int, float)
+        sub = f"id IN (SELECT id FROM {self._idx} WHERE field = ? AND "
+        if isinstance(cond, scalar) and not isinstance(cond, bool):
+            params.extend((field, cond))
+            return sub + "value = ?)"
+        if not isinstance(cond, dict) or not cond or not all(k.startswith("$") for k in cond):
+            return None
+        ops = set(cond) - {"$options"}
+        if ops == {"$eq"} and isinstance(cond["$eq"], scalar):
+            params.extend((field, cond["$eq"]))
+            return sub + "value = ?)"
+        if ops == {"$in"} and all(isinstance(v, scalar) for v in cond["$in"]):
+            values = list(cond["$in"])
+            if not values:
+                return "0"
+            params.append(field)
+            params.extend(values)
+            return sub + f"value IN ({','.join('?' * len(values))}))"
+        if ops and ops <= set(_SQL_RANGE) and all(isinstance(cond[o], (int, float)) for o in ops):
+            params.append(field)
+            parts = []
+            for o in sorted(ops):
+                parts.append(f"value {_SQL_RANGE[o]} ?")
+                params.append(cond[o])
+            return sub + "typeof(value) IN ('integer', 'real') AND " + " AND ".join(parts) + ")"
+        if ops == {"$regex"}:
+            prefix = _literal_prefix(cond)
+            if prefix is not None:
+                params.extend((field, prefix, prefix + "\U0010ffff"))
+                return sub + "typeof(value) = 'text' AND value >= ? AND value < ?)"
+            pattern = _regex(cond)
+            with self.store.lock:
+                rows = self.store.conn.execute(f"SELECT value, id FROM {self._idx} WHERE field = ?", (field,)).fetchall()
+            ids = sorted({doc_id for value, doc_id in rows if isinstance(value, str) and pattern.search(value)})
+            if not ids:
+                return "0"
+            params.extend(ids)
+            return f"id IN ({','.join('?' * len(ids))})"
+        return None
+
+    def _match_ids(self, query: Optional[Dict[str, Any]], limit: int = 0) -> List[int]:
+        clauses, params, exact = self._plan(query)
+        if exact:
+            where = " AND ".join(clauses) or "1"
+            with self.store.lock:
+                rows = self.store.conn.execute(
+                    f"SELECT id FROM {self._docs} WHERE {where} ORDER BY id" + (f" LIMIT {int(limit)}" if limit else ""),
+                    params,
+                ).fetchall()
+            return [r[0] for r in rows]
+        out = []
+        for doc_id, doc in self._scan_rows(" AND ".join(clauses), params):
+            if matches(doc, query):
+                out.append(doc_id)
+                if limit and len(out) >= limit:
+                    break
+        return out
+
+    # -- reads -------------------------------------------------------------
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+             **kwargs: Any) -> "LocalCursor":
+        return LocalCursor(self, filter or {}, projection or kwargs.get("projection"))
+
+    def find_one(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None,
+                 **kwargs: Any) -> Optional[Dict[str, Any]]:
+        return next(iter(self.find(filter, projection, **kwargs).limit(1)), None)
+
+    def count_documents(self, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> int:
+        return len(self._match_ids(filter, kwargs.get("limit", 0)))
+
+    def estimated_document_count(self, **kwargs: Any) -> int:
+        with self.store.lock:
+            return self.store.conn.execute(f"SELECT COUNT(*) FROM {self._docs}").fetchone()[0]
+
+    def aggregate(self, pipeline: List[Dict[str, Any]], **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        stages = list(pipeline)
+        query = stages.pop(0)["$match"] if stages and "$match" in stages[0] else {}
+        docs: List[Dict[str, Any]] = list(self.find(query))
+        for stage in stages:
+            (op, arg), = stage.items()
+            if op == "$match":
+                docs = [d for d in docs if matches(d, arg)]
+            elif op == "$sample":
+                docs = random.sample(docs, min(int(arg["size"]), len(docs)))
+            elif op == "$project":
+                docs = [_project(d, arg) for d in docs]
+            elif op == "$sort":
+                docs = _sort_docs(docs, list(arg.items()))
+            elif op == "$skip":
+                docs = docs[int(arg):]
+            elif op == "$limit":
+                docs = docs[:int(arg)]
+            elif op == "$count":
+                docs = [{arg: len(docs)}]
+            elif op == "$group":
+                docs = self._group(docs, arg)
+            else:
+                raise ValueError(f"Unsupported aggregation stage {op}")
+        return iter(docs)
+
+    @staticmethod
+    def _group(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+        def value(d: Dict[str, Any], expr: Any) -> Any:
+            if isinstance(expr, str) and expr.startswith("$"):
+                v = _get_path(d, expr[1:])
+                return None if v is _MISSING else v
+            return expr
+
+        groups: Dict[str, Dict[str, Any]] = {}
+        for d in docs:
+            key = value(d, spec["_id"])
+            out = groups.setdefault(fast_json.dumps_str(key), {"_id": key})
+            for name, acc in spec.items():
+                if name == "_id":
+                    continue
+                (op, expr), = acc.items()
+                if op != "$sum":
+                    raise ValueError(f"Unsupported accumulator {op}")
+                v = value(d, expr)
+                out[name] = out.get(name, 0) + (v if isinstance(v, (int, float)) else 0)
+        return list(groups.values())
+
+    # -- writes ------------------------------------------------------------
+
+    def _write(self, doc_id: Optional[int], doc: Dict[str, Any]) -> int:
+        """Insert (doc_id None) or overwrite one document and refresh its index rows. Caller holds a transaction."""
+        text, blobs, paths = self._encode(doc)
+        conn = self.store.conn
+        if doc_id is None:
+            doc_id = conn.execute(f"INSERT INTO {self._docs} (doc, blobs, blob_paths) VALUES (?, ?, ?)",
+                                  (text, blobs, paths)).lastrowid
+        else:
+            conn.execute(f"UPDATE {self._docs} SET doc = ?, blobs = ?, blob_paths = ? WHERE id = ?",
+                         (text, blobs, paths, doc_id))
+        self._reindex(doc_id, doc)
+        return doc_id
+
+    def _transaction(self):
+        store = self.store
+
+        col = self
+
+        class _Tx:
+            def __enter__(self_inner):
+                store.lock.acquire()
+                try:
+                    store.conn.execute("BEGIN IMMEDIATE")
+                    col._load_indexes()
+                except BaseException:
+                    if store.conn.in_transaction:
+                        store.conn.execute("ROLLBACK")
+                    store.lock.release()
+                    raise
+
+            def __exit__(self_inner, exc_type, *exc):
+                try:
+                    store.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+                finally:
+                    store.lock.release()
+                return False
+        return _Tx()
+
+    def _first(self, query: Dict[str, Any]) -> Optional[Tuple[int, Dict[str, Any]]]:
+        ids = self._match_ids(query, limit=1)
+        if not ids:
+            return None
+        row = self.store.conn.execute(f"SELECT id, doc, blobs, blob_paths FROM {self._docs} WHERE id = ?", (ids[0],)).fetchone()
+        return row[0], self._decode(*row)
+
+    def insert_one(self, doc: Dict[str, Any], **kwargs: Any) -> _Result:
+        with self._transaction():
+            doc_id = self._write(None, doc)
+        return _Result(inserted_id=doc_id)
+
+    def insert_many(self, docs: Iterable[Dict[str, Any]], ordered: bool = True, **kwargs: Any) -> _Result:
+        """As pymongo: documents before a failure stay inserted; ordered=False also tries the rest.
+        Failures raise BulkWriteError with their indexes in .details["writeErrors"]."""
+        result = _Result()
+        result.inserted_ids = []
+        with self._transaction():
+            errors = self._each_op(list(docs), lambda d: result.inserted_ids.append(self._write(None, d)), ordered)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(result.inserted_ids)})
+        return result
+
+    def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **kwargs: Any) -> _Result:
+        with self._transaction():
+            found = self._first(filter)
+            if found is not None:
+                self._write(found[0], replacement)
+                return _Result(matched=1, modified=1)
+            if not upsert:
+                return _Result()
+            return _Result(upserted_id=self._write(None, replacement))
+
+    def _each_op(self, items: Sequence[Any], apply: Any, ordered: bool) -> List[Dict[str, Any]]:
+        """Run apply(item) for each item under its own savepoint (inside an open transaction), so a
+        failure is rolled back alone. ordered=True stops at the first failure. Returns the write errors."""
+        errors: List[Dict[str, Any]] = []
+        conn = self.store.conn
+        for i, item in enumerate(items):
+            conn.execute("SAVEPOINT bulk_op")
+            try:
+                apply(item)
+                conn.execute("RELEASE bulk_op")
+            except Exception as e:
+                conn.execute("ROLLBACK TO bulk_op")
+                conn.execute("RELEASE bulk_op")
+                errors.append({"index": i, "errmsg": str(e), "code": 11000 if isinstance(e, DuplicateKeyError) else 1})
+                if ordered:
+                    break
+        return errors
+
+    def bulk_write(self, requests: Sequence[Any], ordered: bool = True, **kwargs: Any) -> _Result:
+        """ReplaceOne / UpdateOne batch in one transaction. A failed operation is rolled back alone (savepoint);
+        ordered=True stops there, ordered=False carries on. Failures raise BulkWriteError at the end."""
+        result = _Result()
+        result.upserted_count = 0
+
+        def apply(op: Any) -> None:
+            if isinstance(op, UpdateOne):
+                r = self._update_locked(op._filter, op._doc, op._upsert, many=False)
+            else:
+                found = self._first(op._filter)
+                if found is not None:
+                    self._write(found[0], op._doc)
+                    r = _Result(matched=1, modified=1)
+                elif op._upsert:
+                    r = _Result(upserted_id=self._write(None, op._doc))
+                else:
+                    r = _Result()
+            result.matched_count += r.matched_count
+            result.modified_count += r.modified_count
+            result.upserted_count += r.upserted_id is not None
+
+        with self._transaction():
+            errors = self._each_op(requests, apply, ordered)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nMatched": result.matched_count,
+                                  "nUpserted": result.upserted_count})
+        return result
+
+    def _apply_update(self, doc: Dict[str, Any], update: Dict[str, Any], inserting: bool) -> Dict[str, Any]:
+        for op, fields in update.items():
+            if op == "$setOnInsert" and not inserting:
+                continue
+            for path, value in fields.items():
+                if op in ("$set", "$setOnInsert"):
+                    _set_path(doc, path, value)
+                elif op == "$unset":
+                    _unset_path(doc, path)
+                elif op == "$inc":
+                    current = _get_path(doc, path)
+                    _set_path(doc, path, (0 if current is _MISSING else current) + value)
+                else:
+                    raise ValueError(f"Unsupported update operator {op}")
+        return doc
+
+    def _update(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool, many: bool) -> _Result:
+        with self._transaction():
+            return self._update_locked(filter, update, upsert, many)
+
+    def _update_locked(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool, many: bool) -> _Result:
+        ids = self._match_ids(filter, limit=0 if many else 1)
+        for doc_id in ids:
+            row = self.store.conn.execute(f"SELECT id, doc, blobs, blob_paths FROM {self._docs} WHERE id = ?", (doc_id,)).fetchone()
+            self._write(doc_id, self._apply_update(self._decode(*row), update, inserting=False))
+        if ids or not upsert:
+            return _Result(matched=len(ids), modified=len(ids))
+        seed = {k: v for k, v in filter.items() if not k.startswith("$") and not isinstance(v, dict)}
+        doc: Dict[str, Any] = {}
+        for path, value in seed.items():
+            _set_path(doc, path, value)
+        return _Result(upserted_id=self._write(None, self._apply_update(doc, update, inserting=True)))
+
+    def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs: Any) -> _Result:
+        return self._update(filter, update, upsert, many=False)
+
+    def update_many(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs: Any) -> _Result:
+        return self._update(filter, update, upsert, many=True)
+
+    def _delete(self, filter: Dict[str, Any], many: bool) -> _Result:
+        with self._transaction():
+            ids = self._match_ids(filter, limit=0 if many else 1)
+            for start in range(0, len(ids), SQL_CHUNK):
+                chunk = ids[start:start + SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                self.store.conn.execute(f"DELETE FROM {self._docs} WHERE id IN ({marks})", chunk)
+                self.store.conn.execute(f"DELETE FROM {self._idx} WHERE id IN ({marks})", chunk)
+        return _Result(deleted=len(ids))
+
+    def delete_one(self, filter: Dict[str, Any], **kwargs: Any) -> _Result:
+        return self._delete(filter, many=False)
+
+    def delete_many(self, filter: Dict[str, Any], **kwargs: Any) -> _Result:
+        return self._delete(filter, many=True)
+
+    def drop(self) -> None:
+        with self._transaction():
+            self.store.conn.execute(f"DELETE FROM {self._docs}")
+            self.store.conn.execute(f"DELETE FROM {self._idx}")
+
+
+class LocalCursor:
+    """Lazy result of LocalCollection.find(); supports sort/skip/limit chaining and iteration."""
+
+    def __init__(self, col: LocalCollection, query: Dict[str, Any], projection: Optional[Dict[str, Any]]):
+        self.col = col
+        self.query = query
+        self.projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._iter: Optional[Iterator[Dict[str, Any]]] = None
+
+    def sort(self, key: Union[str, Sequence[Tuple[str, int]]], direction: int = 1) -> "LocalCursor":
+        self._sort = _normalize_sort(key, direction)
+        return self
+
+    def skip(self, n: int) -> "LocalCursor":
+        self._skip = int(n)
+        return self
+
+    def limit(self, n: int) -> "LocalCursor":
+        self._limit = int(n)
+        return self
+
+    def __iter__(self) -> "LocalCursor":
+        return self
+
+    def __next__(self) -> Dict[str, Any]:
+        if self._iter is None:
+            self._iter = self._execute()
+        return next(self._iter)
+
+    def explain(self) -> Dict[str, Any]:
+        """Mongo-shaped plan: IXSCAN/IDHACK when an indexed condition narrows the query, else COLLSCAN."""
+        terms = list(self.query.items())
+        if isinstance(self.query.get("$or"), list) and self.col._plan({"$or": self.query["$or"]})[2]:
+            terms += [item for q in self.query["$or"] for item in q.items()]
+        used = [k for k, cond in terms
+                if k in self.col.indexes and self.col._index_clause(k, cond, []) is not None]
+        if "_id" in self.query:
+            plan: Dict[str, Any] = {"stage": "IDHACK"}
+        elif used:
+            plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": f"{used[0]}_1",
+                                                     "keyPattern": {k: 1 for k in used}}}
+        else:
+            plan = {"stage": "COLLSCAN", "filter": self.query}
+        _, _, exact = self.col._plan(self.query)
+        if self._sort and not exact:
+            plan = {"stage": "SORT", "sortPattern": dict(self._sort), "inputStage": plan}
+        return {"queryPlanner": {"namespace": self.col.name, "winningPlan": plan}}
+
+    def _execute(self) -> Iterator[Dict[str, Any]]:
+        clauses, params, exact = self.col._plan(self.query)
+        if exact:
+            return self._execute_sql(clauses, params)
+        if not self._sort:
+            docs = (d for _, d in self.col._scan_rows(" AND ".join(clauses), params) if matches(d, self.query))
+            docs = itertools.islice(docs, self._skip, self._skip + self._limit if self._limit else None)
+            return (_project(d, self.projection) for d in docs)
+        found = [d for _, d in self.col._scan_rows(" AND ".join(clauses), params) if matches(d, self.query)]
+        found = _sort_docs(found, self._sort)[self._skip:]
+        if self._limit:
+            found = found[:self._limit]
+        return (_project(d, self.projection) for d in found)
+
+    def _execute_sql(self, clauses: List[str], params: List[Any]) -> Iterator[Dict[str, Any]]:
+        """The whole filter is answered by the index tables: order, page and project in SQL."""
+        docs_table = self.col._docs
+        where = " AND ".join(clauses) or "1"
+        order = ", ".join(
+            # _id is the rowid, not part of the stored JSON
+            f"id {'ASC' if d > 0 else 'DESC'}" if f == "_id" else
+            f"json_type(doc, '{_json_path(f)}') IS NOT NULL {'ASC' if d > 0 else 'DESC'}, "
+            f"json_extract(doc, '{_json_path(f)}') {'ASC' if d > 0 else 'DESC'}"
+            for f, d in self._sort
+        ) or "id"
+        if self._sort:
+            order += ", id"
+        page = f" LIMIT {self._limit if self._limit else -1} OFFSET {self._skip}"
+
+        include = [k for k, v in (self.projection or {}).items() if v and k != "_id"]
+        keep_id = bool((self.projection or {}).get("_id", 1))
+        if include:
+            cols = ", ".join(f"doc -> '{_json_path(f)}'" for f in include)
+            sql = f"SELECT id, {cols}, blobs, blob_paths FROM {docs_table} WHERE {where} ORDER BY {order}{page}"
+            with self.col.store.lock:
+                rows = self.col.store.conn.execute(sql, params).fetchall()
+
+            def build() -> Iterator[Dict[str, Any]]:
+                for row in rows:
+                    out: Dict[str, Any] = {}
+                    for field, raw in zip(include, row[1:-2]):
+                        if raw is not None:
+                            _set_path(out, field, fast_json.loads(raw))
+                    _restore_blobs(out, row[-2], row[-1], include)
+                    if keep_id:
+                        out["_id"] = row[0]
+                    yield out
+            return build()
+
+        sql = f"SELECT id, doc, blobs, blob_paths FROM {docs_table} WHERE {where} ORDER BY {order}{page}"
+        with self.col.store.lock:
+            rows = self.col.store.conn.execute(sql, params).fetchall()
+        return (_project(self.col._decode(*row), self.projection) for row in rows)
@@ -1,4 +1,4 @@
-import requests
+import http_fixtures
 import re
 from typing import Optional, List
 
@@ -74,7 +74,7 @@ class Lolalytics:
         }
         
         try:
-            resp = requests.get(url, headers=headers, timeout=5)
+            resp = http_fixtures.get(url, headers=headers, timeout=5)
             if resp.status_code != 200:
                 print(f"[Lolalytics] Failed to fetch {url}: {resp.status_code}")
                 return None
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-import json
+import os
 from pathlib import Path
 from typing import Any, Dict, List
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -9,13 +9,21 @@ from rich.console import Console
 from rich.table import Table
 
 
+import fast_json
 from riot_client import RiotClient
 from analyzer import analyze_matches, calculate_season_stats_from_db
-from timeline_analyzer import classify_loss_reason, analyze_timeline_movement
+from timeline_analyzer import classify_loss_reason, analyze_timeline_movement, PIPELINE_FEATURES
 from league_crew import call_league_crew, classify_matches_and_identify_candidates
 from coach_data_enricher import enrich_coaching_data
+from match_features import build_match_features
+from heatmaps import load_player_heatmaps, save_player_heatmaps
+from ward_coverage import load_ward_coverage, save_ward_coverage
 from champion_profile_helper import load_champion_profiles, attach_champion_profiles
 from stats_scraper import get_past_ranks
+from pipeline_trace import Tracer, bind, chrome_trace, current_tracer, span
+from pipeline_profiler import PipelineProfiler
+from memory_budget import MemoryBudget, SpillList, SpillStore
+import metrics
 
 console = Console()
 
@@ -23,54 +31,37 @@ SCRIPT_DIR = Path(__file__).resolve().parent
 SAVE_DIR = SCRIPT_DIR / "saves"
 SAVE_DIR.mkdir(parents=True, exist_ok=True)
 
+# Parallel fetch workers (tune against riot_simulator.py; the FetchScheduler still paces calls)
+MATCH_FETCH_WORKERS = int(os.getenv("RIOT_MATCH_FETCH_WORKERS", "8"))
+TIMELINE_FETCH_WORKERS = int(os.getenv("RIOT_TIMELINE_FETCH_WORKERS", "5"))
+
+# Optional: write every run's Chrome trace JSON here (see pipeline_trace.py)
+PIPELINE_TRACE_DIR = os.getenv("PIPELINE_TRACE_DIR", "")
+
+# Per-match timeline series already merged into detailed_matches; dropped from spilled movement summaries
+HEAVY_MOVEMENT_FIELDS = (
+    "position_samples", "kill_events", "ward_events", "building_events",
+    "all_item_builds", "item_build", "gold_xp_series", "team_gold_diff",
+)
+
 
 
 
 def backfill_match_history(puuid: str, region: str):
     """
-    Background task to fetch up to 1000 matches for season stats.
-    Only fetches matching IDs that are NOT in the database.
+    Queue a background top-up of up to 1000 matches for season stats.
+
+    The FetchScheduler owns the work: it dedupes players/match IDs, persists the
+    queue across restarts and only spends the backfill share of the Riot quota,
+    so foreground analyses are never starved.
     """
     try:
-        import time
-        from riot_client import RiotClient
-        from database import Database
-        
-        # 1. Setup
-        client = RiotClient()
-        db = Database()
-        
-        # 2. Get 1000 IDs (Fast)
-        all_ids = client.get_recent_match_ids(puuid, count=1000)
-        
-        # 3. Check what we have (O(1) lookups via id index)
-        cached_map = db.get_matches_bulk(all_ids) 
-        missing_ids = [mid for mid in all_ids if mid not in cached_map]
-        
-        if not missing_ids:
-            return
-
-        console.print(f"[dim][Backfill] Found {len(missing_ids)} missing matches. Fetching in background...[/dim]")
-        
-        # 4. Fetch Missing (Sequential to be polite in background)
-        for i, mid in enumerate(missing_ids):
-            try:
-                m_data = client.get_match(mid)
-                if m_data:
-                    db.save_match(m_data)
-                # Sleep slightly to avoid rate limits if running long
-                if i % 10 == 0:
-                    time.sleep(0.5)
-            except Exception:
-                pass
-                
+        from fetch_scheduler import get_scheduler
+        get_scheduler().schedule_backfill(puuid, region)
     except Exception as e:
         console.print(f"[yellow][Backfill] Error: {e}[/yellow]")
 
 
-
-
-
 def get_cached_past_ranks(puuid: str, game_name: str, tag_line: str, region: str) -> List[Dict[str, str]]:
     """Fetch past ranks with caching to avoid re-scraping static data."""
     cache_file = SAVE_DIR / f"cache_past_ranks_{puuid}.json"
@@ -78,10 +69,9 @@ def get_cached_past_ranks(puuid: str, game_name: str, tag_line: str, region: str
     # Try to load from cache
     if cache_file.exists():
         try:
-            with open(cache_file, "r") as f:
-                data = json.load(f)
-                if data: # valid data
-                    return data
+            data = fast_json.read_file(cache_file)
+            if data: # valid data
+                return data
         except Exception:
             pass # ignore errors, re-fetch
             
@@ -91,8 +81,7 @@ def get_cached_past_ranks(puuid: str, game_name: str, tag_line: str, region: str
     # Save to cache if we found data
     if ranks:
         try:
-            with open(cache_file, "w") as f:
-                json.dump(ranks, f)
+            fast_json.write_file(cache_file, ranks)
         except Exception as e:
             console.print(f"[yellow]Warning: Could not save cache: {e}[/yellow]")
             
@@ -271,11 +260,79 @@ def run_analysis_pipeline(
     region_key: str = "NA",
     puuid: str = None,
     force_refresh: bool = False,
+    profile: bool = False,
 ) -> Dict[str, Any]:
     """
     Programmatic entry point for the analysis pipeline.
     Returns the final agent_payload dictionary.
+
+    Every run is traced (pipeline_trace.Tracer): the span record is stored on
+    the saved analysis as "pipeline_trace" and a per-stage summary is printed.
+    Stage durations also feed the pipeline_stage_seconds metric.
+
+    profile=True additionally samples stacks and tracemalloc per stage and
+    writes the results to saves/profiles/<trace_id>/ (see pipeline_profiler.py).
     """
+    tracer = Tracer("analysis", riot_id=riot_id, match_count=match_count, region=region_key,
+                    use_timeline=use_timeline, call_ai=call_ai)
+    profiler = None
+    if profile:
+        profiler = PipelineProfiler(tracer)
+        tracer.attrs["profile_id"] = profiler.job_id
+        profiler.start()
+    try:
+        with metrics.analysis_in_flight(), tracer.activate(), tracer.span("pipeline"):
+            result = _run_analysis_pipeline(
+                riot_id, match_count, use_timeline, call_ai, save_json,
+                open_dashboard, region_key, puuid, force_refresh,
+            )
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+    tracer.print_summary()
+    record = tracer.to_dict()
+    metrics.observe_trace(record)
+    if profiler is not None:
+        try:
+            profiler.write(record)
+        except Exception as e:
+            console.print(f"[yellow]Warning: Failed to write pipeline profile: {e}[/yellow]")
+    if isinstance(result, dict) and "error" not in result:
+        result["pipeline_trace"] = record
+    if PIPELINE_TRACE_DIR:
+        try:
+            trace_dir = Path(PIPELINE_TRACE_DIR)
+            trace_dir.mkdir(parents=True, exist_ok=True)
+            safe_id = str(record["attrs"].get("riot_id") or "run").replace("#", "_")
+            fast_json.write_file(trace_dir / f"trace_{safe_id}_{record['trace_id']}.json", chrome_trace(record))
+        except Exception as e:
+            console.print(f"[yellow]Warning: Failed to write pipeline trace: {e}[/yellow]")
+    return result
+
+
+def _light_movement_summary(summary: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in summary.items() if k not in HEAVY_MOVEMENT_FIELDS}
+
+
+def _attach_trace(agent_payload: Dict[str, Any]) -> None:
+    """Store the trace so far on the payload, so it is saved with the analysis."""
+    tracer = current_tracer()
+    if tracer is not None:
+        agent_payload["pipeline_trace"] = tracer.to_dict()
+
+
+def _run_analysis_pipeline(
+    riot_id: str,
+    match_count: int,
+    use_timeline: bool,
+    call_ai: bool,
+    save_json: bool,
+    open_dashboard: bool,
+    region_key: str,
+    puuid: str,
+    force_refresh: bool,
+) -> Dict[str, Any]:
     import time
     
     def log_debug(msg):
@@ -285,16 +342,15 @@ def run_analysis_pipeline(
         except:
             pass
 
-    t_start = time.time()
     log_debug(f"Pipeline Start for {riot_id} (AI={call_ai}, Region={region_key})")
-    # console.print(f"[cyan]TIMING: Pipeline Start[/cyan]")
 
     client = RiotClient(region_key=region_key)
 
     # 1. Resolve Riot ID from PUUID if provided (Robust Navigation)
     if puuid:
         try:
-            acc = client.get_account_by_puuid(puuid)
+            with span("resolve_puuid"):
+                acc = client.get_account_by_puuid(puuid)
             raw_name = acc.get("gameName", "Unknown")
             raw_tag = acc.get("tagLine", "NA1")
             riot_id = f"{raw_name}#{raw_tag}"
@@ -337,11 +393,10 @@ def run_analysis_pipeline(
     # Try loading cached account/summoner data to speed up repeated runs
     if account_cache_file.exists() and not force_refresh:
         try:
-            with open(account_cache_file, "r") as f:
-                cached_data = json.load(f)
-                account = cached_data.get("account")
-                summoner = cached_data.get("summoner")
-                console.print(f"[dim]Loaded cached account info for {riot_id}[/dim]")
+            cached_data = fast_json.read_file(account_cache_file)
+            account = cached_data.get("account")
+            summoner = cached_data.get("summoner")
+            console.print(f"[dim]Loaded cached account info for {riot_id}[/dim]")
         except Exception:
             pass
 
@@ -357,7 +412,8 @@ def run_analysis_pipeline(
         with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] Init Database...\n")
         db = Database()
         with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] DB Init Done. Checking existing analysis...\n")
-        existing_doc = db.get_analysis(riot_id)
+        with span("load_existing_analysis"):
+            existing_doc = db.get_analysis(riot_id)
         with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] Existing analysis check done. Found: {bool(existing_doc)}\n")
         
         # We resume if:
@@ -387,7 +443,8 @@ def run_analysis_pipeline(
             
             console.print("Contacting League Coach Crew (Gemini - may take 10-30s)...")
             try:
-                coaching_report = call_league_crew(agent_payload)
+                with span("ai"):
+                    coaching_report = call_league_crew(agent_payload)
                 
                 if isinstance(coaching_report, dict):
                     console.print("\n[bold]Coaching Overview:[/bold]")
@@ -406,7 +463,9 @@ def run_analysis_pipeline(
             
             # Final Save
             if save_json:
-                db.save_analysis(agent_payload)
+                _attach_trace(agent_payload)
+                with span("save_analysis", stage="resume"):
+                    db.save_analysis(agent_payload)
                 console.print(f"[green]STAGE 2: Saved Smart Resume Analysis to MongoDB[/green]")
                 
             return agent_payload
@@ -417,13 +476,15 @@ def run_analysis_pipeline(
         # console.print(f"[bold]Looking up account on {region_key} (Routing: {client.region})...[/bold]")
         try:
             with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] Fetching account from Riot...\n")
-            account = client.get_account_by_riot_id(game_name, tag_line)
+            with span("resolve_account"):
+                account = client.get_account_by_riot_id(game_name, tag_line)
             with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] Account fetched. Fetching Summoner...\n")
             puuid = account["puuid"]
             
             console.print("[bold]Fetching summoner profile...[/bold]")
             try:
-                summoner = client.get_summoner_by_puuid(puuid)
+                with span("fetch_summoner"):
+                    summoner = client.get_summoner_by_puuid(puuid)
             except Exception as e:
                 if "404" in str(e):
                     # Account exists (globally) but not on this region
@@ -431,8 +492,7 @@ def run_analysis_pipeline(
                 raise e
             
             # Save to cache
-            with open(account_cache_file, "w") as f:
-                json.dump({"account": account, "summoner": summoner}, f)
+            fast_json.write_file(account_cache_file, {"account": account, "summoner": summoner})
                 
         except Exception as e:
             msg = f"Failed to find account '{riot_id}'. Error: {e}"
@@ -448,7 +508,8 @@ def run_analysis_pipeline(
     league_entries = []
     try:
         console.print("[bold]Fetching rank data...[/bold]")
-        league_entries = client.get_league_entries(puuid)
+        with span("fetch_league_entries"):
+            league_entries = client.get_league_entries(puuid)
         console.print(f"[dim]Debug: Found {len(league_entries)} league entries.[/dim]")
     except Exception as e:
         console.print(f"[yellow]Warning: Failed to fetch rank data: {e}[/yellow]")
@@ -457,7 +518,8 @@ def run_analysis_pipeline(
     # console.print(f"[bold]Fetching last {match_count} ranked matches...[/bold]")
     try:
         with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] Fetching Match IDs...\n")
-        match_ids = client.get_recent_match_ids(puuid, match_count, queue=420)
+        with span("fetch_match_ids", requested=match_count):
+            match_ids = client.get_recent_match_ids(puuid, match_count, queue=420)
         with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] Match IDs fetched: {len(match_ids)}\n")
     except Exception as e:
         msg = f"Failed to fetch match IDs: {e}"
@@ -465,9 +527,6 @@ def run_analysis_pipeline(
         return {"error": msg}
         
     console.print(f"Retrieved {len(match_ids)} match IDs.")
-    
-    t_ids = time.time()
-    console.print(f"[cyan]TIMING: ID Fetch took {t_ids - t_start:.2f}s[/cyan]")
 
     matches: List[Dict[str, Any]] = []
     # Parallel Fetching of Matches
@@ -476,14 +535,14 @@ def run_analysis_pipeline(
     # Initialize DB for caching matches
     from database import Database
     db = Database()
+    # Per-job memory accounting; over budget, movement summaries spill to the store (see memory_budget.py)
+    budget = MemoryBudget(riot_id)
 
     # 1. BULK FETCH from Cache (Optimization)
     console.print(f"[dim]Checking cache for {len(match_ids)} matches...[/dim]")
-    cached_matches_map = db.get_matches_bulk(match_ids)
+    with span("bulk_db_fetch", requested=len(match_ids)):
+        cached_matches_map = db.get_matches_bulk(match_ids)
     console.print(f"Found {len(cached_matches_map)} matches in cache.")
-    
-    t_bulk = time.time()
-    console.print(f"[cyan]TIMING: Bulk DB Fetch took {t_bulk - t_ids:.2f}s[/cyan]")
 
     # 2. Parallel Fetch for MISSING matches
     matches = [None] * len(match_ids)
@@ -492,15 +551,16 @@ def run_analysis_pipeline(
 
     if missing_ids:
         console.print(f"[bold]Fetching {len(missing_ids)} missing matches (Parallel)...[/bold]")
-        with ThreadPoolExecutor(max_workers=8) as executor:
-            future_to_mid = {executor.submit(client.get_match, mid): mid for mid in missing_ids}
+        with span("fetch_matches", missing=len(missing_ids)), ThreadPoolExecutor(max_workers=MATCH_FETCH_WORKERS) as executor:
+            # Already counted as cache misses by get_matches_bulk; go straight to Riot
+            fetch_match = bind(lambda mid: client.get_match(mid, use_cache=False), "fetch_match")
+            future_to_mid = {executor.submit(fetch_match, mid): mid for mid in missing_ids}
             for future in as_completed(future_to_mid):
                 mid = future_to_mid[future]
                 try:
                     m_data = future.result()
                     if m_data:
-                        # Save to DB immediately to avoid memory bloat if large batch
-                        db.save_match(m_data)
+                        # client.get_match already queued it for the DB (write-behind, see ingest_buffer.py)
                         fetched_map[mid] = m_data
                 except Exception as e:
                     # console.print(f"[yellow]Failed to fetch {mid}: {e}[/yellow]")
@@ -518,10 +578,14 @@ def run_analysis_pipeline(
 
     if not matches:
         return {"error": "No matches found or all match fetches failed."}
+    budget.checkpoint("fetch_matches", matches=matches)
 
     console.print("[bold]Analyzing your performance...[/bold]")
+    # One pass over the matches, shared by the analyzer and the enricher
     try:
-        base_analysis = analyze_matches(matches, puuid)
+        with span("analyze_matches", games=len(matches)):
+            features = build_match_features(matches, puuid)
+            base_analysis = analyze_matches(matches, puuid, features=features)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -530,9 +594,14 @@ def run_analysis_pipeline(
     if "error" in base_analysis:
         console.print(f"[red]{base_analysis['error']}[/red]")
         return base_analysis
+    budget.checkpoint("analyze_matches", analysis=base_analysis)
 
     timeline_loss_diagnostics: List[Dict[str, Any]] = []
-    movement_summaries: List[Dict[str, Any]] = []
+    movement_summaries = SpillList(
+        budget, "movement_summaries",
+        SpillStore(db, job=getattr(current_tracer(), "trace_id", None), puuid=puuid),
+        light=_light_movement_summary,
+    )
     # 3. TIMELINES
     if use_timeline:
         with open("backend_debug.txt", "a") as f:
@@ -556,7 +625,9 @@ def run_analysis_pipeline(
             # Movement Analysis
             mov = None
             try:
-                mov = analyze_timeline_movement(m_data, tl, puuid)
+                # Replay series (all_positions / all_gold_xp_series) are never built here;
+                # /api/matches/<id>/replay/ serves them on demand
+                mov = analyze_timeline_movement(m_data, tl, puuid, features=PIPELINE_FEATURES)
                 if mov:
                     mov = {"match_id": m_id, **mov}
             except Exception:
@@ -578,32 +649,36 @@ def run_analysis_pipeline(
         # OPTIMIZED PARALLEL FETCHING
         # 1. Fetch all missing timelines in parallel
         
-        missing_mids = []
-        for mid, _ in valid_tasks:
-            if not db.get_timeline(mid):
-                missing_mids.append(mid)
+        # One ID-only query; it also records each timeline's cache hit/miss
+        with span("check_timeline_cache", requested=len(valid_tasks)):
+            cached_mids = db.get_cached_timeline_ids([mid for mid, _ in valid_tasks])
+        missing_mids = [mid for mid, _ in valid_tasks if mid not in cached_mids]
                 
         if missing_mids:
             console.print(f"[bold]Fetching {len(missing_mids)} missing timelines (Parallel)...[/bold]")
-            with ThreadPoolExecutor(max_workers=5) as executor:
-                future_to_mid = {executor.submit(client.get_match_timeline, mid): mid for mid in missing_mids}
+            with span("fetch_timelines", missing=len(missing_mids)), ThreadPoolExecutor(max_workers=TIMELINE_FETCH_WORKERS) as executor:
+                # Already counted as misses above; go straight to Riot
+                fetch_timeline = bind(lambda mid: client.get_match_timeline(mid, use_cache=False), "fetch_timeline")
+                future_to_mid = {executor.submit(fetch_timeline, mid): mid for mid in missing_mids}
                 
                 for future in as_completed(future_to_mid):
                     mid = future_to_mid[future]
                     try:
-                        tl = future.result()
-                        if tl:
-                            db.save_timeline(mid, tl)
+                        # client.get_match_timeline already queued it for the DB; reads below see it right away
+                        future.result()
                     except Exception as e:
                         # console.print(f"[yellow]Failed to fetch timeline {mid}: {e}[/yellow]")
                         pass
 
         # 2. Process Sequentially (CPU bound + Safety)
-        # BATCHING: chunk tasks to control memory usage and allow GC to run (500MB limit)
+        # BATCHING: one timeline in memory at a time; GC between batches only when over the memory budget
         import gc
         BATCH_SIZE = 5
         
         console.print(f"[bold]Processing {len(valid_tasks)} timelines in batches of {BATCH_SIZE}...[/bold]")
+        # Season heatmaps are updated incrementally; matches already folded in are skipped
+        player_heatmaps = load_player_heatmaps(puuid, db=db)
+        ward_index = load_ward_coverage(puuid, db=db)
         with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] Start Processing {len(valid_tasks)} timelines (Batched)...\n")
         
         for i in range(0, len(valid_tasks), BATCH_SIZE):
@@ -615,14 +690,17 @@ def run_analysis_pipeline(
                 t_start_tl = time.time()
                 try:
                     # Load ONE timeline into memory
-                    tl = db.get_timeline(mid)
+                    with span("timeline_decode", match_id=mid):
+                        tl = db.get_timeline(mid, record_lookup=False)
                     if tl:
-                        l_res, mov_res = process_timeline(global_idx, mid, m_data, tl)
+                        with span("timeline_analyze", match_id=mid):
+                            l_res, mov_res = process_timeline(global_idx, mid, m_data, tl)
                         
                         # MEMORY OPTIMIZATION: Strip heavy unused fields
                         if mov_res:
-                            mov_res.pop("all_positions", None)      # Huge, unused by frontend
-                            mov_res.pop("all_gold_xp_series", None) # Huge, unused by frontend
+                            player_heatmaps.add_match(mid, mov_res.get("role"), mov_res.pop("position_bins", None))
+                            wards = mov_res.pop("ward_coverage", None) or {}
+                            ward_index.add_match(mid, wards.get("team_id"), wards.get("hotspots"))
                         
                         # Explicitly free the timeline JSON
                         del tl
@@ -637,24 +715,41 @@ def run_analysis_pipeline(
                 dur = time.time() - t_start_tl
                 with open("backend_debug.txt", "a") as f: f.write(f"[DEBUG] Processed {mid} in {dur:.2f}s\n")
             
-            # Force GC after each batch to reclaim timeline memory
-            gc.collect()
+            if budget.over():
+                gc.collect()
+        budget.checkpoint("timelines")
+        if movement_summaries.spilled:
+            console.print(f"[yellow]Memory budget exceeded: spilled {movement_summaries.spilled}/{len(movement_summaries)} movement summaries to the store.[/yellow]")
 
-    t_processing = time.time()
-    console.print(f"[cyan]TIMING: Match & Timeline Processing took {t_processing - t_bulk:.2f}s[/cyan]")
+        try:
+            with span("save_heatmaps"):
+                save_player_heatmaps(player_heatmaps, db=db)
+                save_ward_coverage(ward_index, db=db)
+        except Exception as e:
+            console.print(f"[yellow]Failed to save heatmaps/ward coverage: {e}[/yellow]")
 
     # Enrich analysis with macro, comp, and itemization data
-    analysis = enrich_coaching_data(
-        matches=matches,
-        match_ids=match_ids,
-        puuid=puuid,
-        analysis=base_analysis,
-        timeline_loss_diagnostics=timeline_loss_diagnostics,
-        movement_summaries=movement_summaries,
-    )
+    with span("enrich"):
+        analysis = enrich_coaching_data(
+            matches=matches,
+            match_ids=match_ids,
+            puuid=puuid,
+            analysis=base_analysis,
+            timeline_loss_diagnostics=timeline_loss_diagnostics,
+            movement_summaries=movement_summaries,
+            features=features,
+        )
+    # detailed_matches now carries the per-match series; the payload keeps light copies of spilled summaries
+    movement_summaries.close()
+    budget.release("movement_summaries")
+    budget.checkpoint("enrich", analysis=analysis)
+    budget.print_summary()
+    if current_tracer() is not None:
+        current_tracer().attrs["memory"] = budget.report()
     
     # Identify review candidates and classify matches
-    review_candidates, match_tags = classify_matches_and_identify_candidates(analysis)
+    with span("classify_matches"):
+        review_candidates, match_tags = classify_matches_and_identify_candidates(analysis)
     analysis["review_candidates"] = review_candidates
     
     # Inject tags into detailed_matches for frontend
@@ -669,6 +764,10 @@ def run_analysis_pipeline(
 
     # Second: AI section – structured JSON payload
     summary = analysis.get("summary", {})
+    with span("fetch_past_ranks"):
+        past_ranks = get_cached_past_ranks(puuid, game_name, tag_line, client.platform)
+    with span("fetch_champion_mastery"):
+        champion_mastery = client.get_champion_mastery(puuid)
     agent_payload: Dict[str, Any] = {
         "schema_version": "C-enriched-1",
         "region": region_key,  # Store region for invalidation/updates
@@ -685,15 +784,15 @@ def run_analysis_pipeline(
             "id": summoner.get("id", "")
         },
         "rank_info": league_entries,
-        "past_ranks": get_cached_past_ranks(puuid, game_name, tag_line, client.platform),
+        "past_ranks": past_ranks,
         "match_count_requested": match_count,
         "match_ids": match_ids,
         "analysis": analysis,
         "timeline_loss_diagnostics": timeline_loss_diagnostics,
-        "movement_summaries": movement_summaries,
-        "champion_mastery": client.get_champion_mastery(puuid)[:100], # Top 100 mastery
+        "movement_summaries": movement_summaries.light(),
+        "champion_mastery": champion_mastery[:100], # Top 100 mastery
         "meta": {
-            "intended_role_focus": summary.get("primary_role", "FLEX"),
+            "intended_role_focus": analysis.get("primary_role", "FLEX"),
             "player_self_reported_rank": summary.get(
                 "self_reported_rank", "Unknown"
             ),
@@ -707,11 +806,9 @@ def run_analysis_pipeline(
 
     # Enhanced Season Stats (Tier 3)
     try:
-        t_season_start = time.time()
-        agent_payload["season_stats"] = calculate_season_stats_from_db(puuid)
-        t_season_end = time.time()
+        with span("season_stats"):
+            agent_payload["season_stats"] = calculate_season_stats_from_db(puuid)
         # console.print(f"[green]Calculated Season Stats from {agent_payload['season_stats'].get('total_games', 0)} cached games.[/green]")
-        # console.print(f"[cyan]TIMING: Season Stats took {t_season_end - t_season_start:.2f}s[/cyan]")
     except Exception as e:
         console.print(f"[yellow]Warning: Failed to calculate season stats: {e}[/yellow]")
 
@@ -761,13 +858,12 @@ def run_analysis_pipeline(
         # while the new one generates. This allows the UI to show "Cached" data + "Loading" spinner.
         try:
             if filename.exists():
-                with open(filename, "r", encoding="utf-8") as f:
-                    old_data = json.load(f)
-                    if "coaching_report" in old_data:
-                        agent_payload["coaching_report"] = old_data["coaching_report"]
-                        console.print("[dim]Preserving cached coaching report for Stage 1 UI...[/dim]")
-                    if "coaching_report_markdown" in old_data:
-                         agent_payload["coaching_report_markdown"] = old_data["coaching_report_markdown"]
+                old_data = fast_json.read_file(filename)
+                if "coaching_report" in old_data:
+                    agent_payload["coaching_report"] = old_data["coaching_report"]
+                    console.print("[dim]Preserving cached coaching report for Stage 1 UI...[/dim]")
+                if "coaching_report_markdown" in old_data:
+                     agent_payload["coaching_report_markdown"] = old_data["coaching_report_markdown"]
         except Exception as e:
             console.print(f"[yellow]Warning: Failed to read old cache, starting fresh: {e}[/yellow]")
 
@@ -777,7 +873,9 @@ def run_analysis_pipeline(
         try:
             from database import Database
             db = Database()
-            db.save_analysis(agent_payload)
+            _attach_trace(agent_payload)
+            with span("save_analysis", stage=1):
+                db.save_analysis(agent_payload)
             console.print(f"[green]STAGE 1: Saved Base Stats to MongoDB (UI Updated)[/green]")
         except Exception as e:
             console.print(f"[red]Failed to save Stage 1 Analysis to DB: {e}[/red]")
@@ -860,7 +958,8 @@ def run_analysis_pipeline(
             f.write(f"[DEBUG] Pipeline Step: Calling AI...\n")
         console.print("Contacting League Coach Crew (Gemini - may take 10-30s)...")
         try:
-            coaching_report = call_league_crew(agent_payload)
+            with span("ai"):
+                coaching_report = call_league_crew(agent_payload)
             
             if isinstance(coaching_report, dict):
                 console.print("\n[bold]Coaching Overview:[/bold]")
@@ -894,7 +993,9 @@ def run_analysis_pipeline(
             else:
                 print(f"[DEBUG] 'analysis' key present. Subkeys: {list(agent_payload['analysis'].keys())}")
 
-            db.save_analysis(agent_payload)
+            _attach_trace(agent_payload)
+            with span("save_analysis", stage=2):
+                db.save_analysis(agent_payload)
             print(f"[green]STAGE 2: Saved Final Analysis with AI to MongoDB[/green]")
         except Exception as e:
             console.print(f"[red]Failed to save Stage 2 Analysis to DB: {e}[/red]")
@@ -906,11 +1007,12 @@ def run_analysis_pipeline(
         # 1. Clean up old matches for this user (Keep top 1000 to cover full seasons)
         # 1000 compressed games = ~3MB. Safe to keep.
         p_puuid = agent_payload.get("summoner_info", {}).get("puuid")
-        if p_puuid:
-            db.cleanup_old_matches(p_puuid, limit=1000)
-        
-        # 2. Clean up old AI cache files (older than 90 days)
-        cleanup_local_cache_files(days=90)
+        with span("cleanup"):
+            if p_puuid:
+                db.cleanup_old_matches(p_puuid, limit=1000)
+
+            # 2. Clean up old AI cache files (older than 90 days)
+            cleanup_local_cache_files(days=90)
         
     except Exception as e:
         console.print(f"[yellow]Cleanup warning: {e}[/yellow]")
@@ -929,9 +1031,8 @@ def run_analysis_pipeline(
     # --- PROACTIVE BACKFILL (Background) ---
     # Fetch remaining season matches (up to 1000) for accurate stats next time.
     if puuid:
-        import threading
-        t = threading.Thread(target=backfill_match_history, args=(puuid, region_key), daemon=True)
-        t.start()
+        with span("schedule_backfill"):
+            backfill_match_history(puuid, region_key)
 
     return agent_payload
 
@@ -1010,6 +1111,7 @@ def main() -> None:
             call_ai=call_ai,
             save_json=save_json,
             open_dashboard=open_dashboard,
+            profile=os.getenv("PIPELINE_PROFILE") == "1",
         )
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
@@ -0,0 +1,131 @@
+"""
+match_features.py
+
+One pass over the match list that every per-match builder shares.
+
+analyze_matches, analyze_teammates, analyze_recent_performance,
+calculate_season_stats_from_db and the coach_data_enricher builders used to
+each re-walk the matches, re-search for the player's participant and re-derive
+team totals / season / patch from gameVersion. build_match_features() does that
+once per match and the builders read the cached values.
+
+Features are keyed to the match payload itself (metadata.matchId), so a failed
+fetch can no longer shift match IDs against payloads the way zip(matches,
+match_ids) could.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_SEASON = "16"
+
+
+def season_from_version(game_version: str) -> str:
+    """Major version (season) from a gameVersion string, e.g. "16.3.712.1234" -> "16"."""
+    if not game_version:
+        return "0"
+    return game_version.split(".")[0]
+
+
+def patch_from_version(game_version: str) -> str:
+    """Major.minor patch, e.g. "16.3.712.1234" -> "16.3"."""
+    return ".".join(game_version.split(".")[:2]) if game_version else "unknown"
+
+
+def detect_role(self_participant: Dict[str, Any]) -> str:
+    """
+    Detect role using strictly Riot API's teamPosition.
+    Falls back to individualPosition if teamPosition is missing/invalid.
+    """
+    # 1. Riot API Team Position
+    pos = self_participant.get("teamPosition")
+    if pos and pos != "Invalid":
+        return pos
+
+    # 2. Fallback
+    return self_participant.get("individualPosition") or "MIDDLE"
+
+
+class MatchFeatures:
+    """Per-match values derived once from a match-v5 payload for one player."""
+
+    __slots__ = (
+        "match", "match_id", "info", "participants",
+        "self_index", "self_p", "team_id", "win", "role", "champion",
+        "game_version", "patch", "season",
+        "duration", "duration_minutes", "game_creation", "game_end_ts",
+        "team_participants", "enemy_participants",
+        "team_kills", "enemy_kills", "team_damage", "team_gold", "enemy_gold",
+        "lane_opponent",
+    )
+
+    def __init__(self, match: Dict[str, Any], puuid: str) -> None:
+        self.match = match
+        self.match_id = match.get("metadata", {}).get("matchId")
+        info = match.get("info", {})
+        self.info = info
+        self.participants = info.get("participants", [])
+
+        self.self_index = next(
+            (i for i, p in enumerate(self.participants) if p.get("puuid") == puuid), None
+        )
+        if self.self_index is None:
+            raise ValueError("PUUID not found in match participants")
+        self_p = self.participants[self.self_index]
+        self.self_p = self_p
+
+        self.team_id = self_p.get("teamId")
+        self.win = bool(self_p.get("win", False))
+        self.role = detect_role(self_p)
+        self.champion = self_p.get("championName", "Unknown")
+
+        self.game_version = info.get("gameVersion", "")
+        self.patch = patch_from_version(self.game_version)
+        self.season = season_from_version(self.game_version)
+
+        self.duration = info.get("gameDuration", 0)  # seconds
+        self.duration_minutes = max(self.duration / 60, 1)
+        self.game_creation = info.get("gameCreation", 0)
+        self.game_end_ts = info.get("gameEndTimestamp")
+
+        self.team_participants = [p for p in self.participants if p.get("teamId") == self.team_id]
+        self.enemy_participants = [p for p in self.participants if p.get("teamId") != self.team_id]
+
+        self.team_kills = sum(p.get("kills", 0) for p in self.team_participants)
+        self.enemy_kills = sum(p.get("kills", 0) for p in self.enemy_participants)
+        self.team_damage = sum(p.get("totalDamageDealtToChampions", 0) for p in self.team_participants)
+        self.team_gold = sum(p.get("goldEarned", 0) for p in self.team_participants)
+        self.enemy_gold = sum(p.get("goldEarned", 0) for p in self.enemy_participants)
+
+        my_pos = self_p.get("teamPosition")
+        self.lane_opponent: Optional[Dict[str, Any]] = None
+        if my_pos:
+            self.lane_opponent = next(
+                (p for p in self.enemy_participants if p.get("teamPosition") == my_pos), None
+            )
+
+    def __repr__(self) -> str:
+        return f"MatchFeatures({self.match_id!r}, {self.champion!r}, {self.role!r})"
+
+
+def build_match_features(matches: List[Dict[str, Any]], puuid: str) -> List[MatchFeatures]:
+    """Visit each match once. Matches without this player are skipped (with a warning)."""
+    features: List[MatchFeatures] = []
+    for match in matches:
+        if not match:
+            continue
+        try:
+            features.append(MatchFeatures(match, puuid))
+        except Exception as e:
+            mid = (match.get("metadata") or {}).get("matchId", "?")
+            print(f"[Features] Skipping match {mid}: {e}")
+    return features
+
+
+def current_season(features: List[MatchFeatures]) -> str:
+    """Season of the most recent game (matches are ordered newest first)."""
+    if features and features[0].game_version:
+        return features[0].season
+    return DEFAULT_SEASON
@@ -0,0 +1,159 @@
+"""
+match_replay.py
+
+Replay data for the dashboard's timeline map and gold/XP graph, built on demand.
+
+The analysis pipeline drops all_positions and all_gold_xp_series from each
+movement summary to keep analysis documents small. When a user opens a match's
+Timeline tab, /api/matches/<match_id>/replay/ rebuilds those two series from the
+cached match and timeline (analyze_timeline_movement with REPLAY_FEATURES) and
+returns them.
+
+Results are cached per match (LRU, REPLAY_CACHE_SIZE entries). Timelines of
+finished games never change, so a cache entry never goes stale. Entries are
+stored as encoded JSON bytes, so a cache hit skips serialization as well.
+
+With ?encoding=q1 each per-participant series is packed into integer columns
+(series_lod.encode_series). Timestamps are delta-coded ms and coordinates and
+values are int16. This makes the payload about 4x smaller, and the dashboard
+decodes it in utils/series.js.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import fast_json
+from series_lod import ENCODING, encode_series
+from timeline_analyzer import REPLAY_FEATURES, analyze_timeline_movement
+
+
+REPLAY_CACHE_SIZE = int(os.getenv("REPLAY_CACHE_SIZE", "32"))
+
+
+GOLD_XP_FIELDS = ("total_gold", "xp", "level", "minions_killed")
+
+# match-v5 IDs: platform + "_" + game ID, e.g. NA1_5012345678
+MATCH_ID_RE = re.compile(r"^[A-Za-z0-9]{2,8}_\d{1,20}$")
+
+
+class ReplayRequestError(ValueError):
+    """A replay request with a malformed match ID or an unknown encoding (the client's fault)."""
+
+
+def validate_replay_request(match_id: str, encoding: Optional[str] = None) -> None:
+    """Raise ReplayRequestError unless the request names a match-v5 ID and a known encoding."""
+    if not MATCH_ID_RE.match(match_id or ""):
+        raise ReplayRequestError(f"Invalid match ID: {match_id!r}")
+    if encoding not in (None, ENCODING):
+        raise ReplayRequestError(f"Unknown replay encoding: {encoding}")
+
+
+def build_replay(match_id: str, match: Dict[str, Any], timeline: Dict[str, Any],
+                 encoding: Optional[str] = None) -> Dict[str, Any]:
+    """All-participant positions and gold/XP series from a match-v5 match + timeline."""
+    # The replay series cover every participant; any of them anchors the movement context
+    participants = (match.get("metadata") or {}).get("participants") or [""]
+    movement = analyze_timeline_movement(match, timeline, participants[0], features=REPLAY_FEATURES)
+    all_positions = movement["all_positions"]
+    all_gold_xp_series = movement["all_gold_xp_series"]
+
+    if encoding == ENCODING:
+        all_positions = {
+            pid: encode_series(series, "t", ("x", "y")) for pid, series in all_positions.items()
+        }
+        all_gold_xp_series = {
+            pid: encode_series(series, "time_min", GOLD_XP_FIELDS) for pid, series in all_gold_xp_series.items()
+        }
+
+    return {
+        "match_id": match_id,
+        "encoding": encoding,
+        "all_positions": all_positions,
+        "all_gold_xp_series": all_gold_xp_series,
+    }
+
+
+class ReplayCache:
+    """Process-wide LRU of encoded replay payloads, keyed by (match ID, encoding)."""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(ReplayCache, cls).__new__(cls)
+                cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], bytes]" = OrderedDict()
+        self.max_entries = max(1, REPLAY_CACHE_SIZE)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, Optional[str]]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Tuple[str, Optional[str]], body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def get_replay_json(match_id: str, db=None, encoding: Optional[str] = None) -> Optional[bytes]:
+    """
+    Encoded replay payload for a match, or None if its match or timeline isn't cached.
+
+    Both are read from the Database store only. This never calls
+    the Riot API, so opening the map can't use up fetch quota. A malformed
+    match ID or encoding raises ReplayRequestError.
+    """
+    validate_replay_request(match_id, encoding)
+
+    key = (match_id, encoding)
+    cache = ReplayCache()
+    body = cache.get(key)
+    if body is not None:
+        return body
+
+    if db is None:
+        from database import Database
+        db = Database()
+
+    timeline = db.get_timeline(match_id)
+    if not timeline:
+        return None
+    match = db.get_match(match_id)
+    if not match:
+        return None
+
+    replay = build_replay(match_id, match, timeline, encoding=encoding)
+    del timeline, match
+    body = fast_json.dumps(replay)
+    cache.put(key, body)
+    return body
+
+
+def get_replay(match_id: str, db=None) -> Optional[Dict[str, Any]]:
+    """Decoded replay payload (for server-side consumers such as the deep dive)."""
+    body = get_replay_json(match_id, db=db)
+    return fast_json.loads(body) if body is not None else None
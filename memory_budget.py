@@ -0,0 +1,281 @@
+"""
+memory_budget.py
+
+Per-job memory accounting for the analysis pipeline.
+
+    budget = MemoryBudget(riot_id)
+    budget.checkpoint("fetch_matches", matches=matches)    # estimate what the stage holds
+    summaries = SpillList(budget, "movement_summaries", SpillStore(db))
+    summaries.append(summary)                               # spills once over budget
+
+The pipeline used to keep every match, timeline result and the full payload in
+memory and relied on ad-hoc gc.collect() calls to stay under the 512MB web
+instance. MemoryBudget keeps a per-account byte estimate (estimate_size) and
+compares it with PIPELINE_MEMORY_BUDGET_MB (default 384, 0 disables). It also
+compares the process RSS growth since the job started, which catches anything
+the estimates miss.
+
+When the budget is exceeded, SpillList writes items to a SpillStore and keeps
+only their IDs and a light copy. The store is the spills collection when the
+DB is connected, and a temp dir otherwise. Spills are keyed by job (one
+pipeline run) and match, because movement summaries are per player: two
+concurrent analyses of players from the same game must not see each other's.
+close() deletes the job's spills. Readers load spilled items back one at a time.
+A large match_count therefore costs extra store round-trips instead of
+getting the worker OOM-killed.
+
+Estimates are approximate: long containers are extrapolated from a sample of
+their elements.
+"""
+
+from __future__ import annotations
+
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from pipeline_trace import count
+
+
+MEMORY_BUDGET_MB = float(os.getenv("PIPELINE_MEMORY_BUDGET_MB", "384"))
+SAMPLE_ITEMS = 24
+MB = 1024 * 1024
+
+
+def estimate_size(obj: Any, sample: int = SAMPLE_ITEMS) -> int:
+    """Approximate deep size of a JSON-like structure (dicts, lists, scalars, __slots__ records), in bytes."""
+    seen: set = set()
+
+    def walk(o: Any) -> int:
+        if isinstance(o, (dict, list, tuple)):
+            if id(o) in seen:
+                return 0
+            seen.add(id(o))
+            size = sys.getsizeof(o)
+            n = len(o)
+            if n == 0:
+                return size
+            if isinstance(o, dict):
+                pairs = list(o.items()) if n <= sample else [kv for kv, _ in zip(o.items(), range(sample))]
+                part = sum(walk(k) + walk(v) for k, v in pairs)
+                return size + part * n // len(pairs)
+            if n <= sample:
+                return size + sum(walk(v) for v in o)
+            step = n / sample
+            return size + sum(walk(o[int(i * step)]) for i in range(sample)) * n // sample
+        slots = getattr(type(o), "__slots__", None)
+        if slots and not isinstance(o, type):
+            # __slots__ records (e.g. compact_participants.ParticipantRow)
+            if id(o) in seen:
+                return 0
+            seen.add(id(o))
+            return sys.getsizeof(o) + sum(walk(getattr(o, name, None)) for name in slots)
+        return sys.getsizeof(o)
+
+    return walk(obj)
+
+
+def process_rss() -> Optional[int]:
+    """Current resident set size in bytes (Linux), else None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class MemoryBudget:
+    """Byte estimates per named account, checked against a per-job limit."""
+
+    def __init__(self, job: str = "job", limit_mb: float = MEMORY_BUDGET_MB):
+        self.job = job
+        self.limit = int(limit_mb * MB) if limit_mb > 0 else 0
+        self.accounts: Dict[str, int] = {}
+        self.stages: List[Dict[str, Any]] = []
+        self.peak = 0
+        self.spilled = 0
+        self._rss0 = process_rss()
+
+    @property
+    def used(self) -> int:
+        return sum(self.accounts.values())
+
+    def rss_growth(self) -> Optional[int]:
+        rss = process_rss()
+        if rss is None or self._rss0 is None:
+            return None
+        return max(rss - self._rss0, 0)
+
+    def set(self, account: str, nbytes: int) -> None:
+        self.accounts[account] = nbytes
+        self.peak = max(self.peak, self.used)
+
+    def add(self, account: str, nbytes: int) -> None:
+        self.set(account, self.accounts.get(account, 0) + nbytes)
+
+    def release(self, account: str) -> None:
+        self.accounts.pop(account, None)
+
+    def over(self, extra: int = 0) -> bool:
+        """True if holding `extra` more bytes would exceed the budget."""
+        if not self.limit:
+            return False
+        if self.used + extra > self.limit:
+            return True
+        growth = self.rss_growth()
+        return growth is not None and growth + extra > self.limit
+
+    def checkpoint(self, stage: str, **holdings: Any) -> None:
+        """Re-estimate the given holdings (account=object), log the stage, and collect garbage if over budget."""
+        for account, obj in holdings.items():
+            self.set(account, estimate_size(obj))
+        collected = False
+        if self.over():
+            gc.collect()
+            collected = True
+        growth = self.rss_growth()
+        self.stages.append({
+            "stage": stage,
+            "estimated_mb": round(self.used / MB, 1),
+            "rss_growth_mb": round(growth / MB, 1) if growth is not None else None,
+            "gc": collected,
+        })
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "limit_mb": round(self.limit / MB, 1),
+            "peak_estimated_mb": round(self.peak / MB, 1),
+            "spilled": self.spilled,
+            "accounts_mb": {k: round(v / MB, 1) for k, v in self.accounts.items()},
+            "stages": self.stages,
+        }
+
+    def print_summary(self) -> None:
+        limit = f"{self.limit / MB:.0f}MB" if self.limit else "off"
+        print(f"[Memory] {self.job}: peak estimate {self.peak / MB:.1f}MB, budget {limit}, {self.spilled} items spilled")
+        for s in self.stages:
+            rss = f", rss +{s['rss_growth_mb']}MB" if s["rss_growth_mb"] is not None else ""
+            print(f"[Memory]   {s['stage']}: ~{s['estimated_mb']}MB{rss}{' (gc)' if s['gc'] else ''}")
+
+
+class SpillStore:
+    """Holds one job's spilled items: the spills collection when the DB is up, else a temp dir."""
+
+    def __init__(self, db: Any = None, job: Optional[str] = None, puuid: str = ""):
+        self.job = job or uuid.uuid4().hex[:16]
+        self.puuid = puuid
+        self.db = db if db is not None and getattr(db, "is_connected", False) else None
+        self._dir: Optional[Path] = None
+        self._db_keys = False
+
+    def _path(self, key: str) -> Path:
+        if self._dir is None:
+            self._dir = Path(tempfile.mkdtemp(prefix="league_spill_"))
+        return self._dir / (key.replace("/", "_") + ".bin")
+
+    def put(self, key: str, item: Dict[str, Any]) -> None:
+        if self.db is not None:
+            self.db.save_spill(self.job, key, self.puuid, item)
+            self._db_keys = True
+            return
+        from database import compress_blob
+        with open(self._path(key), "wb") as f:
+            f.write(compress_blob(item))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.db is not None:
+            return self.db.get_spill(self.job, key)
+        if self._dir is None:
+            return None
+        path = self._path(key)
+        if not path.exists():
+            return None
+        from database import decompress_blob
+        with open(path, "rb") as f:
+            return decompress_blob(f.read())
+
+    def close(self) -> None:
+        if self._db_keys:
+            try:
+                self.db.delete_spills(self.job)
+            except Exception as e:
+                print(f"[Memory] Failed to delete spills of job {self.job}: {e}")
+            self._db_keys = False
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+
+class SpillList:
+    """
+    Append-only list of per-match dicts (keyed by item[key]) that spills to a
+    SpillStore once the budget is exceeded. Iterating or get() returns the full
+    items, loading spilled ones back one at a time. light() returns the
+    in-memory view: full items that were never spilled and light copies of the
+    rest.
+    """
+
+    def __init__(self, budget: MemoryBudget, account: str, store: SpillStore,
+                 light: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None, key: str = "match_id"):
+        self.budget = budget
+        self.account = account
+        self.store = store
+        self.key = key
+        self._light = light or (lambda item: {key: item.get(key)})
+        self._order: List[str] = []
+        self._held: Dict[str, Dict[str, Any]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._light_items: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    @property
+    def spilled(self) -> int:
+        return len(self._light_items)
+
+    def _spill(self, k: str, item: Dict[str, Any]) -> None:
+        self.store.put(k, item)
+        self._light_items[k] = self._light(item)
+        self.budget.spilled += 1
+        count("mem_spilled")
+
+    def append(self, item: Dict[str, Any]) -> None:
+        k = item[self.key]
+        self._order.append(k)
+        size = estimate_size(item)
+        if not self.budget.over(size):
+            self._held[k] = item
+            self._sizes[k] = size
+            self.budget.add(self.account, size)
+            return
+        # Over budget: spill this item and evict held ones, oldest first
+        self._spill(k, item)
+        while self._held and self.budget.over():
+            old_k = next(iter(self._held))
+            self._spill(old_k, self._held.pop(old_k))
+            self.budget.add(self.account, -self._sizes.pop(old_k))
+
+    def get(self, k: str) -> Optional[Dict[str, Any]]:
+        if k in self._held:
+            return self._held[k]
+        if k in self._light_items:
+            return self.store.get(k)
+        return None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for k in self._order:
+            item = self.get(k)
+            if item is not None:
+                yield item
+
+    def light(self) -> List[Dict[str, Any]]:
+        return [self._held.get(k) or self._light_items[k] for k in self._order]
+
+    def close(self) -> None:
+        self.store.close()
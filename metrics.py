@@ -0,0 +1,325 @@
+"""
+metrics.py
+
+Prometheus metrics for the backend, served at /api/metrics/.
+
+    riot_request_seconds{endpoint,status}   Riot API latency (histogram)
+    riot_throttled_total{endpoint}          429 responses
+    riot_sleep_seconds_total{reason}        time spent waiting on quota (scheduler) or Retry-After
+    db_operation_seconds{method}            Database method latency (histogram)
+    cache_requests_total{cache,result}      hit/miss for match, timeline, ai_prompt, static_data
+    pipeline_stage_seconds{stage}           pipeline stage durations, from the run's trace
+    fetch_queue_depth                       backfill queue length
+    analyses_in_flight                      pipeline runs currently executing
+
+With prometheus_client installed, the metrics are multiprocess-safe. Set
+PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does) and every worker writes
+its samples there, and a scrape of any worker aggregates all of them.
+Without prometheus_client, a minimal in-process registry renders the same
+names in the text format. That covers a single dev server, but each gunicorn
+worker then only reports its own samples.
+
+Outside DEBUG the endpoint needs PIPELINE_ADMIN_TOKEN, sent as X-Admin-Token
+or "Authorization: Bearer <token>" (Prometheus' `authorization` scrape option).
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    HAVE_PROMETHEUS = True
+except ImportError:
+    HAVE_PROMETHEUS = False
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Riot paths -> low-cardinality endpoint labels (IDs never end up in a label)
+RIOT_ENDPOINTS: Tuple[Tuple[str, "re.Pattern[str]"], ...] = tuple((name, re.compile(pattern)) for name, pattern in (
+    ("account-v1.by-riot-id", r"^/riot/account/v1/accounts/by-riot-id/"),
+    ("account-v1.by-puuid", r"^/riot/account/v1/accounts/by-puuid/"),
+    ("summoner-v4.by-puuid", r"^/lol/summoner/v4/summoners/by-puuid/"),
+    ("league-v4.by-puuid", r"^/lol/league/v4/entries/by-puuid/"),
+    ("champion-mastery-v4", r"^/lol/champion-mastery/v4/"),
+    ("match-v5.ids", r"^/lol/match/v5/matches/by-puuid/[^/]+/ids$"),
+    ("match-v5.timeline", r"^/lol/match/v5/matches/[^/]+/timeline$"),
+    ("match-v5.match", r"^/lol/match/v5/matches/[^/]+$"),
+))
+
+
+# ---------------------------------------------------------------------------
+# Minimal fallback registry (same call surface as prometheus_client's)
+# ---------------------------------------------------------------------------
+
+if not HAVE_PROMETHEUS:
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+    class _Metric:
+        kind = "untyped"
+
+        def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), **kwargs: Any):
+            self.name = name
+            self.documentation = documentation
+            self.labelnames = tuple(labelnames)
+            self._lock = threading.Lock()
+            self._children: Dict[Tuple[str, ...], Any] = {}
+            self._kwargs = kwargs
+            _FALLBACK_METRICS.append(self)
+
+        def labels(self, *values: Any, **kv: Any) -> "_Metric":
+            key = tuple(str(v) for v in values) if values else tuple(str(kv[n]) for n in self.labelnames)
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+            return child
+
+        def _new_child(self) -> Any:
+            # An untyped metric holds one settable value, rendered without a suffix
+            return _GaugeChild()
+
+        # Unlabelled metrics are used directly
+        def inc(self, amount: float = 1) -> None:
+            self.labels().inc(amount)
+
+        def dec(self, amount: float = 1) -> None:
+            self.labels().dec(amount)
+
+        def set(self, value: float) -> None:
+            self.labels().set(value)
+
+        def observe(self, value: float) -> None:
+            self.labels().observe(value)
+
+        def _samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+            with self._lock:
+                children = list(self._children.items())
+            if not self.labelnames and not children:
+                children = [((), self.labels())]
+            out = []
+            for key, child in children:
+                labels = dict(zip(self.labelnames, key))
+                out.extend((self.name + suffix, {**labels, **extra}, value) for suffix, extra, value in child.samples())
+            return out
+
+    class _Value:
+        def __init__(self):
+            self.value = 0.0
+            self._lock = threading.Lock()
+
+        def inc(self, amount: float = 1) -> None:
+            with self._lock:
+                self.value += amount
+
+        def dec(self, amount: float = 1) -> None:
+            self.inc(-amount)
+
+        def set(self, value: float) -> None:
+            with self._lock:
+                self.value = float(value)
+
+    class _CounterChild(_Value):
+        def samples(self):
+            return [("_total", {}, self.value)]
+
+    class _GaugeChild(_Value):
+        def samples(self):
+            return [("", {}, self.value)]
+
+    class _HistogramChild:
+        def __init__(self, buckets: Tuple[float, ...]):
+            self.buckets = tuple(buckets) + (float("inf"),)
+            self.counts = [0] * len(self.buckets)
+            self.sum = 0.0
+            self._lock = threading.Lock()
+
+        def observe(self, value: float) -> None:
+            with self._lock:
+                self.sum += value
+                for i, bound in enumerate(self.buckets):
+                    if value <= bound:
+                        self.counts[i] += 1
+                        break
+
+        def samples(self):
+            out, running = [], 0
+            for bound, n in zip(self.buckets, self.counts):
+                running += n
+                out.append(("_bucket", {"le": "+Inf" if bound == float("inf") else repr(bound)}, running))
+            out.append(("_count", {}, running))
+            out.append(("_sum", {}, self.sum))
+            return out
+
+    class Counter(_Metric):
+        kind = "counter"
+
+        def _new_child(self):
+            return _CounterChild()
+
+    class Gauge(_Metric):
+        kind = "gauge"
+
+    class Histogram(_Metric):
+        kind = "histogram"
+
+        def _new_child(self):
+            return _HistogramChild(self._kwargs.get("buckets", LATENCY_BUCKETS))
+
+    _FALLBACK_METRICS: List[_Metric] = []
+
+    def _escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    def _render_fallback() -> bytes:
+        lines: List[str] = []
+        for metric in _FALLBACK_METRICS:
+            name = metric.name + ("_total" if metric.kind == "counter" else "")
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for sample_name, labels, value in metric._samples():
+                label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{sample_name}{{{label_str}}} {value}" if label_str else f"{sample_name} {value}")
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# ---------------------------------------------------------------------------
+# Metric definitions
+# ---------------------------------------------------------------------------
+
+RIOT_REQUEST_SECONDS = Histogram(
+    "riot_request_seconds", "Riot API request latency", ("endpoint", "status"), buckets=LATENCY_BUCKETS,
+)
+RIOT_THROTTLED = Counter("riot_throttled", "Riot API 429 responses", ("endpoint",))
+RIOT_SLEEP_SECONDS = Counter("riot_sleep_seconds", "Seconds spent waiting before Riot requests", ("reason",))
+DB_OPERATION_SECONDS = Histogram(
+    "db_operation_seconds", "Database method latency", ("method",), buckets=LATENCY_BUCKETS,
+)
+CACHE_REQUESTS = Counter("cache_requests", "Cache lookups by result", ("cache", "result"))
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds", "Analysis pipeline stage duration", ("stage",), buckets=STAGE_BUCKETS,
+)
+if HAVE_PROMETHEUS:
+    FETCH_QUEUE_DEPTH = Gauge("fetch_queue_depth", "Backfill queue length", multiprocess_mode="max")
+    ANALYSES_IN_FLIGHT = Gauge("analyses_in_flight", "Pipeline runs currently executing", multiprocess_mode="livesum")
+else:
+    FETCH_QUEUE_DEPTH = Gauge("fetch_queue_depth", "Backfill queue length")
+    ANALYSES_IN_FLIGHT = Gauge("analyses_in_flight", "Pipeline runs currently executing")
+
+
+# ---------------------------------------------------------------------------
+# Recording helpers
+# ---------------------------------------------------------------------------
+
+
+def riot_endpoint(path: str) -> str:
+    for name, pattern in RIOT_ENDPOINTS:
+        if pattern.search(path):
+            return name
+    return "other"
+
+
+def observe_riot_request(path: str, status: Any, seconds: float) -> None:
+    RIOT_REQUEST_SECONDS.labels(riot_endpoint(path), str(status)).observe(seconds)
+
+
+def count_riot_throttle(path: str, retry_after: float) -> None:
+    RIOT_THROTTLED.labels(riot_endpoint(path)).inc()
+    RIOT_SLEEP_SECONDS.labels("retry_after").inc(retry_after)
+
+
+def add_riot_sleep(seconds: float, reason: str = "quota") -> None:
+    if seconds > 0:
+        RIOT_SLEEP_SECONDS.labels(reason).inc(seconds)
+
+
+def cache_result(cache: str, hit: bool, n: int = 1) -> None:
+    if n > 0:
+        CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc(n)
+
+
+def set_queue_depth(depth: int) -> None:
+    FETCH_QUEUE_DEPTH.set(depth)
+
+
+@contextmanager
+def analysis_in_flight() -> Iterator[None]:
+    ANALYSES_IN_FLIGHT.inc()
+    try:
+        yield
+    finally:
+        ANALYSES_IN_FLIGHT.dec()
+
+
+def observe_trace(record: Dict[str, Any]) -> None:
+    """Feed a pipeline_trace record's stage spans (children of the root) into pipeline_stage_seconds."""
+    spans = record.get("spans") or []
+    roots = {s["id"] for s in spans if s.get("parent") is None}
+    totals: Dict[str, float] = {}
+    for s in spans:
+        if s.get("parent") is None:
+            totals["total"] = totals.get("total", 0.0) + s["wall_ms"]
+        elif s.get("parent") in roots:
+            totals[s["name"]] = totals.get(s["name"], 0.0) + s["wall_ms"]
+    for stage, ms in totals.items():
+        PIPELINE_STAGE_SECONDS.labels(stage).observe(ms / 1000.0)
+
+
+def timed_db_methods(cls):
+    """Class decorator: record every public method's latency in db_operation_seconds."""
+    for name, fn in list(vars(cls).items()):
+        if name.startswith("_") or not callable(fn) or isinstance(fn, (staticmethod, classmethod, property)):
+            continue
+
+        def wrap(fn, name=name):
+            histogram = DB_OPERATION_SECONDS.labels(name)
+
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - t0)
+            return timed
+        setattr(cls, name, wrap(fn))
+    return cls
+
+
+# ---------------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------------
+
+
+def render() -> Tuple[bytes, str]:
+    """(body, content type) for a scrape."""
+    if not HAVE_PROMETHEUS:
+        return _render_fallback(), CONTENT_TYPE_LATEST
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    from prometheus_client import REGISTRY
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """gunicorn child_exit hook: drop a dead worker's live gauges."""
+    if HAVE_PROMETHEUS and os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,286 @@
+"""
+pipeline_profiler.py
+
+On-demand profiling for one pipeline run, turned on with
+run_analysis_pipeline(profile=True) or the X-Profile-Pipeline header on
+/api/analyze/.
+
+While the run executes:
+    - a sampler thread snapshots the Python stack of every thread that has
+      one of the run's spans open (the run's own thread, plus pool threads
+      while they execute work submitted through tracer.bind) every
+      PIPELINE_PROFILE_INTERVAL_MS (default 5ms). Other requests served by
+      the same process aren't sampled. Each sample is filed under the
+      pipeline stage that was open at the time, so worker-pool threads count
+      toward the stage that submitted them.
+    - tracemalloc runs, and snapshots taken at each stage boundary give that
+      stage's net allocations, top allocating lines and peak traced memory.
+
+Stages are the tracer's top-level spans (children of the "pipeline" root).
+The profiler subscribes to the run's pipeline_trace.Tracer to see them open
+and close.
+
+Output, in saves/profiles/<job_id>/ (PIPELINE_PROFILE_DIR to override). The
+job_id is the run's trace_id:
+    stacks.folded     collapsed stacks "stage;file:func;... count", for
+                      flamegraph.pl, speedscope or inferno
+    allocations.json  per stage: net/peak traced memory and top allocators
+    trace.json        the run's Chrome trace (see pipeline_trace.chrome_trace)
+    summary.json      run attributes, per-stage samples/memory and the hottest
+                      functions
+
+Only the newest PIPELINE_PROFILE_KEEP profiles (default 20) are kept; older
+directories are deleted after each write (0 keeps everything).
+
+Both the sampler and tracemalloc slow the run down (tracemalloc the most), so
+this is strictly opt-in. Time spent taking snapshots is filed under
+"profiler_snapshot" rather than the stage, and is reported as snapshot_ms.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import fast_json
+from pipeline_trace import Span, Tracer, chrome_trace
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROFILE_DIR = Path(os.getenv("PIPELINE_PROFILE_DIR", str(SCRIPT_DIR / "saves" / "profiles")))
+SAMPLE_INTERVAL_S = float(os.getenv("PIPELINE_PROFILE_INTERVAL_MS", "5")) / 1000.0
+TRACEMALLOC_FRAMES = int(os.getenv("PIPELINE_PROFILE_MALLOC_FRAMES", "5"))
+PROFILE_KEEP = int(os.getenv("PIPELINE_PROFILE_KEEP", "20"))
+TOP_ALLOCATORS = 15
+MAX_STACK_DEPTH = 64
+
+# Only one run can own tracemalloc at a time
+_active_lock = threading.Lock()
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class PipelineProfiler:
+    """Sampling profiler + tracemalloc stage snapshots for one traced run."""
+
+    def __init__(self, tracer: Tracer, interval: float = SAMPLE_INTERVAL_S):
+        self.tracer = tracer
+        self.job_id = tracer.trace_id
+        self.interval = interval
+        self.out_dir = PROFILE_DIR / self.job_id
+        self.stacks: Counter = Counter()
+        self.stage_samples: Counter = Counter()
+        self.allocations: List[Dict[str, Any]] = []
+        self.sample_count = 0
+        self.snapshot_s = 0.0
+        self._stage = "setup"
+        self._root_id: Optional[int] = None
+        self._stage_snapshot: Optional[tracemalloc.Snapshot] = None
+        # Open spans of this run per thread ident; only those threads are sampled
+        self._open_spans: Counter = Counter()
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._owns_tracemalloc = False
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def __enter__(self) -> "PipelineProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        if _active_lock.acquire(blocking=False):
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                self._owns_tracemalloc = True
+            else:
+                _active_lock.release()
+        if not self._owns_tracemalloc:
+            print("[Profile] tracemalloc already in use; sampling stacks only.")
+        self.tracer.listeners.append(self)
+        self._thread = threading.Thread(target=self._sample_loop, name=f"profiler-{self.job_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self in self.tracer.listeners:
+            self.tracer.listeners.remove(self)
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+            _active_lock.release()
+
+    # -- tracer listener ---------------------------------------------------
+
+    def span_started(self, s: Span) -> None:
+        # Listeners run on the span's own thread
+        with self._threads_lock:
+            self._open_spans[threading.get_ident()] += 1
+        if s.parent is None and self._root_id is None:
+            self._root_id = s.id
+        elif s.parent == self._root_id:
+            if self._owns_tracemalloc:
+                # Snapshot cost lands inside the stage's span; keep it out of the stage's samples
+                self._stage = "profiler_snapshot"
+                t0 = time.perf_counter()
+                self._stage_snapshot = tracemalloc.take_snapshot()
+                tracemalloc.reset_peak()
+                self.snapshot_s += time.perf_counter() - t0
+            self._stage = s.name
+
+    def span_finished(self, s: Span) -> None:
+        ident = threading.get_ident()
+        with self._threads_lock:
+            self._open_spans[ident] -= 1
+            if self._open_spans[ident] <= 0:
+                del self._open_spans[ident]
+        if s.parent != self._root_id or s.parent is None:
+            return
+        if self._owns_tracemalloc and self._stage_snapshot is not None:
+            self._stage = "profiler_snapshot"
+            t0 = time.perf_counter()
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            diff = after.compare_to(self._stage_snapshot, "lineno")
+            self.allocations.append({
+                "stage": s.name,
+                "span_id": s.id,
+                "net_bytes": sum(d.size_diff for d in diff),
+                "traced_bytes": current,
+                "peak_bytes": peak,
+                "top": [
+                    {
+                        "where": f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+                        "size_diff": d.size_diff,
+                        "count_diff": d.count_diff,
+                        "size": d.size,
+                    }
+                    for d in diff[:TOP_ALLOCATORS] if d.size_diff > 0
+                ],
+            })
+            self._stage_snapshot = None
+            self.snapshot_s += time.perf_counter() - t0
+        self._stage = "between_stages"
+
+    # -- sampling ----------------------------------------------------------
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            stage = self._stage
+            with self._threads_lock:
+                idents = list(self._open_spans)
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                labels = []
+                while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if not labels:
+                    continue
+                labels.append(stage)
+                self.stacks[";".join(reversed(labels))] += 1
+                self.stage_samples[stage] += 1
+                self.sample_count += 1
+
+    # -- output ------------------------------------------------------------
+
+    def _top_functions(self, n: int = 25) -> List[Dict[str, Any]]:
+        self_counts: Counter = Counter()
+        for stack, c in self.stacks.items():
+            self_counts[stack.rsplit(";", 1)[-1]] += c
+        total = max(self.sample_count, 1)
+        return [{"function": f, "samples": c, "pct": round(100.0 * c / total, 2)} for f, c in self_counts.most_common(n)]
+
+    def write(self, record: Dict[str, Any]) -> Path:
+        """Write the profile artifacts next to each other and return the directory."""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.out_dir / "stacks.folded", "w", encoding="utf-8") as f:
+            for stack, c in self.stacks.most_common():
+                f.write(f"{stack} {c}\n")
+        fast_json.write_file(self.out_dir / "allocations.json", self.allocations, indent=True)
+        fast_json.write_file(self.out_dir / "trace.json", chrome_trace(record))
+
+        memory = {a["stage"]: a for a in self.allocations}
+        stages = [
+            {
+                "stage": s["name"],
+                "wall_ms": s["wall_ms"],
+                "samples": self.stage_samples.get(s["name"], 0),
+                "net_bytes": memory.get(s["name"], {}).get("net_bytes"),
+                "peak_bytes": memory.get(s["name"], {}).get("peak_bytes"),
+            }
+            for s in record.get("spans", []) if s["parent"] == self._root_id and s["parent"] is not None
+        ]
+        summary = {
+            "job_id": self.job_id,
+            "created_at": record.get("started_at"),
+            "attrs": record.get("attrs", {}),
+            "total_ms": record.get("total_ms"),
+            "snapshot_ms": round(self.snapshot_s * 1000, 1),
+            "sample_interval_ms": self.interval * 1000,
+            "samples": self.sample_count,
+            "tracemalloc": bool(self.allocations),
+            "stages": stages,
+            "top_functions": self._top_functions(),
+        }
+        fast_json.write_file(self.out_dir / "summary.json", summary, indent=True)
+        print(f"[Profile] {self.sample_count} samples, {len(self.allocations)} stage snapshots -> {self.out_dir}")
+        prune_profiles()
+        return self.out_dir
+
+
+def prune_profiles(keep: int = PROFILE_KEEP) -> int:
+    """Delete all but the newest `keep` profile directories. Returns how many were removed."""
+    if keep <= 0 or not PROFILE_DIR.exists():
+        return 0
+    dirs = sorted((d for d in PROFILE_DIR.iterdir() if d.is_dir()), key=lambda d: d.stat().st_mtime, reverse=True)
+    removed = 0
+    for d in dirs[keep:]:
+        try:
+            shutil.rmtree(d)
+            removed += 1
+        except OSError as e:
+            print(f"[Profile] Could not remove old profile {d.name}: {e}")
+    return removed
+
+
+def list_profiles(limit: int = 20) -> List[Dict[str, Any]]:
+    """Newest-first summaries of stored profiles."""
+    if not PROFILE_DIR.exists():
+        return []
+    dirs = sorted((d for d in PROFILE_DIR.iterdir() if (d / "summary.json").exists()),
+                  key=lambda d: d.stat().st_mtime, reverse=True)
+    out = []
+    for d in dirs[:limit]:
+        try:
+            summary = fast_json.read_file(d / "summary.json")
+        except (OSError, ValueError):
+            continue
+        summary.pop("top_functions", None)
+        summary["files"] = sorted(p.name for p in d.iterdir() if p.is_file())
+        out.append(summary)
+    return out
+
+
+def profile_file(job_id: str, name: str) -> Optional[Path]:
+    """Path of one artifact of a stored profile, or None (rejects path tricks)."""
+    if not job_id.isalnum() or name not in ("stacks.folded", "allocations.json", "trace.json", "summary.json"):
+        return None
+    path = PROFILE_DIR / job_id / name
+    return path if path.exists() else None
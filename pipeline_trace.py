@@ -0,0 +1,272 @@
+"""
+pipeline_trace.py
+
+Nested timing spans for one pipeline run.
+
+    tracer = Tracer("analysis", riot_id=riot_id)
+    with tracer.activate():
+        with span("fetch_ids"):
+            ...
+            count("riot_calls")
+
+Each span records:
+    - wall time and thread CPU time
+    - its attributes
+    - counters added while it was the innermost open span on that thread
+      (riot_calls, riot_429, riot_wait_s, bytes_read, match_cache_hit/miss,
+      timeline_cache_hit/miss, ...)
+
+Library code (RiotClient, Database) calls the module-level count(). That is a
+no-op unless a tracer is active on the calling thread, so nothing changes for
+scripts that don't trace.
+
+Worker threads don't inherit the active tracer. Submit work through
+tracer.bind(fn, "name") to run each call as a child span of the submitting
+span, on its own thread lane.
+
+Listeners (e.g. pipeline_profiler.PipelineProfiler) appended to
+tracer.listeners get span_started(span) / span_finished(span) calls.
+
+Output:
+    tracer.to_dict()        compact record, stored on the analysis document
+    chrome_trace(record)    Chrome trace-event JSON (chrome://tracing, Perfetto)
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+_local = threading.local()
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "attrs", "counters", "thread", "start", "wall", "cpu", "open", "_cpu0")
+
+    def __init__(self, span_id: int, parent: Optional[int], name: str, attrs: Dict[str, Any], thread: int, start: float):
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.counters: Dict[str, float] = {}
+        self.thread = thread
+        self.start = start
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.open = True
+        self._cpu0 = time.thread_time()
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        # A span still open (e.g. the root, when the record is saved mid-run) reports time so far
+        wall = now - self.start if self.open else self.wall
+        return {
+            "id": self.id,
+            "parent": self.parent,
+            "name": self.name,
+            "thread": self.thread,
+            "start_ms": round(self.start * 1000, 3),
+            "wall_ms": round(wall * 1000, 3),
+            "cpu_ms": round(self.cpu * 1000, 3),
+            "attrs": self.attrs,
+            "counters": {k: (round(v, 4) if isinstance(v, float) else v) for k, v in self.counters.items()},
+        }
+
+
+class Tracer:
+    """Collects the spans of one run. Thread-safe; spans nest per thread."""
+
+    def __init__(self, name: str = "pipeline", **attrs: Any):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._threads: Dict[int, int] = {}
+        self.spans: List[Span] = []
+        self.listeners: List[Any] = []
+
+    # -- thread-local state ------------------------------------------------
+
+    def _stack(self) -> List[Span]:
+        stacks = getattr(_local, "stacks", None)
+        if stacks is None:
+            stacks = _local.stacks = {}
+        return stacks.setdefault(self.trace_id, [])
+
+    def _thread_lane(self) -> int:
+        ident = threading.get_ident()
+        with self._lock:
+            if ident not in self._threads:
+                self._threads[ident] = len(self._threads)
+            return self._threads[ident]
+
+    @contextmanager
+    def activate(self) -> Iterator["Tracer"]:
+        """Make this the tracer span()/count() report to on the current thread."""
+        previous = getattr(_local, "tracer", None)
+        _local.tracer = self
+        try:
+            yield self
+        finally:
+            _local.tracer = previous
+
+    # -- spans -------------------------------------------------------------
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attrs: Any) -> Iterator[Span]:
+        stack = self._stack()
+        if parent is None and stack:
+            parent = stack[-1]
+        s = Span(next(self._ids), parent.id if parent else None, name, attrs,
+                 self._thread_lane(), time.perf_counter() - self._t0)
+        with self._lock:
+            self.spans.append(s)
+        stack.append(s)
+        for listener in self.listeners:
+            listener.span_started(s)
+        try:
+            yield s
+        finally:
+            s.wall = time.perf_counter() - self._t0 - s.start
+            s.cpu = time.thread_time() - s._cpu0
+            s.open = False
+            stack.pop()
+            for listener in self.listeners:
+                listener.span_finished(s)
+            if not stack:
+                # Pool threads outlive the run; don't keep an empty stack per trace
+                _local.stacks.pop(self.trace_id, None)
+
+    def current(self) -> Optional[Span]:
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def count(self, key: str, n: float = 1) -> None:
+        s = self.current()
+        if s is not None:
+            s.counters[key] = s.counters.get(key, 0) + n
+
+    def bind(self, fn: Callable[..., Any], name: str, **attrs: Any) -> Callable[..., Any]:
+        """Wrap fn so each call, on whatever thread, is a child span of the current span."""
+        parent = self.current()
+
+        def traced(*args, **kwargs):
+            previous = getattr(_local, "tracer", None)
+            _local.tracer = self
+            try:
+                with self.span(name, parent=parent, **attrs):
+                    return fn(*args, **kwargs)
+            finally:
+                _local.tracer = previous
+        return traced
+
+    # -- output ------------------------------------------------------------
+
+    def totals(self) -> Dict[str, float]:
+        """Counters summed over every span."""
+        out: Dict[str, float] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for s in spans:
+            for k, v in s.counters.items():
+                out[k] = out.get(k, 0) + v
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        now = time.perf_counter() - self._t0
+        with self._lock:
+            spans = [s.to_dict(now) for s in self.spans]
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attrs": self.attrs,
+            "started_at": self.started_at,
+            "total_ms": round(now * 1000, 3),
+            "totals": {k: (round(v, 4) if isinstance(v, float) else v) for k, v in self.totals().items()},
+            "spans": spans,
+        }
+
+    def print_summary(self, max_depth: int = 3) -> None:
+        """One line per span up to max_depth; repeated child spans are folded into one line."""
+        record = self.to_dict()
+        children: Dict[Optional[int], List[Dict[str, Any]]] = {}
+        for s in record["spans"]:
+            children.setdefault(s["parent"], []).append(s)
+
+        def walk(parent: Optional[int], depth: int) -> None:
+            groups: Dict[str, List[Dict[str, Any]]] = {}
+            for s in children.get(parent, []):
+                groups.setdefault(s["name"], []).append(s)
+            for name, group in groups.items():
+                wall = sum(s["wall_ms"] for s in group)
+                cpu = sum(s["cpu_ms"] for s in group)
+                label = f"{name} x{len(group)}" if len(group) > 1 else name
+                print(f"[Trace] {'  ' * depth}{label}: {wall / 1000:.2f}s wall, {cpu / 1000:.2f}s cpu")
+                if depth + 1 < max_depth and len(group) == 1:
+                    walk(group[0]["id"], depth + 1)
+
+        print(f"[Trace] {self.name} {record['trace_id']}: {record['total_ms'] / 1000:.2f}s total")
+        walk(None, 0)
+        if record["totals"]:
+            print("[Trace] " + ", ".join(f"{k}={v}" for k, v in sorted(record["totals"].items())))
+
+
+# ---------------------------------------------------------------------------
+# Module-level helpers (no-ops when no tracer is active on this thread)
+# ---------------------------------------------------------------------------
+
+
+def current_tracer() -> Optional[Tracer]:
+    return getattr(_local, "tracer", None)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    tracer = current_tracer()
+    if tracer is None:
+        yield None
+        return
+    with tracer.span(name, **attrs) as s:
+        yield s
+
+
+def count(key: str, n: float = 1) -> None:
+    tracer = current_tracer()
+    if tracer is not None:
+        tracer.count(key, n)
+
+
+def bind(fn: Callable[..., Any], name: str, **attrs: Any) -> Callable[..., Any]:
+    """Tracer.bind on the active tracer; fn unchanged when there is none."""
+    tracer = current_tracer()
+    return tracer.bind(fn, name, **attrs) if tracer is not None else fn
+
+
+def chrome_trace(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Chrome trace-event JSON ("X" complete events, microseconds) from a to_dict() record."""
+    events: List[Dict[str, Any]] = [
+        {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"{record.get('name')} {record.get('trace_id')}"}},
+    ]
+    for s in record.get("spans", []):
+        events.append({
+            "name": s["name"],
+            "cat": "pipeline",
+            "ph": "X",
+            "pid": 1,
+            "tid": s["thread"],
+            "ts": round(s["start_ms"] * 1000),
+            "dur": round(s["wall_ms"] * 1000),
+            "args": {"cpu_ms": s["cpu_ms"], **s.get("attrs", {}), **s.get("counters", {})},
+        })
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"trace_id": record.get("trace_id"), "started_at": record.get("started_at"), **(record.get("attrs") or {})},
+    }
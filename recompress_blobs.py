@@ -0,0 +1,156 @@
+"""
+recompress_blobs.py
+
+Trains the zstd dictionaries and rewrites stored blobs with the current codec (see blob_codec).
+
+    python recompress_blobs.py train                  # train + store a dictionary per kind
+    python recompress_blobs.py run                    # re-encode every stale match/timeline once
+    python recompress_blobs.py run --loop             # keep going as a background worker
+    python recompress_blobs.py stats                  # documents per codec tag
+
+A document is stale when its "codec" tag differs from blob_codec.current_tag()
+for its kind. That covers legacy untagged zlib blobs, and every blob after a
+new dictionary is trained. Work goes in small batches with a pause between
+them (RECOMPRESS_BATCH, RECOMPRESS_PAUSE_S), so the job can run next to the
+web workers. Each pass pages through the stale documents by _id, so a
+document that fails to decode (or was rewritten in the meantime, which the
+conditional update in Database.replace_blob skips) doesn't hold up the rest;
+failures are retried on the next pass. A restart simply resumes from the
+remaining stale documents. `run --loop` is the background worker: run it as
+its own process next to gunicorn, not inside the web workers.
+
+Analyses (movement_summaries) are left alone: they are rewritten on every
+run and pick up the new codec then.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import blob_codec
+import fast_json
+
+
+# collection -> codec kind
+BLOB_COLLECTIONS = {"matches": "match", "timelines": "timeline"}
+TRAIN_SAMPLES = {"match": 1000, "timeline": 200}
+BATCH_SIZE = int(os.getenv("RECOMPRESS_BATCH", "200"))
+PAUSE_S = float(os.getenv("RECOMPRESS_PAUSE_S", "1.0"))
+IDLE_S = 600.0
+
+
+def train(db, kind: str, samples: Optional[int] = None) -> Optional[int]:
+    """Train a dictionary for `kind` from stored documents and make it active. Returns its id."""
+    collection = next(c for c, k in BLOB_COLLECTIONS.items() if k == kind)
+    docs = db.sample_blob_documents(collection, samples or TRAIN_SAMPLES[kind])
+    t0 = time.perf_counter()
+    data = blob_codec.train_dictionary(docs)
+    dict_id = db.save_compression_dict(kind, data, samples=len(docs))
+
+    # Report the gain on the training sample
+    zlib_bytes = sum(len(blob_codec.compress(fast_json.dumps(d), "zlib")) for d in docs)
+    new_bytes = sum(len(blob_codec.encode(d, kind)[0]) for d in docs)
+    print(f"[Recompress] {kind}: dictionary {dict_id} ({len(data) // 1024}KB) from {len(docs)} samples "
+          f"in {time.perf_counter() - t0:.1f}s; sample size {zlib_bytes // 1024}KB zlib -> {new_bytes // 1024}KB "
+          f"({100.0 * new_bytes / max(zlib_bytes, 1):.0f}%)")
+    return dict_id
+
+
+def recompress_batch(db, collection: str, limit: int = BATCH_SIZE, after: Any = None) -> Dict[str, Any]:
+    """Re-encode up to `limit` stale documents of one collection with _id > `after`.
+    stats["last"] is the cursor for the next page, None once the pass reached the end."""
+    kind = BLOB_COLLECTIONS[collection]
+    target = blob_codec.current_tag(kind)
+    stats: Dict[str, Any] = {"rewritten": 0, "skipped": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0,
+                             "last": None}
+    docs = db.find_stale_blobs(collection, target, limit, after=after)
+    if len(docs) >= limit:
+        stats["last"] = docs[-1]["_id"]
+    for doc in docs:
+        old = doc["compressed_data"]
+        try:
+            raw = blob_codec.decompress(old, doc.get("codec"))
+            blob = blob_codec.compress(raw, target)
+        except Exception as e:
+            print(f"[Recompress] {collection} {doc['_id']}: {e}")
+            stats["failed"] += 1
+            continue
+        if db.replace_blob(collection, doc["_id"], doc.get("codec"), blob, target):
+            stats["rewritten"] += 1
+            stats["bytes_before"] += len(old)
+            stats["bytes_after"] += len(blob)
+        else:
+            stats["skipped"] += 1
+    return stats
+
+
+def run(db, loop: bool = False, batch: int = BATCH_SIZE, pause: float = PAUSE_S,
+        stop: Optional[threading.Event] = None) -> None:
+    """One pass over every stale document; with loop=True start a new pass every IDLE_S."""
+    stop = stop or threading.Event()
+    cursors: Dict[str, Any] = {c: None for c in BLOB_COLLECTIONS}
+    done = set()
+    while not stop.is_set():
+        for collection in BLOB_COLLECTIONS:
+            if collection in done:
+                continue
+            stats = recompress_batch(db, collection, batch, after=cursors[collection])
+            cursors[collection] = stats["last"]
+            if stats["last"] is None:
+                done.add(collection)
+            if stats["rewritten"] or stats["skipped"] or stats["failed"]:
+                saved = stats["bytes_before"] - stats["bytes_after"]
+                print(f"[Recompress] {collection}: {stats['rewritten']} rewritten, {stats['skipped']} skipped, "
+                      f"{stats['failed']} failed, {saved // 1024}KB saved")
+            if stop.wait(pause):
+                return
+        if len(done) == len(BLOB_COLLECTIONS):
+            if not loop:
+                return
+            done.clear()
+            stop.wait(IDLE_S)
+
+
+def codec_stats(db) -> Dict[str, Dict[str, int]]:
+    out = {}
+    for collection in BLOB_COLLECTIONS:
+        col = db._get_collection(collection)
+        if col is None:
+            continue
+        out[collection] = {
+            str(row["_id"] or "zlib (untagged)"): row["n"]
+            for row in col.aggregate([{"$group": {"_id": "$codec", "n": {"$sum": 1}}}])
+        }
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train zstd dictionaries and recompress stored blobs.")
+    parser.add_argument("command", choices=("train", "run", "stats"))
+    parser.add_argument("--kind", choices=tuple(BLOB_COLLECTIONS.values()), help="train only this kind")
+    parser.add_argument("--samples", type=int, help="documents to train on")
+    parser.add_argument("--loop", action="store_true", help="keep running and pick up new stale documents")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    from database import Database
+    db = Database()
+    if not db.is_connected:
+        raise SystemExit("[Recompress] No database connection (MONGO_URI).")
+
+    if args.command == "train":
+        if blob_codec.zstandard is None:
+            raise SystemExit("[Recompress] zstandard is not installed.")
+        for kind in ([args.kind] if args.kind else BLOB_COLLECTIONS.values()):
+            train(db, kind, args.samples)
+    elif args.command == "run":
+        print("[Recompress] Target codecs: " + ", ".join(
+            f"{c}={blob_codec.current_tag(k)}" for c, k in BLOB_COLLECTIONS.items()))
+        run(db, loop=args.loop, batch=args.batch)
+    else:
+        for collection, tags in codec_stats(db).items():
+            print(f"[Recompress] {collection}: " + ", ".join(f"{t}={n}" for t, n in sorted(tags.items())))
@@ -1,14 +1,24 @@
+import os
 import time
 import requests
 from typing import List, Dict, Any, Optional
-from urllib.parse import quote
+from urllib.parse import quote, urlparse
 from analyzer_config import RIOT_API_KEY, REGION, PLATFORM
+from fetch_scheduler import get_scheduler, PRIORITY_INTERACTIVE
+from http_fixtures import make_session
+import fast_json
+from pipeline_trace import count
+import metrics
 
 
 HEADERS = {
     "X-Riot-Token": RIOT_API_KEY
 }
 
+# Send every call to one base URL instead of the regional Riot hosts,
+# e.g. the local simulator: RIOT_API_BASE_URL=http://127.0.0.1:8787
+RIOT_API_BASE_URL = os.getenv("RIOT_API_BASE_URL", "").rstrip("/")
+
 
 # Region Mapping
 # Maps User-Friendly Region Codes to (Platform, Routing)
@@ -42,11 +52,16 @@ class RiotClient:
     - Automatic retry on 429 or transient network errors
     - Queue filtering (solo = 420, flex = 440, or None = all queues)
     - Dynamic Region Support
+    - Shared quota: every call waits for a permit from the FetchScheduler,
+      so background backfill yields to interactive analyses
     """
 
-    def __init__(self, region_key: str = "NA") -> None:
-        self.session = requests.Session()
+    def __init__(self, region_key: str = "NA", priority: int = PRIORITY_INTERACTIVE) -> None:
+        # Plain Session unless HTTP_FIXTURE_MODE selects record/replay
+        self.session = make_session()
         self.session.headers.update(HEADERS)
+        self.priority = priority
+        self.scheduler = get_scheduler()
         
         # Default to NA/Americas if unknown
         config = REGION_MAPPING.get(region_key.upper(), REGION_MAPPING["NA"])
@@ -59,6 +74,9 @@ class RiotClient:
         self.base_lol_url = f"https://{self.platform}.api.riotgames.com"
         self.base_match_url = f"https://{self.region}.api.riotgames.com"
 
+        if RIOT_API_BASE_URL:
+            self.base_account_url = self.base_lol_url = self.base_match_url = RIOT_API_BASE_URL
+
     # -------------------------------
     # Internal GET helper with retries
     # -------------------------------
@@ -73,15 +91,30 @@ class RiotClient:
         """Centralized GET with basic retry and 429 handling."""
         max_attempts = 4
         backoff = 1.5
+        # Riot enforces limits per host (platform vs routing cluster)
+        parts = urlparse(url)
+        quota_key = parts.netloc
 
         for attempt in range(1, max_attempts + 1):
             try:
+                waited = self.scheduler.acquire(quota_key, self.priority)
+                count("riot_wait_s", waited)
+                metrics.add_riot_sleep(waited)
+
                 # print(f"[RiotClient] GET {url} (Attempt {attempt})...")
                 # Log to backend_debug.txt for absolute visibility
                 with open("backend_debug.txt", "a") as f:
                     f.write(f"[REQ] GET {url} (Attempt {attempt}) Params: {params}\n")
                 
-                resp = self.session.get(url, params=params, timeout=timeout)
+                t_req = time.perf_counter()
+                try:
+                    resp = self.session.get(url, params=params, timeout=timeout)
+                except requests.RequestException:
+                    metrics.observe_riot_request(parts.path, "error", time.perf_counter() - t_req)
+                    raise
+                metrics.observe_riot_request(parts.path, resp.status_code, time.perf_counter() - t_req)
+                count("riot_calls")
+                self.scheduler.learn_limits(resp.headers.get("X-App-Rate-Limit", ""))
                 
                 with open("backend_debug.txt", "a") as f:
                     f.write(f"[REQ] Status: {resp.status_code}\n")
@@ -89,13 +122,18 @@ class RiotClient:
                 # Handle Riot rate limits
                 if resp.status_code == 429:
                     retry_after = int(resp.headers.get("Retry-After", "2"))
+                    count("riot_429")
+                    count("riot_retry_after_s", retry_after)
+                    metrics.count_riot_throttle(parts.path, retry_after)
                     print(f"[RiotClient] Rate limited (429). Retrying in {retry_after}s...")
                     with open("backend_debug.txt", "a") as f:
                         f.write(f"[REQ] Rate Limit 429. Retry in {retry_after}\n")
-                    time.sleep(retry_after)
+                    # Pause the whole host, not just this thread; acquire() does the waiting
+                    self.scheduler.penalize(quota_key, retry_after)
                     continue
 
                 resp.raise_for_status()
+                count("riot_bytes", len(resp.content))
                 return resp
 
             except requests.RequestException as e:
@@ -133,19 +171,19 @@ class RiotClient:
         
         url = f"{self.base_account_url}/riot/account/v1/accounts/by-riot-id/{gn_enc}/{tl_enc}"
         r = self._get(url, timeout=10)
-        return r.json()
+        return fast_json.loads(r.content)
 
     def get_account_by_puuid(self, puuid: str) -> Dict[str, Any]:
         """Look up an account by PUUID (returns gameName, tagLine)."""
         url = f"{self.base_account_url}/riot/account/v1/accounts/by-puuid/{puuid}"
         r = self._get(url, timeout=10)
-        return r.json()
+        return fast_json.loads(r.content)
 
     def get_summoner_by_puuid(self, puuid: str) -> Dict[str, Any]:
         """Get Summoner-v4 data for a player by PUUID."""
         url = f"{self.base_lol_url}/lol/summoner/v4/summoners/by-puuid/{puuid}"
         r = self._get(url, timeout=10)
-        data = r.json()
+        data = fast_json.loads(r.content)
         
         # Note: 'id' (SummonerID) might be missing in some regions/responses.
         # Since we switched to checking Rank by PUUID, we no longer enforce 'id' presence.
@@ -187,7 +225,7 @@ class RiotClient:
 
             try:
                 r = self._get(url, params=params, timeout=10)
-                batch_ids = r.json()
+                batch_ids = fast_json.loads(r.content)
             except Exception as e:
                 print(f"[RiotClient] Failed to fetch match batch at start={start_index}: {e}")
                 break
@@ -204,40 +242,49 @@ class RiotClient:
                 
         return all_ids
 
-    def get_match(self, match_id: str) -> Dict[str, Any]:
-        """Fetch full match-v5 payload for a given match ID (Cached via MongoDB)."""
+    def get_match(self, match_id: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Fetch full match-v5 payload for a given match ID (Cached via MongoDB).
+
+        use_cache=False skips the DB probe when the caller already knows the
+        match isn't stored (e.g. the misses of Database.get_matches_bulk), so
+        the miss isn't counted twice. The fetched match is still saved.
+        """
         from database import Database
         db = Database()
         
         # 1. Try DB Cache
-        cached = db.get_match(match_id)
+        cached = db.get_match(match_id) if use_cache else None
         if cached:
             return cached
 
         # 2. Fetch Fresh
         url = f"{self.base_match_url}/lol/match/v5/matches/{match_id}"
         r = self._get(url, timeout=15)
-        data = r.json()
+        data = fast_json.loads(r.content)
         
         # 3. Save to DB
         db.save_match(data)
             
         return data
 
-    def get_match_timeline(self, match_id: str) -> Dict[str, Any]:
-        """Fetch match timeline for deeper analysis (Cached via MongoDB)."""
+    def get_match_timeline(self, match_id: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Fetch match timeline for deeper analysis (Cached via MongoDB).
+
+        use_cache=False skips the DB probe when the caller already knows the
+        timeline isn't stored (see get_match).
+        """
         from database import Database
         db = Database()
 
         # 1. Try DB Cache
-        cached = db.get_timeline(match_id)
+        cached = db.get_timeline(match_id) if use_cache else None
         if cached:
             return cached
 
         # 2. Fetch Fresh
         url = f"{self.base_match_url}/lol/match/v5/matches/{match_id}/timeline"
         r = self._get(url, timeout=15)
-        data = r.json()
+        data = fast_json.loads(r.content)
         
         # 3. Save to DB
         db.save_timeline(match_id, data)
@@ -253,7 +300,7 @@ class RiotClient:
         url = f"{self.base_lol_url}/lol/league/v4/entries/by-puuid/{puuid}"
         try:
             r = self._get(url, timeout=10)
-            return r.json()
+            return fast_json.loads(r.content)
         except Exception as e:
             # Handle 403 Forbidden or other errors gracefully
             if "403" in str(e):
@@ -268,6 +315,6 @@ class RiotClient:
         """Get all champion mastery entries sorted by number of champion points descending."""
         url = f"{self.base_lol_url}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}"
         r = self._get(url, timeout=10)
-        return r.json()
+        return fast_json.loads(r.content)
 
 
@@ -0,0 +1,419 @@
+"""
+riot_simulator.py
+
+Local stand-in for the Riot API, for load and rate-limit testing without
+touching the production key.
+
+Endpoints (same paths and query params as Riot):
+    /riot/account/v1/accounts/by-riot-id/{gameName}/{tagLine}
+    /riot/account/v1/accounts/by-puuid/{puuid}
+    /lol/summoner/v4/summoners/by-puuid/{puuid}
+    /lol/league/v4/entries/by-puuid/{puuid}
+    /lol/match/v5/matches/by-puuid/{puuid}/ids?start=&count=&queue=
+    /lol/match/v5/matches/{matchId}
+    /lol/match/v5/matches/{matchId}/timeline
+    /lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}
+
+Payloads come from recorded fixtures (http_fixtures store) when available and
+fall back to deterministic synthetic data.
+
+Rate limits are enforced per application and per method, on sliding windows.
+Responses carry X-App-Rate-Limit(-Count), X-Method-Rate-Limit(-Count) and, on
+429, Retry-After and X-Rate-Limit-Type, like the real API. Rejected calls don't
+count against the window.
+
+Point the pipeline at it:
+
+    python riot_simulator.py --port 8787 --latency lognormal:60,0.5 &
+    RIOT_API_BASE_URL=http://127.0.0.1:8787 python main.py ...
+
+The FetchScheduler picks up --app-limits from the X-App-Rate-Limit header.
+Set RIOT_RATE_LIMITS higher than --app-limits to override that and exercise
+the 429 path.
+Pipeline worker counts: RIOT_MATCH_FETCH_WORKERS / RIOT_TIMELINE_FETCH_WORKERS.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import fast_json
+from fetch_scheduler import parse_rate_limits
+from http_fixtures import FixtureStore, fixture_key
+
+
+# Development-key defaults
+DEFAULT_APP_LIMITS = "20:1,100:120"
+
+# Roughly the published per-method limits for a development key
+DEFAULT_METHOD_LIMITS: Dict[str, str] = {
+    "account-v1": "1000:60",
+    "summoner-v4": "1600:60",
+    "league-v4": "100:60",
+    "match-v5.ids": "2000:10",
+    "match-v5.match": "2000:10",
+    "match-v5.timeline": "2000:10",
+    "champion-mastery-v4": "20000:10,1200000:600",
+}
+
+
+# ---------------------------------------------------------------------------
+# Latency
+# ---------------------------------------------------------------------------
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Latency sampler (seconds) from a spec:
+        "0"                   none
+        "fixed:50"            50 ms
+        "uniform:20-120"      uniform between 20 and 120 ms
+        "lognormal:60,0.5"    median 60 ms, sigma 0.5 (long tail, like the real API)
+    """
+    spec = (spec or "0").strip()
+    kind, _, args = spec.partition(":")
+    try:
+        if kind == "fixed":
+            value = float(args) / 1000.0
+            return lambda rng: value
+        if kind == "uniform":
+            lo, hi = (float(v) / 1000.0 for v in args.split("-", 1))
+            return lambda rng: rng.uniform(lo, hi)
+        if kind == "lognormal":
+            median, sigma = (float(v) for v in args.split(",", 1))
+            mu = math.log(median / 1000.0)
+            return lambda rng: rng.lognormvariate(mu, sigma)
+        value = float(kind) / 1000.0
+        return lambda rng: value
+    except ValueError:
+        raise ValueError(f"Bad latency spec: {spec}")
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+
+
+class _Window:
+    """Sliding-window counters for one limit set ("20:1,100:120")."""
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        self.limits = parse_rate_limits(spec)
+        self.history: Deque[float] = deque()
+
+    def _prune(self, now: float) -> None:
+        longest = max((w for _, w in self.limits), default=0)
+        while self.history and now - self.history[0] >= longest:
+            self.history.popleft()
+
+    def retry_after(self, now: float) -> float:
+        """Seconds until a call would fit (0 if it fits now)."""
+        self._prune(now)
+        wait = 0.0
+        for count, window in self.limits:
+            in_window = [t for t in self.history if now - t < window]
+            if len(in_window) >= count:
+                wait = max(wait, window - (now - in_window[-count]))
+        return wait
+
+    def record(self, now: float) -> None:
+        self.history.append(now)
+
+    def counts_header(self, now: float) -> str:
+        self._prune(now)
+        return ",".join(
+            f"{sum(1 for t in self.history if now - t < window)}:{int(window)}"
+            for _, window in self.limits
+        )
+
+
+class RateLimiter:
+    def __init__(self, app_spec: str, method_specs: Dict[str, str]):
+        self._lock = threading.Lock()
+        self.app = _Window(app_spec)
+        self.methods = {name: _Window(spec) for name, spec in method_specs.items()}
+
+    def check(self, method: str) -> Tuple[Optional[Tuple[str, int]], Dict[str, str]]:
+        """Admit or reject a call. Returns ((limit_type, retry_after) or None, headers)."""
+        now = time.monotonic()
+        with self._lock:
+            method_window = self.methods.get(method)
+            rejected = None
+            app_wait = self.app.retry_after(now)
+            method_wait = method_window.retry_after(now) if method_window else 0.0
+            if app_wait > 0:
+                rejected = ("application", max(1, math.ceil(app_wait)))
+            elif method_wait > 0:
+                rejected = ("method", max(1, math.ceil(method_wait)))
+            else:
+                self.app.record(now)
+                if method_window:
+                    method_window.record(now)
+
+            headers = {
+                "X-App-Rate-Limit": self.app.spec,
+                "X-App-Rate-Limit-Count": self.app.counts_header(now),
+            }
+            if method_window:
+                headers["X-Method-Rate-Limit"] = method_window.spec
+                headers["X-Method-Rate-Limit-Count"] = method_window.counts_header(now)
+            return rejected, headers
+
+
+# ---------------------------------------------------------------------------
+# Payloads
+# ---------------------------------------------------------------------------
+
+
+def _seed_int(*parts: Any) -> int:
+    return int(hashlib.sha256(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:12], 16)
+
+
+class SyntheticSource:
+    """Deterministic stand-in payloads (same input -> same payload)."""
+
+    def __init__(self, seed: int = 0, history_size: int = 1000, platform: str = "NA1"):
+        self.seed = seed
+        self.history_size = history_size
+        self.platform = platform
+        # match ID -> the player whose history listed it, so that player is in the match
+        self._owners: Dict[str, str] = {}
+        self._owners_lock = threading.Lock()
+
+    def puuid_for(self, game_name: str, tag_line: str) -> str:
+        return hashlib.sha256(f"{game_name.lower()}#{tag_line.lower()}".encode("utf-8")).hexdigest()[:78]
+
+    def account(self, puuid: str, game_name: Optional[str] = None, tag_line: Optional[str] = None) -> Dict[str, Any]:
+        return {"puuid": puuid, "gameName": game_name or f"Sim{puuid[:6]}", "tagLine": tag_line or "SIM"}
+
+    def summoner(self, puuid: str) -> Dict[str, Any]:
+        return {"puuid": puuid, "profileIconId": 29, "revisionDate": 0, "summonerLevel": 100 + _seed_int(puuid) % 400}
+
+    def league_entries(self, puuid: str) -> List[Dict[str, Any]]:
+        rng = random.Random(_seed_int(self.seed, puuid, "league"))
+        wins, losses = rng.randint(20, 200), rng.randint(20, 200)
+        return [{
+            "queueType": "RANKED_SOLO_5x5", "tier": rng.choice(["SILVER", "GOLD", "PLATINUM", "EMERALD"]),
+            "rank": rng.choice(["I", "II", "III", "IV"]), "leaguePoints": rng.randint(0, 99),
+            "wins": wins, "losses": losses, "puuid": puuid,
+        }]
+
+    def match_ids(self, puuid: str, start: int, count: int) -> List[str]:
+        end = min(start + count, self.history_size)
+        base = 5_000_000_000 + _seed_int(puuid) % 1_000_000
+        ids = [f"{self.platform}_{base - i}" for i in range(start, end)]
+        with self._owners_lock:
+            for mid in ids:
+                self._owners.setdefault(mid, puuid)
+        return ids
+
+    def match(self, match_id: str) -> Dict[str, Any]:
+        from synthetic_matches import generate_match
+        return generate_match(match_id, seed=_seed_int(self.seed, match_id), puuid=self._owners.get(match_id))
+
+    def timeline(self, match_id: str) -> Dict[str, Any]:
+        from synthetic_matches import generate_timeline
+        return generate_timeline(self.match(match_id), seed=_seed_int(self.seed, match_id))
+
+    def mastery(self, puuid: str) -> List[Dict[str, Any]]:
+        rng = random.Random(_seed_int(self.seed, puuid, "mastery"))
+        champs = rng.sample(range(1, 900), 20)
+        return sorted(
+            [{"puuid": puuid, "championId": c, "championLevel": rng.randint(1, 40), "championPoints": rng.randint(1000, 900000)} for c in champs],
+            key=lambda m: m["championPoints"], reverse=True,
+        )
+
+
+class FixtureSource:
+    """Recorded responses (http_fixtures store), looked up by the real Riot URL."""
+
+    def __init__(self, store: FixtureStore, hosts: List[str]):
+        self.store = store
+        self.hosts = hosts
+
+    def lookup(self, path: str, params: Dict[str, str]) -> Optional[Tuple[int, bytes]]:
+        import base64
+        for host in self.hosts:
+            entry = self.store.load(fixture_key("GET", f"https://{host}{path}", params or None))
+            if entry is not None:
+                return entry["status"], base64.b64decode(entry.get("body") or "")
+        return None
+
+
+# (method name, compiled path pattern)
+ROUTES: List[Tuple[str, "re.Pattern[str]"]] = [
+    ("account-v1", re.compile(r"^/riot/account/v1/accounts/by-riot-id/(?P<game_name>[^/]+)/(?P<tag_line>[^/]+)$")),
+    ("account-v1", re.compile(r"^/riot/account/v1/accounts/by-puuid/(?P<puuid>[^/]+)$")),
+    ("summoner-v4", re.compile(r"^/lol/summoner/v4/summoners/by-puuid/(?P<puuid>[^/]+)$")),
+    ("league-v4", re.compile(r"^/lol/league/v4/entries/by-puuid/(?P<puuid>[^/]+)$")),
+    ("match-v5.ids", re.compile(r"^/lol/match/v5/matches/by-puuid/(?P<puuid>[^/]+)/ids$")),
+    ("match-v5.timeline", re.compile(r"^/lol/match/v5/matches/(?P<match_id>[^/]+)/timeline$")),
+    ("match-v5.match", re.compile(r"^/lol/match/v5/matches/(?P<match_id>[^/]+)$")),
+    ("champion-mastery-v4", re.compile(r"^/lol/champion-mastery/v4/champion-masteries/by-puuid/(?P<puuid>[^/]+)$")),
+]
+
+
+class RiotSimulator:
+    """Routing, rate limiting, latency and payload selection (HTTP-agnostic)."""
+
+    def __init__(
+        self,
+        synthetic: SyntheticSource,
+        fixtures: Optional[FixtureSource] = None,
+        limiter: Optional[RateLimiter] = None,
+        latency: Callable[[random.Random], float] = lambda rng: 0.0,
+        seed: int = 0,
+    ):
+        self.synthetic = synthetic
+        self.fixtures = fixtures
+        self.limiter = limiter
+        self.latency = latency
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "throttled": 0, "fixture_hits": 0}
+
+    def _synthetic_payload(self, method: str, groups: Dict[str, str], params: Dict[str, str]) -> Any:
+        src = self.synthetic
+        if method == "account-v1":
+            if "puuid" in groups:
+                return src.account(groups["puuid"])
+            name, tag = unquote(groups["game_name"]), unquote(groups["tag_line"])
+            return src.account(src.puuid_for(name, tag), name, tag)
+        if method == "summoner-v4":
+            return src.summoner(groups["puuid"])
+        if method == "league-v4":
+            return src.league_entries(groups["puuid"])
+        if method == "match-v5.ids":
+            start = int(params.get("start", 0))
+            count = min(int(params.get("count", 20)), 100)
+            return src.match_ids(groups["puuid"], start, count)
+        if method == "match-v5.match":
+            return src.match(groups["match_id"])
+        if method == "match-v5.timeline":
+            return src.timeline(groups["match_id"])
+        if method == "champion-mastery-v4":
+            return src.mastery(groups["puuid"])
+        return None
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Returns (status, headers, body)."""
+        with self._rng_lock:
+            self.stats["requests"] += 1
+            delay = self.latency(self._rng)
+        if delay > 0:
+            time.sleep(delay)
+
+        for method, pattern in ROUTES:
+            m = pattern.match(path)
+            if m:
+                break
+        else:
+            return 404, {}, b'{"status":{"message":"Data not found - no route","status_code":404}}'
+
+        headers: Dict[str, str] = {}
+        if self.limiter is not None:
+            rejected, headers = self.limiter.check(method)
+            if rejected is not None:
+                limit_type, retry_after = rejected
+                with self._rng_lock:
+                    self.stats["throttled"] += 1
+                headers.update({"Retry-After": str(retry_after), "X-Rate-Limit-Type": limit_type})
+                return 429, headers, b'{"status":{"message":"Rate limit exceeded","status_code":429}}'
+
+        if self.fixtures is not None:
+            hit = self.fixtures.lookup(path, params)
+            if hit is not None:
+                with self._rng_lock:
+                    self.stats["fixture_hits"] += 1
+                return hit[0], headers, hit[1]
+
+        payload = self._synthetic_payload(method, m.groupdict(), params)
+        if payload is None:
+            return 404, headers, b'{"status":{"message":"Data not found","status_code":404}}'
+        return 200, headers, fast_json.dumps(payload)
+
+
+def make_handler(sim: RiotSimulator):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+            status, headers, body = sim.handle(parts.path, params)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json;charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(sim: RiotSimulator, host: str = "127.0.0.1", port: int = 8787) -> ThreadingHTTPServer:
+    """Start the simulator on a daemon thread and return the server."""
+    server = ThreadingHTTPServer((host, port), make_handler(sim))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="riot-simulator", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Riot API simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--history-size", type=int, default=1000, help="match IDs available per player")
+    parser.add_argument("--app-limits", default=DEFAULT_APP_LIMITS, help='e.g. "20:1,100:120"; "" disables limits')
+    parser.add_argument("--method-limit", action="append", default=[], metavar="METHOD=SPEC",
+                        help='override one method limit, e.g. match-v5.match=500:10')
+    parser.add_argument("--latency", default="0", help='"fixed:50", "uniform:20-120" or "lognormal:60,0.5"')
+    parser.add_argument("--fixtures", default=None, help="http_fixtures store directory to serve recorded payloads from")
+    parser.add_argument("--fixture-hosts", default="americas.api.riotgames.com,na1.api.riotgames.com")
+    args = parser.parse_args()
+
+    method_specs = dict(DEFAULT_METHOD_LIMITS)
+    for override in args.method_limit:
+        name, _, spec = override.partition("=")
+        method_specs[name] = spec
+
+    limiter = RateLimiter(args.app_limits, method_specs) if args.app_limits else None
+    fixtures = None
+    if args.fixtures:
+        fixtures = FixtureSource(FixtureStore(args.fixtures), [h.strip() for h in args.fixture_hosts.split(",") if h.strip()])
+
+    sim = RiotSimulator(
+        SyntheticSource(seed=args.seed, history_size=args.history_size),
+        fixtures=fixtures,
+        limiter=limiter,
+        latency=parse_latency(args.latency),
+        seed=args.seed,
+    )
+    server = serve(sim, args.host, args.port)
+    print(f"[Simulator] Riot API simulator on http://{args.host}:{args.port} (limits: {args.app_limits or 'off'}, latency: {args.latency})")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"[Simulator] {sim.stats}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+series_lod.py
+
+Level-of-detail helpers for the time series shipped to the dashboard.
+
+Downsampling
+    lttb_indices() / downsample() apply Largest-Triangle-Three-Buckets. It keeps
+    the first and last point, and from each bucket in between it keeps the point
+    that forms the largest triangle with the previously kept point and the next
+    bucket's average. Peaks and swings survive, flat stretches are dropped.
+    `xy` picks the plane the triangles are measured in. For a graph that is
+    (time, value). For a map path it is (x, y), which keeps the turns in a route.
+
+    minmax_indices() is the cheaper alternative: it keeps each bucket's minimum
+    and maximum.
+
+Quantized encoding
+    encode_series() packs a list of dicts into integer columns. Timestamps are
+    delta-coded milliseconds (int32) and value fields are int16 when every value
+    fits, int32 otherwise. Each column is base64 of little-endian bytes.
+    decode_series() reverses it. The dashboard decoder is utils/series.js.
+
+Standard library only, like timeline_analyzer.
+"""
+
+from __future__ import annotations
+
+import base64
+import os
+import sys
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Default budgets for series embedded in the analysis document.
+# Per-minute gold/XP frames only hit this in very long games. Position samples
+# (frames plus event/lane-proxy injections) usually do.
+GRAPH_MAX_POINTS = int(os.getenv("TIMELINE_GRAPH_MAX_POINTS", "40"))
+PATH_MAX_POINTS = int(os.getenv("TIMELINE_PATH_MAX_POINTS", "60"))
+
+ENCODING = "q1"
+INT16_MIN, INT16_MAX = -32768, 32767
+
+XY = Callable[[Any], Tuple[float, float]]
+
+
+# ---------------------------------------------------------------------------
+# Downsampling
+# ---------------------------------------------------------------------------
+
+
+def lttb_indices(points: Sequence[Any], max_points: int, xy: XY) -> List[int]:
+    """Indices of the points LTTB keeps (all of them if len <= max_points)."""
+    n = len(points)
+    if max_points is None or max_points >= n or n <= 2:
+        return list(range(n))
+    if max_points < 3:
+        return [0, n - 1][:max(max_points, 1)]
+
+    coords = [xy(p) for p in points]
+    kept = [0]
+    bucket_size = (n - 2) / (max_points - 2)
+    a = 0
+
+    for i in range(max_points - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket (or the last point for the final bucket)
+        next_start = end
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        if next_start >= next_end:
+            avg_x, avg_y = coords[n - 1]
+        else:
+            span = next_end - next_start
+            avg_x = sum(c[0] for c in coords[next_start:next_end]) / span
+            avg_y = sum(c[1] for c in coords[next_start:next_end]) / span
+
+        ax, ay = coords[a]
+        best, best_area = start, -1.0
+        for j in range(start, min(end, n - 1)):
+            bx, by = coords[j]
+            area = abs((ax - avg_x) * (by - ay) - (ax - bx) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+
+    kept.append(n - 1)
+    return kept
+
+
+def minmax_indices(points: Sequence[Any], max_points: int, value: Callable[[Any], float]) -> List[int]:
+    """Indices keeping each bucket's min and max (about max_points in total)."""
+    n = len(points)
+    if max_points is None or max_points >= n or n <= 2:
+        return list(range(n))
+
+    buckets = max(1, (max_points - 2) // 2)
+    bucket_size = (n - 2) / buckets
+    kept = {0, n - 1}
+    for i in range(buckets):
+        start = int(i * bucket_size) + 1
+        end = min(int((i + 1) * bucket_size) + 1, n - 1)
+        if start >= end:
+            continue
+        window = range(start, end)
+        kept.add(min(window, key=lambda j: value(points[j])))
+        kept.add(max(window, key=lambda j: value(points[j])))
+    return sorted(kept)
+
+
+def take(points: Sequence[Any], indices: Sequence[int]) -> List[Any]:
+    return [points[i] for i in indices]
+
+
+def downsample(
+    points: Sequence[Any],
+    max_points: Optional[int],
+    xy: XY,
+    method: str = "lttb",
+) -> List[Any]:
+    """Reduce a series to at most ~max_points. method: "lttb" or "minmax" (uses y of xy)."""
+    if not points or max_points is None or len(points) <= max_points:
+        return list(points)
+    if method == "minmax":
+        return take(points, minmax_indices(points, max_points, lambda p: xy(p)[1]))
+    return take(points, lttb_indices(points, max_points, xy))
+
+
+def time_value(time_key: str, value_key: str) -> XY:
+    """xy for a dict series plotted as value over time."""
+    return lambda p: (p.get(time_key, 0) or 0, p.get(value_key, 0) or 0)
+
+
+def map_xy(p: Dict[str, Any]) -> Tuple[float, float]:
+    """xy for a map path (triangles measured on the map plane)."""
+    return (p.get("x", 0) or 0, p.get("y", 0) or 0)
+
+
+# ---------------------------------------------------------------------------
+# Quantized encoding
+# ---------------------------------------------------------------------------
+
+
+def _pack(values: List[int], typecode: str) -> str:
+    arr = array(typecode, values)
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return base64.b64encode(arr.tobytes()).decode("ascii")
+
+
+def _unpack(data: str, typecode: str) -> List[int]:
+    arr = array(typecode)
+    arr.frombytes(base64.b64decode(data))
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tolist()
+
+
+def encode_series(
+    points: Sequence[Dict[str, Any]],
+    time_key: str,
+    fields: Sequence[str],
+    time_scale: float = 60000.0,
+) -> Dict[str, Any]:
+    """
+    Pack [{time_key: minutes, field: number, ...}, ...] into integer columns.
+
+    time_scale converts time_key values to milliseconds (60000 for *_min keys).
+    Values are rounded to integers. Keep fractional fields out of `fields`.
+    """
+    ts = [int(round((p.get(time_key, 0) or 0) * time_scale)) for p in points]
+    deltas = [t - prev for t, prev in zip(ts, [0] + ts[:-1])]
+
+    columns: Dict[str, Any] = {}
+    types: Dict[str, str] = {}
+    for name in fields:
+        values = [int(round(p.get(name, 0) or 0)) for p in points]
+        typecode = "h" if all(INT16_MIN <= v <= INT16_MAX for v in values) else "i"
+        columns[name] = _pack(values, typecode)
+        types[name] = typecode
+
+    return {
+        "enc": ENCODING,
+        "n": len(points),
+        "time_key": time_key,
+        "time_scale": time_scale,
+        "t": _pack(deltas, "i"),
+        "types": types,
+        "cols": columns,
+    }
+
+
+def decode_series(encoded: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Inverse of encode_series (times come back as time_key units, values as ints)."""
+    n = encoded.get("n", 0)
+    scale = encoded.get("time_scale", 60000.0)
+    time_key = encoded.get("time_key", "time_min")
+
+    ts: List[int] = []
+    acc = 0
+    for d in _unpack(encoded["t"], "i"):
+        acc += d
+        ts.append(acc)
+
+    columns = {
+        name: _unpack(data, encoded["types"][name])
+        for name, data in encoded.get("cols", {}).items()
+    }
+    rows = []
+    for i in range(n):
+        row: Dict[str, Any] = {time_key: ts[i] / scale}
+        for name, values in columns.items():
+            row[name] = values[i]
+        rows.append(row)
+    return rows
+
+
+def is_encoded(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("enc") == ENCODING
@@ -0,0 +1,295 @@
+"""
+static_data.py
+
+One place to get Data Dragon / Meraki static data (patch version, items,
+champions).
+
+- The current patch is resolved at most once per VERSION_TTL seconds.
+- Each asset is downloaded once per patch. Revalidation uses ETag /
+  If-Modified-Since, so an unchanged asset costs a 304 and no re-parse.
+- Parsed objects stay in memory, so every consumer in the process (analysis
+  pipeline, crew prompts, dashboard API) shares one copy.
+- The sha256 of each asset's bytes is recorded in the manifest, so callers can
+  key derived caches on content instead of on mtimes.
+
+Everything is best effort. If the network is down, the last good copy (memory,
+then disk) is served. Only a cold start with no cache returns empty data.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import fast_json
+from http_fixtures import make_session
+from metrics import cache_result
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+STATIC_CACHE_DIR = SCRIPT_DIR / "saves" / "cache" / "static"
+MANIFEST_PATH = STATIC_CACHE_DIR / "manifest.json"
+
+DD_BASE_URL = "https://ddragon.leagueoflegends.com"
+MERAKI_BASE_URL = "https://cdn.merakianalytics.com/riot/lol/resources/latest/en-US"
+DEFAULT_LANG = "en_US"
+
+FALLBACK_VERSION = "16.1.1"  # Season 16
+VERSION_TTL = int(os.getenv("STATIC_DATA_VERSION_TTL", "3600"))
+
+
+def _ddragon_url(path: str):
+    return lambda version: f"{DD_BASE_URL}/cdn/{version}/data/{DEFAULT_LANG}/{path}"
+
+
+# name -> (url builder, versioned_url)
+# Versioned URLs are immutable once downloaded; "latest" URLs are revalidated once per patch.
+ASSETS = {
+    "ddragon_items": (_ddragon_url("item.json"), True),
+    "ddragon_champions": (_ddragon_url("champion.json"), True),
+    "meraki_items": (lambda version: f"{MERAKI_BASE_URL}/items.json", False),
+    "meraki_champions": (lambda version: f"{MERAKI_BASE_URL}/champions.json", False),
+}
+
+
+class StaticDataService:
+    """Process-wide cache of static game data."""
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(StaticDataService, cls).__new__(cls)
+                cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        self.session = make_session()
+        self._lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        self._asset_locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in ASSETS}
+        self._memory: Dict[str, Dict[str, Any]] = {}  # name -> {"patch", "data"}
+        self._version: Optional[str] = None
+        self._version_checked_at = 0.0
+        self._manifest = self._load_manifest()
+
+    # -------------------------------
+    # Manifest (validators + hashes, survives restarts)
+    # -------------------------------
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            if MANIFEST_PATH.exists():
+                return fast_json.read_file(MANIFEST_PATH)
+        except Exception as e:
+            print(f"[StaticData] Manifest unreadable ({e}), starting fresh.")
+        return {}
+
+    def _update_manifest(self, key: str, fields: Dict[str, Any]) -> None:
+        """Merge fields into one entry and persist it. The read-modify-write runs under the lock against
+        the file's current contents, so entries other processes wrote since we loaded it are kept.
+        The dict is replaced, never mutated, so readers without the lock see a consistent copy."""
+        with self._manifest_lock:
+            manifest = {**self._manifest, **self._load_manifest()}
+            manifest[key] = {**manifest.get(key, {}), **fields}
+            try:
+                STATIC_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                fast_json.write_file(MANIFEST_PATH, manifest, indent=True, atomic=True)
+            except Exception as e:
+                print(f"[StaticData] Failed to write manifest: {e}")
+            self._manifest = manifest
+
+    # -------------------------------
+    # Conditional fetch
+    # -------------------------------
+
+    def _conditional_get(self, key: str, url: str, timeout: int,
+                         revalidate: bool = True) -> Tuple[Optional[bytes], Dict[str, Any]]:
+        """GET with stored validators. Returns (new bytes or None on 304, validators to record once stored)."""
+        entry = self._manifest.get(key, {})
+        headers = {}
+        if revalidate and entry.get("url") == url:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        resp = self.session.get(url, headers=headers, timeout=timeout)
+        if resp.status_code == 304:
+            return None, {}
+        resp.raise_for_status()
+        return resp.content, {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+
+    # -------------------------------
+    # Patch version
+    # -------------------------------
+
+    def get_latest_version(self) -> str:
+        """Current Data Dragon patch (e.g. "16.3.1"), refreshed at most once per TTL."""
+        now = time.time()
+        if self._version and now - self._version_checked_at < VERSION_TTL:
+            return self._version
+
+        with self._lock:
+            if self._version and now - self._version_checked_at < VERSION_TTL:
+                return self._version
+            try:
+                body, validators = self._conditional_get("versions", f"{DD_BASE_URL}/api/versions.json", timeout=5)
+                if body is not None:
+                    versions = fast_json.loads(body)
+                    if isinstance(versions, list) and versions:
+                        self._update_manifest("versions", {**validators, "version": versions[0]})
+                self._version = self._manifest.get("versions", {}).get("version") or FALLBACK_VERSION
+            except Exception as e:
+                print(f"[StaticData] Version lookup failed ({e}), using cached/fallback.")
+                self._version = self._version or self._manifest.get("versions", {}).get("version") or FALLBACK_VERSION
+            # Failures also wait out the TTL so a dead CDN doesn't add a timeout to every call
+            self._version_checked_at = now
+            return self._version
+
+    # -------------------------------
+    # Assets
+    # -------------------------------
+
+    def _asset_path(self, name: str, patch: str) -> Path:
+        return STATIC_CACHE_DIR / f"{name}_{patch}.json"
+
+    def get_asset(self, name: str, timeout: int = 10) -> Dict[str, Any]:
+        """Parsed JSON for a named asset at the current patch ({} if unavailable)."""
+        patch = self.get_latest_version()
+        cached = self._memory.get(name)
+        if cached and cached["patch"] == patch:
+            cache_result("static_data", True)
+            return cached["data"]
+
+        with self._asset_locks[name]:
+            cached = self._memory.get(name)
+            if cached and cached["patch"] == patch:
+                cache_result("static_data", True)
+                return cached["data"]
+
+            url_for, versioned = ASSETS[name]
+            url = url_for(patch)
+            path = self._asset_path(name, patch)
+            entry = self._manifest.get(name, {})
+            data = None
+
+            # Versioned DDragon files never change once published
+            if path.exists() and (versioned or entry.get("patch") == patch):
+                data = self._read_file(path)
+            cache_result("static_data", data is not None)
+
+            if data is None:
+                prev_path = self._asset_path(name, entry.get("patch", patch))
+                try:
+                    # Only send validators if we still hold the bytes they describe
+                    body, fields = self._conditional_get(name, url, timeout=timeout, revalidate=prev_path.exists())
+                    if body is None:
+                        # 304: previous patch's copy is still current
+                        data = self._read_file(prev_path)
+                        if data is not None and prev_path != path:
+                            os.replace(prev_path, path)
+                    else:
+                        data = fast_json.loads(body)
+                        STATIC_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                        # Other workers may be reading (or writing) the same file
+                        fast_json.replace_file(path, body)
+                        fields["sha256"] = hashlib.sha256(body).hexdigest()
+                    if data is not None:
+                        self._update_manifest(name, {**fields, "patch": patch})
+                except Exception as e:
+                    print(f"[StaticData] Fetch failed for {name} ({e}), serving last known copy.")
+                    if cached:
+                        return cached["data"]
+                    data = self._read_file(prev_path)
+
+            if data is None:
+                return {}
+
+            self._memory[name] = {"patch": patch, "data": data}
+            self._prune_old_files(name, patch)
+            return data
+
+    def asset_hash(self, name: str) -> Optional[str]:
+        """sha256 of the asset's current bytes (loads the asset if needed)."""
+        self.get_asset(name)
+        return self._manifest.get(name, {}).get("sha256")
+
+    def _read_file(self, path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            if path.exists():
+                return fast_json.read_file(path)
+        except Exception as e:
+            print(f"[StaticData] Corrupt cache file {path.name}: {e}")
+        return None
+
+    def _prune_old_files(self, name: str, keep_patch: str) -> None:
+        for old in STATIC_CACHE_DIR.glob(f"{name}_*.json"):
+            if old.name != f"{name}_{keep_patch}.json":
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+
+
+def get_static_data() -> StaticDataService:
+    return StaticDataService()
+
+
+# --- Convenience accessors ---
+
+def get_latest_version() -> str:
+    return get_static_data().get_latest_version()
+
+
+def get_ddragon_items() -> Dict[str, Any]:
+    """DDragon item.json "data" block: {item_id_str: {...}}."""
+    return get_static_data().get_asset("ddragon_items").get("data", {})
+
+
+def get_ddragon_champions() -> Dict[str, Any]:
+    """DDragon champion.json "data" block: {champ_key: {...}}."""
+    return get_static_data().get_asset("ddragon_champions").get("data", {})
+
+
+def get_meraki_items() -> Dict[str, Any]:
+    return get_static_data().get_asset("meraki_items")
+
+
+def get_meraki_champions() -> Dict[str, Any]:
+    # Large file, allow a longer download
+    return get_static_data().get_asset("meraki_champions", timeout=20)
+
+
+_item_names_cache: Dict[str, Any] = {}
+
+
+def get_item_names() -> Dict[int, str]:
+    """Item ID -> display name (DDragon first, Meraki fills the gaps)."""
+    patch = get_latest_version()
+    if _item_names_cache.get("patch") == patch:
+        return _item_names_cache["names"]
+
+    names: Dict[int, str] = {}
+    for source in (get_meraki_items(), get_ddragon_items()):
+        for item_id_str, info in source.items():
+            try:
+                item_id = int(item_id_str)
+            except ValueError:
+                continue
+            if isinstance(info, dict) and info.get("name"):
+                names[item_id] = info["name"]
+
+    if names:
+        _item_names_cache.update({"patch": patch, "names": names})
+    return names
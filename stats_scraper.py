@@ -1,4 +1,4 @@
-import requests
+import http_fixtures
 from bs4 import BeautifulSoup
 import re
 from typing import List, Dict, Optional, Any
@@ -42,7 +42,7 @@ def get_past_ranks(game_name: str, tag_line: str, region: str = "na") -> List[Di
     
     try:
         print(f"Scraping {url} for past ranks...")
-        response = requests.get(url, headers=HEADER, timeout=10)
+        response = http_fixtures.get(url, headers=HEADER, timeout=10)
         
         if response.status_code != 200:
             print(f"Failed to fetch LeagueOfGraphs: Status {response.status_code}")
@@ -153,7 +153,7 @@ def get_season_stats(game_name: str, tag_line: str, region: str = "na") -> Dict[
     
     try:
         print(f"Scraping {url} for season stats...")
-        response = requests.get(url, headers=HEADER, timeout=10)
+        response = http_fixtures.get(url, headers=HEADER, timeout=10)
         if response.status_code != 200:
             return stats
             
@@ -0,0 +1,602 @@
+"""
+synthetic_matches.py
+
+Deterministic, statistically plausible match-v5 / timeline-v5 payloads for
+offline testing and scale benchmarks.
+
+Each game is simulated minute by minute. The simulation covers:
+    - lane-anchored positions that drift into roams and objective fights as
+      the game goes on
+    - kills (a Poisson process weighted toward the eventual winner, with
+      assists and placed near the victim)
+    - ward placements and clears
+    - dragons, barons and towers
+    - gold/XP/CS growth with level-ups and item purchases
+The end-of-game participant stats (KDA, gold, CS, wards, vision, items,
+objectives, challenges) are derived from that same simulation, so the match
+and its timeline agree with each other.
+
+Scale knobs live in SyntheticConfig: number of games, game length, kill
+density and ward density. The same config and seed always give the same
+payloads.
+
+    generate_match(match_id, seed, puuid)   one match (used by riot_simulator)
+    generate_timeline(match, seed)          its timeline
+    generate_dataset(config)                (match, timeline) pairs, newest first
+    seed_database(config)                   save a dataset into matches/timelines
+
+CLI:
+    python synthetic_matches.py --games 1000 --puuid <puuid> --load
+    python synthetic_matches.py --games 100 --out saves/synthetic_100.jsonl.gz
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import math
+import random
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import fast_json
+
+
+POSITIONS = ("TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY")
+CHAMPIONS = (
+    ("Aatrox", 266), ("Ahri", 103), ("Ashe", 22), ("Darius", 122), ("Ezreal", 81),
+    ("Garen", 86), ("Jinx", 222), ("Kaisa", 145), ("LeeSin", 64), ("Leona", 89),
+    ("Lux", 99), ("Orianna", 61), ("Sett", 875), ("Sylas", 517), ("Thresh", 412),
+    ("Vi", 254), ("Viego", 234), ("Yasuo", 157), ("Yone", 777), ("Zed", 238),
+)
+# Completed items bought during the game, and what they cost
+ITEMS = (3031, 3071, 3078, 3153, 3157, 3190, 3006, 3047, 3111, 6653, 6672, 3089, 3135, 3742, 2055)
+BOOTS = (3006, 3047, 3111)
+CONTROL_WARD = 2055
+ITEM_COST = {item: 1100 if item in BOOTS else 75 if item == CONTROL_WARD else 3000 for item in ITEMS}
+STARTERS = {"TOP": 1054, "JUNGLE": 1101, "MIDDLE": 1056, "BOTTOM": 1055, "UTILITY": 3850}
+MAP_SIZE = 14820
+
+# Cumulative XP needed for levels 2..18
+LEVEL_XP = (280, 660, 1140, 1720, 2400, 3180, 4060, 5040, 6120, 7300, 8580, 9960, 11440, 13020, 14700, 16480, 18360)
+
+FOUNTAIN = {100: (550, 550), 200: (14300, 14300)}
+DRAGON_PIT = (9866, 4414)
+BARON_PIT = (5007, 10471)
+# Early-game anchor per (team, role); the bot lane pair shares a lane
+LANE_ANCHORS = {
+    (100, "TOP"): (1500, 11000), (200, "TOP"): (3800, 13300),
+    (100, "MIDDLE"): (6300, 6300), (200, "MIDDLE"): (8500, 8500),
+    (100, "BOTTOM"): (11000, 1500), (200, "BOTTOM"): (13300, 3800),
+    (100, "UTILITY"): (10500, 1900), (200, "UTILITY"): (12900, 4300),
+}
+JUNGLE_CAMPS = {
+    100: ((3800, 7900), (7900, 4100), (6900, 5400), (2100, 8400)),
+    200: ((11000, 6900), (6900, 10700), (7900, 9400), (12700, 6400)),
+}
+TOWER_LANES = (("TOP_LANE", 4), ("MID_LANE", 5), ("BOT_LANE", 4))
+TOWER_TYPES = ("OUTER_TURRET", "INNER_TURRET", "BASE_TURRET", "NEXUS_TURRET", "NEXUS_TURRET")
+DRAGON_TYPES = ("FIRE_DRAGON", "WATER_DRAGON", "EARTH_DRAGON", "AIR_DRAGON", "HEXTECH_DRAGON", "CHEMTECH_DRAGON")
+
+# Per-role weights: (kill share, ward rate, CS/min, XP/min, damage per gold)
+ROLE_PROFILE = {
+    "TOP": (1.0, 0.8, 7.0, 560, 1.3),
+    "JUNGLE": (1.0, 1.0, 5.6, 500, 1.0),
+    "MIDDLE": (1.2, 0.8, 7.4, 560, 1.6),
+    "BOTTOM": (1.3, 0.7, 7.8, 480, 1.7),
+    "UTILITY": (0.5, 2.4, 1.2, 380, 0.9),
+}
+
+
+@dataclass(frozen=True)
+class SyntheticConfig:
+    """Scale and density knobs for a synthetic dataset."""
+
+    games: int = 20
+    seed: int = 0
+    puuid: Optional[str] = None      # the tracked player, present in every game
+    platform: str = "NA1"
+    min_minutes: float = 16.0        # surrender floor
+    max_minutes: float = 40.0
+    mode_minutes: float = 29.0       # most common game length
+    kills_per_minute: float = 0.9    # both teams combined
+    wards_per_minute: float = 0.45   # per player, before the role weight
+    winner_bias: float = 0.58        # share of kills/objectives taken by the winning team
+    start_ms: int = 1_767_225_600_000  # gameCreation of the newest game
+    game_version: str = "16.3.712.1234"
+
+
+DEFAULT_CONFIG = SyntheticConfig()
+
+
+def _rng(seed: Any) -> random.Random:
+    return random.Random(int(hashlib.sha256(str(seed).encode("utf-8")).hexdigest()[:16], 16))
+
+
+def _puuid(rng: random.Random) -> str:
+    return "".join(rng.choice("0123456789abcdef") for _ in range(78))
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    if lam <= 0:
+        return 0
+    limit, k, p = math.exp(-lam), 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+
+def _clamp(v: float) -> int:
+    return int(min(MAP_SIZE - 200, max(200, v)))
+
+
+def _near(rng: random.Random, xy: Tuple[float, float], spread: float) -> Tuple[int, int]:
+    return _clamp(rng.gauss(xy[0], spread)), _clamp(rng.gauss(xy[1], spread))
+
+
+def _level_for_xp(xp: int) -> int:
+    level = 1
+    for threshold in LEVEL_XP:
+        if xp < threshold:
+            break
+        level += 1
+    return level
+
+
+class _Player:
+    """Running per-participant state during a simulated game."""
+
+    __slots__ = (
+        "pid", "team_id", "role", "puuid", "name", "champ_id", "x", "y",
+        "kills", "deaths", "assists", "solo_kills", "gold", "current_gold", "xp", "level",
+        "cs", "jungle_cs", "wards_placed", "wards_killed", "control_wards",
+        "items", "damage", "damage_taken", "cs_at_10",
+    )
+
+    def __init__(self, pid: int, team_id: int, role: str, puuid: str, name: str, champ_id: int):
+        self.pid, self.team_id, self.role, self.puuid = pid, team_id, role, puuid
+        self.name, self.champ_id = name, champ_id
+        self.x, self.y = FOUNTAIN[team_id]
+        self.kills = self.deaths = self.assists = self.solo_kills = 0
+        self.gold = self.current_gold = 500
+        self.xp, self.level = 0, 1
+        self.cs = self.jungle_cs = 0
+        self.wards_placed = self.wards_killed = self.control_wards = 0
+        self.items: List[int] = []
+        self.damage = self.damage_taken = 0.0
+        self.cs_at_10 = 0
+
+    def earn(self, gold: float) -> None:
+        self.gold += int(gold)
+        self.current_gold += int(gold)
+
+
+def _move(rng: random.Random, p: _Player, minute: int) -> None:
+    """Place a live player for this frame: lane/jungle early, roams and objectives later."""
+    if p.role == "JUNGLE":
+        anchor = rng.choice(JUNGLE_CAMPS[p.team_id])
+    else:
+        anchor = LANE_ANCHORS[(p.team_id, p.role)]
+    roam_chance = 0.1 if minute < 14 else 0.45 if minute < 25 else 0.6
+    if minute >= 3 and rng.random() < roam_chance:
+        anchor = rng.choice((DRAGON_PIT, BARON_PIT, (7400, 7400), anchor))
+    p.x, p.y = _near(rng, anchor, 900 if minute < 14 else 1400)
+
+
+def _simulate(
+    match_id: str,
+    seed: Any,
+    puuid: Optional[str],
+    game_creation_ms: int,
+    game_version: str,
+    config: SyntheticConfig,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    rng = _rng(f"{seed}:{match_id}")
+    minutes = rng.triangular(config.min_minutes, config.max_minutes, config.mode_minutes)
+    duration_s = int(minutes * 60) + rng.randint(0, 59)
+    duration_ms = duration_s * 1000
+    blue_wins = rng.random() < 0.5
+    winner = 100 if blue_wins else 200
+    champs = rng.sample(CHAMPIONS, 10)
+    self_slot = rng.randrange(10)
+
+    players: List[_Player] = []
+    for i in range(10):
+        team_id = 100 if i < 5 else 200
+        drawn = _puuid(rng)
+        player_puuid = puuid if (puuid and i == self_slot) else drawn
+        players.append(_Player(i + 1, team_id, POSITIONS[i % 5], player_puuid, champs[i][0], champs[i][1]))
+    teams = {100: players[:5], 200: players[5:]}
+    objectives = {t: {"champion": 0, "dragon": 0, "baron": 0, "tower": 0, "inhibitor": 0} for t in (100, 200)}
+    towers_left = {t: {lane: n for lane, n in TOWER_LANES} for t in (100, 200)}
+    # team that took each objective first
+    firsts = {"champion": None, "dragon": None, "baron": None, "tower": None}
+    next_dragon_ms, next_baron_ms = 5 * 60000, 20 * 60000
+
+    def pick_team(bias: float) -> int:
+        return winner if rng.random() < bias else (200 if winner == 100 else 100)
+
+    def enemy(team_id: int) -> int:
+        return 200 if team_id == 100 else 100
+
+    frames: List[Dict[str, Any]] = []
+    n_frames = duration_ms // 60000 + 1
+    for f in range(n_frames):
+        ts = min(f * 60000, duration_ms)
+        events: List[Dict[str, Any]] = []
+        window_start, window_ms = (f - 1) * 60000, ts - (f - 1) * 60000
+
+        def stamp() -> int:
+            return window_start + rng.randint(0, max(0, window_ms - 1))
+
+        if f == 1:
+            for p in players:
+                starter = STARTERS[p.role]
+                p.current_gold -= 450
+                events.append({"type": "ITEM_PURCHASED", "timestamp": rng.randint(1000, 15000),
+                               "participantId": p.pid, "itemId": starter})
+                events.append({"type": "SKILL_LEVEL_UP", "timestamp": rng.randint(1000, 59000),
+                               "participantId": p.pid, "skillSlot": rng.choice((1, 2, 3)), "levelUpType": "NORMAL"})
+
+        if f > 0:
+            minute = f
+            share = window_ms / 60000.0
+            dead: set = set()
+            for p in players:
+                _move(rng, p, minute)
+                cs_rate, xp_rate = ROLE_PROFILE[p.role][2], ROLE_PROFILE[p.role][3]
+                ramp = 0.35 if minute == 1 else 1.0
+                farmed = int(cs_rate * ramp * share * rng.uniform(0.75, 1.2))
+                if p.role == "JUNGLE":
+                    p.jungle_cs += farmed
+                else:
+                    p.cs += farmed
+                    p.jungle_cs += 1 if rng.random() < 0.08 else 0
+                p.earn(farmed * 21 + (122 * share if minute > 1 else 0))
+                p.xp += int(xp_rate * ramp * share * rng.uniform(0.85, 1.1))
+
+            # Champion kills
+            density = config.kills_per_minute * (0.5 if minute < 4 else 1.0 if minute < 25 else 1.3) * share
+            for _ in range(_poisson(rng, density)):
+                killer_team = pick_team(config.winner_bias)
+                killers = teams[killer_team]
+                killer = rng.choices(killers, weights=[ROLE_PROFILE[p.role][0] for p in killers])[0]
+                victims = [v for v in teams[enemy(killer_team)] if v.pid not in dead] or teams[enemy(killer_team)]
+                victim = rng.choice(victims)
+                assist_p = 0.25 if minute < 14 else 0.5
+                assisters = [p for p in killers if p is not killer and rng.random() < assist_p]
+                bounty = 300
+                killer.kills += 1
+                killer.earn(bounty)
+                killer.xp += 250
+                if not assisters:
+                    killer.solo_kills += 1
+                for a in assisters:
+                    a.assists += 1
+                    a.earn(150)
+                    a.xp += 100
+                victim.deaths += 1
+                dead.add(victim.pid)
+                objectives[killer_team]["champion"] += 1
+                if firsts["champion"] is None:
+                    firsts["champion"] = killer_team
+                kx, ky = _near(rng, (victim.x, victim.y), 500)
+                killer.x, killer.y = _near(rng, (kx, ky), 400)
+                events.append({
+                    "type": "CHAMPION_KILL",
+                    "timestamp": stamp(),
+                    "killerId": killer.pid,
+                    "victimId": victim.pid,
+                    "assistingParticipantIds": [a.pid for a in assisters],
+                    "bounty": bounty,
+                    "shutdownBounty": 0,
+                    "killStreakLength": 0,
+                    "position": {"x": kx, "y": ky},
+                })
+
+            # Wards
+            for p in players:
+                for _ in range(_poisson(rng, config.wards_per_minute * ROLE_PROFILE[p.role][1] * share)):
+                    ward_type = "YELLOW_TRINKET"
+                    if p.role == "UTILITY" and minute >= 4:
+                        ward_type = rng.choice(("SIGHT_WARD", "SIGHT_WARD", "CONTROL_WARD", "YELLOW_TRINKET"))
+                    elif rng.random() < 0.12:
+                        ward_type = "CONTROL_WARD"
+                    if ward_type == "CONTROL_WARD":
+                        p.control_wards += 1
+                        p.current_gold -= ITEM_COST[CONTROL_WARD]
+                        events.append({"type": "ITEM_PURCHASED", "timestamp": stamp(),
+                                       "participantId": p.pid, "itemId": CONTROL_WARD})
+                    p.wards_placed += 1
+                    events.append({"type": "WARD_PLACED", "timestamp": stamp(),
+                                   "creatorId": p.pid, "wardType": ward_type})
+                if rng.random() < 0.12 * ROLE_PROFILE[p.role][1] * share:
+                    p.wards_killed += 1
+                    events.append({"type": "WARD_KILL", "timestamp": stamp(), "killerId": p.pid,
+                                   "wardType": rng.choice(("YELLOW_TRINKET", "SIGHT_WARD", "CONTROL_WARD"))})
+
+            # Elite monsters
+            if next_dragon_ms <= ts:
+                team_id = pick_team(config.winner_bias + 0.04)
+                jungler = teams[team_id][1]
+                objectives[team_id]["dragon"] += 1
+                firsts["dragon"] = firsts["dragon"] or team_id
+                for p in teams[team_id]:
+                    p.earn(50)
+                jungler.x, jungler.y = _near(rng, DRAGON_PIT, 300)
+                events.append({"type": "ELITE_MONSTER_KILL", "timestamp": stamp(),
+                               "killerId": jungler.pid, "killerTeamId": team_id, "monsterType": "DRAGON",
+                               "monsterSubType": rng.choice(DRAGON_TYPES),
+                               "position": {"x": DRAGON_PIT[0], "y": DRAGON_PIT[1]}})
+                next_dragon_ms = ts + 5 * 60000 + rng.randint(0, 90000)
+            if next_baron_ms <= ts and rng.random() < 0.45:
+                team_id = pick_team(config.winner_bias + 0.1)
+                jungler = teams[team_id][1]
+                objectives[team_id]["baron"] += 1
+                firsts["baron"] = firsts["baron"] or team_id
+                for p in teams[team_id]:
+                    p.earn(300)
+                jungler.x, jungler.y = _near(rng, BARON_PIT, 300)
+                events.append({"type": "ELITE_MONSTER_KILL", "timestamp": stamp(),
+                               "killerId": jungler.pid, "killerTeamId": team_id, "monsterType": "BARON_NASHOR",
+                               "position": {"x": BARON_PIT[0], "y": BARON_PIT[1]}})
+                next_baron_ms = ts + 6 * 60000
+
+            # Towers: BUILDING_KILL.teamId is the team that lost the building
+            if minute >= 10 and rng.random() < (0.25 if minute < 20 else 0.45) * share:
+                taker = pick_team(config.winner_bias + 0.08)
+                loser = enemy(taker)
+                lanes = [lane for lane, left in towers_left[loser].items() if left > 0]
+                if lanes:
+                    lane = rng.choice(lanes)
+                    lost = dict(TOWER_LANES)[lane] - towers_left[loser][lane]
+                    towers_left[loser][lane] -= 1
+                    objectives[taker]["tower"] += 1
+                    firsts["tower"] = firsts["tower"] or taker
+                    killer = rng.choice(teams[taker])
+                    killer.earn(250)
+                    events.append({"type": "BUILDING_KILL", "timestamp": stamp(), "teamId": loser,
+                                   "killerId": killer.pid, "buildingType": "TOWER_BUILDING", "laneType": lane,
+                                   "towerType": TOWER_TYPES[min(lost, len(TOWER_TYPES) - 1)],
+                                   "position": {"x": killer.x, "y": killer.y}})
+
+            # Level-ups and shopping (on recall, i.e. with enough gold banked)
+            for p in players:
+                new_level = _level_for_xp(p.xp)
+                while p.level < new_level:
+                    p.level += 1
+                    events.append({"type": "SKILL_LEVEL_UP", "timestamp": stamp(), "participantId": p.pid,
+                                   "skillSlot": 4 if p.level in (6, 11, 16) else rng.choice((1, 2, 3)),
+                                   "levelUpType": "NORMAL"})
+                wanted = [i for i in ITEMS if i != CONTROL_WARD and i not in p.items
+                          and not (i in BOOTS and any(b in p.items for b in BOOTS))]
+                if len(p.items) < 6 and wanted:
+                    item = rng.choice(wanted)
+                    if p.current_gold >= ITEM_COST[item]:
+                        p.items.append(item)
+                        p.current_gold -= ITEM_COST[item]
+                        events.append({"type": "ITEM_PURCHASED", "timestamp": stamp(),
+                                       "participantId": p.pid, "itemId": item})
+                p.damage += (p.gold / max(1, f)) * ROLE_PROFILE[p.role][4] * share * rng.uniform(0.7, 1.3)
+                p.damage_taken += (p.gold / max(1, f)) * share * rng.uniform(0.8, 1.6)
+                if minute == 10:
+                    p.cs_at_10 = p.cs
+
+            for pid in dead:
+                victim = players[pid - 1]
+                victim.x, victim.y = FOUNTAIN[victim.team_id]
+
+        events.sort(key=lambda e: e["timestamp"])
+        frames.append({
+            "timestamp": ts,
+            "events": events,
+            "participantFrames": {
+                str(p.pid): {
+                    "participantId": p.pid,
+                    "position": {"x": p.x, "y": p.y},
+                    "currentGold": max(0, p.current_gold),
+                    "totalGold": p.gold,
+                    "xp": p.xp,
+                    "level": p.level,
+                    "minionsKilled": p.cs,
+                    "jungleMinionsKilled": p.jungle_cs,
+                } for p in players
+            },
+        })
+
+    game_minutes = duration_s / 60
+    team_kills = {t: sum(p.kills for p in teams[t]) for t in teams}
+    team_damage = {t: sum(p.damage for p in teams[t]) or 1.0 for t in teams}
+    participants: List[Dict[str, Any]] = []
+    for i, p in enumerate(players):
+        items = p.items + [0] * (6 - len(p.items))
+        vision = int(p.wards_placed * 1.1 + p.wards_killed * 1.5 + p.control_wards + game_minutes * 0.2)
+        participants.append({
+            "puuid": p.puuid,
+            "participantId": p.pid,
+            "teamId": p.team_id,
+            "win": p.team_id == winner,
+            "teamPosition": p.role,
+            "individualPosition": p.role,
+            "championName": p.name,
+            "championId": p.champ_id,
+            "champLevel": p.level,
+            "riotIdGameName": f"Synth{i}",
+            "riotIdTagline": "SYN",
+            "summonerName": f"Synth{i}",
+            "kills": p.kills,
+            "deaths": p.deaths,
+            "assists": p.assists,
+            "goldEarned": p.gold,
+            "totalDamageDealtToChampions": int(p.damage),
+            "totalDamageTaken": int(p.damage_taken),
+            "totalMinionsKilled": p.cs,
+            "neutralMinionsKilled": p.jungle_cs,
+            "visionScore": vision,
+            "wardsPlaced": p.wards_placed,
+            "wardsKilled": p.wards_killed,
+            "detectorWardsPlaced": p.control_wards,
+            "visionWardsBoughtInGame": p.control_wards,
+            "summoner1Id": 4,
+            "summoner2Id": 11 if p.role == "JUNGLE" else 14 if p.role in ("MIDDLE", "UTILITY") else 7 if p.role == "BOTTOM" else 12,
+            **{f"item{slot}": items[slot] for slot in range(6)},
+            "item6": 3364 if p.role == "UTILITY" else 3340,
+            "perks": {
+                "statPerks": {"offense": 5008, "flex": 5008, "defense": 5011},
+                "styles": [
+                    {"description": "primaryStyle", "style": 8000, "selections": [{"perk": k} for k in (8010, 9111, 9104, 8299)]},
+                    {"description": "subStyle", "style": 8400, "selections": [{"perk": k} for k in (8444, 8451)]},
+                ],
+            },
+            "challenges": {
+                "killParticipation": round((p.kills + p.assists) / team_kills[p.team_id], 3) if team_kills[p.team_id] else 0,
+                "teamDamagePercentage": round(p.damage / team_damage[p.team_id], 3),
+                "visionScorePerMinute": round(vision / game_minutes, 3),
+                "goldPerMinute": round(p.gold / game_minutes, 1),
+                "laneMinionsFirst10Minutes": p.cs_at_10,
+                "soloKills": p.solo_kills,
+            },
+        })
+
+    def team_objectives(team_id: int) -> Dict[str, Any]:
+        return {
+            name: {"first": firsts.get(name) == team_id, "kills": objectives[team_id][name]}
+            for name in ("champion", "dragon", "baron", "tower", "inhibitor")
+        }
+
+    game_id = match_id.rsplit("_", 1)[-1]
+    metadata = {"matchId": match_id, "participants": [p["puuid"] for p in participants]}
+    match = {
+        "metadata": metadata,
+        "info": {
+            "gameId": int(game_id) if game_id.isdigit() else 0,
+            "gameCreation": game_creation_ms,
+            "gameStartTimestamp": game_creation_ms + 30_000,
+            "gameEndTimestamp": game_creation_ms + 30_000 + duration_ms,
+            "gameDuration": duration_s,
+            "gameMode": "CLASSIC",
+            "gameVersion": game_version,
+            "queueId": 420,
+            "mapId": 11,
+            "participants": participants,
+            "teams": [
+                {"teamId": 100, "win": blue_wins, "objectives": team_objectives(100)},
+                {"teamId": 200, "win": not blue_wins, "objectives": team_objectives(200)},
+            ],
+        },
+    }
+    timeline = {
+        "metadata": dict(metadata),
+        "info": {"frameInterval": 60000, "frames": frames, "participants": [
+            {"participantId": p["participantId"], "puuid": p["puuid"]} for p in participants
+        ]},
+    }
+    return match, timeline
+
+
+def generate_match(
+    match_id: str,
+    seed: Any = 0,
+    puuid: Optional[str] = None,
+    game_creation_ms: int = 1_767_225_600_000,
+    game_version: str = "16.3.712.1234",
+    config: SyntheticConfig = DEFAULT_CONFIG,
+) -> Dict[str, Any]:
+    """A ranked solo match-v5 payload. `puuid`, if given, takes one (seeded) participant slot."""
+    return _simulate(match_id, seed, puuid, game_creation_ms, game_version, config)[0]
+
+
+def generate_timeline(match: Dict[str, Any], seed: Any = 0, config: SyntheticConfig = DEFAULT_CONFIG) -> Dict[str, Any]:
+    """The timeline consistent with `match` (pass the seed/config that generated it)."""
+    info = match["info"]
+    _, timeline = _simulate(match["metadata"]["matchId"], seed, None, info["gameCreation"], info["gameVersion"], config)
+    # Only the tracked player's puuid differs from the re-run; copy the match's
+    puuids = {p["participantId"]: p["puuid"] for p in info["participants"]}
+    timeline["metadata"]["participants"] = list(match["metadata"]["participants"])
+    for p in timeline["info"]["participants"]:
+        p["puuid"] = puuids.get(p["participantId"], p["puuid"])
+    return timeline
+
+
+def generate_dataset(config: SyntheticConfig = DEFAULT_CONFIG) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """Yield `config.games` (match, timeline) pairs, newest first, roughly a game per 45 min of play."""
+    schedule = _rng(f"{config.seed}:schedule")
+    base_id = 5_000_000_000 + _rng(f"{config.seed}:{config.puuid}").randrange(1_000_000)
+    creation = config.start_ms
+    for i in range(config.games):
+        match_id = f"{config.platform}_{base_id - i}"
+        yield _simulate(match_id, config.seed, config.puuid, creation, config.game_version, config)
+        creation -= int(schedule.uniform(25, 180) * 60000)
+
+
+def seed_database(config: SyntheticConfig = DEFAULT_CONFIG, db=None) -> int:
+    """Save a generated dataset into the matches and timelines collections. Returns the game count."""
+    if db is None:
+        from database import Database
+        db = Database()
+    started = time.perf_counter()
+    count = 0
+    for match, timeline in generate_dataset(config):
+        db.save_match(match)
+        db.save_timeline(match["metadata"]["matchId"], timeline)
+        count += 1
+        if count % 500 == 0:
+            print(f"[Synthetic] Seeded {count}/{config.games} games...")
+    db.flush_writes()
+    print(f"[Synthetic] Seeded {count} games in {time.perf_counter() - started:.1f}s")
+    return count
+
+
+def write_dataset(config: SyntheticConfig, path: str) -> int:
+    """Write a dataset as gzipped JSON lines: {"match": ..., "timeline": ...} per game."""
+    count = 0
+    with gzip.open(path, "wb") as f:
+        for match, timeline in generate_dataset(config):
+            f.write(fast_json.dumps({"match": match, "timeline": timeline}) + b"\n")
+            count += 1
+    print(f"[Synthetic] Wrote {count} games to {path}")
+    return count
+
+
+def read_dataset(path: str) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    with gzip.open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                row = fast_json.loads(line)
+                yield row["match"], row["timeline"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Synthetic match/timeline generator")
+    parser.add_argument("--games", type=int, default=DEFAULT_CONFIG.games)
+    parser.add_argument("--seed", type=int, default=DEFAULT_CONFIG.seed)
+    parser.add_argument("--puuid", help="tracked player present in every game")
+    parser.add_argument("--platform", default=DEFAULT_CONFIG.platform)
+    parser.add_argument("--min-minutes", type=float, default=DEFAULT_CONFIG.min_minutes)
+    parser.add_argument("--max-minutes", type=float, default=DEFAULT_CONFIG.max_minutes)
+    parser.add_argument("--mode-minutes", type=float, default=DEFAULT_CONFIG.mode_minutes)
+    parser.add_argument("--kills-per-minute", type=float, default=DEFAULT_CONFIG.kills_per_minute)
+    parser.add_argument("--wards-per-minute", type=float, default=DEFAULT_CONFIG.wards_per_minute)
+    parser.add_argument("--load", action="store_true", help="seed the matches/timelines collections")
+    parser.add_argument("--out", help="write a .jsonl.gz dataset file")
+    args = parser.parse_args()
+
+    config = replace(
+        DEFAULT_CONFIG,
+        games=args.games, seed=args.seed, puuid=args.puuid, platform=args.platform,
+        min_minutes=args.min_minutes, max_minutes=args.max_minutes, mode_minutes=args.mode_minutes,
+        kills_per_minute=args.kills_per_minute, wards_per_minute=args.wards_per_minute,
+    )
+    if args.out:
+        write_dataset(config, args.out)
+    if args.load:
+        seed_database(config)
+    if not args.out and not args.load:
+        parser.error("nothing to do: pass --load and/or --out")
+
+
+if __name__ == "__main__":
+    main()
@@ -40,16 +40,28 @@ the Streamlit dashboard:
             ],
         }
 
-This module is intentionally self-contained (only standard library imports)
+This module is intentionally self-contained (only standard library imports
+plus sibling helper modules)
 so that it is robust when used in different contexts (CLI + dashboard).
 """
 
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from collections import defaultdict
 from ward_data import WARD_HOTSPOTS
+from heatmaps import bin_positions
+from ward_coverage import summarize_match_wards
+from series_lod import (
+    GRAPH_MAX_POINTS,
+    PATH_MAX_POINTS,
+    downsample,
+    lttb_indices,
+    map_xy,
+    take,
+    time_value,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -1174,8 +1186,159 @@ def _extract_building_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any
     return building_events
 
 
+# ---------------------------------------------------------------------------
+# Movement extractors (output-selective)
+# ---------------------------------------------------------------------------
+#
+# Each output of analyze_timeline_movement is produced by one extractor that
+# declares what it needs. Names starting with "_" are shared intermediates
+# (flattened events, full-resolution series) and are never returned.
+# Resolution is lazy: an extractor runs, and its intermediates are allocated,
+# only when a requested output depends on it.
+
+
+class _MovementContext:
+    """Identity for one (match, player) plus memoized extractor results."""
+
+    def __init__(
+        self,
+        match: Dict[str, Any],
+        timeline: Dict[str, Any],
+        puuid: str,
+        graph_max_points: Optional[int],
+        path_max_points: Optional[int],
+    ) -> None:
+        info = match.get("info", {})
+        self.match = match
+        self.timeline = timeline
+        self.puuid = puuid
+        self.graph_max_points = graph_max_points
+        self.path_max_points = path_max_points
+
+        self.my_team, self.enemy_team, self.my_pid = _get_team_ids(match, puuid)
+        self.participants = info.get("participants", [])
+        my_part = None
+        for p in self.participants:
+            if int(p.get("participantId", 0) or 0) == self.my_pid:
+                my_part = p
+                break
+        if my_part is None:
+            raise ValueError("Could not find self participant by participantId")
+
+        self.champion = my_part.get("championName", "Unknown")
+        self.role = my_part.get("teamPosition") or my_part.get("individualPosition") or "UNKNOWN"
+        self.duration_s = info.get("gameDuration", 0)
+        self._values: Dict[str, Any] = {}
+
+    @property
+    def frames(self) -> List[Dict[str, Any]]:
+        return self.timeline.get("info", {}).get("frames", [])
+
+    def get(self, name: str) -> Any:
+        if name not in self._values:
+            deps, fn = _MOVEMENT_EXTRACTORS[name]
+            self._values[name] = fn(self, *(self.get(d) for d in deps))
+        return self._values[name]
+
+
+def _graph_indices(ctx: _MovementContext, team_gold_diff_full: List[Dict[str, Any]]) -> List[int]:
+    # Both graph series come from the same frames; reduce them with one index set
+    # so the dashboard's index-aligned fallback still lines up
+    return lttb_indices(team_gold_diff_full, ctx.graph_max_points, time_value("time_min", "gold_diff"))
+
+
+def _reduced_gold_xp(ctx: _MovementContext, full: List[Dict[str, Any]], team_diff_full: List[Dict[str, Any]], idx: List[int]):
+    if len(full) == len(team_diff_full):
+        return take(full, idx)
+    return downsample(full, ctx.graph_max_points, time_value("time_min", "total_gold"))
+
+
+def _position_samples(ctx: _MovementContext, pos_series: List[PosSample]) -> List[Dict[str, Any]]:
+    # Frames plus event/lane-proxy injections, reduced on the map plane so route turns survive
+    return downsample(
+        [{"time_min": p.ts_ms / 60000.0, "x": p.x, "y": p.y, "zone": p.zone} for p in pos_series],
+        ctx.path_max_points,
+        map_xy,
+    )
+
+
+# name -> (dependencies, extractor(ctx, *dependency_values))
+_MOVEMENT_EXTRACTORS: Dict[str, Tuple[Tuple[str, ...], Any]] = {
+    # Shared intermediates
+    "_events": ((), lambda ctx: _flatten_events(ctx.timeline)),
+    "_pos_series": (("_events",), lambda ctx, events: _build_position_series(ctx.timeline, ctx.my_pid, ctx.my_team, events, ctx.role)),
+    "_gold_xp_full": ((), lambda ctx: _extract_gold_xp_series(ctx.timeline, ctx.my_pid)),
+    "_team_gold_diff_full": ((), lambda ctx: [
+        {"time_min": t, "gold_diff": d} for t, d in _compute_gold_diff_series(ctx.match, ctx.timeline, ctx.puuid)
+    ]),
+    "_graph_idx": (("_team_gold_diff_full",), _graph_indices),
+
+    # Coaching stats
+    "roams": (("_pos_series", "_events"), lambda ctx, pos, events: _detect_roams(ctx.role, pos, events, ctx.my_pid)),
+    "jungle_pathing": (("_events",), lambda ctx, events: _analyze_jungle_ganks(ctx.role, events, ctx.my_pid)),
+    "fight_presence": (("_events", "_pos_series"), lambda ctx, events, pos: _analyze_fights(
+        ctx.match, events, pos, ctx.my_team, ctx.enemy_team, ctx.my_pid)),
+
+    # Per-game dashboard data
+    "position_samples": (("_pos_series",), _position_samples),
+    # Heatmap contribution (full resolution), folded into the player's heatmaps by the pipeline
+    "position_bins": (("_pos_series",), lambda ctx, pos: bin_positions((p.ts_ms, p.x, p.y) for p in pos)),
+    "skill_order": (("_events",), lambda ctx, events: _extract_skill_order(events, ctx.my_pid)),
+    "item_build": (("_events",), lambda ctx, events: _extract_item_build(events, ctx.my_pid)),
+    "all_item_builds": (("_events",), lambda ctx, events: _extract_all_item_builds(events)),
+    "kill_events": (("_events",), lambda ctx, events: _extract_kill_events(events, ctx.match)),
+    "ward_events": (("_events",), lambda ctx, events: _extract_ward_events(events, ctx.frames, ctx.participants)),
+    # This player's placements per hotspot, folded into the ward-coverage index by the pipeline
+    "ward_coverage": (("ward_events",), lambda ctx, wards: {
+        "team_id": ctx.my_team,
+        "hotspots": summarize_match_wards(wards, ctx.my_pid, int(ctx.duration_s * 1000)),
+    }),
+    "building_events": (("_events",), lambda ctx, events: _extract_building_events(events)),
+    "gold_xp_series": (("_gold_xp_full", "_team_gold_diff_full", "_graph_idx"), _reduced_gold_xp),
+    "team_gold_diff": (("_team_gold_diff_full", "_graph_idx"), lambda ctx, full, idx: take(full, idx)),
+
+    # Replay (all participants)
+    "all_positions": ((), lambda ctx: _extract_all_positions(ctx.timeline)),
+    "all_gold_xp_series": ((), lambda ctx: _extract_all_gold_xp_series(ctx.timeline)),
+}
+
+MOVEMENT_FEATURES: Tuple[str, ...] = tuple(n for n in _MOVEMENT_EXTRACTORS if not n.startswith("_"))
+
+# Presets for common callers
+REPLAY_FEATURES = ("all_positions", "all_gold_xp_series")
+STATS_FEATURES = ("roams", "jungle_pathing", "fight_presence")
+# Everything the analysis pipeline stores (replay data is served on demand instead)
+PIPELINE_FEATURES = tuple(n for n in MOVEMENT_FEATURES if n not in REPLAY_FEATURES)
+
+
+def resolve_movement_features(features: Iterable[str]) -> List[str]:
+    """Requested outputs plus everything they depend on, in run order.
+    Only MOVEMENT_FEATURES can be requested; "_"-prefixed intermediates run as dependencies."""
+    order: List[str] = []
+
+    def visit(name: str) -> None:
+        if name in order:
+            return
+        if name not in _MOVEMENT_EXTRACTORS:
+            raise ValueError(f"Unknown movement feature: {name}")
+        for dep in _MOVEMENT_EXTRACTORS[name][0]:
+            visit(dep)
+        order.append(name)
+
+    for name in features:
+        if name.startswith("_"):
+            raise ValueError(f"Unknown movement feature: {name} (internal intermediate)")
+        visit(name)
+    return order
+
+
 def analyze_timeline_movement(
-    match: Dict[str, Any], timeline: Dict[str, Any], puuid: str
+    match: Dict[str, Any],
+    timeline: Dict[str, Any],
+    puuid: str,
+    graph_max_points: Optional[int] = GRAPH_MAX_POINTS,
+    path_max_points: Optional[int] = PATH_MAX_POINTS,
+    features: Optional[Iterable[str]] = None,
 ) -> Dict[str, Any]:
     """
     High-level movement + positioning analysis for a *single game*.
@@ -1197,87 +1360,32 @@ def analyze_timeline_movement(
 
     The `position_samples` list is specifically designed for the dashboard
     to draw movement paths and heatmaps.
-    """
-    info = match.get("info", {})
-    meta = match.get("metadata", {})
-    my_team, enemy_team, my_pid = _get_team_ids(match, puuid)
 
-    # Basic identity
-    participants = info.get("participants", [])
-    my_part = None
-    for p in participants:
-        if int(p.get("participantId", 0) or 0) == my_pid:
-            my_part = p
-            break
-    if my_part is None:
-        raise ValueError("Could not find self participant by participantId")
-
-    champ = my_part.get("championName", "Unknown")
-    role = my_part.get("teamPosition") or my_part.get("individualPosition") or "UNKNOWN"
-    duration_s = info.get("gameDuration", 0)
-    duration_min = float(duration_s) / 60.0 if duration_s else 0.0
+    `features` selects outputs (see MOVEMENT_FEATURES and the *_FEATURES
+    presets). The identity keys above are always present. Only the requested
+    extractors and their dependencies run. None means every feature.
 
-    # Core series
-    events = _flatten_events(timeline)
-    pos_series = _build_position_series(timeline, my_pid, my_team, events, role)
-
-    # Roams (laners)
-    roams = _detect_roams(role, pos_series, events, my_pid)
+    Roams, ganks and fights are computed at full resolution. Only the series
+    returned for display are reduced (series_lod.lttb_indices):
+    gold_xp_series / team_gold_diff to graph_max_points and position_samples
+    to path_max_points. Pass None to keep every sample.
+    """
+    wanted = MOVEMENT_FEATURES if features is None else tuple(features)
+    # Validate up front so a typo fails before any work is done
+    resolve_movement_features(wanted)
 
-    # Jungle pathing / early ganks
-    jungle_pathing = _analyze_jungle_ganks(role, events, my_pid)
-    
-    # Fight analysis
-    fight_presence = _analyze_fights(match, events, pos_series, my_team, enemy_team, my_pid)
-    
-    # Detailed timeline extractions for dashboard
-    skill_order = _extract_skill_order(events, my_pid)
-    item_build = _extract_item_build(events, my_pid)
-    all_item_builds = _extract_all_item_builds(events)
-    kill_events = _extract_kill_events(events, match)
-    ward_events = _extract_ward_events(events, timeline.get("info", {}).get("frames", []), participants)
-    building_events = _extract_building_events(events)
-    
-    # Graph data
-    gold_xp_series = _extract_gold_xp_series(timeline, my_pid)
-    # Re-compute gold diff series for this match context
-    gold_diff_series_raw = _compute_gold_diff_series(match, timeline, puuid)
-    team_gold_diff = [{"time_min": t, "gold_diff": d} for t, d in gold_diff_series_raw]
-
-    # Sample positions for dashboard (every ~1 min)
-    # We already have pos_series which is every frame (~1 min usually).
-    # Just convert to dicts.
-    # Sample positions for dashboard (every ~1 min)
-    # We already have pos_series which is every frame (~1 min usually).
-    # Just convert to dicts.
-    position_samples = [
-        {"time_min": p.ts_ms / 60000.0, "x": p.x, "y": p.y, "zone": p.zone}
-        for p in pos_series
-    ]
-    
-    # Extract ALL participant positions for the timeline map
-    all_positions = _extract_all_positions(timeline)
+    ctx = _MovementContext(match, timeline, puuid, graph_max_points, path_max_points)
+    duration_min = float(ctx.duration_s) / 60.0 if ctx.duration_s else 0.0
 
-    return {
-        "match_id": meta.get("matchId", "UNKNOWN"),
-        "champion": champ,
-        "role": role,
+    result: Dict[str, Any] = {
+        "match_id": match.get("metadata", {}).get("matchId", "UNKNOWN"),
+        "champion": ctx.champion,
+        "role": ctx.role,
         "duration_min": duration_min,
-        "roams": roams,
-        "jungle_pathing": jungle_pathing,
-        "fight_presence": fight_presence,
-        "position_samples": position_samples,
-        "all_positions": all_positions, # NEW
-        "skill_order": skill_order,
-        "item_build": item_build,
-        "all_item_builds": all_item_builds,
-        "kill_events": kill_events,
-        "ward_events": ward_events,
-        "building_events": building_events,
-        "gold_xp_series": gold_xp_series,
-        "all_gold_xp_series": _extract_all_gold_xp_series(timeline),
-        "team_gold_diff": team_gold_diff
     }
+    for name in wanted:
+        result[name] = ctx.get(name)
+    return result
 
 def _extract_all_positions(timeline: Dict[str, Any]) -> Dict[int, List[Dict[str, Any]]]:
     """
@@ -32,7 +32,7 @@ def verify_movement():
         match = client.get_match(match_id)
         timeline = client.get_match_timeline(match_id)
         
-        movement = analyze_timeline_movement(match, timeline, puuid)
+        movement = analyze_timeline_movement(match, timeline, puuid, graph_max_points=None, path_max_points=None)
         
         samples = movement.get("position_samples", [])
         print(f"Total position samples: {len(samples)}")
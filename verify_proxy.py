@@ -34,7 +34,7 @@ def verify_proxy():
         
         # We need to force a role to test proxy logic if the player isn't a laner
         # But analyze_timeline_movement infers role. Let's see what it does.
-        movement = analyze_timeline_movement(match, timeline, puuid)
+        movement = analyze_timeline_movement(match, timeline, puuid, graph_max_points=None, path_max_points=None)
         
         samples = movement.get("position_samples", [])
         
@@ -0,0 +1,202 @@
+"""
+ward_coverage.py
+
+Persisted vision-coverage aggregate per player and map side, keyed on
+ward_data.WARD_HOTSPOTS.
+
+analyze_timeline_movement summarizes the player's own placements for one game
+("ward_coverage"). For each hotspot it records the number of placements, the
+total ward lifetime and the first placement time. The pipeline adds these
+summaries to the player's WardCoverage. save_ward_coverage claims each match
+in the aggregate_folds marker collection as a lease, the same way as
+heatmaps.py, adds the claimed matches' totals with $inc, then confirms the
+claims (or releases them if the $inc failed). Concurrent runs for the same
+player therefore add up instead of overwriting each other. Vision coaching
+can then read one small document instead of re-decoding every timeline.
+"""
+
+from __future__ import annotations
+
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from ward_data import WARD_HOTSPOTS
+
+
+# A placement counts toward a hotspot if it lands within this many units
+HOTSPOT_RADIUS = 800
+
+# Expected lifetime when no WARD_KILL was matched (None = lasts until killed/game end).
+# Same values the dashboard's TimelineMap uses.
+WARD_DURATION_MS: Dict[str, Optional[int]] = {
+    "YELLOW_TRINKET": 90_000,
+    "SIGHT_WARD": 150_000,
+    "CONTROL_WARD": None,
+    "BLUE_TRINKET": None,
+}
+DEFAULT_DURATION_MS = 90_000
+
+SIDES = {100: "blue", 200: "red"}
+
+
+def _spot_name(spot: Dict[str, Any]) -> str:
+    # Mongo keys can't contain dots; names are also used as JSON keys
+    return spot["name"].strip().replace(".", "")
+
+
+# Unique names in list order (a few hotspots share a name; they aggregate together)
+HOTSPOT_POSITIONS: Dict[str, Dict[str, int]] = {}
+for _spot in WARD_HOTSPOTS:
+    HOTSPOT_POSITIONS.setdefault(_spot_name(_spot), {"x": _spot["x"], "y": _spot["y"]})
+
+
+def nearest_hotspot(x: float, y: float) -> Optional[str]:
+    best_name, best_dist_sq = None, HOTSPOT_RADIUS * HOTSPOT_RADIUS
+    for spot in WARD_HOTSPOTS:
+        dist_sq = (x - spot["x"]) ** 2 + (y - spot["y"]) ** 2
+        if dist_sq <= best_dist_sq:
+            best_name, best_dist_sq = _spot_name(spot), dist_sq
+    return best_name
+
+
+def ward_lifetime_ms(ward: Dict[str, Any], game_end_ms: int) -> int:
+    start = ward.get("timestamp", 0)
+    end = ward.get("endTime")
+    if end is None:
+        duration = WARD_DURATION_MS.get(ward.get("wardType"), DEFAULT_DURATION_MS)
+        end = game_end_ms if duration is None else min(start + duration, game_end_ms)
+    return max(0, end - start)
+
+
+def summarize_match_wards(
+    ward_events: List[Dict[str, Any]],
+    my_pid: int,
+    game_end_ms: int,
+) -> Dict[str, Dict[str, int]]:
+    """
+    One game's contribution, from _extract_ward_events output:
+    {hotspot: {"placements", "lifetime_ms", "first_placed_ms"}}.
+    Placements that aren't near a hotspot are counted under "other".
+    """
+    summary: Dict[str, Dict[str, int]] = {}
+    for ward in ward_events:
+        if ward.get("creatorId") != my_pid or ward.get("type") != "WARD_PLACED":
+            continue
+        pos = ward.get("position") or {}
+        if "x" not in pos or "y" not in pos:
+            continue
+        name = nearest_hotspot(pos["x"], pos["y"]) or "other"
+        ts = ward.get("timestamp", 0)
+        entry = summary.get(name)
+        if entry is None:
+            entry = summary[name] = {"placements": 0, "lifetime_ms": 0, "first_placed_ms": ts}
+        entry["placements"] += 1
+        entry["lifetime_ms"] += ward_lifetime_ms(ward, game_end_ms)
+        entry["first_placed_ms"] = min(entry["first_placed_ms"], ts)
+    return summary
+
+
+class WardCoverage:
+    """A player's hotspot totals per side, plus matches added since the load (not yet saved)."""
+
+    def __init__(self, puuid: str, doc: Optional[Dict[str, Any]] = None):
+        self.puuid = puuid
+        # side -> hotspot -> {"placements", "lifetime_ms", "first_placed_ms_sum", "games_placed"}
+        self.sides: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self.games: Dict[str, int] = {}
+        # Pre-marker documents listed their folded match IDs inline
+        self.legacy_match_ids: List[str] = []
+        self.pending: Dict[str, Tuple[str, Dict[str, Dict[str, int]]]] = {}
+
+        if doc:
+            self.sides = {side: {k: dict(v) for k, v in spots.items()} for side, spots in (doc.get("sides") or {}).items()}
+            self.games = dict(doc.get("games") or {})
+            self.legacy_match_ids = list(doc.get("match_ids") or [])
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.pending)
+
+    def add_match(self, match_id: str, team_id: int, summary: Optional[Dict[str, Dict[str, int]]]) -> bool:
+        """Queue one game's summary for the next save. Returns False if it was already added."""
+        if not match_id or match_id in self.pending or summary is None:
+            return False
+        self.pending[match_id] = (SIDES.get(team_id, "unknown"), summary)
+        return True
+
+    @staticmethod
+    def increments(games: List[Tuple[str, Dict[str, Dict[str, int]]]]) -> Dict[str, int]:
+        """$inc paths ("sides.<side>.<hotspot>.<field>", "games.<side>") for a list of (side, summary)."""
+        inc: Dict[str, int] = {}
+        for side, summary in games:
+            for name, entry in summary.items():
+                prefix = f"sides.{side}.{name}."
+                for field, value in (("placements", entry["placements"]), ("lifetime_ms", entry["lifetime_ms"]),
+                                     ("first_placed_ms_sum", entry["first_placed_ms"]), ("games_placed", 1)):
+                    inc[prefix + field] = inc.get(prefix + field, 0) + value
+            inc[f"games.{side}"] = inc.get(f"games.{side}", 0) + 1
+        return inc
+
+    def summary(self, side: Optional[str] = None) -> Dict[str, Any]:
+        """Per-hotspot placements, rates and averages (both sides combined if side is None)."""
+        sides = [side] if side else list(self.sides)
+        games = sum(self.games.get(s, 0) for s in sides)
+
+        combined: Dict[str, Dict[str, int]] = {}
+        for s in sides:
+            for name, agg in self.sides.get(s, {}).items():
+                acc = combined.setdefault(name, {"placements": 0, "lifetime_ms": 0, "first_placed_ms_sum": 0, "games_placed": 0})
+                for key in acc:
+                    acc[key] += agg.get(key, 0)
+
+        hotspots = []
+        for name, acc in combined.items():
+            placements = acc["placements"]
+            hotspots.append({
+                "hotspot": name,
+                "position": HOTSPOT_POSITIONS.get(name),
+                "placements": placements,
+                "placements_per_game": round(placements / games, 2) if games else 0,
+                "games_placed": acc["games_placed"],
+                "avg_lifetime_s": round(acc["lifetime_ms"] / placements / 1000, 1) if placements else 0,
+                "avg_first_placement_min": round(acc["first_placed_ms_sum"] / acc["games_placed"] / 60000, 2) if acc["games_placed"] else None,
+            })
+        hotspots.sort(key=lambda h: h["placements"], reverse=True)
+
+        return {
+            "puuid": self.puuid,
+            "side": side,
+            "games": games,
+            "hotspots": hotspots,
+            "never_warded": [name for name in HOTSPOT_POSITIONS if name not in combined],
+        }
+
+def load_ward_coverage(puuid: str, db=None) -> WardCoverage:
+    if db is None:
+        from database import Database
+        db = Database()
+    return WardCoverage(puuid, db.get_ward_coverage(puuid))
+
+
+def save_ward_coverage(coverage: WardCoverage, db=None) -> None:
+    """Add the pending matches to the stored totals (each match once, across runs and workers)."""
+    if not coverage.dirty:
+        return
+    if db is None:
+        from database import Database
+        db = Database()
+    puuid = coverage.puuid
+    legacy = set(((db.get_ward_coverage(puuid) or {}).get("match_ids")) or [])
+    if legacy:
+        db.claim_folds("ward_coverage", puuid, sorted(legacy))
+    owner = uuid.uuid4().hex
+    claimed = db.claim_folds("ward_coverage", puuid, [mid for mid in coverage.pending if mid not in legacy], owner)
+    try:
+        # Also run with nothing claimed but a legacy list, to drop that list from the document
+        if claimed or legacy:
+            db.inc_ward_coverage(puuid, WardCoverage.increments([coverage.pending[mid] for mid in claimed]))
+    except BaseException:
+        db.release_folds("ward_coverage", puuid, claimed, owner)
+        raise
+    db.confirm_folds("ward_coverage", puuid, claimed, owner)
+    coverage.pending.clear()
@@ -1,6 +1,21 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # runserver's serving process (not its autoreloader parent, not migrate/shell);
+        # gunicorn workers resume the backfill in post_fork (gunicorn.conf.py)
+        if os.environ.get("RUN_MAIN") != "true":
+            return
+        project_root = str(settings.BASE_DIR.parent.parent)
+        if project_root not in sys.path:
+            sys.path.append(project_root)
+        from fetch_scheduler import get_scheduler
+        get_scheduler().resume_backfill()
@@ -0,0 +1,31 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class FastJSONRenderer(BaseRenderer):
+    """DRF JSON renderer backed by fast_json (the repo-wide codec)."""
+
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        import fast_json
+        return fast_json.dumps(data, default=JSONEncoder().default)
+
+
+class FastJSONParser(BaseParser):
+    """DRF JSON request parser backed by fast_json."""
+
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        import fast_json
+        try:
+            return fast_json.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -1,13 +1,21 @@
 from django.urls import path
-from .views import AnalysisListView, AnalysisDetailView, RunAnalysisView, DeepDiveAnalysisView, cached_meraki_items, cached_meraki_champions, health_check, AnalysisLookupView
+from .views import AnalysisListView, AnalysisDetailView, RunAnalysisView, DeepDiveAnalysisView, cached_meraki_items, cached_meraki_champions, health_check, AnalysisLookupView, AnalysisSearchView, match_replay_data, player_heatmap, player_ward_coverage, analysis_trace, metrics_view, admin_profiles, admin_profile_file
 
 urlpatterns = [
     path('analyses/', AnalysisListView.as_view(), name='analysis-list'),
     path('analyses/<str:filename>/', AnalysisDetailView.as_view(), name='analysis-detail'),
     path('analyses/<str:filename>/deep_dive/', DeepDiveAnalysisView.as_view(), name='deep-dive-analysis'),
+    path('analyses/<str:filename>/trace/', analysis_trace, name='analysis-trace'),
     path('lookup/', AnalysisLookupView.as_view(), name='analysis-lookup'),
+    path('search/', AnalysisSearchView.as_view(), name='analysis-search'),
     path('analyze/', RunAnalysisView.as_view(), name='run-analysis'),
     path('meraki/items/', cached_meraki_items, name='meraki-items'),
     path('meraki/champions/', cached_meraki_champions, name='meraki-champions'),
+    path('matches/<str:match_id>/replay/', match_replay_data, name='match-replay'),
+    path('heatmaps/<str:puuid>/', player_heatmap, name='player-heatmap'),
+    path('wards/<str:puuid>/', player_ward_coverage, name='player-ward-coverage'),
     path('health/', health_check, name='health-check'),
+    path('metrics/', metrics_view, name='metrics'),
+    path('admin/profiles/', admin_profiles, name='admin-profiles'),
+    path('admin/profiles/<str:job_id>/<str:name>', admin_profile_file, name='admin-profile-file'),
 ]
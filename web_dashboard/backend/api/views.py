@@ -14,9 +14,17 @@ from urllib.parse import unquote
 
 SAVES_DIR = settings.BASE_DIR.parent.parent / 'saves'
 
+LIST_PAGE_SIZE = 50
+
+
 class AnalysisListView(APIView):
     def get(self, request):
-        print("Listing analyses from MongoDB")
+        """Newest first, one page at a time: ?limit=N (max 200) and ?cursor=<next_cursor of the previous page>."""
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', LIST_PAGE_SIZE)), 200))
+            cursor = request.query_params.get('cursor') or None
+        except ValueError:
+            return Response({'error': 'Invalid limit or cursor'}, status=status.HTTP_400_BAD_REQUEST)
         try:
             from database import Database
             db = Database()
@@ -25,13 +33,15 @@ class AnalysisListView(APIView):
             # For migration, we assume DB is primary.
             if not db.is_connected:
                 print("MongoDB not connected, returning empty list.")
-                return Response([])
-                
-            files = db.list_analyses()
-            
-            # Sort by created desc (db.list_analyses doesn't sort yet, or we sort here)
-            files.sort(key=lambda x: x.get('created', 0), reverse=True)
-            return Response(files)
+                return Response({'items': [], 'next_cursor': None, 'total': 0})
+
+            # Sorted and paged by the DB on the (created, _id) index
+            try:
+                files = db.list_analyses(limit=limit, cursor=cursor)
+            except ValueError:
+                return Response({'error': 'Invalid limit or cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            next_cursor = files[-1]['cursor'] if len(files) == limit else None
+            return Response({'items': files, 'next_cursor': next_cursor, 'total': db.count_analyses()})
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -62,12 +72,13 @@ class AnalysisDetailView(APIView):
 
             # This handles "league_analysis_..." prefix AND raw Riot IDs
             # It normalizes spaces, tags, etc.
-            target_doc = db.find_analysis_by_fuzzy_filename(core_id)
+            # expand=False: participants stay in packed column form, the dashboard decodes them
+            target_doc = db.find_analysis_by_fuzzy_filename(core_id, expand=False)
             
             if target_doc:
                 # Sanitize to remove ObjectId
                 target_doc = db._sanitize_document(target_doc)
-                return JsonResponse(target_doc)
+                return FastJsonResponse(target_doc)
             else:
                 return Response({'error': 'Analysis not found in DB'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -77,131 +88,80 @@ class AnalysisDetailView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 import json
-from django.http import JsonResponse
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, Http404
 from pathlib import Path
 import time
-import requests
 
 # ... existing imports ...
 
-# Define cache path (should match coach_data_enricher)
-CACHE_DIR = Path(__file__).resolve().parent.parent.parent.parent / "saves" / "cache"
+# Hashed item assets never change once written, so clients may cache them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class FastJsonResponse(HttpResponse):
+    """JsonResponse encoded with fast_json: bytes straight into the body, int keys allowed."""
+
+    def __init__(self, data, **kwargs):
+        import fast_json
+        from django.core.serializers.json import DjangoJSONEncoder
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=fast_json.dumps(data, default=DjangoJSONEncoder().default), **kwargs)
 
-# Helper for Smart Caching
-def fetch_if_modified(url, cache_path, timeout=10):
-    """
-    Fetches URL only if remote content is newer than local file.
-    Returns: (data, was_modified)
-    """
-    headers = {}
-    if cache_path.exists():
-        # Add If-Modified-Since header
-        mtime = cache_path.stat().st_mtime
-        from email.utils import formatdate
-        headers['If-Modified-Since'] = formatdate(mtime, usegmt=True)
-        
-    try:
-        resp = requests.get(url, headers=headers, timeout=timeout)
-        
-        if resp.status_code == 304:
-            # Not Modified - Update local mtime to touch the file
-            # print(f"[Smart Cache] Not Modified: {cache_path.name}")
-            os.utime(cache_path, None)
-            with open(cache_path, "r", encoding="utf-8") as f:
-                return json.load(f), False
-                
-        elif resp.status_code == 200:
-            # Modified - Save new data
-            # print(f"[Smart Cache] Modified! Downloading {cache_path.name}")
-            data = resp.json()
-            with open(cache_path, "w", encoding="utf-8") as f:
-                json.dump(data, f)
-            return data, True
-            
-        else:
-            # Error status - Fallback to cache if exists
-            resp.raise_for_status()
-            
-    except Exception as e:
-        print(f"Smart fetch failed ({e}), checking cache...")
-        if cache_path.exists():
-            with open(cache_path, "r", encoding="utf-8") as f:
-                return json.load(f), False
-        raise e
 
 def cached_meraki_items(request):
-    """Serve cached Meraki items to frontend with Smart Caching."""
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    cache_path = CACHE_DIR / "meraki_items_enriched.json"
-    
-    # Base Meraki Fetch (Smart)
-    data = {}
-    try:
-        url = "https://cdn.merakianalytics.com/riot/lol/resources/latest/en-US/items.json"
-        # Use simple name for raw cache to support headers check
-        raw_cache_path = CACHE_DIR / "meraki_items_raw.json"
-        
-        # Check remote
-        raw_data, modified = fetch_if_modified(url, raw_cache_path, timeout=3)
-        
-        if not modified and cache_path.exists():
-            # If Meraki didn't change and we have enriched cache, return enriched
-             # Check if enriched is also recent-ish (synced with raw)
-            if cache_path.stat().st_mtime >= raw_cache_path.stat().st_mtime:
-                 with open(cache_path, "r", encoding="utf-8") as f:
-                    return JsonResponse(json.load(f))
-        
-        # If modified or no enriched cache, proceed to enrich
-        data = raw_data
-        
-    except Exception as e:
-        print(f"Meraki Smart Fetch failed ({e})...")
-        
-    # Enrichment Logic (Same as before)
-    try:
-        # Get latest version
-        v_resp = requests.get("https://ddragon.leagueoflegends.com/api/versions.json", timeout=5)
-        latest_version = v_resp.json()[0]
-        
-        # Get DDragon Items
-        dd_resp = requests.get(f"https://ddragon.leagueoflegends.com/cdn/{latest_version}/data/en_US/item.json", timeout=10)
-        dd_items = dd_resp.json().get("data", {})
+    """Redirect to the precomputed, content-hashed enriched items asset."""
+    import enriched_items
+    # Idempotent: republishes in the background when the patch changes
+    enriched_items.start_background_refresh()
 
-        if not data:
-            data = dd_items # Fallback
-        else:
-            # Merge
-            for item_id, item_info in data.items():
-                dd_item = dd_items.get(item_id)
-                if dd_item:
-                    if dd_item.get("description"):
-                        item_info["description"] = dd_item.get("description")
-                    if dd_item.get("name"):
-                         item_info["name"] = dd_item.get("name")
-                         
-        # Save enriched
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(data, f)
-            
-    except Exception as e:
-        print(f"Enrichment failed: {e}")
-        if not data:
-            return JsonResponse({'error': 'Failed to fetch item data source'}, status=503)
+    pointer = enriched_items.read_pointer()
+    if pointer is None:
+        # Cold start (build step skipped): publish synchronously once
+        try:
+            pointer = enriched_items.publish()
+        except Exception as e:
+            print(f"Enrichment failed: {e}")
+    if not pointer:
+        return FastJsonResponse({'error': 'Failed to fetch item data source'}, status=503)
 
-    return JsonResponse(data)
+    response = HttpResponseRedirect(request.build_absolute_uri(pointer["url"]))
+    # Short TTL: the pointer moves when a new patch is published
+    response["Cache-Control"] = "public, max-age=300"
+    return response
+
+def static_data_asset(request, name):
+    """
+    Serve a hashed asset that WhiteNoise hasn't indexed yet.
+
+    WhiteNoise scans WHITENOISE_ROOT at startup, so files published by the
+    background refresh after boot fall through to this view until the next restart.
+    """
+    import enriched_items
+    path = (enriched_items.ASSET_DIR / name).resolve()
+    if path.parent != enriched_items.ASSET_DIR.resolve() or not name.endswith(".json") or not path.exists():
+        raise Http404("Asset not found")
+
+    gz_path = path.with_name(path.name + ".gz")
+    if "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "") and gz_path.exists():
+        response = FileResponse(open(gz_path, "rb"), content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = FileResponse(open(path, "rb"), content_type="application/json")
+    response["Vary"] = "Accept-Encoding"
+    if name != enriched_items.POINTER_PATH.name:
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+    return response
 
 def cached_meraki_champions(request):
-    """Serve cached Meraki champions to frontend with Smart Caching."""
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    cache_path = CACHE_DIR / "meraki_champions.json"
-    
+    """Serve Meraki champions from the shared static-data cache."""
     try:
-        url = "https://cdn.merakianalytics.com/riot/lol/resources/latest/en-US/champions.json"
-        # Smart Fetch (Large file, 20s timeout)
-        data, _ = fetch_if_modified(url, cache_path, timeout=20)
-        return JsonResponse(data)
+        import static_data
+        data = static_data.get_meraki_champions()
+        if not data:
+            return FastJsonResponse({"error": "Champion data unavailable"}, status=503)
+        return FastJsonResponse(data)
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return FastJsonResponse({"error": str(e)}, status=500)
 
 class AnalysisLookupView(APIView):
     """
@@ -230,7 +190,8 @@ class AnalysisLookupView(APIView):
             # Let's convert "Name#Tag" -> "Name_Tag" here to be safe and consistent with logic.
             safe_id = riot_id.replace("#", "_")
             
-            doc = db.find_analysis_by_fuzzy_filename(safe_id)
+            # Only the identity fields: a hit is answered without loading/decompressing the analysis
+            doc = db.find_analysis_by_fuzzy_filename(safe_id, projection={"riot_id": 1, "region": 1, "_id": 0})
             
             if doc:
                 # Calculate correct filename
@@ -256,6 +217,24 @@ class AnalysisLookupView(APIView):
             print(f"Lookup Error: {e}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class AnalysisSearchView(APIView):
+    """Autocomplete for stored analyses: ?q=<partial Riot ID>&limit=N (max 25). Prefix match, any casing."""
+    def get(self, request):
+        query = (request.query_params.get('q') or '').strip()
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 25))
+        except ValueError:
+            limit = 10
+        if len(query) < 2:
+            return Response({'results': []})
+        try:
+            from database import Database
+            db = Database()
+            return Response({'results': db.search_analyses(query, limit=limit)})
+        except Exception as e:
+            print(f"Search Error: {e}")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class RunAnalysisView(APIView):
 # ... existing code ...
     def post(self, request):
@@ -275,6 +254,7 @@ class RunAnalysisView(APIView):
         region = request.data.get('region', 'NA')
         force_refresh = request.data.get('force_refresh', False)
         puuid = request.data.get('puuid', None)
+        profile = bool(request.headers.get('X-Profile-Pipeline')) and _admin_allowed(request)
 
         # Basic Validation
         if not riot_id:
@@ -324,7 +304,8 @@ class RunAnalysisView(APIView):
                 open_dashboard=False,
                 region_key=region,
                 puuid=puuid,
-                force_refresh=force_refresh
+                force_refresh=force_refresh,
+                profile=profile,
             )
             with open("backend_debug.txt", "a") as f:
                 f.write(f"[DEBUG] Pipeline finished successfully\n")
@@ -357,18 +338,19 @@ class RunAnalysisView(APIView):
                 'riot_id': canonical_riot_id, # Return the ACTUAL ID used for saving
                 'filename': f"league_analysis_{canonical_riot_id.replace('#', '_')}.json",
                 'input_riot_id': riot_id,
+                'profile_id': (analysis_result.get('pipeline_trace') or {}).get('attrs', {}).get('profile_id'),
                 'debug': {
                     'db_connected': db.is_connected,
                     'save_verified': True,
                     'saved_id': saved_doc.get('riot_id'),
-                    'db_doc_count': len(db.list_analyses())
+                    'db_doc_count': db.count_analyses()
                 }
             }
             
             # log size of response (should be tiny)
-            import json
+            import fast_json
             try:
-                debug_json = json.dumps(response_data)
+                debug_json = fast_json.dumps(response_data)
                 with open("backend_debug.txt", "a") as f:
                     f.write(f"[DEBUG] Response JSON Size: {len(debug_json)} bytes\n")
             except Exception as e:
@@ -378,8 +360,8 @@ class RunAnalysisView(APIView):
             with open("backend_debug.txt", "a") as f:
                 f.write("[DEBUG] Sending Response object now.\n")
                 
-            # Use JsonResponse to bypass DRF content negotiation/overhead
-            return JsonResponse(response_data)
+            # Use FastJsonResponse to bypass DRF content negotiation/overhead
+            return FastJsonResponse(response_data)
             
         except Exception as e:
             import traceback
@@ -455,7 +437,14 @@ class DeepDiveAnalysisView(APIView):
             champion_pool = champion_pool[:10]
 
             print(f"Running deep dive for {match_id} (Pool: {len(champion_pool)} champs)...")
-            report_markdown = analyze_specific_game(match_id, target_match, champion_pool=champion_pool)
+            # Positions are no longer stored in the analysis; rebuild them for the crew only
+            crew_match = target_match
+            if not target_match.get("all_positions"):
+                import match_replay
+                replay = match_replay.get_replay(match_id, db=db)
+                if replay:
+                    crew_match = {**target_match, "all_positions": replay["all_positions"]}
+            report_markdown = analyze_specific_game(match_id, crew_match, champion_pool=champion_pool)
             print(f"Deep dive complete. Report length: {len(report_markdown)}")
             
             if not report_markdown:
@@ -485,6 +474,154 @@ class DeepDiveAnalysisView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def match_replay_data(request, match_id):
+    """All-participant positions and gold/XP series for one match, built on demand."""
+    import match_replay
+    match_id = unquote(match_id)
+    encoding = request.GET.get('encoding') or None
+    try:
+        match_replay.validate_replay_request(match_id, encoding)
+    except match_replay.ReplayRequestError as e:
+        return FastJsonResponse({'error': str(e)}, status=400)
+    try:
+        body = match_replay.get_replay_json(match_id, encoding=encoding)
+    except Exception as e:
+        print(f"Replay Error: {e}")
+        return FastJsonResponse({'error': str(e)}, status=500)
+    if body is None:
+        return FastJsonResponse({'error': 'Match or timeline not cached for this match'}, status=404)
+
+    response = HttpResponse(body, content_type="application/json")
+    # Finished games never change; let the browser keep it for the session and beyond
+    response["Cache-Control"] = "private, max-age=86400"
+    return response
+
+
+def player_heatmap(request, puuid):
+    """
+    Precomputed movement heatmap for a player (64x64 uint16 grid).
+
+    ?role=MIDDLE&phase=early selects one grid. Omitting either sums across it.
+    ?format=bin returns the raw little-endian uint16 bytes instead of JSON.
+    """
+    try:
+        import heatmaps
+        role = request.GET.get('role') or None
+        phase = request.GET.get('phase') or None
+        if phase and phase not in heatmaps.PHASE_NAMES:
+            return FastJsonResponse({'error': f"Unknown phase: {phase}"}, status=400)
+
+        player = heatmaps.load_player_heatmaps(unquote(puuid))
+        if not player.grids:
+            return FastJsonResponse({'error': 'No heatmap data for this player'}, status=404)
+
+        if request.GET.get('format') == 'bin':
+            response = HttpResponse(heatmaps.grid_to_bytes(player.get(role, phase)), content_type="application/octet-stream")
+            response["X-Grid-Size"] = str(heatmaps.GRID_SIZE)
+            response["X-Map-Size"] = str(heatmaps.MAP_SIZE)
+        else:
+            response = FastJsonResponse(heatmaps.heatmap_payload(player, role, phase))
+        # Grids change only when a new analysis runs
+        response["Cache-Control"] = "private, max-age=60"
+        return response
+    except Exception as e:
+        print(f"Heatmap Error: {e}")
+        return FastJsonResponse({'error': str(e)}, status=500)
+
+
+def player_ward_coverage(request, puuid):
+    """Aggregated hotspot vision stats for a player (?side=blue|red, both if omitted)."""
+    try:
+        import ward_coverage
+        side = request.GET.get('side') or None
+        if side and side not in ward_coverage.SIDES.values():
+            return FastJsonResponse({'error': f"Unknown side: {side}"}, status=400)
+
+        coverage = ward_coverage.load_ward_coverage(unquote(puuid))
+        if not coverage.match_ids:
+            return FastJsonResponse({'error': 'No ward coverage data for this player'}, status=404)
+        response = FastJsonResponse(coverage.summary(side))
+        response["Cache-Control"] = "private, max-age=60"
+        return response
+    except Exception as e:
+        print(f"Ward Coverage Error: {e}")
+        return FastJsonResponse({'error': str(e)}, status=500)
+
+
+def analysis_trace(request, filename):
+    """
+    The pipeline trace stored with an analysis, as Chrome trace-event JSON
+    (load in chrome://tracing or Perfetto). ?format=raw returns the span record.
+    """
+    try:
+        from database import Database
+        from pipeline_trace import chrome_trace
+        core_id = unquote(filename).strip().rstrip('/')
+        if core_id.lower().startswith("league_analysis_"):
+            core_id = core_id[16:]
+        if core_id.lower().endswith(".json"):
+            core_id = core_id[:-5]
+
+        doc = Database().find_analysis_by_fuzzy_filename(core_id, expand=False)
+        record = (doc or {}).get("pipeline_trace")
+        if not record:
+            return FastJsonResponse({'error': 'No trace stored for this analysis'}, status=404)
+        if request.GET.get('format') == 'raw':
+            return FastJsonResponse(record)
+        response = FastJsonResponse(chrome_trace(record))
+        response["Content-Disposition"] = f'inline; filename="trace_{core_id}.json"'
+        return response
+    except Exception as e:
+        print(f"Trace Error: {e}")
+        return FastJsonResponse({'error': str(e)}, status=500)
+
+
+def _admin_allowed(request):
+    """Profiling and metrics are open in DEBUG; otherwise they need PIPELINE_ADMIN_TOKEN,
+    as X-Admin-Token or a bearer token (what Prometheus scrapes send)."""
+    if settings.DEBUG:
+        return True
+    token = os.getenv('PIPELINE_ADMIN_TOKEN')
+    if not token:
+        return False
+    auth = request.headers.get('Authorization', '')
+    bearer = auth[7:] if auth.startswith('Bearer ') else None
+    return token in (request.headers.get('X-Admin-Token'), bearer)
+
+
+def admin_profiles(request):
+    """Recent pipeline profiles (newest first). ?limit=N, default 20."""
+    if not _admin_allowed(request):
+        return FastJsonResponse({'error': 'Forbidden'}, status=403)
+    from pipeline_profiler import list_profiles
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 20)), 200))
+    except ValueError:
+        limit = 20
+    return FastJsonResponse({'profiles': list_profiles(limit)})
+
+
+def admin_profile_file(request, job_id, name):
+    """One artifact of a stored profile (stacks.folded, allocations.json, trace.json, summary.json)."""
+    if not _admin_allowed(request):
+        return FastJsonResponse({'error': 'Forbidden'}, status=403)
+    from pipeline_profiler import profile_file
+    path = profile_file(job_id, name)
+    if path is None:
+        raise Http404("Profile not found")
+    content_type = 'text/plain; charset=utf-8' if name.endswith('.folded') else 'application/json'
+    return FileResponse(open(path, 'rb'), content_type=content_type)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint (text exposition format)."""
+    if not _admin_allowed(request):
+        return FastJsonResponse({'error': 'Forbidden'}, status=403)
+    from metrics import render
+    body, content_type = render()
+    return HttpResponse(body, content_type=content_type)
+
+
 def health_check(request):
     """Simple health check for frontend polling."""
-    return JsonResponse({"status": "online", "timestamp": time.time()})
+    return FastJsonResponse({"status": "online", "timestamp": time.time()})
@@ -85,6 +85,10 @@ CORS_ALLOWED_ORIGINS = []
 # ]
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Opt-in pipeline profiling and the admin profile endpoints (see api/views.py)
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = (*default_headers, "x-profile-pipeline", "x-admin-token")
+
 if 'RENDER' in os.environ:
     # Add the Vercel frontend URL to CORS_ALLOWED_ORIGINS
     FRONTEND_URL = os.environ.get('FRONTEND_URL')
@@ -120,6 +124,19 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# JSON in and out through the repo's fast_json codec
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -171,6 +188,17 @@ if not DEBUG:
     STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Precomputed data assets (see enriched_items.py) served by WhiteNoise at /static-data/...
+WHITENOISE_ROOT = BASE_DIR.parent.parent / 'saves' / 'public'
+os.makedirs(WHITENOISE_ROOT, exist_ok=True)
+
+def _is_hashed_asset(path, url):
+    # items.<12 hex>.json[.gz] -> safe to cache forever
+    import re
+    return bool(re.search(r'\.[0-9a-f]{12}\.json(\.gz)?$', url))
+
+WHITENOISE_IMMUTABLE_FILE_TEST = _is_hashed_asset
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -16,8 +16,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from api.views import static_data_asset
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    # Fallback for assets published after WhiteNoise indexed WHITENOISE_ROOT
+    path('static-data/<str:name>', static_data_asset, name='static-data-asset'),
 ]
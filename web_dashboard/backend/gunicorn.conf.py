@@ -1,5 +1,38 @@
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
 timeout = 300
 workers = 2
+# Every worker paces Riot calls on its own; give each one an equal slice of the key's limits (fetch_scheduler.py)
+os.environ.setdefault("RIOT_QUOTA_SHARES", str(workers))
 loglevel = "info"
 accesslog = "-"
 errorlog = "-"
+
+# Shared sample directory so /api/metrics/ aggregates every worker (see metrics.py).
+# Must be set before the workers import prometheus_client.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "league_analyzer_metrics"))
+
+
+def on_starting(server):
+    # Samples from a previous master's workers would be summed into this one's
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    # Pick up the shared backfill queue left by previous workers (fetch_scheduler.py)
+    repo_root = str(Path(__file__).resolve().parent.parent.parent)
+    if repo_root not in sys.path:
+        sys.path.append(repo_root)
+    from fetch_scheduler import get_scheduler
+    get_scheduler().resume_backfill()
@@ -5,6 +5,7 @@ import Home from './components/Home';
 import DashboardView from './components/DashboardView';
 import BackendStatus from './components/BackendStatus';
 import config from './config';
+import { expandAnalysis } from './utils/participants';
 
 function App() {
   const [selectedFile, setSelectedFile] = useState(null);
@@ -49,7 +50,7 @@ function App() {
     setLoading(true);
     axios.get(`${config.API_URL}/api/analyses/${encodeURIComponent(filename)}/?_t=${Date.now()}`)
       .then(res => {
-        setAnalysisData(res.data);
+        setAnalysisData(expandAnalysis(res.data));
         setLoading(false);
       })
       .catch(err => {
@@ -190,7 +191,7 @@ function App() {
   const refreshData = (filename) => {
     axios.get(`${config.API_URL}/api/analyses/${encodeURIComponent(filename)}/?_t=${Date.now()}`)
       .then(res => {
-        setAnalysisData(res.data);
+        setAnalysisData(expandAnalysis(res.data));
       })
       .catch(err => {
         console.error("Silent refresh failed:", err);
@@ -5,6 +5,8 @@ import config from '../config';
 
 export default function AnalysisList({ onSelect }) {
     const [analyses, setAnalyses] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [total, setTotal] = useState(0);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
 
@@ -15,11 +17,16 @@ export default function AnalysisList({ onSelect }) {
     const [analyzing, setAnalyzing] = useState(false);
     const [analyzeError, setAnalyzeError] = useState(null);
 
-    const fetchAnalyses = () => {
+    // cursor = null loads the first page; otherwise appends the page after it
+    const fetchAnalyses = (cursor = null) => {
         setLoading(true);
-        axios.get(`${config.API_URL}/api/analyses/?_t=${Date.now()}`)
+        const params = { _t: Date.now() };
+        if (cursor) params.cursor = cursor;
+        axios.get(`${config.API_URL}/api/analyses/`, { params })
             .then(res => {
-                setAnalyses(res.data);
+                setAnalyses(prev => cursor ? [...prev, ...res.data.items] : res.data.items);
+                setNextCursor(res.data.next_cursor);
+                setTotal(res.data.total);
                 setLoading(false);
             })
             .catch(err => {
@@ -65,7 +72,10 @@ export default function AnalysisList({ onSelect }) {
     return (
         <div className="max-w-4xl mx-auto p-6">
             <div className="flex items-center justify-between mb-8">
-                <h1 className="text-3xl font-bold text-white">Recent Analyses</h1>
+                <h1 className="text-3xl font-bold text-white">
+                    Recent Analyses
+                    {total > 0 && <span className="ml-3 text-base font-normal text-slate-500">{total}</span>}
+                </h1>
                 <button
                     onClick={() => setShowModal(true)}
                     className="flex items-center gap-2 bg-blue-600 hover:bg-blue-500 text-white px-4 py-2 rounded-lg font-medium transition-colors font-serif shadow-lg shadow-blue-500/20"
@@ -109,6 +119,15 @@ export default function AnalysisList({ onSelect }) {
                             <ChevronRight className="text-slate-600 group-hover:text-blue-400 transition-colors" />
                         </button>
                     ))}
+                    {nextCursor && (
+                        <button
+                            onClick={() => fetchAnalyses(nextCursor)}
+                            disabled={loading}
+                            className="p-3 text-sm text-slate-400 hover:text-white border border-slate-700/50 rounded-xl transition-colors disabled:opacity-50"
+                        >
+                            {loading ? 'Loading...' : 'Load more'}
+                        </button>
+                    )}
                 </div>
             )}
 
@@ -1,11 +1,27 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import ReactMarkdown from 'react-markdown';
 import { X, Microscope, Map as MapIcon, FileText } from 'lucide-react';
 import TimelineMap from './TimelineMap';
+import { fetchReplay } from '../utils/replay';
 import clsx from 'clsx';
 
 export default function DeepDiveView({ report, matchData, puuid, onClose, isLoading }) {
     const [activeTab, setActiveTab] = useState('report');
+    const [replay, setReplay] = useState(null);
+
+    // Positions for the map come from the replay endpoint, not the analysis document
+    useEffect(() => {
+        if (activeTab !== 'map' || !matchData || matchData.all_positions) return;
+        let cancelled = false;
+        fetchReplay(matchData.match_id).then(data => {
+            if (!cancelled && data) setReplay(data);
+        });
+        return () => { cancelled = true; };
+    }, [activeTab, matchData]);
+
+    const mapMatch = replay && matchData && replay.match_id === matchData.match_id
+        ? { ...matchData, all_positions: replay.all_positions }
+        : matchData;
 
     if (!report && !isLoading) return null;
 
@@ -167,7 +183,7 @@ export default function DeepDiveView({ report, matchData, puuid, onClose, isLoad
                             )}
                             {activeTab === 'map' && matchData && (
                                 <div className="h-full">
-                                    <TimelineMap match={matchData} puuid={puuid} showWards={true} />
+                                    <TimelineMap match={mapMatch} puuid={puuid} showWards={true} />
                                 </div>
                             )}
                         </>
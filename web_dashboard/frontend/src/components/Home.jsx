@@ -10,6 +10,7 @@ export default function Home({ onSelect, onAnalyze }) {
     const [region, setRegion] = useState('NA');
     const [recentAnalyses, setRecentAnalyses] = useState([]);
     const [showRecent, setShowRecent] = useState(false);
+    const [suggestions, setSuggestions] = useState([]);
     const [analyzing, setAnalyzing] = useState(false);
     const [analyzeError, setAnalyzeError] = useState(null);
     const searchRef = useRef(null);
@@ -34,6 +35,21 @@ export default function Home({ onSelect, onAnalyze }) {
         return () => document.removeEventListener("mousedown", handleClickOutside);
     }, []);
 
+    // Server-side autocomplete over stored analyses (debounced)
+    useEffect(() => {
+        const q = riotId.trim();
+        if (q.length < 2) {
+            setSuggestions([]);
+            return;
+        }
+        const timer = setTimeout(() => {
+            axios.get(`${config.API_URL}/api/search/`, { params: { q, limit: 5 } })
+                .then(res => setSuggestions(res.data.results || []))
+                .catch(() => setSuggestions([]));
+        }, 200);
+        return () => clearTimeout(timer);
+    }, [riotId]);
+
     const handleSearch = async (e) => {
         e.preventDefault();
         if (!riotId) return;
@@ -66,6 +82,8 @@ export default function Home({ onSelect, onAnalyze }) {
         const name = file.riot_id !== 'Unknown' ? file.riot_id : file.filename;
         return name.toLowerCase().includes(riotId.toLowerCase());
     });
+    const recentIds = new Set(filteredRecents.slice(0, 5).map(file => file.riot_id));
+    const playerMatches = suggestions.filter(file => !recentIds.has(file.riot_id));
 
     return (
         <div className="min-h-screen bg-dark-bg text-white font-sans flex flex-col relative overflow-hidden">
@@ -165,11 +183,13 @@ export default function Home({ onSelect, onAnalyze }) {
                     </form>
 
                     {/* Recent Searches Dropdown */}
-                    {showRecent && filteredRecents.length > 0 && (
+                    {showRecent && (filteredRecents.length > 0 || playerMatches.length > 0) && (
                         <div className="absolute top-full left-0 right-0 mt-2 bg-slate-900/95 backdrop-blur-xl border border-white/10 rounded-xl shadow-2xl overflow-hidden z-10 animate-in fade-in slide-in-from-top-2 duration-200">
-                            <div className="px-4 py-2 text-xs font-bold text-violet-400 uppercase tracking-wider bg-violet-500/5">
-                                Recent Searches
-                            </div>
+                            {filteredRecents.length > 0 && (
+                                <div className="px-4 py-2 text-xs font-bold text-violet-400 uppercase tracking-wider bg-violet-500/5">
+                                    Recent Searches
+                                </div>
+                            )}
                             {filteredRecents.slice(0, 5).map((file) => (
                                 <button
                                     key={file.filename}
@@ -195,6 +215,35 @@ export default function Home({ onSelect, onAnalyze }) {
                                     <ChevronRight className="text-slate-600 group-hover:text-white transition-colors" />
                                 </button>
                             ))}
+                            {playerMatches.length > 0 && (
+                                <div className="px-4 py-2 text-xs font-bold text-violet-400 uppercase tracking-wider bg-violet-500/5">
+                                    Analyzed Players
+                                </div>
+                            )}
+                            {playerMatches.map((file) => (
+                                <button
+                                    key={file.filename}
+                                    onClick={() => onSelect(file.filename)}
+                                    className="w-full flex items-center justify-between px-5 py-4 hover:bg-violet-500/10 transition-colors border-b border-white/5 last:border-0 group text-left"
+                                >
+                                    <div className="flex items-center gap-4">
+                                        <div className="w-10 h-10 rounded-full bg-violet-500/10 border border-violet-500/20 flex items-center justify-center text-violet-400 group-hover:text-white group-hover:bg-violet-600 transition-colors">
+                                            <Search size={20} />
+                                        </div>
+                                        <div>
+                                            <div className="font-bold text-slate-200 text-lg group-hover:text-white transition-colors">
+                                                {file.riot_id}
+                                            </div>
+                                            <div className="flex items-center gap-2 text-xs text-slate-500">
+                                                <span className="text-violet-400 font-medium">{file.primary_role}</span>
+                                                <span>•</span>
+                                                <span>{file.match_count} Games</span>
+                                            </div>
+                                        </div>
+                                    </div>
+                                    <ChevronRight className="text-slate-600 group-hover:text-white transition-colors" />
+                                </button>
+                            ))}
                         </div>
                     )}
                 </div>
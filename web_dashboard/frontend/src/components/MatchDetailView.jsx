@@ -1,12 +1,28 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import clsx from 'clsx';
 import Scoreboard from './Scoreboard';
 import BuildAnalysis from './BuildAnalysis';
 import TimelineMap from './TimelineMap';
 import GoldXpGraph from './GoldXpGraph';
+import { fetchReplay } from '../utils/replay';
 
 export default function MatchDetailView({ match, puuid, onClose, onPlayerClick }) {
     const [activeTab, setActiveTab] = useState('overview');
+    const [replay, setReplay] = useState(null);
+
+    // Heavy replay series are loaded only once the Timeline tab is opened
+    useEffect(() => {
+        if (activeTab !== 'timeline' || replay || match.all_positions) return;
+        let cancelled = false;
+        fetchReplay(match.match_id).then(data => {
+            if (!cancelled && data) setReplay(data);
+        });
+        return () => { cancelled = true; };
+    }, [activeTab, match.match_id, match.all_positions, replay]);
+
+    const timelineMatch = replay
+        ? { ...match, all_positions: replay.all_positions, all_gold_xp_series: replay.all_gold_xp_series }
+        : match;
 
     const tabs = [
         { id: 'overview', label: 'Overview' },
@@ -58,11 +74,11 @@ export default function MatchDetailView({ match, puuid, onClose, onPlayerClick }
                         <GoldXpGraph
                             goldXpSeries={match.gold_xp_series}
                             teamGoldDiff={match.team_gold_diff}
-                            allGoldXpData={match.all_gold_xp_series}
+                            allGoldXpData={timelineMatch.all_gold_xp_series}
                             participants={match.participants}
                             puuid={puuid}
                         />
-                        <TimelineMap match={match} puuid={puuid} showWards={false} />
+                        <TimelineMap match={timelineMatch} puuid={puuid} showWards={false} />
                     </div>
                 )}
             </div>
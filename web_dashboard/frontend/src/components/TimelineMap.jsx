@@ -140,7 +140,7 @@ export default function TimelineMap({ match, puuid, showWards = true }) {
         const allPositions = match.all_positions || {};
 
         match.participants.forEach(p => {
-            const pid = p.participantId;
+            const pid = p.participant_id ?? p.participantId;
             paths[p.puuid] = [];
 
             // Add movement frames from backend
@@ -279,9 +279,10 @@ export const getStatModData = (id) => {
 // Fetch item data (From Local Backend Cache -> Meraki)
 export const fetchItems = async () => {
     let data = null;
+    let needsEnrichment = false;
     try {
-        // Use local backend proxy to ensure caching and avoid browser CORS/Rate-limit issues
-        const response = await fetch(`${config.API_URL}/api/meraki/items/?v=${Date.now()}`);
+        // Backend redirects to a content-hashed, pre-enriched asset (immutable, browser-cacheable)
+        const response = await fetch(`${config.API_URL}/api/meraki/items/`);
         if (!response.ok) throw new Error("Backend fetch failed");
         data = await response.json();
     } catch (e) {
@@ -289,17 +290,18 @@ export const fetchItems = async () => {
         try {
             const merakiResponse = await fetch(`${MERAKI_BASE_URL}/items.json`);
             data = await merakiResponse.json();
+            needsEnrichment = true;
         } catch (cdnErr) {
             console.error("Critical: Failed to fetch items from any source", cdnErr);
             return;
         }
     }
 
-    // Always attempt to enrich with DDragon data to fix missing descriptions (e.g. Seraph's Embrace)
+    // Raw CDN data still needs DDragon descriptions (e.g. Seraph's Embrace);
     // Meraki sometimes relies on simpleDescription which strips scaling numbers.
     if (data) {
         try {
-            await enrichWithDDragon(data);
+            if (needsEnrichment) await enrichWithDDragon(data);
             patchItemStats(data); // Apply manual S16 fixes
         } catch (err) {
             console.warn("DDragon enrichment failed", err);
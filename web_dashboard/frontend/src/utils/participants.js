@@ -0,0 +1,77 @@
+// Decoder for packed scoreboard rows (see compact_participants.py)
+// The backend ships detailed_matches[*].participants as columns plus lookup tables
+// shared by the whole analysis; components expect the legacy list-of-objects shape.
+
+const STAT_FIELDS = [
+    "participant_id", "team_id", "position", "win", "champ_level",
+    "kills", "deaths", "assists",
+    "total_damage_dealt_to_champions", "total_damage_taken",
+    "total_minions_killed", "neutral_minions_killed", "gold_earned",
+    "vision_score", "wards_placed", "wards_killed", "detector_wards_placed",
+    "summoner1Id", "summoner2Id",
+];
+
+const perksFromRunePage = (page) => {
+    const [primaryStyle, primaryPerks, subStyle, subPerks, [offense, flex, defense]] = page;
+    const styles = [];
+    if (primaryStyle !== null || primaryPerks.length) {
+        styles.push({ description: "primaryStyle", style: primaryStyle, selections: primaryPerks.map(perk => ({ perk })) });
+    }
+    if (subStyle !== null || subPerks.length) {
+        styles.push({ description: "subStyle", style: subStyle, selections: subPerks.map(perk => ({ perk })) });
+    }
+    return {
+        primary_style: primaryStyle,
+        sub_style: subStyle,
+        keystone: primaryPerks.length ? primaryPerks[0] : null,
+        styles,
+        statPerks: { offense, flex, defense },
+    };
+};
+
+const unpackParticipants = (packed, tables, gameDuration) => {
+    const { cols, extra = {} } = packed;
+    const rows = [];
+    for (let i = 0; i < packed.n; i++) {
+        const p = {};
+        STAT_FIELDS.forEach(name => { if (cols[name]) p[name] = cols[name][i]; });
+
+        const [championName, championId] = tables.champions[cols.champion[i]];
+        p.puuid = tables.puuids[cols.puuid[i]];
+        p.riot_id = tables.riot_ids[cols.riot_id[i]];
+        p.champion_name = championName;
+        p.champion_id = championId;
+
+        cols.items[i].forEach((idx, slot) => { p[`item${slot}`] = tables.items[idx]; });
+        p.perks = perksFromRunePage(tables.rune_pages[cols.rune_page[i]]);
+
+        // Derived values are not stored
+        const cs = (p.total_minions_killed || 0) + (p.neutral_minions_killed || 0);
+        p.cs = cs;
+        p.cs_per_min = gameDuration > 0 ? Math.round((cs / (gameDuration / 60)) * 10) / 10 : 0;
+        p.kda = Math.round((((p.kills || 0) + (p.assists || 0)) / Math.max(1, p.deaths || 0)) * 100) / 100;
+        p.is_self = i === packed.self_index;
+
+        Object.keys(extra).forEach(key => {
+            if (extra[key][i] !== null && extra[key][i] !== undefined) p[key] = extra[key][i];
+        });
+        rows.push(p);
+    }
+    return rows;
+};
+
+// Expands packed participants in place; legacy (already expanded) payloads pass through.
+export const expandAnalysis = (data) => {
+    const analysis = data?.analysis;
+    const tables = analysis?.participant_tables;
+    if (!tables) return data;
+
+    (analysis.detailed_matches || []).forEach(dm => {
+        const packed = dm.participants;
+        if (packed && !Array.isArray(packed) && packed.cols) {
+            dm.participants = unpackParticipants(packed, tables, dm.game_duration || 0);
+        }
+    });
+    delete analysis.participant_tables;
+    return data;
+};
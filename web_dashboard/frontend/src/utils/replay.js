@@ -0,0 +1,32 @@
+import config from '../config';
+import { decodeSeriesMap } from './series';
+
+// Replay data (all-participant positions + gold/XP series) is not part of the
+// analysis payload; it is built per match by /api/matches/<id>/replay/ when the
+// Timeline tab is opened. Series arrive quantized (q1) and are decoded here.
+// Requests are memoized so re-opening a match is free.
+const replayCache = new Map();
+
+export const fetchReplay = (matchId) => {
+    if (!matchId) return Promise.resolve(null);
+    if (!replayCache.has(matchId)) {
+        const request = fetch(`${config.API_URL}/api/matches/${encodeURIComponent(matchId)}/replay/?encoding=q1`)
+            .then(res => (res.ok ? res.json() : null))
+            .then(data => data && {
+                ...data,
+                all_positions: decodeSeriesMap(data.all_positions),
+                all_gold_xp_series: decodeSeriesMap(data.all_gold_xp_series),
+            })
+            .catch(err => {
+                console.error("Failed to load replay data:", err);
+                return null;
+            })
+            .then(data => {
+                // Don't memoize failures, a later open may succeed
+                if (!data) replayCache.delete(matchId);
+                return data;
+            });
+        replayCache.set(matchId, request);
+    }
+    return replayCache.get(matchId);
+};
@@ -0,0 +1,43 @@
+// Decoder for quantized series (see series_lod.encode_series)
+// { enc: "q1", n, time_key, time_scale, t: b64 int32 deltas (ms), types: {field: "h"|"i"}, cols: {field: b64} }
+
+const ENCODING = "q1";
+
+const decodeColumn = (b64, typecode) => {
+    const bin = atob(b64);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    const view = new DataView(bytes.buffer);
+    const width = typecode === "h" ? 2 : 4;
+    const out = new Array(bytes.length / width);
+    for (let i = 0; i < out.length; i++) {
+        out[i] = width === 2 ? view.getInt16(i * width, true) : view.getInt32(i * width, true);
+    }
+    return out;
+};
+
+export const isEncodedSeries = (value) => !!value && !Array.isArray(value) && value.enc === ENCODING;
+
+export const decodeSeries = (encoded) => {
+    if (!isEncodedSeries(encoded)) return encoded;
+    const { n, time_key: timeKey = "time_min", time_scale: timeScale = 60000, types, cols } = encoded;
+
+    const deltas = decodeColumn(encoded.t, "i");
+    const columns = Object.fromEntries(Object.entries(cols).map(([name, b64]) => [name, decodeColumn(b64, types[name])]));
+
+    const rows = new Array(n);
+    let acc = 0;
+    for (let i = 0; i < n; i++) {
+        acc += deltas[i];
+        const row = { [timeKey]: acc / timeScale };
+        Object.keys(columns).forEach(name => { row[name] = columns[name][i]; });
+        rows[i] = row;
+    }
+    return rows;
+};
+
+// { pid: encoded } -> { pid: rows }
+export const decodeSeriesMap = (map) => {
+    if (!map) return map;
+    return Object.fromEntries(Object.entries(map).map(([key, series]) => [key, decodeSeries(series)]));
+};